@@ -0,0 +1,269 @@
+# 근사 최근접 이웃 인덱스 (IVF-PQ Approximate Nearest-neighbour Index)
+#
+# vector_index의 전수 검색은 질문마다 모든 벡터를 읽으므로, 768차원 벡터가 수백만 개를 넘으면 느려집니다.
+# 여기서는 NumPy만으로 IVF-PQ 인덱스를 만듭니다.
+#   IVF: k-평균 중심 nlist개로 벡터를 목록(inverted list)에 나누고, 질문과 가까운 nprobe개 목록만 검색
+#   PQ:  벡터 - 중심(잔차)을 m개 부분 공간으로 나누어 부분 공간마다 256개 코드북 중 하나(1바이트)로 저장
+#        (768차원 float32 3 KB -> m=96이면 96바이트). 질문과 코드북의 내적 표(m, 256)를 한 번 만들어
+#        후보마다 m개 값을 더하는 것으로 내적을 근사합니다.
+# nprobe가 재현율/지연 시간 조절 값이고, refine을 주면 PQ 후보 k × refine개를 로컬 벡터 인덱스의
+# 원래 벡터로 다시 채점합니다. 삽입/삭제는 CHUNK_ID 기준이며, 중심/코드북은 다시 학습하지 않습니다.
+
+import json
+import os
+import time
+
+import numpy as np
+
+from vector_index import normalize_rows
+
+DEFAULT_SUBSPACES = 96          # PQ 부분 공간 수 m (768 / 96 = 8차원씩, 벡터당 96바이트)
+CODEBOOK_SIZE = 256             # 부분 공간당 코드 수 (uint8)
+DEFAULT_NPROBE = 16
+DEFAULT_REFINE = 64             # PQ 후보 k × 64개를 원래 벡터로 다시 채점
+DEFAULT_TRAIN_ROWS = 100000     # 학습에 쓰는 최대 벡터 수
+POINTS_PER_CENTROID = 40        # 중심 하나당 학습 벡터 수 (IVF는 40 × nlist, PQ는 40 × 256개까지만 사용)
+KMEANS_ITERATIONS = 10
+ASSIGN_BLOCK = 8192             # k-평균 할당을 나누어 계산하는 행 수
+
+
+def default_nlist(n_vectors: int) -> int:
+    """목록 수: 대략 4 × sqrt(n) (16 ~ 4096)."""
+    return int(np.clip(4 * np.sqrt(max(n_vectors, 1)), 16, 4096))
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, spherical: bool) -> np.ndarray:
+    """가장 가까운 중심 번호 (spherical이면 내적 최대, 아니면 L2 거리 최소)."""
+    bias = 0.0 if spherical else -0.5 * np.einsum("kd,kd->k", centroids, centroids)
+    labels = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), ASSIGN_BLOCK):
+        labels[start:start + ASSIGN_BLOCK] = np.argmax(x[start:start + ASSIGN_BLOCK] @ centroids.T + bias, axis=1)
+    return labels
+
+
+def kmeans(x: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, spherical: bool = False,
+           seed: int = 0) -> np.ndarray:
+    """Lloyd k-평균. 빈 군집은 임의의 점으로 다시 시작합니다. 반환값: (k, d) 중심."""
+    rng = np.random.default_rng(seed)
+    x = np.asarray(x, dtype=np.float32)
+    centroids = x[rng.choice(len(x), size=k, replace=len(x) < k)].copy()
+    for _ in range(iterations):
+        labels = _assign(x, centroids, spherical)
+        order = np.argsort(labels, kind="stable")
+        clusters, starts, counts = np.unique(labels[order], return_index=True, return_counts=True)
+        sums = np.add.reduceat(x[order], starts, axis=0)
+        centroids[clusters] = sums / counts[:, None]
+        empty = np.setdiff1d(np.arange(k), clusters)
+        if len(empty):
+            centroids[empty] = x[rng.choice(len(x), size=len(empty))]
+        if spherical:
+            centroids = normalize_rows(centroids)
+    return centroids
+
+
+class AnnIndex:
+    """IVF-PQ 인덱스입니다. 디렉터리 하나에 meta.json + index.npz로 저장됩니다.
+
+    목록마다 CHUNK_ID (int64)와 PQ 코드 (len, m) uint8을 가집니다.
+    """
+
+    def __init__(self, centroids: np.ndarray, codebooks: np.ndarray, meta: dict = None):
+        self.centroids = np.asarray(centroids, dtype=np.float32)        # (nlist, dim)
+        self.codebooks = np.asarray(codebooks, dtype=np.float32)        # (m, 256, dim / m)
+        nlist, (m, _, dsub) = len(self.centroids), self.codebooks.shape
+        self.meta = meta or {'nlist': nlist, 'subspaces': m, 'dim': m * dsub, 'synced_rows': 0, 'generation': None}
+        self.list_ids = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        self.list_codes = [np.empty((0, m), dtype=np.uint8) for _ in range(nlist)]
+        self._offsets = (np.arange(m) * CODEBOOK_SIZE).astype(np.intp)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: int = None, subspaces: int = DEFAULT_SUBSPACES, seed: int = 0):
+        """정규화된 학습 벡터로 IVF 중심(구면 k-평균)과 잔차 PQ 코드북을 학습합니다."""
+        vectors = normalize_rows(vectors)
+        dim = vectors.shape[1]
+        if dim % subspaces:
+            raise ValueError(f"차원 {dim}이 부분 공간 수 {subspaces}로 나누어떨어지지 않습니다")
+        nlist = min(nlist or default_nlist(len(vectors)), len(vectors))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.permutation(len(vectors))[:POINTS_PER_CENTROID * nlist]]
+        centroids = kmeans(sample, nlist, spherical=True, seed=seed)
+        sample = vectors[rng.permutation(len(vectors))[:POINTS_PER_CENTROID * CODEBOOK_SIZE]]
+        residuals = sample - centroids[_assign(sample, centroids, spherical=True)]
+        dsub = dim // subspaces
+        codebooks = np.stack([kmeans(residuals[:, m * dsub:(m + 1) * dsub], CODEBOOK_SIZE, seed=seed + m)
+                              for m in range(subspaces)])
+        return cls(centroids, codebooks)
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self.list_ids)
+
+    def nbytes(self) -> int:
+        """목록(CHUNK_ID + 코드)과 중심/코드북의 메모리 크기."""
+        return (sum(ids.nbytes + codes.nbytes for ids, codes in zip(self.list_ids, self.list_codes))
+                + self.centroids.nbytes + self.codebooks.nbytes)
+
+    def encode(self, vectors: np.ndarray):
+        """벡터 -> (목록 번호, PQ 코드 (n, m) uint8)."""
+        vectors = normalize_rows(vectors)
+        lists = _assign(vectors, self.centroids, spherical=True)
+        residuals = vectors - self.centroids[lists]
+        m, _, dsub = self.codebooks.shape
+        codes = np.empty((len(vectors), m), dtype=np.uint8)
+        for i in range(m):
+            codes[:, i] = _assign(residuals[:, i * dsub:(i + 1) * dsub], self.codebooks[i], spherical=False)
+        return lists, codes
+
+    def delete(self, chunk_ids) -> int:
+        """CHUNK_ID의 항목을 지웁니다. 반환값: 지운 항목 수."""
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        removed = 0
+        for l, ids in enumerate(self.list_ids):
+            if len(ids):
+                keep = ~np.isin(ids, chunk_ids)
+                if not keep.all():
+                    removed += int((~keep).sum())
+                    self.list_ids[l], self.list_codes[l] = ids[keep], self.list_codes[l][keep]
+        return removed
+
+    def add(self, chunk_ids, vectors, replace: bool = True) -> int:
+        """벡터를 넣습니다. replace면 같은 CHUNK_ID의 기존 항목을 먼저 지웁니다. 반환값: 교체된 항목 수."""
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        if not len(chunk_ids):
+            return 0
+        replaced = self.delete(chunk_ids) if replace else 0
+        lists, codes = self.encode(vectors)
+        order = np.argsort(lists, kind="stable")
+        targets, starts = np.unique(lists[order], return_index=True)
+        for l, ids, list_codes in zip(targets, np.split(chunk_ids[order], starts[1:]), np.split(codes[order], starts[1:])):
+            self.list_ids[l] = np.concatenate([self.list_ids[l], ids])
+            self.list_codes[l] = np.concatenate([self.list_codes[l], list_codes])
+        return replaced
+
+    def search(self, queries, k: int = 10, nprobe: int = DEFAULT_NPROBE, refine: int = DEFAULT_REFINE,
+               vector_index=None):
+        """근사 상위 k개. nprobe: 검색할 목록 수 (클수록 재현율↑, 지연↑)
+
+        refine, vector_index: PQ 후보 k × refine개를 vector_index(VectorIndex)의 벡터로 다시 채점
+        반환값: (CHUNK_ID (b, k), 점수 (b, k)) - 점수 내림차순, 부족하면 CHUNK_ID -1
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        m, _, dsub = self.codebooks.shape
+        nprobe = min(nprobe, len(self.centroids))
+        coarse = queries @ self.centroids.T                                          # (b, nlist)
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+        tables = np.einsum("bmd,mkd->bmk", queries.reshape(len(queries), m, dsub), self.codebooks)
+        tables = tables.reshape(len(queries), m * CODEBOOK_SIZE)                     # 질문별 내적 표
+        n_candidates = k * refine if refine and vector_index is not None else k
+
+        result_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        result_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for i, probe in enumerate(probes):
+            ids = np.concatenate([self.list_ids[l] for l in probe])
+            if not len(ids):
+                continue
+            codes = np.concatenate([self.list_codes[l] for l in probe])
+            base = np.repeat(coarse[i, probe], [len(self.list_ids[l]) for l in probe])
+            scores = base + tables[i][codes.astype(np.intp) + self._offsets].sum(axis=1)
+            if len(scores) > n_candidates:
+                top = np.argpartition(scores, -n_candidates)[-n_candidates:]
+                ids, scores = ids[top], scores[top]
+            if n_candidates > k:
+                rows = vector_index.rows_for(ids)
+                found = rows >= 0
+                ids, scores = ids[found], vector_index.vectors_for(rows[found]) @ queries[i]
+            order = np.argsort(-scores)[:k]
+            result_ids[i, :len(order)], result_scores[i, :len(order)] = ids[order], scores[order]
+        return result_ids, result_scores
+
+    def sync(self, vector_index) -> dict:
+        """로컬 벡터 인덱스의 변경을 반영합니다 (새 행 삽입, 삭제/교체된 CHUNK_ID 제거).
+
+        vector_index가 압축되거나 다시 만들어졌으면(행 번호가 바뀜) 모든 벡터를 다시 넣습니다 (학습은 유지).
+        반환값: {'added', 'deleted', 'reloaded', 'seconds'}
+        """
+        start_time = time.perf_counter()
+        reloaded = self.meta['generation'] != vector_index.meta.get('generation', 0)
+        if reloaded:
+            self.list_ids = [ids[:0] for ids in self.list_ids]
+            self.list_codes = [codes[:0] for codes in self.list_codes]
+            self.meta['synced_rows'] = 0
+
+        # 인덱스에는 있지만 로컬 인덱스에서 살아 있지 않은 CHUNK_ID 제거
+        deleted = 0
+        if len(self):
+            indexed = np.concatenate(self.list_ids)
+            deleted = self.delete(indexed[vector_index.rows_for(indexed) < 0])
+
+        # 마지막 동기화 이후 덧붙은 행 (교체된 CHUNK_ID 포함)
+        added = 0
+        total_rows = vector_index.meta['rows']
+        replace = self.meta['synced_rows'] > 0  # 처음부터 넣을 때는 CHUNK_ID가 겹치지 않음
+        for start in range(self.meta['synced_rows'], total_rows, DEFAULT_TRAIN_ROWS):
+            rows = np.arange(start, min(start + DEFAULT_TRAIN_ROWS, total_rows))
+            rows = rows[np.asarray(vector_index.live[rows])]
+            self.add(np.asarray(vector_index.ids[rows]), vector_index.vectors_for(rows), replace=replace)
+            added += len(rows)
+        self.meta.update({'synced_rows': total_rows, 'generation': vector_index.meta.get('generation', 0)})
+        return {'added': added, 'deleted': deleted, 'reloaded': reloaded, 'seconds': time.perf_counter() - start_time}
+
+    def save(self, directory: str):
+        """디렉터리에 저장합니다 (임시 파일 + os.replace)."""
+        os.makedirs(directory, exist_ok=True)
+        lengths = np.array([len(ids) for ids in self.list_ids], dtype=np.int64)
+        tmp_path = os.path.join(directory, "index.tmp.npz")
+        np.savez(tmp_path, centroids=self.centroids, codebooks=self.codebooks, lengths=lengths,
+                 ids=np.concatenate(self.list_ids), codes=np.concatenate(self.list_codes))
+        os.replace(tmp_path, os.path.join(directory, "index.npz"))
+        with open(os.path.join(directory, "meta.json.tmp"), "w") as f:
+            json.dump(self.meta, f)
+        os.replace(os.path.join(directory, "meta.json.tmp"), os.path.join(directory, "meta.json"))
+
+    @classmethod
+    def load(cls, directory: str):
+        """저장된 인덱스를 엽니다. 없으면 None."""
+        path = os.path.join(directory, "index.npz")
+        if not os.path.exists(path):
+            return None
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        with np.load(path) as data:
+            index = cls(data["centroids"], data["codebooks"], meta)
+            splits = np.cumsum(data["lengths"])[:-1]
+            index.list_ids = np.split(data["ids"], splits)
+            index.list_codes = np.split(data["codes"], splits)
+        return index
+
+
+class AnnSearcher:
+    """VectorIndex와 같은 search/metadata 인터페이스로 AnnIndex를 씁니다 (vector_index.search_chunks에 그대로 전달)."""
+
+    def __init__(self, ann: AnnIndex, vector_index, nprobe: int = DEFAULT_NPROBE, refine: int = DEFAULT_REFINE):
+        self.ann = ann
+        self.vector_index = vector_index
+        self.nprobe = nprobe
+        self.refine = refine
+
+    def __len__(self) -> int:
+        return len(self.ann)
+
+    def search(self, queries, k: int = 5):
+        """반환값: (vector_index의 행 번호 (b, k), 점수 (b, k))"""
+        ids, scores = self.ann.search(queries, k, self.nprobe, self.refine, self.vector_index)
+        return self.vector_index.rows_for(ids), scores
+
+    def metadata(self, rows) -> list:
+        return self.vector_index.metadata(rows)
+
+
+def build_ann_index(vector_index, nlist: int = None, subspaces: int = DEFAULT_SUBSPACES,
+                    train_rows: int = DEFAULT_TRAIN_ROWS, seed: int = 0) -> AnnIndex:
+    """로컬 벡터 인덱스(Day 18 임베딩 테이블을 내보낸 것)의 표본으로 학습하고 모든 벡터를 넣습니다."""
+    live_rows = np.flatnonzero(vector_index.live)
+    if not len(live_rows):
+        raise ValueError("로컬 벡터 인덱스가 비어 있습니다")
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(live_rows, size=min(train_rows, len(live_rows)), replace=False))
+    index = AnnIndex.train(vector_index.vectors_for(sample), nlist=nlist or default_nlist(len(live_rows)),
+                           subspaces=subspaces, seed=seed)
+    index.sync(vector_index)
+    return index
@@ -0,0 +1,333 @@
+# 모델 비교 아레나 헬퍼 (Model Arena Helpers)
+#
+# Day 15의 모델 비교에서 사용하는 측정 및 동시 실행 로직입니다.
+# Streamlit에 의존하지 않으므로 다른 스크립트에서도 재사용할 수 있습니다.
+
+import hashlib
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+def prompt_hash(prompt: str) -> str:
+    """프롬프트 원문 대신 저장할 짧은 해시입니다."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수를 추정합니다 (1 토큰 ≈ 0.75 단어)."""
+    return int(len(text.split()) * 4/3)
+
+
+def measure_stream(chunks, start: float = None, on_token=None) -> dict:
+    """스트림을 소비하면서 지연 시간, 첫 토큰까지의 시간(TTFT), 토큰 수를 측정합니다.
+
+    start: time.perf_counter() 기준 시작 시각. 여러 모델을 동시에 실행할 때
+           같은 값을 넘기면 모든 타이머가 같은 순간에 시작합니다.
+    on_token: 청크가 도착할 때마다 호출되는 콜백
+    """
+    if start is None:
+        start = time.perf_counter()
+
+    parts = []
+    ttft = None
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        parts.append(chunk)
+        if on_token:
+            on_token(chunk)
+
+    text = "".join(parts)
+    latency = time.perf_counter() - start
+    tokens = estimate_tokens(text)
+
+    return {
+        "latency": latency,
+        "ttft": ttft if ttft is not None else latency,
+        "tokens": tokens,
+        "tokens_per_sec": tokens / latency if latency > 0 else 0.0,
+        "response_text": text
+    }
+
+
+def error_result(start: float, error: Exception) -> dict:
+    """실패한 실행을 결과와 같은 형태의 딕셔너리로 만듭니다."""
+    latency = time.perf_counter() - start
+    return {
+        "latency": latency,
+        "ttft": None,
+        "tokens": 0,
+        "tokens_per_sec": 0.0,
+        "response_text": f"오류: {error}",
+        "error": str(error)
+    }
+
+
+def run_concurrently(run_fn, jobs: dict, prompt: str, max_workers: int = None):
+    """여러 모델을 워커 풀에서 동시에 실행하고 이벤트를 도착 순서대로 내보냅니다.
+
+    run_fn: run_fn(model, prompt, start=..., on_token=...) -> dict
+    jobs: {키: 모델 이름} (같은 모델을 두 번 비교할 수 있도록 키를 사용)
+
+    내보내는 이벤트:
+    - ("token", key, chunk): 토큰이 도착함
+    - ("done", key, result): 모델 실행 완료 (실패 시 result["error"] 포함,
+      result["queue_wait"]는 워커를 기다린 시간)
+
+    max_workers가 모델 수보다 작으면 대기열에서 기다린 시간이 지연 시간/TTFT에 섞이지 않도록
+    각 모델의 타이머는 워커가 실행을 시작할 때 시작합니다.
+    Streamlit 요소는 스크립트 스레드에서만 갱신해야 하므로, 워커는 큐에 이벤트만 넣고
+    화면 갱신은 이 제너레이터를 소비하는 쪽에서 합니다.
+    """
+    events = queue.Queue()
+    max_workers = max_workers or len(jobs)
+    submitted = time.perf_counter()
+    shared_start = max_workers >= len(jobs)  # 모두 바로 실행되면 모든 타이머가 같은 순간에 시작
+
+    def worker(key, model):
+        start = submitted if shared_start else time.perf_counter()
+        try:
+            result = run_fn(model, prompt, start=start,
+                            on_token=lambda chunk: events.put(("token", key, chunk)))
+        except Exception as e:
+            result = error_result(start, e)
+        result["queue_wait"] = start - submitted
+        events.put(("done", key, result))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for key, model in jobs.items():
+            pool.submit(worker, key, model)
+
+        remaining = len(jobs)
+        while remaining:
+            event = events.get()
+            if event[0] == "done":
+                remaining -= 1
+            yield event
+
+
+def history_records(prompt: str, results: dict, timestamp: float = None) -> list:
+    """한 번의 비교 결과를 모델별 히스토리 레코드 목록으로 변환합니다.
+
+    오류 없이 토큰을 하나도 만들지 않은 실행(예: 실습 코드가 비어 있는 run_model)은 기록하지 않습니다.
+    """
+    timestamp = timestamp or time.time()
+    return [
+        {
+            "model": model,
+            "prompt": prompt,
+            "latency": result["latency"],
+            "ttft": result.get("ttft"),
+            "tokens": result["tokens"],
+            "tokens_per_sec": result.get("tokens_per_sec", 0.0),
+            "error": result.get("error"),
+            "timestamp": timestamp
+        }
+        for model, result in results.items()
+        if result["tokens"] or result.get("error")
+    ]
+
+
+def summarize(records: list, quantiles=(0.50, 0.95)):
+    """히스토리 레코드에서 모델별 지연 시간, TTFT 백분위수와 초당 토큰 수를 계산합니다.
+
+    실패한 실행은 Errors/Error Rate에만 집계하고 백분위수 계산에서는 제외합니다.
+    """
+    labels = [f"p{round(q * 100)}" for q in quantiles]
+    columns = (["Model", "Runs", "Errors", "Error Rate"]
+               + [f"{label} Latency (s)" for label in labels]
+               + [f"{label} TTFT (s)" for label in labels]
+               + ["Tokens/s"])
+    if not records:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.DataFrame(records)
+    rows = []
+    for model, group in df.groupby("model"):
+        ok = group[group["error"].isna()]
+        row = {
+            "Model": model,
+            "Runs": len(group),
+            "Errors": len(group) - len(ok),
+            "Error Rate": (len(group) - len(ok)) / len(group)
+        }
+        for q, label in zip(quantiles, labels):
+            row[f"{label} Latency (s)"] = ok["latency"].quantile(q)
+            row[f"{label} TTFT (s)"] = ok["ttft"].quantile(q)
+        row["Tokens/s"] = ok["tokens_per_sec"].median()
+        rows.append(row)
+
+    sort_column = f"{labels[0]} Latency (s)"
+    return pd.DataFrame(rows, columns=columns).sort_values(sort_column).reset_index(drop=True)
+
+
+def leaderboard(records: list):
+    """히스토리 레코드에서 모델별 p50/p95 지연 시간, TTFT, 초당 토큰 수를 계산합니다."""
+    return summarize(records, quantiles=(0.50, 0.95)).drop(columns=["Error Rate"])
+
+
+# --- 실행 기록 저장소 (Run History Stores) ---
+
+HISTORY_COLUMNS = ["run_id", "model", "prompt_hash", "latency", "ttft", "tokens",
+                   "tokens_per_sec", "error", "source", "ts"]
+
+
+def _history_frame(records: list, source: str) -> pd.DataFrame:
+    """레코드를 저장용 데이터프레임으로 변환합니다 (프롬프트 원문은 해시로 대체)."""
+    run_id = uuid.uuid4().hex
+    rows = []
+    for r in records:
+        rows.append({
+            "run_id": r.get("run_id", run_id),
+            "model": r["model"],
+            "prompt_hash": r.get("prompt_hash") or prompt_hash(r.get("prompt", "")),
+            "latency": r["latency"],
+            "ttft": r.get("ttft"),
+            "tokens": r["tokens"],
+            "tokens_per_sec": r.get("tokens_per_sec", 0.0),
+            "error": r.get("error"),
+            "source": source,
+            "ts": pd.Timestamp(r.get("timestamp", time.time()), unit="s")
+        })
+    return pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+
+
+class SQLiteHistoryStore:
+    """로컬 SQLite 파일에 아레나 실행 기록을 일괄 추가합니다.
+
+    st.cache_resource로 여러 세션이 공유하므로 버퍼는 잠금으로 보호합니다.
+    """
+
+    def __init__(self, path: str = "arena_history.db", batch_size: int = 200, source: str = "arena"):
+        self.path = path
+        self.batch_size = batch_size
+        self.source = source
+        self._buffer = []
+        self._lock = threading.Lock()
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS arena_runs (
+                    run_id TEXT, model TEXT, prompt_hash TEXT, latency REAL, ttft REAL,
+                    tokens INTEGER, tokens_per_sec REAL, error TEXT, source TEXT, ts TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_arena_runs_ts ON arena_runs (ts)")
+
+    def append(self, records: list):
+        """레코드를 버퍼에 추가하고, batch_size를 넘으면 한 번에 기록합니다."""
+        frame = _history_frame(records, self.source)
+        with self._lock:
+            self._buffer.append(frame)
+            full = sum(len(df) for df in self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._lock:  # 버퍼를 꺼내는 동안 다른 세션이 추가하지 않도록
+            buffer, self._buffer = self._buffer, []
+        if not buffer:
+            return 0
+        df = pd.concat(buffer, ignore_index=True)
+        df["ts"] = df["ts"].dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany(
+                f"INSERT INTO arena_runs ({', '.join(HISTORY_COLUMNS)}) VALUES ({', '.join('?' * len(HISTORY_COLUMNS))})",
+                df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+            )
+        return len(df)
+
+    def load(self, days: int = None) -> pd.DataFrame:
+        query = f"SELECT {', '.join(HISTORY_COLUMNS)} FROM arena_runs"
+        params = ()
+        if days:
+            query += " WHERE ts >= ?"
+            params = ((pd.Timestamp.now(tz="UTC").tz_localize(None) - pd.Timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S"),)
+        with sqlite3.connect(self.path) as conn:
+            df = pd.read_sql_query(query + " ORDER BY ts", conn, params=params)
+        df["ts"] = pd.to_datetime(df["ts"])
+        return df
+
+
+class SnowflakeHistoryStore:
+    """Snowflake 테이블에 아레나 실행 기록을 write_pandas로 일괄 추가합니다 (버퍼는 잠금으로 보호)."""
+
+    def __init__(self, session, table: str = "RAG_DB.RAG_SCHEMA.ARENA_RESULTS",
+                 batch_size: int = 200, source: str = "arena"):
+        self.session = session
+        self.database, self.schema, self.table = table.split(".")
+        self.full_table = table
+        self.batch_size = batch_size
+        self.source = source
+        self._buffer = []
+        self._lock = threading.Lock()
+        session.sql(f"CREATE DATABASE IF NOT EXISTS {self.database}").collect()
+        session.sql(f"CREATE SCHEMA IF NOT EXISTS {self.database}.{self.schema}").collect()
+        session.sql(f"""
+            CREATE TABLE IF NOT EXISTS {self.full_table} (
+                RUN_ID VARCHAR, MODEL VARCHAR, PROMPT_HASH VARCHAR, LATENCY FLOAT, TTFT FLOAT,
+                TOKENS NUMBER, TOKENS_PER_SEC FLOAT, ERROR VARCHAR, SOURCE VARCHAR, TS TIMESTAMP_NTZ
+            )
+        """).collect()
+
+    def append(self, records: list):
+        """레코드를 버퍼에 추가하고, batch_size를 넘으면 한 번에 기록합니다."""
+        frame = _history_frame(records, self.source)
+        with self._lock:
+            self._buffer.append(frame)
+            full = sum(len(df) for df in self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._lock:  # 버퍼를 꺼내는 동안 다른 세션이 추가하지 않도록
+            buffer, self._buffer = self._buffer, []
+        if not buffer:
+            return 0
+        df = pd.concat(buffer, ignore_index=True)
+        df.columns = [c.upper() for c in df.columns]
+        self.session.write_pandas(df, table_name=self.table, database=self.database,
+                                  schema=self.schema, overwrite=False, use_logical_type=True,
+                                  quote_identifiers=False)  # CREATE TABLE로 만든 대문자 이름과 맞춤
+        return len(df)
+
+    def load(self, days: int = None) -> pd.DataFrame:
+        query = f"SELECT {', '.join(c.upper() for c in HISTORY_COLUMNS)} FROM {self.full_table}"
+        if days:
+            # TS는 UTC(NTZ)로 저장되므로 세션 시간대가 아닌 UTC 현재 시각과 비교
+            query += f" WHERE TS >= DATEADD(day, -{int(days)}, SYSDATE())"
+        df = self.session.sql(query + " ORDER BY TS").to_pandas()
+        df.columns = [c.lower() for c in df.columns]
+        df["ts"] = pd.to_datetime(df["ts"])
+        return df
+
+
+# --- 대시보드 집계 (Dashboard Aggregations) ---
+
+def latency_histogram(df: pd.DataFrame, bins: int = 20) -> pd.DataFrame:
+    """모델별 지연 시간 히스토그램 (행: 구간, 열: 모델)."""
+    ok = df[df["error"].isna()]
+    if ok.empty:
+        return pd.DataFrame()
+    edges = pd.interval_range(start=0.0, end=float(ok["latency"].max()) * 1.0001, periods=bins)
+    binned = pd.cut(ok["latency"], edges)
+    table = pd.crosstab(binned, ok["model"]).reindex(edges, fill_value=0)
+    table.index = [f"{interval.left:.2f}-{interval.right:.2f}s" for interval in table.index]
+    return table
+
+
+def percentile_trend(df: pd.DataFrame, quantile: float = 0.50, freq: str = "D") -> pd.DataFrame:
+    """기간(freq)별 모델 지연 시간 백분위수 추이 (행: 기간, 열: 모델)."""
+    ok = df[df["error"].isna()]
+    if ok.empty:
+        return pd.DataFrame()
+    return (ok.groupby([pd.Grouper(key="ts", freq=freq), "model"])["latency"]
+              .quantile(quantile)
+              .unstack("model"))
@@ -0,0 +1,193 @@
+# 헤드리스 아레나 벤치마크 (Headless Arena Benchmark)
+#
+# 프롬프트 묶음 × 모델 목록을 R번씩 반복 실행하여 지연 시간 분포를 측정합니다.
+# Day 15의 run_model과 같은 측정 로직(arena.measure_stream)을 사용합니다.
+#
+# 사용 예:
+#   python arena_bench.py --prompts prompts.txt --models llama3-8b,mistral-7b \
+#       --repetitions 10 --warmup 2 --concurrency 4 --csv runs.csv --json summary.json
+#
+#   # Snowflake 없이 로컬 대체 백엔드로 실행
+#   python arena_bench.py --prompts prompts.txt --models a,b --backend local
+
+import argparse
+import json
+import random
+import sys
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from arena import measure_stream, error_result, summarize, prompt_hash, SQLiteHistoryStore
+
+QUANTILES = (0.50, 0.90, 0.99)
+
+
+def load_prompts(path: str) -> list:
+    """프롬프트 파일을 읽습니다 (.txt: 한 줄에 하나, .json: 문자열 목록, .jsonl: {"prompt": ...})."""
+    text = Path(path).read_text(encoding="utf-8")
+    if path.endswith(".jsonl"):
+        return [json.loads(line)["prompt"] for line in text.splitlines() if line.strip()]
+    if path.endswith(".json"):
+        return [p if isinstance(p, str) else p["prompt"] for p in json.loads(text)]
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def local_backend(time_scale: float = 1.0, error_rate: float = 0.0, seed: int = 0):
+    """Snowflake 없이 동작하는 대체 백엔드입니다.
+
+    모델 이름마다 고정된 TTFT와 생성 속도를 가지며, 실행마다 약간의 지터가 있습니다.
+    """
+    rng = random.Random(seed)
+
+    def stream(model: str, prompt: str):
+        profile = random.Random(model)  # 모델별로 항상 같은 프로필
+        ttft = profile.uniform(0.05, 0.40)
+        tokens_per_sec = profile.uniform(40, 200)
+        n_words = 40 + len(prompt.split()) * 4
+        fail = rng.random() < error_rate
+        jitter = rng.uniform(0.8, 1.3)
+
+        time.sleep(ttft * jitter * time_scale)
+        if fail:
+            raise RuntimeError(f"{model}: simulated backend error")
+        for i in range(n_words):
+            time.sleep(0.75 / tokens_per_sec * jitter * time_scale)
+            yield f"word{i} "
+
+    return stream
+
+
+def cortex_backend(connection: str = None):
+    """Snowflake Cortex Complete 스트리밍 백엔드입니다."""
+    from snowflake.cortex import Complete
+    from snowflake.snowpark import Session
+
+    secrets_path = Path(connection or Path(__file__).parent / ".streamlit" / "secrets.toml")
+    with open(secrets_path, "rb") as f:
+        configs = tomllib.load(f)["connections"]["snowflake"]
+    session = Session.builder.configs(configs).create()
+
+    def stream(model: str, prompt: str):
+        return Complete(model=model, prompt=prompt, session=session, stream=True)
+
+    return stream
+
+
+def run_benchmark(stream_fn, models: list, prompts: list, repetitions: int = 5,
+                  warmup: int = 1, concurrency: int = 4, on_record=None, timings: dict = None) -> list:
+    """모든 (모델, 프롬프트, 반복) 조합을 동시 실행 수 제한 내에서 실행합니다.
+
+    워밍업 실행은 먼저 모두 끝낸 뒤 측정 실행을 시작하며, warmup=True로 기록됩니다.
+    timings: 주면 단계별 경과 시간 {'warmup': 초, 'measured': 초}을 채웁니다.
+    """
+    def run_one(model, prompt_id, prompt, repetition, is_warmup):
+        start = time.perf_counter()
+        try:
+            result = measure_stream(stream_fn(model, prompt), start=start)
+        except Exception as e:
+            result = error_result(start, e)
+        record = {
+            "model": model,
+            "prompt_id": prompt_id,
+            "prompt_hash": prompt_hash(prompt),
+            "repetition": repetition,
+            "warmup": is_warmup,
+            "latency": result["latency"],
+            "ttft": result["ttft"],
+            "tokens": result["tokens"],
+            "tokens_per_sec": result["tokens_per_sec"],
+            "error": result.get("error"),
+            "timestamp": time.time()
+        }
+        if on_record:
+            on_record(record)
+        return record
+
+    records = []
+    phases = [(True, range(warmup)), (False, range(warmup, warmup + repetitions))]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for is_warmup, reps in phases:
+            phase_start = time.perf_counter()
+            futures = [
+                pool.submit(run_one, model, prompt_id, prompt, rep, is_warmup)
+                for rep in reps
+                for prompt_id, prompt in enumerate(prompts)
+                for model in models
+            ]
+            records.extend(f.result() for f in futures)
+            if timings is not None:
+                timings["warmup" if is_warmup else "measured"] = time.perf_counter() - phase_start
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="프롬프트 × 모델 매트릭스 지연 시간 벤치마크")
+    parser.add_argument("--prompts", required=True, help="프롬프트 파일 (.txt / .json / .jsonl)")
+    parser.add_argument("--models", required=True, help="쉼표로 구분된 모델 목록")
+    parser.add_argument("--repetitions", "-r", type=int, default=5, help="프롬프트당 측정 반복 횟수")
+    parser.add_argument("--warmup", type=int, default=1, help="통계에서 제외할 워밍업 반복 횟수")
+    parser.add_argument("--concurrency", "-c", type=int, default=4, help="최대 동시 요청 수")
+    parser.add_argument("--backend", choices=["cortex", "local"], default="cortex")
+    parser.add_argument("--connection", help="secrets.toml 경로 (cortex 백엔드)")
+    parser.add_argument("--local-time-scale", type=float, default=1.0, help="로컬 백엔드 지연 배율")
+    parser.add_argument("--local-error-rate", type=float, default=0.0, help="로컬 백엔드 오류 비율")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="모든 실행 기록을 저장할 CSV 경로")
+    parser.add_argument("--json", help="요약 및 실행 기록을 저장할 JSON 경로")
+    parser.add_argument("--history", help="측정 실행을 추가할 SQLite 기록 파일 (Day 15 대시보드와 공유)")
+    args = parser.parse_args(argv)
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    prompts = load_prompts(args.prompts)
+    if args.backend == "local":
+        stream_fn = local_backend(args.local_time_scale, args.local_error_rate, args.seed)
+    else:
+        stream_fn = cortex_backend(args.connection)
+
+    total = len(models) * len(prompts) * (args.repetitions + args.warmup)
+    done = [0]
+
+    def on_record(record):
+        done[0] += 1
+        print(f"\r{done[0]}/{total} 실행 완료", end="", file=sys.stderr, flush=True)
+
+    timings = {}
+    records = run_benchmark(stream_fn, models, prompts, args.repetitions, args.warmup,
+                            args.concurrency, on_record=on_record, timings=timings)
+    wall = timings["measured"]  # 처리량은 워밍업을 뺀 측정 단계 시간으로 계산
+    print(file=sys.stderr)
+
+    measured = [r for r in records if not r["warmup"]]
+    summary = summarize(measured, quantiles=QUANTILES)
+    total_tokens = sum(r["tokens"] for r in measured)
+
+    if args.csv:
+        pd.DataFrame(records).to_csv(args.csv, index=False)
+    if args.history:
+        store = SQLiteHistoryStore(args.history, source="benchmark")
+        store.append(measured)
+        store.flush()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "config": {k: v for k, v in vars(args).items() if k not in ("csv", "json")},
+                "wall_time_s": wall,
+                "warmup_time_s": timings["warmup"],
+                "throughput_tokens_per_s": total_tokens / wall if wall > 0 else 0.0,
+                "summary": summary.to_dict(orient="records"),
+                "runs": records
+            }, f, ensure_ascii=False, indent=2)
+
+    with pd.option_context("display.width", 200, "display.max_columns", None,
+                           "display.float_format", "{:.3f}".format):
+        print(summary.to_string(index=False))
+    print(f"\n측정 실행 {len(measured)}회 (워밍업 {len(records) - len(measured)}회 제외), "
+          f"측정 {wall:.1f}s (워밍업 {timings['warmup']:.1f}s 별도), 처리량 {total_tokens / wall if wall > 0 else 0:.1f} tokens/s")
+
+
+if __name__ == "__main__":
+    main()
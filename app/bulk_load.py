@@ -0,0 +1,158 @@
+# Snowflake 일괄 로더 (Bulk Loader)
+#
+# 행마다 INSERT 문을 만드는 대신, 행을 데이터프레임으로 모아 write_pandas 한 번으로 로드합니다.
+# write_pandas는 데이터를 Parquet 파일로 스테이지에 병렬 업로드한 뒤 COPY INTO 한 번으로 적재하므로
+# 텍스트를 SQL 리터럴로 이스케이프할 필요가 없습니다.
+
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 10000  # 스테이지에 올리는 Parquet 파일당 행 수
+DEFAULT_PARALLEL = 4        # 동시 업로드 스레드 수
+
+
+def bulk_load(session, rows, table_name: str, database: str = None, schema: str = None,
+              chunk_size: int = DEFAULT_CHUNK_SIZE, parallel: int = DEFAULT_PARALLEL,
+              overwrite: bool = False, auto_create_table: bool = False, on_chunk=None) -> list:
+    """행들을 한 번의 stage + COPY INTO 작업으로 테이블에 로드합니다.
+
+    rows: 데이터프레임 또는 딕셔너리 목록. 컬럼 이름은 대문자로 바뀌어 테이블 컬럼과 매칭되며,
+          데이터프레임에 없는 컬럼(AUTOINCREMENT, DEFAULT 등)은 테이블 기본값을 사용합니다.
+    on_chunk: on_chunk(loaded_rows, total_rows) 진행 상황 콜백
+
+    반환값: 행마다 {'row': 인덱스, 'loaded': bool, 'error': str 또는 None} 목록.
+    전체 로드가 실패하면 chunk_size 단위로 나누어 다시 시도하므로, 문제가 있는 묶음만 실패로 보고됩니다.
+    """
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+    df = df.reset_index(drop=True)
+    df.columns = [str(c).upper() for c in df.columns]
+    total = len(df)
+    if total == 0:
+        return []
+
+    def write(part: pd.DataFrame, overwrite_table: bool):
+        session.write_pandas(
+            part,
+            table_name=table_name,
+            database=database,
+            schema=schema,
+            chunk_size=chunk_size,
+            parallel=parallel,
+            overwrite=overwrite_table,
+            auto_create_table=auto_create_table,
+            quote_identifiers=False  # CREATE TABLE로 만든 대문자 이름과 맞춤 (입력이 소문자여도)
+        )
+
+    try:
+        write(df, overwrite)
+        if on_chunk:
+            on_chunk(total, total)
+        return [{'row': i, 'loaded': True, 'error': None} for i in range(total)]
+    except Exception as e:
+        if total <= chunk_size:
+            return [{'row': i, 'loaded': False, 'error': str(e)} for i in range(total)]
+
+    # 묶음 단위로 다시 시도 (overwrite는 첫 묶음에만 적용)
+    results = []
+    for start in range(0, total, chunk_size):
+        part = df.iloc[start:start + chunk_size]
+        try:
+            write(part, overwrite and start == 0)
+            error = None
+        except Exception as e:
+            error = str(e)
+        results.extend({'row': i, 'loaded': error is None, 'error': error}
+                       for i in range(start, start + len(part)))
+        if on_chunk:
+            on_chunk(min(start + chunk_size, total), total)
+    return results
+
+
+def failed_rows(results: list) -> list:
+    """bulk_load 결과에서 실패한 행만 골라냅니다."""
+    return [r for r in results if not r['loaded']]
+
+
+def merge_load(session, rows, table_name: str, database: str, schema: str, key_columns: list,
+               touch_columns: dict = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+               parallel: int = DEFAULT_PARALLEL) -> dict:
+    """행들을 임시 스테이징 테이블에 일괄 로드한 뒤 MERGE 한 번으로 대상 테이블에 반영합니다.
+
+    key_columns: 일치 여부를 판단할 컬럼 (예: ['FILE_NAME'])
+    touch_columns: 업데이트/삽입 시 SQL 식으로 설정할 컬럼 (예: {'UPLOAD_TIMESTAMP': 'CURRENT_TIMESTAMP()'})
+
+    반환값: {'inserted': 삽입된 행 수, 'updated': 업데이트된 행 수, 'failed': 로드 실패 행 목록}
+    실패 행의 'row'는 중복 제거 전 입력 rows의 위치이며, 'key'에 키 컬럼 값이 들어 있습니다.
+    """
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+    if df.empty:
+        return {'inserted': 0, 'updated': 0, 'failed': []}
+    df = df.reset_index(drop=True)
+    df.columns = [str(c).upper() for c in df.columns]
+    df = df.drop_duplicates(subset=[c.upper() for c in key_columns], keep='last')  # MERGE는 키당 원본 행이 하나여야 함
+
+    target = f"{database}.{schema}.{table_name}"
+    columns = list(df.columns)
+    staging, failed = stage_rows(session, df, table_name, database, schema, chunk_size, parallel)
+    keys = [c.upper() for c in key_columns]
+    failed = [{**r, 'row': int(df.index[r['row']]), 'key': df.iloc[r['row']][keys].to_dict()} for r in failed]
+
+    counts = merge_staged(session, staging, target, key_columns, columns, touch_columns)
+    session.sql(f"DROP TABLE IF EXISTS {staging}").collect()
+    return {**counts, 'failed': failed}
+
+
+def stage_rows(session, df: pd.DataFrame, table_name: str, database: str, schema: str,
+               chunk_size: int = DEFAULT_CHUNK_SIZE, parallel: int = DEFAULT_PARALLEL) -> tuple:
+    """데이터프레임을 임시 스테이징 테이블 {table_name}_STAGING에 일괄 로드합니다.
+
+    컬럼 타입은 dtype에서 정하고, 컬럼 이름은 대문자로 바꿉니다.
+    반환값: (스테이징 테이블 전체 이름, 로드 실패 행 목록)
+    """
+    df = df.rename(columns=lambda c: str(c).upper())
+    staging_name = f"{table_name}_STAGING"
+    staging = f"{database}.{schema}.{staging_name}"
+    session.sql(f"CREATE OR REPLACE TEMPORARY TABLE {staging} ({', '.join(f'{c} {_sql_type(df[c])}' for c in df.columns)})").collect()
+    failed = failed_rows(bulk_load(session, df, staging_name, database=database, schema=schema,
+                                   chunk_size=chunk_size, parallel=parallel))
+    return staging, failed
+
+
+def merge_staged(session, staging: str, target: str, key_columns: list, columns: list,
+                 touch_columns: dict = None) -> dict:
+    """스테이징 테이블의 행을 MERGE 한 번으로 대상 테이블에 반영합니다 (키가 같으면 업데이트, 없으면 삽입).
+
+    반환값: {'inserted': 삽입된 행 수, 'updated': 업데이트된 행 수}
+    """
+    touch_columns = touch_columns or {}
+    on_clause = " AND ".join(f"t.{c} = s.{c}" for c in key_columns)
+    set_clause = ", ".join([f"t.{c} = s.{c}" for c in columns if c not in key_columns]
+                           + [f"t.{c} = {expr}" for c, expr in touch_columns.items()])
+    insert_columns = ", ".join(columns) + "".join(f", {c}" for c in touch_columns)
+    insert_values = ", ".join(f"s.{c}" for c in columns) + "".join(f", {expr}" for expr in touch_columns.values())
+
+    result = session.sql(f"""
+        MERGE INTO {target} t
+        USING {staging} s
+        ON {on_clause}
+        WHEN MATCHED THEN UPDATE SET {set_clause}
+        WHEN NOT MATCHED THEN INSERT ({insert_columns}) VALUES ({insert_values})
+    """).collect()
+
+    counts = result[0].as_dict() if result else {}
+    return {
+        'inserted': counts.get('number of rows inserted', 0),
+        'updated': counts.get('number of rows updated', 0)
+    }
+
+
+def _sql_type(series: pd.Series) -> str:
+    """스테이징 테이블 컬럼 타입을 데이터프레임 dtype에서 결정합니다."""
+    if pd.api.types.is_bool_dtype(series):
+        return "BOOLEAN"
+    if pd.api.types.is_integer_dtype(series):
+        return "NUMBER"
+    if pd.api.types.is_float_dtype(series):
+        return "FLOAT"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "TIMESTAMP_NTZ"
+    return "VARCHAR"
@@ -0,0 +1,151 @@
+# 청크 테이블 증분 동기화 (Incremental Chunk Sync)
+#
+# Day 17을 다시 실행할 때 문서 테이블 전체를 다시 청킹하지 않도록, 청크 행마다 문서별 워터마크
+# (DOC_ID, 청킹 당시의 UPLOAD_TIMESTAMP = SOURCE_TIMESTAMP, 청킹 설정 = CHUNK_CONFIG)를 기록합니다.
+# Day 16 증분 수집은 바뀐 문서의 UPLOAD_TIMESTAMP를 갱신하므로, 새 문서 / 바뀐 문서 / 설정이 바뀐 문서만
+# 텍스트 컬럼을 읽지 않는 조인 한 번으로 찾을 수 있습니다.
+#
+# 반영 순서 (apply_chunk_changes):
+#   1. 다시 청킹한 문서에서 더 이상 없는 (DOC_ID, CHUNK_INDEX) 청크 삭제
+#   2. (DOC_ID, CHUNK_INDEX)로 MERGE - 텍스트가 같으면 CHUNK_ID를 유지하여 Day 18 임베딩을 재사용하고,
+#      텍스트가 바뀌면 새 CHUNK_ID를 부여하여 Day 18이 다시 임베딩하게 함
+#   3. 문서 테이블에서 사라진 문서의 청크 삭제
+# 1·3에서 지워지거나 2에서 CHUNK_ID가 바뀐 청크의 임베딩은 Day 18이 임베딩 테이블을 청크 테이블과
+# 맞출 때(server_embedding.prune_orphan_embeddings) 지워집니다.
+
+from bulk_load import stage_rows, DEFAULT_CHUNK_SIZE, DEFAULT_PARALLEL
+from server_chunking import ensure_chunk_table, chunk_in_warehouse, CHUNK_TABLE_COLUMNS
+
+_UPDATE_COLUMNS = ["FILE_NAME", "CHUNK_SIZE", "CHUNK_TYPE", "TOKEN_COUNT", "SOURCE_TIMESTAMP", "CHUNK_CONFIG"]
+
+
+def chunk_config(mode: str, size: int = None, overlap: int = None, tokenizer: str = None,
+                 max_tokens: int = None) -> str:
+    """CHUNK_CONFIG 값. 설정이 바뀌면 모든 문서가 다시 청킹 대상이 됩니다."""
+    if mode == "keep":
+        return "keep"
+    if mode == "words":
+        return f"words:{size}:{overlap}"
+    return f"tokens:{size}:{overlap}:{tokenizer}:{max_tokens}"
+
+
+def changed_doc_ids_sql(source_table: str, chunk_table: str, check_config: bool = True) -> str:
+    """새 문서, 마지막 청킹 이후 바뀐 문서(와 다른 설정으로 청킹된 문서)의 DOC_ID를 고르는 쿼리.
+
+    check_config: True면 바인딩 파라미터 [현재 chunk_config]가 필요합니다.
+    청크 테이블이 있어야 합니다 (ensure_chunk_table).
+    """
+    stale = "SOURCE_TIMESTAMP IS NULL OR CHUNK_INDEX IS NULL" + (" OR CHUNK_CONFIG IS DISTINCT FROM ?" if check_config else "")
+    return f"""
+        SELECT d.DOC_ID
+        FROM {source_table} d
+        LEFT JOIN (
+            SELECT
+                DOC_ID,
+                MIN(SOURCE_TIMESTAMP) AS SOURCE_TIMESTAMP,
+                COUNT_IF({stale}) AS STALE_CHUNKS
+            FROM {chunk_table}
+            GROUP BY DOC_ID
+        ) c ON c.DOC_ID = d.DOC_ID
+        WHERE c.DOC_ID IS NULL
+           OR c.STALE_CHUNKS > 0
+           OR d.UPLOAD_TIMESTAMP > c.SOURCE_TIMESTAMP
+    """
+
+
+def chunk_watermarks_available(session, chunk_table: str) -> bool:
+    """청크 테이블이 있고 문서별 워터마크 컬럼이 있으면 True (DDL 없이 읽기만 함).
+
+    False면 아직 청킹한 문서가 없거나 이전 버전 테이블이므로 모든 문서가 다시 청킹 대상입니다.
+    """
+    try:
+        session.sql(f"SELECT DOC_ID, CHUNK_INDEX, SOURCE_TIMESTAMP FROM {chunk_table} LIMIT 0").collect()
+        return True
+    except Exception:
+        return False
+
+
+def apply_chunk_changes(session, staging: str, target: str, source_table: str) -> dict:
+    """스테이징 테이블(다시 청킹한 문서의 전체 청크)을 청크 테이블에 반영합니다.
+
+    스테이징의 CHUNK_ID는 1부터 시작하는 임시 번호이며, 청크 테이블의 최대값 뒤로 옮겨 사용합니다.
+    반환값: {'documents', 'inserted', 'rechunked', 'unchanged', 'deleted'}
+    """
+    session.sql(f"""
+        UPDATE {staging}
+        SET CHUNK_ID = CHUNK_ID + (SELECT COALESCE(MAX(CHUNK_ID), 0) FROM {target})
+    """).collect()
+    counts = session.sql(f"""
+        SELECT
+            (SELECT COUNT(DISTINCT DOC_ID) FROM {staging}) AS DOCUMENTS,
+            COUNT_IF(t.CHUNK_TEXT = s.CHUNK_TEXT) AS UNCHANGED,
+            COUNT_IF(t.CHUNK_TEXT IS DISTINCT FROM s.CHUNK_TEXT) AS RECHUNKED
+        FROM {staging} s
+        JOIN {target} t ON t.DOC_ID = s.DOC_ID AND t.CHUNK_INDEX = s.CHUNK_INDEX
+    """).collect()[0]
+
+    # 1. 다시 청킹한 문서의 남는 청크 (청크 수가 줄었거나 CHUNK_INDEX가 없는 이전 버전 행)
+    obsolete = session.sql(f"""
+        DELETE FROM {target} t
+        WHERE t.DOC_ID IN (SELECT DOC_ID FROM {staging})
+          AND NOT EXISTS (
+              SELECT 1 FROM {staging} s WHERE s.DOC_ID = t.DOC_ID AND s.CHUNK_INDEX = t.CHUNK_INDEX
+          )
+    """).collect()
+
+    # 2. 같은 위치의 청크는 업데이트, 새 위치는 삽입
+    keep_set = ", ".join(f"t.{c} = s.{c}" for c in _UPDATE_COLUMNS)
+    rechunk_set = ", ".join(f"t.{c} = s.{c}" for c in CHUNK_TABLE_COLUMNS if c not in ("DOC_ID", "CHUNK_INDEX"))
+    session.sql(f"""
+        MERGE INTO {target} t
+        USING {staging} s
+        ON t.DOC_ID = s.DOC_ID AND t.CHUNK_INDEX = s.CHUNK_INDEX
+        WHEN MATCHED AND t.CHUNK_TEXT = s.CHUNK_TEXT THEN UPDATE SET {keep_set}
+        WHEN MATCHED THEN UPDATE SET {rechunk_set}, t.CREATED_TIMESTAMP = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED THEN INSERT ({", ".join(CHUNK_TABLE_COLUMNS)})
+            VALUES ({", ".join(f"s.{c}" for c in CHUNK_TABLE_COLUMNS)})
+    """).collect()
+
+    # 3. 문서 테이블에서 사라진 문서 (예: Day 16 교체 모드 이후 DOC_ID가 바뀐 경우)
+    vanished = session.sql(f"""
+        DELETE FROM {target} t
+        WHERE NOT EXISTS (SELECT 1 FROM {source_table} d WHERE d.DOC_ID = t.DOC_ID)
+    """).collect()
+
+    staged = session.sql(f"SELECT COUNT(*) FROM {staging}").collect()[0][0]
+    return {
+        'documents': counts['DOCUMENTS'],
+        'inserted': staged - counts['UNCHANGED'] - counts['RECHUNKED'],
+        'rechunked': counts['RECHUNKED'],
+        'unchanged': counts['UNCHANGED'],
+        'deleted': obsolete[0][0] + vanished[0][0]
+    }
+
+
+def sync_chunks(session, chunks, table_name: str, database: str, schema: str, source_table: str,
+                chunk_size: int = DEFAULT_CHUNK_SIZE, parallel: int = DEFAULT_PARALLEL) -> dict:
+    """클라이언트에서 만든 청크(다시 청킹한 문서 전체)를 스테이징에 올린 뒤 청크 테이블에 반영합니다.
+
+    chunks: CHUNK_TABLE_COLUMNS 컬럼을 가진 데이터프레임 (대소문자 무관)
+    반환값: apply_chunk_changes 결과 + {'failed': 로드 실패 행 목록}
+    """
+    target = f"{database}.{schema}.{table_name}"
+    ensure_chunk_table(session, target)
+    staging, failed = stage_rows(session, chunks, table_name, database, schema, chunk_size, parallel)
+    counts = apply_chunk_changes(session, staging, target, source_table)
+    session.sql(f"DROP TABLE IF EXISTS {staging}").collect()
+    return {**counts, 'failed': failed}
+
+
+def sync_in_warehouse(session, source_table: str, target: str, mode: str, size: int, overlap: int,
+                      max_tokens: int, config: str) -> dict:
+    """바뀐 문서만 UDTF로 청킹하여 임시 스테이징에 넣고 청크 테이블에 반영합니다 (문서가 앱을 거치지 않음)."""
+    ensure_chunk_table(session, target)
+    staging = f"{target}_STAGING"
+    session.sql(f"CREATE OR REPLACE TEMPORARY TABLE {staging} LIKE {target}").collect()
+    chunk_in_warehouse(session, source_table, staging, mode=mode, size=size, overlap=overlap,
+                       max_tokens=max_tokens, config=config,
+                       where=f"d.DOC_ID IN ({changed_doc_ids_sql(source_table, target)})", params=[config])
+    counts = apply_chunk_changes(session, staging, target, source_table)
+    session.sql(f"DROP TABLE IF EXISTS {staging}").collect()
+    return counts
@@ -0,0 +1,302 @@
+# 리뷰 청킹 엔진 (Review Chunking Engine)
+#
+# Day 17에서 사용합니다. 문서마다 text.split()과 ' '.join()으로 청크 문자열을 다시 만드는 대신,
+# 문서 묶음의 코드 포인트 배열에서 단어 경계(시작/끝 문자 오프셋)를 한 번에 계산하고,
+# 오버랩 윈도우는 numpy 배열 연산으로 구한 뒤 원본 문자열을 오프셋으로 잘라 청크를 만듭니다.
+# 큰 코퍼스는 문서 묶음 단위로 워커 프로세스에 분산합니다 (워커는 오프셋만 돌려줌).
+#
+# 윈도우 의미는 이전 Day 17 방식과 같습니다:
+#   단어 수 <= chunk_size  -> 원본 텍스트 그대로 1개 청크 ('full_review')
+#   그 외                 -> range(0, 단어 수, chunk_size - overlap)의 각 시작 단어부터 chunk_size 단어 ('chunked_review')
+# 청크 텍스트는 원본을 자른 것이므로 단어 사이의 줄바꿈/공백이 그대로 보존됩니다.
+#
+# 토큰 기준 청킹(chunk_documents_by_tokens)은 문장 경계로 나눈 뒤 문장을 target_tokens까지 채우고,
+# 어떤 청크도 임베딩 모델의 최대 토큰 수(max_tokens)를 넘지 않도록 보장합니다.
+# 너무 긴 문장은 단어 단위로, 너무 긴 단어는 문자 단위로 다시 나눕니다.
+
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tokenization import get_tokenizer, max_content_tokens, DEFAULT_TOKENIZER, DEFAULT_EMBED_MODEL
+
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_OVERLAP = 50
+DEFAULT_TARGET_TOKENS = 256
+DEFAULT_OVERLAP_TOKENS = 32
+DOCS_PER_TASK = 20000         # 워커 작업 하나(그리고 코드 포인트 배열 하나)에 넣는 문서 수
+PARALLEL_MIN_DOCS = 50000     # 이보다 문서가 적으면 프로세스 풀 없이 현재 프로세스에서 처리
+CHUNK_COLUMNS = ["chunk_id", "doc_id", "file_name", "chunk_text", "chunk_size", "chunk_type", "chunk_index"]
+
+# str.split()이 공백으로 보는 코드 포인트 (유니코드 공백 포함) 조회 테이블
+# (마지막 항목은 테이블 범위를 넘는 코드 포인트용 False)
+_SPACE_TABLE = np.array([chr(c).isspace() for c in range(0x3001)] + [False], dtype=bool)
+_SEPARATOR = "\n"
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?。！？])\s+|\s*\n\s*")
+_WORD = re.compile(r"\S+")
+
+
+def word_offsets(codes: np.ndarray) -> tuple:
+    """코드 포인트 배열에서 단어(공백이 아닌 연속 구간)의 시작/끝(미포함) 오프셋을 구합니다."""
+    is_space = np.ones(len(codes) + 2, dtype=bool)  # 양 끝에 가상의 공백을 둠
+    _SPACE_TABLE.take(codes, out=is_space[1:-1], mode="clip")  # 범위 밖 코드 포인트는 마지막 항목(False)
+    edges = np.flatnonzero(is_space[1:] != is_space[:-1])  # 공백<->단어 전환 지점
+    return edges[0::2], edges[1::2]
+
+
+def window_offsets(texts: list, chunk_size: int = DEFAULT_CHUNK_SIZE, overlap: int = DEFAULT_OVERLAP) -> tuple:
+    """문서 목록의 청크 윈도우를 오프셋으로 계산합니다.
+
+    반환값: (문서 인덱스, 시작 문자, 끝 문자, 청크 단어 수, 분할 여부) numpy 배열 5개
+    짧은 문서는 시작/끝이 문서 전체(0, len(text))입니다.
+    """
+    step = chunk_size - overlap
+    if step <= 0:
+        raise ValueError("overlap은 chunk_size보다 작아야 합니다")
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    doc_starts = np.zeros(len(texts), dtype=np.int64)
+    np.cumsum(lengths[:-1] + len(_SEPARATOR), out=doc_starts[1:])
+
+    # 묶음 전체를 하나의 UTF-32 배열로 만들어 단어 경계를 한 번에 계산 (구분자는 공백이므로 단어가 문서를 넘지 않음)
+    codes = np.frombuffer(_SEPARATOR.join(texts).encode("utf-32-le"), dtype=np.uint32)
+    starts, ends = word_offsets(codes)
+    first_word = np.searchsorted(starts, doc_starts)  # 문서별 첫 단어 인덱스
+    n_words = np.diff(first_word, append=len(starts))
+
+    split = n_words > chunk_size
+    n_windows = np.where(split, (n_words + step - 1) // step, 1)
+    doc_index = np.repeat(np.arange(len(texts)), n_windows)
+    window_rank = np.arange(len(doc_index)) - np.repeat(np.cumsum(n_windows) - n_windows, n_windows)
+    window_split = split[doc_index]
+
+    first = window_rank * step
+    last = np.minimum(first + chunk_size, n_words[doc_index]) - 1
+    word_start = first_word[doc_index] + first
+    word_end = first_word[doc_index] + last
+    chunk_words = np.where(window_split, last - first + 1, n_words[doc_index])
+
+    char_start = np.zeros(len(doc_index), dtype=np.int64)
+    char_end = lengths[doc_index].copy()
+    if window_split.any():
+        char_start[window_split] = starts[word_start[window_split]] - doc_starts[doc_index[window_split]]
+        char_end[window_split] = ends[word_end[window_split]] - doc_starts[doc_index[window_split]]
+    return doc_index, char_start, char_end, chunk_words, window_split
+
+
+def _window_task(offset: int, texts: list, chunk_size: int, overlap: int) -> tuple:
+    """워커 프로세스에서 실행: 묶음의 윈도우 오프셋 (문서 인덱스는 전체 기준)."""
+    doc_index, char_start, char_end, chunk_words, split = window_offsets(texts, chunk_size, overlap)
+    return doc_index + offset, char_start, char_end, chunk_words, split
+
+
+def _batches(texts: list, docs_per_task: int):
+    for offset in range(0, len(texts), docs_per_task):
+        yield offset, texts[offset:offset + docs_per_task]
+
+
+def chunk_documents(df: pd.DataFrame, chunk_size: int = DEFAULT_CHUNK_SIZE, overlap: int = DEFAULT_OVERLAP,
+                    max_workers: int = None, docs_per_task: int = DOCS_PER_TASK,
+                    text_column: str = "EXTRACTED_TEXT") -> pd.DataFrame:
+    """문서 데이터프레임(DOC_ID, FILE_NAME, EXTRACTED_TEXT)을 청크 데이터프레임으로 변환합니다.
+
+    max_workers: 워커 프로세스 수 (1이면 순차 처리, None이면 문서 수가 PARALLEL_MIN_DOCS 이상일 때 CPU 수)
+    반환값: CHUNK_COLUMNS 컬럼의 데이터프레임 (chunk_id는 문서 순서대로 1부터).
+            문서에 UPLOAD_TIMESTAMP가 있으면 source_timestamp 컬럼도 포함합니다.
+    """
+    texts = _texts(df, text_column)
+    parts = _run_batches(_window_task, texts, (chunk_size, overlap), max_workers, docs_per_task)
+    doc_index, char_start, char_end, chunk_words, split = _concat(parts, 5)
+
+    return _chunk_frame(df, texts, doc_index, char_start, char_end, chunk_words, split)
+
+
+def _texts(df: pd.DataFrame, text_column: str) -> list:
+    return ["" if t is None or t != t else str(t) for t in df[text_column].tolist()]
+
+
+def _run_batches(task, texts: list, task_args: tuple, max_workers: int, docs_per_task: int) -> list:
+    """문서 묶음마다 task(offset, batch, *task_args)를 실행합니다 (큰 코퍼스는 워커 프로세스로 분산)."""
+    if max_workers is None:
+        max_workers = (os.cpu_count() or 1) if len(texts) >= PARALLEL_MIN_DOCS else 1
+    if max_workers <= 1 or len(texts) <= docs_per_task:
+        return [task(offset, batch, *task_args) for offset, batch in _batches(texts, docs_per_task)]
+    # Streamlit 앱 안에서 fork하지 않도록 extraction.py와 같은 spawn 컨텍스트를 사용
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        futures = [pool.submit(task, offset, batch, *task_args) for offset, batch in _batches(texts, docs_per_task)]
+        return [f.result() for f in futures]
+
+
+def _concat(parts: list, n_columns: int) -> list:
+    if parts:
+        return [np.concatenate(cols) for cols in zip(*parts)]
+    return [np.array([], dtype=np.int64) for _ in range(n_columns - 1)] + [np.array([], dtype=bool)]
+
+
+def _chunk_frame(df: pd.DataFrame, texts: list, doc_index, char_start, char_end, chunk_words, split) -> pd.DataFrame:
+    chunk_text = [texts[d][s:e] for d, s, e in zip(doc_index.tolist(), char_start.tolist(), char_end.tolist())]
+    chunks = pd.DataFrame({
+        "chunk_id": np.arange(1, len(doc_index) + 1),
+        "doc_id": df["DOC_ID"].to_numpy()[doc_index],
+        "file_name": df["FILE_NAME"].to_numpy()[doc_index],
+        "chunk_text": chunk_text,
+        "chunk_size": chunk_words,
+        "chunk_type": np.where(split, "chunked_review", "full_review"),
+        # 문서 안에서의 청크 순서 (1부터, 증분 동기화의 MERGE 키)
+        "chunk_index": np.arange(len(doc_index)) - np.searchsorted(doc_index, doc_index) + 1
+    }, columns=CHUNK_COLUMNS)
+    if "UPLOAD_TIMESTAMP" in df:
+        chunks["source_timestamp"] = df["UPLOAD_TIMESTAMP"].to_numpy()[doc_index]  # 문서별 워터마크
+    return chunks
+
+
+def sentence_spans(text: str) -> list:
+    """문장 (시작, 끝) 오프셋 목록. 문장 부호 뒤의 공백과 줄바꿈을 경계로 봅니다."""
+    spans = []
+    start = len(text) - len(text.lstrip())
+    for m in _SENTENCE_BREAK.finditer(text, start):
+        if m.start() > start:
+            spans.append((start, m.start()))
+        start = m.end()
+    end = len(text.rstrip())
+    if end > start:
+        spans.append((start, end))
+    return spans
+
+
+def _split_long(text: str, start: int, end: int, max_tokens: int, tokenizer) -> list:
+    """max_tokens를 넘는 문장을 단어 묶음으로, 그래도 넘는 단어는 문자 단위로 나눕니다."""
+    units = []
+    group_start = group_end = None
+    group_tokens = 0
+    for m in _WORD.finditer(text, start, end):
+        tokens = tokenizer.count(m.group())
+        if group_start is not None and group_tokens + tokens > max_tokens:
+            units.append((group_start, group_end, group_tokens))
+            group_start = None
+        if tokens > max_tokens:
+            piece_start = m.start()
+            while piece_start < m.end():
+                piece = tokenizer.truncate(text[piece_start:m.end()], max_tokens) or text[piece_start]
+                units.append((piece_start, piece_start + len(piece), tokenizer.count(piece)))
+                piece_start += len(piece)
+            continue
+        if group_start is None:
+            group_start, group_tokens = m.start(), 0
+        group_end = m.end()
+        group_tokens += tokens
+    if group_start is not None:
+        units.append((group_start, group_end, group_tokens))
+    return units
+
+
+def token_windows(text: str, tokenizer, target_tokens: int, max_tokens: int, overlap_tokens: int) -> list:
+    """한 문서의 토큰 기준 청크 목록 [(시작 문자, 끝 문자, 토큰 수)].
+
+    문장(또는 나눈 조각)을 target_tokens까지 채우고, 다음 청크는 overlap_tokens 이하의 마지막 문장들로 시작합니다.
+    청크마다 토크나이저로 다시 세어 max_tokens를 넘으면 마지막 조각을 빼므로, 토큰 수가 더해지지 않는
+    토크나이저에서도 max_tokens를 넘지 않습니다.
+    """
+    units = []
+    for start, end in sentence_spans(text):
+        tokens = tokenizer.count(text[start:end])
+        units.extend([(start, end, tokens)] if tokens <= max_tokens
+                     else _split_long(text, start, end, max_tokens, tokenizer))
+
+    windows = []
+    i = 0
+    while i < len(units):
+        j, total = i, 0
+        while j < len(units) and (j == i or total + units[j][2] <= target_tokens):
+            total += units[j][2]
+            j += 1
+        tokens = tokenizer.count(text[units[i][0]:units[j - 1][1]])
+        while tokens > max_tokens and j - i > 1:
+            j -= 1
+            tokens = tokenizer.count(text[units[i][0]:units[j - 1][1]])
+        windows.append((units[i][0], units[j - 1][1], tokens))
+        if j >= len(units):
+            break
+        k, carried = j, 0
+        while k - 1 > i and carried + units[k - 1][2] <= overlap_tokens:
+            k -= 1
+            carried += units[k][2]
+        i = k
+    return windows
+
+
+def document_token_chunks(text: str, tokenizer, target_tokens: int, max_tokens: int, overlap_tokens: int) -> list:
+    """한 문서의 토큰 기준 청크 [(시작 문자, 끝 문자, 토큰 수, 분할 여부)]. 짧은 문서는 원본 그대로 1개."""
+    total = tokenizer.count(text)
+    if total <= target_tokens:
+        return [(0, len(text), total, False)]
+    windows = token_windows(text, tokenizer, target_tokens, max_tokens, overlap_tokens)
+    split = len(windows) > 1
+    return [(s, e, t, split) for s, e, t in windows]
+
+
+def _token_task(offset: int, texts: list, tokenizer_name: str, target_tokens: int, max_tokens: int,
+                overlap_tokens: int) -> tuple:
+    """워커 프로세스에서 실행: 묶음의 토큰 기준 청크 오프셋과 토큰 수."""
+    tokenizer = get_tokenizer(tokenizer_name)
+    rows = [(offset + d, *chunk) for d, text in enumerate(texts)
+            for chunk in document_token_chunks(text, tokenizer, target_tokens, max_tokens, overlap_tokens)]
+    if not rows:
+        return _concat([], 5)
+    doc_index, char_start, char_end, token_count, split = zip(*rows)
+    return (np.array(doc_index), np.array(char_start), np.array(char_end),
+            np.array(token_count), np.array(split, dtype=bool))
+
+
+def chunk_documents_by_tokens(df: pd.DataFrame, target_tokens: int = DEFAULT_TARGET_TOKENS,
+                              overlap_tokens: int = DEFAULT_OVERLAP_TOKENS, model: str = DEFAULT_EMBED_MODEL,
+                              tokenizer: str = DEFAULT_TOKENIZER, max_workers: int = None,
+                              docs_per_task: int = DOCS_PER_TASK, text_column: str = "EXTRACTED_TEXT") -> pd.DataFrame:
+    """문장 경계와 토큰 예산으로 청크를 만듭니다.
+
+    target_tokens: 청크당 목표 토큰 수 (모델 최대치보다 크면 최대치로 줄임)
+    model: 최대 토큰 수를 정하는 임베딩 모델 (EMBED_MODEL_LIMITS)
+    tokenizer: TOKENIZERS의 이름
+    반환값: CHUNK_COLUMNS + token_count 컬럼의 데이터프레임 (chunk_size는 단어 수)
+    """
+    max_tokens = max_content_tokens(model)
+    target_tokens = min(target_tokens, max_tokens)
+    texts = _texts(df, text_column)
+    parts = _run_batches(_token_task, texts, (tokenizer, target_tokens, max_tokens, overlap_tokens),
+                         max_workers, docs_per_task)
+    doc_index, char_start, char_end, token_count, split = _concat(parts, 5)
+    chunks = _chunk_frame(df, texts, doc_index, char_start, char_end, np.zeros(len(doc_index), dtype=np.int64), split)
+    chunks["chunk_size"] = [len(t.split()) for t in chunks["chunk_text"]]
+    chunks["token_count"] = token_count
+    return chunks
+
+
+def count_tokens(texts, tokenizer: str = DEFAULT_TOKENIZER) -> list:
+    """청크 텍스트의 토큰 수 (특수 토큰 제외)."""
+    return get_tokenizer(tokenizer).count_batch(texts)
+
+
+def chunk_documents_legacy(df: pd.DataFrame, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           overlap: int = DEFAULT_OVERLAP) -> list:
+    """이전 Day 17 방식 (iterrows + split/join). 벤치마크 비교 및 결과 검증용."""
+    chunks = []
+    chunk_id = 1
+    for _, row in df.iterrows():
+        text = row['EXTRACTED_TEXT']
+        words = text.split()
+        if len(words) <= chunk_size:
+            chunks.append({'chunk_id': chunk_id, 'doc_id': row['DOC_ID'], 'file_name': row['FILE_NAME'],
+                           'chunk_text': text, 'chunk_size': len(words), 'chunk_type': 'full_review'})
+            chunk_id += 1
+            continue
+        for i in range(0, len(words), chunk_size - overlap):
+            chunk_words = words[i:i + chunk_size]
+            chunks.append({'chunk_id': chunk_id, 'doc_id': row['DOC_ID'], 'file_name': row['FILE_NAME'],
+                           'chunk_text': ' '.join(chunk_words), 'chunk_size': len(chunk_words),
+                           'chunk_type': 'chunked_review'})
+            chunk_id += 1
+    return chunks
@@ -0,0 +1,375 @@
+# Day 17 청킹 벤치마크 (Chunking Benchmarks)
+#
+# 합성 리뷰 코퍼스로 청킹 엔진의 처리량(docs/sec)을 측정합니다.
+#
+# 사용 예:
+#   python chunking_bench.py words --docs 10000 100000 1000000
+#   python chunking_bench.py words --docs 100000 --workers 1 4 8 --legacy-max 100000
+#   python chunking_bench.py tokens --docs 5000 --target-tokens 256 --overlap-tokens 32
+#   python chunking_bench.py server --docs 1000 10000 100000   # Snowflake 연결 필요
+#   python chunking_bench.py stream --docs 100 10000 100000 1000000 --mean-words 40
+#   python chunking_bench.py dedup --chunks 10000 100000 --duplicate-ratio 0.3 --boilerplate-ratio 0.1
+
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from chunking import (chunk_documents, chunk_documents_legacy, chunk_documents_by_tokens, count_tokens,
+                      DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP, DEFAULT_TARGET_TOKENS, DEFAULT_OVERLAP_TOKENS)
+from review_stream import chunk_reviews, stream_chunks
+from dedup import dedup_chunks, dedup_report, DEFAULT_THRESHOLD
+from tokenization import (get_tokenizer, available_tokenizers, max_content_tokens, EMBED_MODEL_LIMITS,
+                          SPECIAL_TOKENS, DEFAULT_EMBED_MODEL, DEFAULT_TOKENIZER)
+
+WORDS = ("powder snow thermal gloves waterproof jacket warm durable binding helmet goggles "
+         "lightweight comfortable zipper seam insulated boots 따뜻해요 방수 가볍고 튼튼합니다").split()
+
+
+def synthetic_reviews(n_docs: int, mean_words: int = 150, long_ratio: float = 0.2, seed: int = 0) -> pd.DataFrame:
+    """리뷰 n_docs개 (대부분 짧고, long_ratio만큼은 chunk_size보다 긴 리뷰)."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n_docs):
+        n_words = rng.randint(400, 1200) if rng.random() < long_ratio else rng.randint(mean_words // 2, mean_words * 3 // 2)
+        start = rng.randrange(len(WORDS))
+        words = [WORDS[(start + i * 7) % len(WORDS)] for i in range(n_words)]
+        for i in range(12, n_words, 13):
+            words[i] += ".\n"  # 문장/줄 경계
+        texts.append(" ".join(words))
+    return pd.DataFrame({
+        "DOC_ID": range(1, n_docs + 1),
+        "FILE_NAME": [f"review-{i:07d}.txt" for i in range(n_docs)],
+        "EXTRACTED_TEXT": texts
+    })
+
+
+def bench_words(args):
+    print(f"chunk_size={args.chunk_size} overlap={args.overlap} CPU={os.cpu_count()}")
+    print(f"{'docs':>9} {'engine':>14} | {'seconds':>8} {'docs/s':>10} {'chunks':>10}")
+    for n_docs in args.docs:
+        df = synthetic_reviews(n_docs, args.mean_words, args.long_ratio, seed=n_docs)
+        if n_docs <= args.legacy_max:
+            start = time.perf_counter()
+            chunks = chunk_documents_legacy(df, args.chunk_size, args.overlap)
+            elapsed = time.perf_counter() - start
+            print(f"{n_docs:>9,} {'legacy':>14} | {elapsed:>8.2f} {n_docs / elapsed:>10,.0f} {len(chunks):>10,}")
+            del chunks
+        for workers in args.workers:
+            start = time.perf_counter()
+            chunks = chunk_documents(df, args.chunk_size, args.overlap, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f"{n_docs:>9,} {f'numpy w={workers}':>14} | {elapsed:>8.2f} {n_docs / elapsed:>10,.0f} {len(chunks):>10,}")
+            del chunks
+
+
+def plant_facts(df: pd.DataFrame, seed: int = 0) -> list:
+    """문서마다 고유 코드가 든 사실 문장을 임의의 문장 위치에 넣고 (문서 인덱스, 코드) 목록을 돌려줍니다."""
+    rng = random.Random(seed)
+    facts, texts = [], []
+    for i, text in enumerate(df["EXTRACTED_TEXT"]):
+        code = f"QX{i:07d}"
+        sentences = text.split(".\n")
+        position = rng.randrange(len(sentences))
+        sentences.insert(position, f"모델 {code}의 보증 기간은 {rng.randint(1, 9)}년입니다")
+        texts.append(".\n".join(sentences))
+        facts.append((i, code))
+    df["EXTRACTED_TEXT"] = texts
+    return facts
+
+
+def _embed_report(name: str, df: pd.DataFrame, chunks: pd.DataFrame, facts: list, elapsed: float,
+                  tokenizer, max_tokens: int, credits_per_mtok: float) -> dict:
+    """청크 수, 임베딩 토큰/비용, 잘림, 사실 검색 적중률 (모델이 실제로 보는 앞부분 기준)."""
+    tokens = chunks["token_count"].to_numpy()
+    embedded = (tokens.clip(max=max_tokens) + SPECIAL_TOKENS).sum()
+    visible = {}
+    for doc_id, text, n in zip(chunks["doc_id"], chunks["chunk_text"], tokens):
+        visible.setdefault(doc_id, []).append(text if n <= max_tokens else tokenizer.truncate(text, max_tokens))
+    doc_ids = df["DOC_ID"].to_numpy()
+    hits = sum(any(code in t for t in visible.get(doc_ids[i], [])) for i, code in facts)
+    return {
+        "mode": name,
+        "chunks": len(chunks),
+        "docs/s": len(df) / elapsed,
+        "max_tok": int(tokens.max()),
+        "truncated": int((tokens > max_tokens).sum()),
+        "lost_tok": int((tokens - max_tokens).clip(min=0).sum()),
+        "embed_Mtok": embedded / 1e6,
+        "credits": embedded / 1e6 * credits_per_mtok,
+        "hit_rate": hits / len(facts)
+    }
+
+
+def bench_tokens(args):
+    tokenizer = get_tokenizer(args.tokenizer)
+    max_tokens = max_content_tokens(args.model)
+    print(f"model={args.model} (최대 {max_tokens}+{SPECIAL_TOKENS} 토큰) tokenizer={args.tokenizer}")
+    for n_docs in args.docs:
+        df = synthetic_reviews(n_docs, args.mean_words, args.long_ratio, seed=n_docs)
+        facts = plant_facts(df, seed=n_docs)
+        rows = []
+
+        start = time.perf_counter()
+        chunks = chunk_documents(df, args.chunk_size, args.overlap, max_workers=args.workers)
+        chunks["token_count"] = count_tokens(chunks["chunk_text"], args.tokenizer)
+        rows.append(_embed_report(f"words {args.chunk_size}/{args.overlap}", df, chunks, facts,
+                                  time.perf_counter() - start, tokenizer, max_tokens, args.credits_per_mtok))
+
+        start = time.perf_counter()
+        chunks = chunk_documents_by_tokens(df, args.target_tokens, args.overlap_tokens, args.model,
+                                           args.tokenizer, max_workers=args.workers)
+        rows.append(_embed_report(f"tokens {args.target_tokens}/{args.overlap_tokens}", df, chunks, facts,
+                                  time.perf_counter() - start, tokenizer, max_tokens, args.credits_per_mtok))
+
+        print(f"\n문서 {n_docs:,}개")
+        print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+
+
+def _utf8_bytes(values) -> int:
+    return sum(len(str(v).encode("utf-8")) for v in values)
+
+
+def bench_server(args):
+    """클라이언트 청킹(to_pandas -> 청킹 -> write_pandas) vs 서버 청킹(UDTF INSERT ... SELECT).
+
+    전송량은 네트워크로 오가는 데이터(문서/청크 텍스트, 모듈, SQL)의 UTF-8 크기로 계산합니다
+    (압축과 프로토콜 오버헤드 제외).
+    """
+    from bulk_load import bulk_load
+    from extraction_bench import _snowflake_session
+    from server_chunking import (ensure_chunk_table, register_chunker, chunk_in_warehouse,
+                                 UDTF_MODULES, CHUNK_TABLE_COLUMNS)
+
+    session = _snowflake_session(args.connection)
+    source = f"{args.database}.{args.schema}.CHUNKING_BENCH_DOCS"
+    target = f"{args.database}.{args.schema}.CHUNKING_BENCH_CHUNKS"
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    module_bytes = sum(os.path.getsize(os.path.join(module_dir, m)) for m in UDTF_MODULES)
+    size, overlap = (args.target_tokens, args.overlap_tokens) if args.mode == "tokens" else (args.chunk_size, args.overlap)
+
+    print(f"mode={args.mode} size={size} overlap={overlap}")
+    print(f"{'docs':>8} | {'client s':>9} {'down MB':>8} {'up MB':>8} | {'server s':>9} {'sent MB':>8} | {'chunks':>9}")
+    for n_docs in args.docs:
+        df = synthetic_reviews(n_docs, args.mean_words, args.long_ratio, seed=n_docs)
+        session.write_pandas(df, table_name="CHUNKING_BENCH_DOCS", database=args.database, schema=args.schema,
+                             auto_create_table=True, overwrite=True, table_type="temporary")
+
+        session.sql(f"DROP TABLE IF EXISTS {target}").collect()
+        ensure_chunk_table(session, target)
+        start = time.perf_counter()
+        docs = session.sql(f"SELECT DOC_ID, FILE_NAME, EXTRACTED_TEXT FROM {source} ORDER BY FILE_NAME").to_pandas()
+        if args.mode == "tokens":
+            chunks = chunk_documents_by_tokens(docs, size, overlap, max_workers=args.workers)
+        else:
+            chunks = chunk_documents(docs, size, overlap, max_workers=args.workers)
+            chunks["token_count"] = count_tokens(chunks["chunk_text"])
+        chunks.columns = [c.upper() for c in chunks.columns]
+        bulk_load(session, chunks[CHUNK_TABLE_COLUMNS], table_name="CHUNKING_BENCH_CHUNKS",
+                  database=args.database, schema=args.schema)
+        client = time.perf_counter() - start
+        down = _utf8_bytes(docs["EXTRACTED_TEXT"]) + _utf8_bytes(docs["FILE_NAME"]) + 8 * len(docs)
+        up = _utf8_bytes(chunks["CHUNK_TEXT"]) + _utf8_bytes(chunks["FILE_NAME"]) + 8 * 5 * len(chunks)
+
+        session.sql(f"DROP TABLE IF EXISTS {target}").collect()
+        start = time.perf_counter()
+        ensure_chunk_table(session, target)
+        register_chunker(session, target, f"{args.database}.{args.schema}.{args.stage}")
+        inserted = chunk_in_warehouse(session, source, target, mode=args.mode, size=size, overlap=overlap,
+                                      max_tokens=max_content_tokens(args.model))
+        server = time.perf_counter() - start
+        sent = module_bytes + 4096  # 모듈 업로드 + DDL/INSERT 문
+
+        print(f"{n_docs:>8,} | {client:>9.2f} {down / 1e6:>8.1f} {up / 1e6:>8.1f} | "
+              f"{server:>9.2f} {sent / 1e6:>8.3f} | {len(chunks):>9,}{'' if inserted == len(chunks) else f' (서버 {inserted:,})'}")
+    session.sql(f"DROP TABLE IF EXISTS {target}").collect()
+
+
+def _synthetic_batches(n_docs: int, batch_rows: int, mean_words: int, long_ratio: float):
+    """synthetic_reviews를 batch_rows개씩 만들어 돌려줍니다 (to_pandas_batches 대역)."""
+    for offset in range(0, n_docs, batch_rows):
+        df = synthetic_reviews(min(batch_rows, n_docs - offset), mean_words, long_ratio, seed=offset)
+        df["DOC_ID"] += offset
+        yield df
+
+
+def _run_stream_variant(args):
+    """자식 프로세스에서 한 가지 방식만 실행하여 최대 RSS를 따로 측정합니다."""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def chunker(df):
+        return chunk_reviews(df, "words", args.chunk_size, args.overlap)
+
+    start = time.perf_counter()
+    if args.variant == "full":
+        # 이전 방식: 전체 테이블을 데이터프레임 하나로 (세션 상태) -> 전체 청크
+        df = synthetic_reviews(args.docs, args.mean_words, args.long_ratio, seed=0)
+        chunks = chunker(df)
+        n_chunks = len(chunks)
+    else:
+        n_chunks = stream_chunks(_synthetic_batches(args.docs, args.batch_rows, args.mean_words, args.long_ratio),
+                                 chunker)["chunks"]
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed:.3f} {peak} {baseline} {n_chunks}")
+
+
+def bench_stream(args):
+    print(f"batch_rows={args.batch_rows} mean_words={args.mean_words} (저장 단계 제외, 최대 RSS는 프로세스별)")
+    print(f"{'docs':>9} {'variant':>7} | {'seconds':>8} {'docs/s':>10} {'chunks':>10} | {'peak MB':>8} {'+MB':>8}")
+    for n_docs in args.docs:
+        for variant in ("full", "stream"):
+            out = subprocess.run([sys.executable, __file__, "_stream-variant", variant, str(n_docs),
+                                  "--batch-rows", str(args.batch_rows), "--mean-words", str(args.mean_words),
+                                  "--long-ratio", str(args.long_ratio), "--chunk-size", str(args.chunk_size),
+                                  "--overlap", str(args.overlap)],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            elapsed, peak, baseline, n_chunks = float(out[0]), int(out[1]), int(out[2]), int(out[3])
+            print(f"{n_docs:>9,} {variant:>7} | {elapsed:>8.2f} {n_docs / elapsed:>10,.0f} {n_chunks:>10,} | "
+                  f"{peak / 1024:>8.1f} {(peak - baseline) / 1024:>8.1f}")
+
+
+BOILERPLATE = ["배송 빠르고 좋아요. 잘 쓸게요!", "Great product, fast shipping. Would buy again!",
+               "생각보다 괜찮네요. 가격 대비 만족합니다.", "Works as described. Five stars."]
+
+
+def near_duplicate_chunks(n_chunks: int, duplicate_ratio: float, boilerplate_ratio: float, seed: int = 0) -> tuple:
+    """고유 청크, 한두 단어만 바꾼 사본, 상투 문구가 섞인 청크와 정답 그룹 (원본 청크 인덱스)."""
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz가나다라마바사아자차카타파하") for _ in range(rng.randint(2, 8)))
+             for _ in range(20_000)]
+    texts, truth = [], []
+    for i in range(n_chunks):
+        r = rng.random()
+        if r < boilerplate_ratio:
+            k = rng.randrange(len(BOILERPLATE))
+            texts.append(BOILERPLATE[k] + rng.choice(["", "!", " ", "\n"]))
+            truth.append(-1 - k)
+        elif r < boilerplate_ratio + duplicate_ratio and i > 0:
+            j = rng.randrange(i)
+            words = texts[j].split()
+            for _ in range(rng.randint(0, 2)):
+                words[rng.randrange(len(words))] = rng.choice(vocab)
+            texts.append(" ".join(words))
+            truth.append(truth[j])
+        else:
+            texts.append(" ".join(rng.choice(vocab) for _ in range(rng.randint(30, 150))))
+            truth.append(i)
+    chunks = pd.DataFrame({
+        "CHUNK_ID": np.arange(1, n_chunks + 1),
+        "DOC_ID": np.arange(1, n_chunks + 1),
+        "FILE_NAME": [f"review-{i:07d}.txt" for i in range(n_chunks)],
+        "CHUNK_TEXT": texts
+    })
+    return chunks, np.array(truth)
+
+
+def bench_dedup(args):
+    print(f"threshold={args.threshold} 임베딩 {args.embed_ms}ms/청크 (가정)")
+    print(f"{'chunks':>9} | {'seconds':>8} {'chunks/s':>10} | {'unique':>9} {'truth':>9} {'ratio':>6} "
+          f"{'recall':>7} {'precision':>9} | {'index MB':>17} | {'embed min':>15}")
+    for n_chunks in args.chunks:
+        chunks, truth = near_duplicate_chunks(n_chunks, args.duplicate_ratio, args.boilerplate_ratio, seed=n_chunks)
+        start = time.perf_counter()
+        _, mapping = dedup_chunks(chunks, threshold=args.threshold)
+        elapsed = time.perf_counter() - start
+        report = dedup_report(mapping, args.embed_ms / 1000)
+
+        # recall: 정답 중복 중 같은 대표로 묶인 비율 / precision: 묶인 청크 중 정답 그룹이 같은 비율
+        canonical = mapping["CANONICAL_CHUNK_ID"].to_numpy() - 1
+        first = pd.Series(np.arange(n_chunks)).groupby(truth).transform("min").to_numpy()
+        is_duplicate = first != np.arange(n_chunks)
+        merged = canonical != np.arange(n_chunks)
+        recall = (canonical[is_duplicate] == canonical[first[is_duplicate]]).mean() if is_duplicate.any() else 1.0
+        precision = (truth[merged] == truth[canonical[merged]]).mean() if merged.any() else 1.0
+
+        print(f"{n_chunks:>9,} | {elapsed:>8.2f} {n_chunks / elapsed:>10,.0f} | {report['unique']:>9,} "
+              f"{len(np.unique(truth)):>9,} {report['compression_ratio']:>5.2f}x {recall:>7.3f} {precision:>9.3f} | "
+              f"{report['index_bytes_before'] / 1e6:>7.1f} -> {report['index_bytes_after'] / 1e6:>6.1f} | "
+              f"{report['embed_seconds_before'] / 60:>6.1f} -> {report['embed_seconds_after'] / 60:>5.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day 17 청킹 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("words", help="단어 기준 청킹 docs/sec (이전 방식 vs numpy 엔진)")
+    p.add_argument("--docs", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    p.add_argument("--overlap", type=int, default=DEFAULT_OVERLAP)
+    p.add_argument("--mean-words", type=int, default=150, help="짧은 리뷰의 평균 단어 수")
+    p.add_argument("--long-ratio", type=float, default=0.2, help="chunk_size보다 긴 리뷰의 비율")
+    p.add_argument("--legacy-max", type=int, default=100_000, help="이전 방식을 측정할 최대 문서 수")
+    p.set_defaults(func=bench_words)
+
+    p = sub.add_parser("tokens", help="단어 기준 vs 토큰/문장 기준 청킹: 청크 수, 임베딩 비용, 사실 검색 적중률")
+    p.add_argument("--docs", type=int, nargs="+", default=[5_000])
+    p.add_argument("--model", choices=list(EMBED_MODEL_LIMITS), default=DEFAULT_EMBED_MODEL)
+    p.add_argument("--tokenizer", choices=available_tokenizers(), default=DEFAULT_TOKENIZER)
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    p.add_argument("--overlap", type=int, default=DEFAULT_OVERLAP)
+    p.add_argument("--target-tokens", type=int, default=DEFAULT_TARGET_TOKENS)
+    p.add_argument("--overlap-tokens", type=int, default=DEFAULT_OVERLAP_TOKENS)
+    p.add_argument("--mean-words", type=int, default=150)
+    p.add_argument("--long-ratio", type=float, default=0.2)
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--credits-per-mtok", type=float, default=0.03, help="임베딩 백만 토큰당 크레딧")
+    p.set_defaults(func=bench_tokens)
+
+    p = sub.add_parser("server", help="클라이언트 청킹 vs 웨어하우스 UDTF 청킹: 종단 간 시간과 전송량")
+    p.add_argument("--docs", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    p.add_argument("--mode", choices=["words", "tokens"], default="words")
+    p.add_argument("--model", choices=list(EMBED_MODEL_LIMITS), default=DEFAULT_EMBED_MODEL)
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    p.add_argument("--overlap", type=int, default=DEFAULT_OVERLAP)
+    p.add_argument("--target-tokens", type=int, default=DEFAULT_TARGET_TOKENS)
+    p.add_argument("--overlap-tokens", type=int, default=DEFAULT_OVERLAP_TOKENS)
+    p.add_argument("--mean-words", type=int, default=150)
+    p.add_argument("--long-ratio", type=float, default=0.2)
+    p.add_argument("--workers", type=int, default=None, help="클라이언트 청킹 워커 수")
+    p.add_argument("--database", default="RAG_DB")
+    p.add_argument("--schema", default="RAG_SCHEMA")
+    p.add_argument("--stage", default="DOC_STAGE")
+    p.add_argument("--connection", help="secrets.toml 경로")
+    p.set_defaults(func=bench_server)
+
+    p = sub.add_parser("stream", help="전체 로드 vs 묶음 스트리밍: 문서 수에 따른 최대 메모리")
+    p.add_argument("--docs", type=int, nargs="+", default=[100, 10_000, 100_000])
+    p.add_argument("--batch-rows", type=int, default=20_000)
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    p.add_argument("--overlap", type=int, default=DEFAULT_OVERLAP)
+    p.add_argument("--mean-words", type=int, default=150)
+    p.add_argument("--long-ratio", type=float, default=0.2)
+    p.set_defaults(func=bench_stream)
+
+    p = sub.add_parser("_stream-variant")
+    p.add_argument("variant", choices=["full", "stream"])
+    p.add_argument("docs", type=int)
+    p.add_argument("--batch-rows", type=int, default=20_000)
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    p.add_argument("--overlap", type=int, default=DEFAULT_OVERLAP)
+    p.add_argument("--mean-words", type=int, default=150)
+    p.add_argument("--long-ratio", type=float, default=0.2)
+    p.set_defaults(func=_run_stream_variant)
+
+    p = sub.add_parser("dedup", help="MinHash/LSH 중복 제거: 처리량, 재현율/정밀도, 압축률, 인덱스 크기와 임베딩 시간")
+    p.add_argument("--chunks", type=int, nargs="+", default=[10_000, 100_000])
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    p.add_argument("--duplicate-ratio", type=float, default=0.3, help="한두 단어만 바꾼 사본 비율")
+    p.add_argument("--boilerplate-ratio", type=float, default=0.1, help="상투 문구 청크 비율")
+    p.add_argument("--embed-ms", type=float, default=20.0, help="청크당 임베딩 시간 (측정값으로 바꿔 넣기)")
+    p.set_defaults(func=bench_dedup)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
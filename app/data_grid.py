@@ -0,0 +1,192 @@
+# 페이지 단위 데이터 그리드 (Paginated Data Grid)
+#
+# Day 16–18의 테이블 뷰어에서 사용합니다. 테이블 전체를 to_pandas()로 가져오지 않고
+# 키셋 페이지네이션(WHERE key > 마지막 키 ORDER BY key LIMIT n)으로 한 페이지씩만 조회합니다.
+# 화면에 필요한 컬럼만 조회하고, 긴 텍스트/벡터 셀은 선택했을 때 한 행만 따로 가져옵니다.
+# 행 수와 요약 집계는 st.cache_data로 캐시되며, 조회 버튼이나 저장 후 reset_grid/table_stats.clear()로 비웁니다.
+
+import json
+
+import pandas as pd
+import streamlit as st
+
+DEFAULT_PAGE_SIZE = 50
+PAGE_SIZES = [25, 50, 100, 200]
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def table_stats(_session, table: str, aggregates: tuple = (), where: str = None) -> dict:
+    """COUNT(*)와 요약 집계를 한 번의 쿼리로 계산합니다 (5분 캐시).
+
+    aggregates: (별칭, SQL 식) 튜플들. 예: (("WORDS", "SUM(WORD_COUNT)"),)
+    반환값: {'ROW_COUNT': 행 수, 별칭: 값, ...}
+    """
+    select = ", ".join(["COUNT(*) AS ROW_COUNT"] + [f"{expr} AS {alias}" for alias, expr in aggregates])
+    row = _session.sql(f"SELECT {select} FROM {table} {f'WHERE {where}' if where else ''}").collect()[0]
+    return row.as_dict()
+
+
+def fetch_page(session, table: str, columns: list, key_column: str, after=None,
+               page_size: int = DEFAULT_PAGE_SIZE, descending: bool = False, where: str = None):
+    """after 다음 키부터 한 페이지를 조회합니다. 반환값: (데이터프레임, 다음 페이지 존재 여부)"""
+    conditions = [f"({where})"] if where else []
+    params = []
+    if after is not None:
+        conditions.append(f"{key_column} {'<' if descending else '>'} ?")
+        params.append(after)
+    query = f"""
+        SELECT {", ".join(columns)}
+        FROM {table}
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY {key_column} {"DESC" if descending else "ASC"}
+        LIMIT {page_size + 1}
+    """
+    df = session.sql(query, params=params or None).to_pandas()
+    return df.head(page_size), len(df) > page_size
+
+
+def load_cell(session, table: str, column: str, key_column: str, key_value):
+    """한 행의 큰 셀(전체 텍스트, 임베딩 벡터 등)만 조회합니다."""
+    rows = session.sql(f"SELECT {column} FROM {table} WHERE {key_column} = ?", params=[key_value]).collect()
+    return rows[0][0] if rows else None
+
+
+def _grid_state(state_key: str, source: str) -> dict:
+    state = st.session_state.get(state_key)
+    if state is None or state["source"] != source:
+        state = {"source": source, "cursors": [None], "page_size": DEFAULT_PAGE_SIZE,
+                 "signature": None, "df": None, "has_next": False, "detail": None}
+        st.session_state[state_key] = state
+    return state
+
+
+def reset_grid(state_key: str):
+    """첫 페이지로 돌아가고 캐시된 행 수/집계를 비웁니다."""
+    st.session_state.pop(state_key, None)
+    table_stats.clear()
+
+
+def _navigation(state: dict, state_key: str, total: int, has_next: bool):
+    page = len(state["cursors"])
+    first_row = (page - 1) * state["page_size"] + 1
+    n_pages = max((total + state["page_size"] - 1) // state["page_size"], 1) if total is not None else None
+
+    def go_next():
+        state["cursors"].append(state["next_cursor"])
+
+    def go_prev():
+        state["cursors"].pop()
+
+    def go_first():
+        del state["cursors"][1:]
+
+    def set_page_size():
+        state["page_size"] = st.session_state[f"{state_key}_page_size"]
+        del state["cursors"][1:]
+
+    col1, col2, col3, col4, col5 = st.columns([1, 1, 3, 1, 1])
+    with col1:
+        st.button(":material/first_page:", key=f"{state_key}_first", on_click=go_first,
+                  disabled=page == 1, use_container_width=True)
+    with col2:
+        st.button(":material/chevron_left:", key=f"{state_key}_prev", on_click=go_prev,
+                  disabled=page == 1, use_container_width=True)
+    with col3:
+        shown = len(state["df"]) if state["df"] is not None else 0
+        page_text = f"페이지 {page}" + (f" / {n_pages:,}" if n_pages else "")
+        total_text = f" · {first_row:,}–{first_row + shown - 1:,}행" + (f" / {total:,}" if total is not None else "")
+        st.caption(page_text + (total_text if shown else ""))
+    with col4:
+        st.button(":material/chevron_right:", key=f"{state_key}_next", on_click=go_next,
+                  disabled=not has_next, use_container_width=True)
+    with col5:
+        st.selectbox("Page Size", PAGE_SIZES, index=PAGE_SIZES.index(state["page_size"]),
+                     key=f"{state_key}_page_size", on_change=set_page_size, label_visibility="collapsed")
+
+
+def paginated_table(session, table: str, columns: list, key_column: str, state_key: str,
+                    detail_column: str = None, label_column: str = None, detail_format: str = "text",
+                    where: str = None, descending: bool = False, total: int = None) -> pd.DataFrame:
+    """테이블을 한 페이지씩 표시하고 현재 페이지 데이터프레임을 돌려줍니다.
+
+    columns: 조회할 SQL 식 목록 (큰 텍스트는 LEFT(..., n) AS PREVIEW 처럼 미리보기만)
+    key_column: 고유하고 정렬 가능한 키 (예: DOC_ID, CHUNK_ID)
+    detail_column: 선택한 행에서만 따로 불러올 큰 컬럼 (예: EXTRACTED_TEXT, EMBEDDING)
+    detail_format: 'text'는 text_area, 'vector'는 벡터 코드 블록으로 표시
+    total: 전체 행 수 (table_stats로 미리 계산했다면 전달하여 페이지 수 표시)
+    """
+    state = _grid_state(state_key, f"{table}|{where}|{descending}")
+    after = state["cursors"][-1]
+    signature = (after, state["page_size"])
+    if state["signature"] != signature:
+        state["df"], state["has_next"] = fetch_page(session, table, columns, key_column, after,
+                                                    state["page_size"], descending, where)
+        state["signature"] = signature
+    df = state["df"]
+    key_name = key_column.upper()
+    state["next_cursor"] = df[key_name].iloc[-1] if len(df) else after
+    if hasattr(state["next_cursor"], "item"):
+        state["next_cursor"] = state["next_cursor"].item()  # numpy 스칼라 -> 바인딩 가능한 파이썬 값
+
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    _navigation(state, state_key, total, state["has_next"])
+
+    if detail_column and len(df):
+        labels = dict(zip(df[key_name].tolist(), df[label_column.upper()].tolist())) if label_column else {}
+        with st.expander(f":material/menu_book: {detail_column} 보기 (현재 페이지)"):
+            selected = st.selectbox(
+                f"{key_name} 선택",
+                options=list(df[key_name].tolist()),
+                format_func=lambda k: f"#{k} - {labels[k]}" if k in labels else f"#{k}",
+                key=f"{state_key}_detail_select"
+            )
+            if st.button(f"{detail_column} 로드", key=f"{state_key}_detail_load"):
+                state["detail"] = (selected, load_cell(session, table, detail_column, key_column, selected))
+            if state["detail"] is not None:
+                detail_key, value = state["detail"]
+                title = f"#{detail_key} - {labels.get(detail_key, '')}".rstrip(" -")
+                if detail_format == "vector":
+                    vector = json.loads(value) if isinstance(value, str) else list(value)
+                    st.caption(f"{title} · 벡터 길이: {len(vector)} 차원")
+                    st.code(vector, language="python")
+                else:
+                    st.text_area(title, value=value or "", height=300, key=f"{state_key}_detail_{detail_key}")
+    return df
+
+
+def paginated_rows(rows: list, columns: list, state_key: str, preview_chars: int = 200,
+                   page_size: int = DEFAULT_PAGE_SIZE) -> pd.DataFrame:
+    """메모리에 있는 딕셔너리 목록(또는 데이터프레임)을 한 페이지씩 표시합니다.
+
+    현재 페이지의 행만 표시용 데이터프레임으로 만들며, 긴 문자열은 preview_chars까지만 잘라서 표시합니다.
+    """
+    state = st.session_state.setdefault(state_key, {"page": 0})
+    n_pages = max((len(rows) + page_size - 1) // page_size, 1)
+    state["page"] = min(state["page"], n_pages - 1)
+    start = state["page"] * page_size
+
+    def truncate(value):
+        if isinstance(value, str) and len(value) > preview_chars:
+            return value[:preview_chars] + "..."
+        return value
+
+    if isinstance(rows, pd.DataFrame):
+        page_rows = rows.iloc[start:start + page_size][columns].to_dict("records")
+    else:
+        page_rows = rows[start:start + page_size]
+    page_df = pd.DataFrame([{c: truncate(row[c]) for c in columns} for row in page_rows], columns=columns)
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+
+    def move(delta):
+        state["page"] = max(0, min(state["page"] + delta, n_pages - 1))
+
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col1:
+        st.button(":material/chevron_left:", key=f"{state_key}_prev", on_click=move, args=(-1,),
+                  disabled=state["page"] == 0, use_container_width=True)
+    with col2:
+        st.caption(f"페이지 {state['page'] + 1} / {n_pages:,} · {start + 1:,}–{min(start + page_size, len(rows)):,}행 / {len(rows):,}")
+    with col3:
+        st.button(":material/chevron_right:", key=f"{state_key}_next", on_click=move, args=(1,),
+                  disabled=state["page"] >= n_pages - 1, use_container_width=True)
+    return page_df
@@ -35,6 +35,9 @@ if prompt := st.chat_input("..."):
     
     with st.chat_message("assistant"):
         # [실습] st.write_stream을 사용하여 제너레이터 출력을 화면에 그리세요.
+        # 힌트: from stream_utils import throttled_stream
+        #       response = st.write_stream(throttled_stream(stream_generator))
+        #       (throttled_stream은 빠른 토큰 스트림을 50ms 단위로 묶어 브라우저 왕복을 줄입니다)
         
         # 여기에 코드를 작성하세요
         st.write("실습 진행 필요")
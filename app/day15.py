@@ -3,8 +3,10 @@
 
 import streamlit as st
 import time
-import json
-from snowflake.snowpark.functions import ai_complete
+from snowflake.cortex import Complete
+from arena import (measure_stream, run_concurrently, history_records, leaderboard,
+                   SQLiteHistoryStore, SnowflakeHistoryStore, latency_histogram, percentile_trend)
+from stream_utils import Throttle
 
 # Snowflake 연결
 try:
@@ -19,61 +21,64 @@ except:
 # 세션 상태 초기화
 if "latest_results" not in st.session_state:
     st.session_state.latest_results = None
+if "arena_history" not in st.session_state:
+    st.session_state.arena_history = []  # 리더보드를 위한 모델별 실행 기록
 
-def run_model(model: str, prompt: str) -> dict:
-    """모델을 실행하고 메트릭을 수집합니다."""
-    start = time.time()
+def run_model(model: str, prompt: str, start: float = None, on_token=None) -> dict:
+    """모델을 스트리밍으로 실행하고 메트릭을 수집합니다."""
+    if start is None:
+        start = time.perf_counter()
 
-    # [실습] Cortex ai_complete 함수를 호출하여 모델 응답을 생성하세요.
-    # 힌트: session.range(1).select(ai_complete(...).alias("response"))
+    # [실습] Cortex Complete 함수를 stream=True로 호출하여 스트리밍 응답을 생성하세요.
+    # 힌트: Complete(model=model, prompt=prompt, session=session, stream=True)
     
     # 여기에 코드를 작성하세요 (아래 코드를 완성하세요)
-    # df = session.range(1).select(
-    #     ai_complete(model=model, prompt=prompt).alias("response")
-    # )
+    # stream = Complete(model=model, prompt=prompt, session=session, stream=True)
     
     # 실습을 위해 임시로 비워둡니다. 위 주석을 참고하여 채워보세요. 
-    df = None # 이 줄을 수정하세요
+    stream = None # 이 줄을 수정하세요
 
-    if df is None:
+    if stream is None:
          # 실습 코드가 작성되지 않았을 때의 예외 처리
         return {
             "latency": 0.0,
+            "ttft": 0.0,
             "tokens": 0,
             "response_text": "코드를 완성해주세요! (run_model 함수를 확인하세요)"
         }
 
-    # 데이터프레임에서 응답 추출
-    rows = df.collect()
-    response_raw = rows[0][0]
-    response_json = json.loads(response_raw)
+    # 토큰이 도착할 때마다 on_token을 호출하고, 지연 시간/TTFT/토큰 수를 측정
+    return measure_stream(stream, start=start, on_token=on_token)
 
-    # 응답에서 텍스트 추출
-    text = response_json.get("choices", [{}])[0].get("messages", "") if isinstance(response_json, dict) else str(response_json)
+@st.cache_resource
+def get_history_store(storage: str, location: str, _session=None):
+    """실행 기록 저장소를 만듭니다 (테이블 생성은 한 번만 수행)."""
+    if storage == "Snowflake":
+        return SnowflakeHistoryStore(_session, location)
+    return SQLiteHistoryStore(location)
 
-    latency = time.time() - start
-    tokens = int(len(text.split()) * 4/3)  # 토큰 수 추정 (1 토큰 ≈ 0.75 단어)
-
-    return {
-        "latency": latency,
-        "tokens": tokens,
-        "response_text": text
-    }
-
-def display_metrics(results: dict, model_key: str):
+def display_metrics(container, result: dict):
     """모델에 대한 메트릭을 표시합니다."""
-    latency_col, tokens_col = st.columns(2)  # 2개의 동일한 열 생성
-
-    latency_col.metric("Latency (s)", f"{results[model_key]['latency']:.1f}")  # 초 단위 1자리 소수점
-    tokens_col.metric("Tokens", results[model_key]['tokens'])
+    with container.container():
+        latency_col, ttft_col, tokens_col = st.columns(3)  # 3개의 동일한 열 생성
+
+        if result:
+            ttft = result.get("ttft")
+            latency_col.metric("Latency (s)", f"{result['latency']:.1f}")  # 초 단위 1자리 소수점
+            ttft_col.metric("TTFT (s)", f"{ttft:.1f}" if ttft is not None else "—")
+            tokens_col.metric("Tokens", result['tokens'])
+        else:  # 결과가 없을 때 플레이스홀더 표시
+            latency_col.metric("Latency (s)", "—")
+            ttft_col.metric("TTFT (s)", "—")
+            tokens_col.metric("Tokens", "—")
 
-def display_response(container, results: dict, model_key: str):
+def display_response(container, prompt: str, response_text: str, streaming: bool = False):
     """컨테이너에 채팅 메시지를 표시합니다."""
-    with container:
+    with container.container():
         with st.chat_message("user"):
-            st.write(results["prompt"])
+            st.write(prompt)
         with st.chat_message("assistant"):
-            st.write(results[model_key]["response_text"])
+            st.markdown(response_text + ("▌" if streaming else ""))  # 스트리밍 중에는 커서 표시
 
 # 모델 선택
 llm_models = [
@@ -87,48 +92,145 @@ llm_models = [
     "openai-gpt-5-mini"
 ]
 st.title(":material/compare: 모델 선택 (Select Models)")
-col_a, col_b = st.columns(2)  # 드롭다운을 위한 두 개의 열 생성
-
-col_a.write("**모델 A**")
-model_a = col_a.selectbox("Model A", llm_models, key="model_a", label_visibility="collapsed")
-
-col_b.write("**모델 B**")
-model_b = col_b.selectbox("Model B", llm_models, key="model_b", index=1, label_visibility="collapsed")  # 두 번째 모델을 기본값으로 설정
+col_models, col_workers = st.columns([3, 1])
+
+selected_models = col_models.multiselect(
+    "비교할 모델 (Models to compare)",
+    llm_models,
+    default=llm_models[:2]  # 처음 두 모델을 기본값으로 설정
+)
+max_workers = col_workers.number_input(
+    "최대 동시 실행 (Parallelism)",
+    min_value=1,
+    max_value=len(llm_models),
+    value=4,
+    help="동시에 실행할 최대 모델 수"
+)
+
+# 실행 기록 저장 위치
+with st.sidebar:
+    st.header(":material/database: 실행 기록 저장 (Run History)")
+    storage = st.radio("저장소 (Storage)", ["SQLite", "Snowflake", "저장 안 함"], horizontal=True,
+                       help="모든 비교 실행을 저장하여 날짜별 지연 시간 추이를 확인합니다")
+    if storage == "SQLite":
+        location = st.text_input("SQLite 파일", value="arena_history.db")
+    elif storage == "Snowflake":
+        location = st.text_input("테이블 (database.schema.table)", value="RAG_DB.RAG_SCHEMA.ARENA_RESULTS")
+    else:
+        location = None
+
+history_store = None
+if location:
+    try:
+        history_store = get_history_store(storage, location, _session=session)
+    except Exception as e:
+        st.sidebar.error(f"기록 저장소를 열 수 없습니다: {str(e)}")
 
 # 응답 컨테이너
 st.divider()
-col_a, col_b = st.columns(2)  # 응답을 위한 두 개의 열 생성
 results = st.session_state.latest_results
-
-# 코드 중복을 피하기 위해 두 모델 반복
-for col, model_name, model_key in [(col_a, model_a, "model_a"), (col_b, model_b, "model_b")]:
-    with col:
-        st.subheader(model_name)
-        container = st.container(height=400, border=True)  # 고정 높이, 스크롤 가능한 컨테이너
-
-        if results:
-            display_response(container, results, model_key)
-
-        st.caption("성능 메트릭 (Performance Metrics)")
-        if results:
-            display_metrics(results, model_key)
-        else:  # 결과가 없을 때 플레이스홀더 표시
-            latency_col, tokens_col = st.columns(2)
-            latency_col.metric("Latency (s)", "—")
-            tokens_col.metric("Tokens", "—")
+if results and "results" not in results:  # 이전 형식(model_a/model_b)의 결과는 무시
+    results = None
+panels = {}  # 스트리밍 중 갱신할 플레이스홀더
+
+# 한 줄에 최대 3개의 모델을 표시
+models_per_row = 3
+for row_start in range(0, len(selected_models), models_per_row):
+    row_models = selected_models[row_start:row_start + models_per_row]
+    for col, model_name in zip(st.columns(models_per_row), row_models):
+        with col:
+            st.subheader(model_name)
+            container = st.container(height=400, border=True)  # 고정 높이, 스크롤 가능한 컨테이너
+            response_slot = container.empty()
+
+            result = results["results"].get(model_name) if results else None
+            if result:
+                display_response(response_slot, results["prompt"], result["response_text"])
+
+            st.caption("성능 메트릭 (Performance Metrics)")
+            metrics_slot = st.empty()
+            display_metrics(metrics_slot, result)  # 결과가 없으면 플레이스홀더 표시
+
+            panels[model_name] = (response_slot, metrics_slot)
+
+# 리더보드
+with st.expander(f":material/leaderboard: 지연 시간 리더보드 (Latency Leaderboard) - {len(st.session_state.arena_history)}회 실행", expanded=False):
+    st.caption("이 세션의 모든 실행 기록을 바탕으로 모델별 지연 시간 분포를 비교합니다.")
+    board_slot = st.empty()
+    board_slot.dataframe(leaderboard(st.session_state.arena_history), use_container_width=True, hide_index=True)
+    if st.button("기록 초기화 (Clear History)"):
+        st.session_state.arena_history = []
+        st.rerun()
 
 # 채팅 입력 및 실행
 st.divider()
-if prompt := st.chat_input("모델을 비교할 메시지를 입력하세요"):  # Walrus 연산자: 할당 및 확인
-    # 모델 순차 실행 (모델 A, 그 다음 모델 B)
-    with st.status(f"{model_a} 실행 중..."):
-        result_a = run_model(model_a, prompt)
-    with st.status(f"{model_b} 실행 중..."):
-        result_b = run_model(model_b, prompt)
-
-    # 결과를 세션 상태에 저장 (이전 결과 교체)
-    st.session_state.latest_results = {"prompt": prompt, "model_a": result_a, "model_b": result_b}
-    st.rerun()  # 결과를 표시하기 위해 다시 실행
+if not selected_models:
+    st.info("비교할 모델을 하나 이상 선택하세요.")
+elif prompt := st.chat_input("모델을 비교할 메시지를 입력하세요"):  # Walrus 연산자: 할당 및 확인
+    # 선택한 모든 모델을 동시에 실행하고 토큰이 도착하는 대로 각 컨테이너에 스트리밍
+    # (총 대기 시간 ≈ 가장 느린 모델의 지연 시간, 단 동시 실행 수 제한 내에서)
+    jobs = {model: model for model in selected_models}
+    texts = {key: "" for key in jobs}
+    throttles = {key: Throttle() for key in jobs}  # 모델별로 50ms 단위로 화면 갱신
+    new_results = {}
+
+    for key in jobs:
+        display_response(panels[key][0], prompt, "", streaming=True)
+
+    for event, key, payload in run_concurrently(run_model, jobs, prompt, max_workers=int(max_workers)):
+        response_slot, metrics_slot = panels[key]
+        if event == "token":
+            texts[key] += payload
+            if throttles[key].ready():
+                display_response(response_slot, prompt, texts[key], streaming=True)
+        else:  # "done"
+            new_results[key] = payload
+            display_response(response_slot, prompt, payload["response_text"])
+            display_metrics(metrics_slot, payload)
+
+    # 결과를 세션 상태에 저장 (최신 결과 교체 + 리더보드 기록 추가) - 이미 화면에 표시되었으므로 재실행 불필요
+    st.session_state.latest_results = {"prompt": prompt, "results": new_results}
+    st.session_state.arena_history.extend(history_records(prompt, new_results))
+    board_slot.dataframe(leaderboard(st.session_state.arena_history), use_container_width=True, hide_index=True)
+
+    # 이번 실행의 모든 모델 결과를 한 번에 저장소에 추가
+    if history_store:
+        try:
+            history_store.append(history_records(prompt, new_results))
+            history_store.flush()
+        except Exception as e:
+            st.warning(f"실행 기록 저장 실패: {str(e)}")
+
+# 저장된 기록 대시보드
+if history_store:
+    with st.expander(":material/monitoring: 기록 대시보드 (History Dashboard)", expanded=False):
+        days = st.slider("조회 기간 (일)", min_value=1, max_value=90, value=14)
+        try:
+            history_df = history_store.load(days=days)
+        except Exception as e:
+            history_df = None
+            st.error(f"기록 로드 중 오류 발생: {str(e)}")
+
+        if history_df is None or history_df.empty:
+            st.info(":material/inbox: 아직 저장된 실행 기록이 없습니다.")
+        else:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("저장된 실행", len(history_df))
+            col2.metric("모델 수", history_df["model"].nunique())
+            col3.metric("오류율", f"{history_df['error'].notna().mean():.1%}")
+
+            st.markdown("**지연 시간 분포 (Latency Histogram)**")
+            st.bar_chart(latency_histogram(history_df), x_label="Latency", y_label="Runs")
+
+            trend_col1, trend_col2 = st.columns(2)
+            with trend_col1:
+                st.markdown("**일별 p50 지연 시간 (s)**")
+                st.line_chart(percentile_trend(history_df, 0.50))
+            with trend_col2:
+                st.markdown("**일별 p95 지연 시간 (s)**")
+                st.line_chart(percentile_trend(history_df, 0.95))
+
+            st.dataframe(leaderboard(history_df.to_dict("records")), use_container_width=True, hide_index=True)
 
 st.divider()
 st.caption("Day 15: Model Comparison Arena | 30 Days of AI")
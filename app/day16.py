@@ -2,10 +2,20 @@
 # RAG를 위한 배치 문서 텍스트 추출기 (Batch Document Text Extractor for RAG)
 
 import streamlit as st
-from pypdf import PdfReader
-import io
+import os
+import time
+import zipfile
 import pandas as pd
 from datetime import datetime
+from stream_utils import ThrottledProgress
+from extraction import extract_batch, file_type, content_hash, available_backends, load_policy, DEFAULT_BACKEND
+from bulk_load import merge_load, merge_staged, failed_rows, DEFAULT_CHUNK_SIZE, DEFAULT_PARALLEL
+from extraction_cache import ExtractionCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from document_sources import (zip_members, iter_zip_sources, directory_files, iter_directory_sources,
+                              resolve_server_path)
+from data_grid import paginated_table, table_stats, reset_grid
+from server_extraction import (DEFAULT_STAGE, SERVER_FILE_TYPES, PARSE_MODES, PARSED_COLUMNS,
+                               ensure_stage, new_batch_id, stage_source, parse_staged, clear_batch)
 
 # Snowflake 연결 설정
 # Snowflake에 연결
@@ -18,6 +28,19 @@ except:
     from snowflake.snowpark import Session
     session = Session.builder.configs(st.secrets["connections"]["snowflake"]).create()
 
+def server_source_root() -> str:
+    """서버 디렉터리 입력을 허용하는 루트 (기본: 저장소의 assets, secrets.toml의 [document_sources] server_root로 변경)."""
+    default = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets"))
+    try:
+        return st.secrets.get("document_sources", {}).get("server_root", default)
+    except Exception:
+        return default
+
+@st.cache_resource
+def get_extraction_cache(directory: str, max_mb: int):
+    """세션 간에 공유되는 추출 결과 디스크 캐시를 만듭니다."""
+    return ExtractionCache(directory, max_bytes=max_mb * 1024 * 1024)
+
 st.title(":material/description: 배치 문서 텍스트 추출기 (Batch Document Text Extractor)")
 st.write("여러 문서를 한 번에 업로드하여 텍스트를 추출하고 RAG 애플리케이션을 위해 Snowflake에 저장합니다.")
 
@@ -81,14 +104,61 @@ with st.container(border=True):
     
     # 파일 업로더
     st.subheader(":material/upload: 문서 업로드 (Upload Documents)")
-    uploaded_files = st.file_uploader(
-        "파일 선택",
-        type=["txt", "md", "pdf"],
-        accept_multiple_files=True,
-        help="지원 형식: TXT, MD, PDF. 여러 파일을 한 번에 업로드하세요!"
-)
+    input_mode = st.radio(
+        "입력 방식 (Input Mode)",
+        ["files", "zip", "directory"],
+        format_func={
+            "files": "개별 파일 (Files)",
+            "zip": "ZIP 아카이브 (ZIP Archive)",
+            "directory": "서버 디렉터리 (Server Directory)"
+        }.get,
+        horizontal=True
+    )
+    
+    # source_listing: 화면 표시용 (이름, 크기) 목록 / open_sources: 소스를 하나씩 내보내는 이터레이터 생성
+    source_listing = []
+    open_sources = None
+    if input_mode == "files":
+        uploaded_files = st.file_uploader(
+            "파일 선택",
+            type=["txt", "md", "pdf"],
+            accept_multiple_files=True,
+            help="지원 형식: TXT, MD, PDF. 여러 파일을 한 번에 업로드하세요!"
+        )
+        if uploaded_files:
+            source_listing = [(f.name, f.size) for f in uploaded_files]
+            open_sources = lambda: iter(uploaded_files)
+    else:
+        if input_mode == "zip":
+            archive = st.file_uploader(
+                "ZIP 아카이브 선택",
+                type=["zip"],
+                help="예: assets/review.zip. 디스크에 풀지 않고 멤버를 하나씩 읽어 추출합니다 (__MACOSX 항목은 건너뜀)."
+            )
+        else:
+            source_root = server_source_root()
+            archive = st.text_input(
+                "서버 경로 (디렉터리 또는 .zip)",
+                value="review",
+                help=f"허용된 루트 `{source_root}` 아래의 디렉터리(하위 폴더 포함) 또는 ZIP 파일 경로 (상대 경로는 루트 기준)"
+            )
+        try:
+            if input_mode == "directory" and archive:
+                # 루트 밖을 가리키는 경로(다른 절대 경로, '..', 심볼릭 링크)는 거부
+                archive = resolve_server_path(archive, source_root)
+            if input_mode == "directory" and archive and os.path.isdir(archive):
+                files = directory_files(archive)
+                source_listing = files
+                open_sources = lambda: iter_directory_sources(archive, files)
+            elif archive:
+                # 중앙 디렉터리(메타데이터)만 읽음 - 멤버 압축 해제는 추출 시 하나씩
+                members = zip_members(archive)
+                source_listing = [(m.filename, m.file_size) for m in members]
+                open_sources = lambda: iter_zip_sources(archive, members)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            st.error(f":material/error: 입력을 열 수 없습니다: {str(e)}")
 
-    # 테이블이 존재하는지 확인하여 replace_mode 기본값 설정
+    # 테이블이 존재하는지 확인하여 저장 모드 기본값 설정
     table_exists = False
     try:
         check_result = session.sql(f"""
@@ -98,15 +168,36 @@ with st.container(border=True):
     except:
         table_exists = False  # 테이블이 존재하지 않음
     
-    # 테이블 존재 여부에 따라 체크박스 값 설정
-    replace_mode = st.checkbox(
-        f":material/sync: `{st.session_state.table_name}` 테이블 교체 모드 (Replace Table Mode)",
-        value=table_exists,  # 테이블이 존재하면 True, 아니면 False
-        help=f"활성화하면 새 문서를 저장하기 전에 {st.session_state.database}.{st.session_state.schema}.{st.session_state.table_name}의 모든 기존 데이터를 지웁니다."
+    # 테이블이 존재하면 증분 모드, 없으면 추가 모드가 기본값
+    write_mode = st.radio(
+        f":material/sync: `{st.session_state.table_name}` 저장 모드 (Write Mode)",
+        ["incremental", "append", "replace"],
+        format_func={
+            "incremental": "증분 (Incremental)",
+            "append": "추가 (Append)",
+            "replace": "교체 (Replace)"
+        }.get,
+        index=0 if table_exists else 1,
+        horizontal=True,
+        help="증분: 내용 해시(SHA-256)가 같은 파일은 건너뛰고, 바뀐 파일은 업데이트, 새 파일은 삽입합니다."
     )
+    replace_mode = write_mode == "replace"
+    incremental_mode = write_mode == "incremental"
+    
+    # 일괄 로드 설정
+    with st.expander(":material/tune: 일괄 로드 설정 (Bulk Load Settings)"):
+        col1, col2 = st.columns(2)
+        with col1:
+            load_chunk_size = st.number_input("파일당 행 수 (Chunk Size)", min_value=100, value=DEFAULT_CHUNK_SIZE, step=1000,
+                                              help="스테이지에 업로드하는 Parquet 파일당 행 수")
+        with col2:
+            load_parallel = st.number_input("업로드 병렬도 (Parallel)", min_value=1, max_value=99, value=DEFAULT_PARALLEL,
+                                            help="스테이지 업로드에 사용할 스레드 수")
     
     if replace_mode:
         st.warning(f":material/warning: **교체 모드 활성화됨** - 새 문서를 저장하기 전에 `{st.session_state.table_name}`의 모든 기존 문서가 삭제됩니다.")
+    elif incremental_mode:
+        st.info(f":material/difference: **증분 모드** - `{st.session_state.table_name}`에 이미 같은 내용으로 저장된 파일은 추출하지 않습니다.")
     else:
         st.info(f":material/add: **추가 모드** - 새 문서가 `{st.session_state.table_name}`에 추가됩니다.")
 
@@ -116,29 +207,80 @@ schema = st.session_state.schema
 table_name = st.session_state.table_name
 
 # 업로드 정보 표시
-if uploaded_files:
+if open_sources and not source_listing:
+    st.warning(":material/warning: 추출할 수 있는 문서(TXT, MD, PDF)가 없습니다.")
+elif open_sources:
     with st.container(border=True):
         st.subheader(":material/upload: 업로드된 문서 (Uploaded Documents)")
-        st.success(f":material/folder: {len(uploaded_files)}개의 파일이 업로드되었습니다.")
+        total_files = len(source_listing)
+        st.success(f":material/folder: {total_files:,}개의 파일이 준비되었습니다 ({sum(size for _, size in source_listing):,} bytes).")
         
         # 선택된 파일 미리보기
         with st.expander(":material/assignment: 선택된 파일 보기", expanded=False):
             file_list_df = pd.DataFrame([
                 {
-                    "File Name": f.name,
-                    "Size": f"{f.size:,} bytes",
-                    "Type": "TXT" if f.name.lower().endswith('.txt') 
-                           else "Markdown" if f.name.lower().endswith('.md')
-                           else "PDF" if f.name.lower().endswith('.pdf')
-                           else "Unknown"
+                    "File Name": name,
+                    "Size": f"{size:,} bytes",
+                    "Type": file_type(name)
                 }
-                for f in uploaded_files
+                for name, size in source_listing
             ])
             st.dataframe(file_list_df, use_container_width=True)
         
+        # 병렬 추출 워커 수
+        max_workers = st.slider(
+            "추출 워커 프로세스 수 (Extraction Workers)",
+            min_value=1,
+            max_value=max(os.cpu_count() or 1, 8),
+            value=min(4, os.cpu_count() or 1),
+            help="파일(또는 큰 PDF의 페이지 범위)을 여러 프로세스로 나누어 추출합니다. 1이면 순차 처리합니다."
+        )
+        
+        # 추출 위치: 클라이언트(pypdf) 또는 서버(Cortex PARSE_DOCUMENT)
+        col1, col2 = st.columns(2)
+        with col1:
+            extract_location = st.radio(
+                "PDF 추출 위치 (Extraction Location)",
+                ["client", "server"],
+                format_func={
+                    "client": "앱 서버 (pypdf)",
+                    "server": "Snowflake (PARSE_DOCUMENT)"
+                }.get,
+                horizontal=True,
+                help="Snowflake: PDF 바이트를 내부 스테이지로 스트리밍한 뒤 웨어하우스에서 한 번의 INSERT ... SELECT로 파싱합니다. TXT/MD는 항상 앱에서 처리합니다."
+            )
+        server_mode = extract_location == "server"
+        with col2:
+            if server_mode:
+                parse_mode = st.selectbox("파싱 모드 (Parse Mode)", PARSE_MODES,
+                                          help="LAYOUT: 표/제목 구조 유지, OCR: 텍스트만 빠르게")
+                pdf_backend = DEFAULT_BACKEND
+            else:
+                pdf_backend = st.selectbox(
+                    "PDF 추출기 (Extractor Backend)",
+                    ["auto"] + available_backends(),
+                    help="auto: 문서 첫 페이지로 프로필(text-heavy / layout-heavy / scanned)을 판단하고, "
+                         "`extraction_bench.py backends --write-policy`로 측정한 가장 빠른 허용 백엔드를 사용합니다."
+                )
+                parse_mode = None
+                if pdf_backend == "auto":
+                    st.caption("정책: " + ", ".join(f"{k} → {v}" for k, v in load_policy().items()))
+        
+        # 추출 캐시: 같은 내용의 파일은 파싱하지 않고 저장된 결과 사용
+        col1, col2 = st.columns(2)
+        with col1:
+            use_cache = st.checkbox(
+                ":material/cached: 추출 캐시 사용 (Use Extraction Cache)",
+                value=True,
+                help=f"(파일 SHA-256, 추출기 버전)을 키로 추출 결과를 `{DEFAULT_CACHE_DIR}`에 압축 저장합니다."
+            )
+        with col2:
+            cache_max_mb = st.number_input("캐시 최대 크기 (MB)", min_value=16, value=DEFAULT_MAX_BYTES // (1024 * 1024), step=64)
+        extraction_cache = get_extraction_cache(DEFAULT_CACHE_DIR, cache_max_mb) if use_cache else None
+        
         # 파일 처리 버튼
         process_button = st.button(
-            f":material/sync: {len(uploaded_files)}개 파일에서 텍스트 추출",
+            f":material/sync: {total_files:,}개 파일에서 텍스트 추출",
             type="primary",
             use_container_width=True
         )
@@ -148,69 +290,91 @@ if uploaded_files:
         success_count = 0
         error_count = 0
         extracted_data = []
+        failed_files = []
+        cache_hits = 0
+        
+        # 증분 모드: 추출 전에 내용 해시를 계산하고, 테이블의 해시와 한 번의 쿼리로 비교
+        hashes = {}
+        existing_hashes = {}
+        sources = open_sources()
+        skipped_files = []  # (이름, 크기) - 버퍼는 보관하지 않음
+        if incremental_mode:
+            if table_exists:
+                try:
+                    session.sql(f"ALTER TABLE {database}.{schema}.{table_name} ADD COLUMN IF NOT EXISTS CONTENT_HASH VARCHAR").collect()
+                    existing_hashes = {
+                        row['FILE_NAME']: row['CONTENT_HASH']
+                        for row in session.sql(f"SELECT FILE_NAME, CONTENT_HASH FROM {database}.{schema}.{table_name}").collect()
+                    }
+                except Exception as e:
+                    st.warning(f":material/warning: 기존 해시를 읽지 못해 모든 파일을 추출합니다: {str(e)}")
+            
+            def changed_only(candidates):
+                """해시가 같은 파일은 건너뛰고, 계산한 해시는 extract_batch가 재사용하도록 기록"""
+                for source in candidates:
+                    hashes[source.name] = content_hash(source)
+                    if existing_hashes.get(source.name) == hashes[source.name]:
+                        skipped_files.append((source.name, source.size))
+                        continue
+                    yield source
+            
+            sources = changed_only(sources)
+        
+        # 서버 측 파싱: PDF는 앱에서 읽지 않고 스테이지로 바로 스트리밍, 나머지만 extract_batch로 전달
+        staged_files = []
+        stage_failures = []  # 스테이지 업로드에 실패한 파일 이름
+        batch_cleared = False
+        if server_mode:
+            stage = f"{database}.{schema}.{DEFAULT_STAGE}"
+            batch_id = new_batch_id()
+            session.sql(f"CREATE DATABASE IF NOT EXISTS {database}").collect()
+            session.sql(f"CREATE SCHEMA IF NOT EXISTS {database}.{schema}").collect()
+            ensure_stage(session, stage)
+            
+            def stage_pdfs(candidates):
+                for source in candidates:
+                    if file_type(source.name) in SERVER_FILE_TYPES:
+                        # 업로드 실패는 추출 오류처럼 해당 파일에만 기록하고 나머지 파일은 계속 처리
+                        try:
+                            staged_files.append(stage_source(session, source, stage, batch_id, hashes.get(source.name)))
+                        except Exception as e:
+                            stage_failures.append(source.name)
+                            failed_files.append({"File Name": source.name, "Error": f"스테이지 업로드 실패: {e}"})
+                    else:
+                        yield source
+            
+            sources = stage_pdfs(sources)
         
         progress_bar = st.progress(0, text="추출 시작 중...")
+        progress = ThrottledProgress(progress_bar)  # 파일마다가 아니라 50ms 단위로 화면 갱신
         status_container = st.empty()
         
-        for idx, uploaded_file in enumerate(uploaded_files):
-            progress_pct = (idx + 1) / len(uploaded_files)
-            progress_bar.progress(progress_pct, text=f"처리 중 {idx+1}/{len(uploaded_files)}: {uploaded_file.name}")
+        # 워커 프로세스에서 추출하고, 완료되는 순서대로 결과를 받아 진행 상황 갱신
+        extract_start = time.perf_counter()
+        extracted_count = 0
+        extracted_bytes = 0
+        batch = extract_batch(sources, max_workers=max_workers, known_hashes=hashes, cache=extraction_cache,
+                              backend=pdf_backend)
+        for result in batch:
+            extracted_count += 1
+            extracted_bytes += result['file_size']
+            done = extracted_count + len(skipped_files) + len(staged_files) + len(stage_failures)
+            progress.update(done / total_files, text=f"완료 {done}/{total_files}: {result['file_name']}")
             
-            try:
-                # 확장자로 파일 유형 결정
-                if uploaded_file.name.lower().endswith('.txt'):
-                    file_type = "TXT"
-                elif uploaded_file.name.lower().endswith('.md'):
-                    file_type = "Markdown"
-                elif uploaded_file.name.lower().endswith('.pdf'):
-                    file_type = "PDF"
-                else:
-                    file_type = "Unknown"
-                
-                # 파일 포인터 리셋
-                uploaded_file.seek(0)
-                
-                # 파일 유형에 따라 텍스트 추출
-                extracted_text = ""
-                
-                if uploaded_file.name.lower().endswith(('.txt', '.md')):
-                    # TXT 및 Markdown 파일 처리
-                    extracted_text = uploaded_file.read().decode("utf-8")
-                
-                elif uploaded_file.name.lower().endswith('.pdf'):
-                    # PDF 파일 처리
-                    pdf_reader = PdfReader(io.BytesIO(uploaded_file.read()))
-                    
-                    # 모든 페이지에서 텍스트 추출
-                    for page in pdf_reader.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            extracted_text += page_text + "\n\n"
-                
-                # 추출 성공 여부 확인
-                if extracted_text and extracted_text.strip():
-                    # 메타데이터 계산
-                    word_count = len(extracted_text.split())
-                    char_count = len(extracted_text)
-                    
-                    # 추출된 데이터 저장
-                    extracted_data.append({
-                        'file_name': uploaded_file.name,
-                        'file_type': file_type,
-                        'file_size': uploaded_file.size,
-                        'extracted_text': extracted_text,
-                        'word_count': word_count,
-                        'char_count': char_count
-                    })
-                    
-                    success_count += 1
-                else:
-                    error_count += 1
-                    status_container.warning(f":material/warning: 텍스트가 추출되지 않음: {uploaded_file.name}")
-                    
-            except Exception as e:
+            if result['cached']:
+                cache_hits += 1
+            if result['error'] is None:
+                result.pop('error')
+                extracted_data.append(result)
+                success_count += 1
+            else:
+                # 파일별 오류는 해당 파일에만 기록되고 나머지 파일은 계속 처리됨
                 error_count += 1
-                status_container.error(f":material/cancel: {uploaded_file.name} 처리 중 오류 발생: {str(e)}")
+                failed_files.append({"File Name": result['file_name'], "Error": result['error']})
+                status_container.warning(f":material/warning: {result['file_name']}: {result['error']}")
+        
+        extract_seconds = time.perf_counter() - extract_start
+        error_count += len(stage_failures)
         
         progress_bar.empty()
         status_container.empty()
@@ -227,24 +391,58 @@ if uploaded_files:
             with col3:
                 st.metric(":material/analytics: 총 단어 수", f"{sum(d['word_count'] for d in extracted_data):,}")
             
+            if staged_files:
+                st.metric(":material/cloud_upload: 서버 파싱 대기 (스테이지에 업로드된 PDF)", len(staged_files),
+                          help=f"{sum(f['file_size'] for f in staged_files):,} bytes - 저장 단계에서 PARSE_DOCUMENT로 추출됩니다")
+            
+            if extraction_cache:
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric(":material/cached: 캐시 적중률 (Cache Hit Ratio)",
+                              f"{cache_hits / extracted_count:.0%}" if extracted_count else "-",
+                              help=f"{cache_hits}/{extracted_count}개 파일이 파싱 없이 캐시에서 로드됨")
+                with col2:
+                    st.metric(":material/storage: 캐시 저장 크기", f"{extraction_cache.bytes_stored() / (1024 * 1024):.1f} MB")
+            
+            if incremental_mode:
+                # 건너뛴 바이트 × 이번 실행의 바이트당 추출 시간으로 절약된 시간 추정
+                skipped_bytes = sum(size for _, size in skipped_files)
+                saved_seconds = skipped_bytes * extract_seconds / extracted_bytes if extracted_bytes else 0.0
+                changed_count = sum(1 for d in extracted_data if d['file_name'] in existing_hashes)
+                
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric(":material/skip_next: 건너뜀 (변경 없음)", len(skipped_files))
+                with col2:
+                    st.metric(":material/edit: 업데이트", changed_count)
+                with col3:
+                    st.metric(":material/add: 삽입", len(extracted_data) - changed_count)
+                with col4:
+                    st.metric(":material/timer: 절약된 추출 시간 (추정)", f"{saved_seconds:.1f}s" if extracted_bytes else "-")
+            
+            if failed_files:
+                with st.expander(f":material/error: 실패한 파일 {len(failed_files)}개"):
+                    st.dataframe(pd.DataFrame(failed_files), use_container_width=True, hide_index=True)
+            
             # 리뷰를 위해 세션 상태에 저장
-            if extracted_data:
+            if extracted_data or staged_files:
                 st.session_state.extracted_data = extracted_data
-                st.success(f":material/check_circle: {success_count}개 파일에서 텍스트를 성공적으로 추출했습니다!")
-                
-                # 추출된 데이터 미리보기
-                with st.expander(":material/visibility: 처음 3개 파일 미리보기"):
-                    for data in extracted_data[:3]:
-                        with st.container(border=True):
-                            st.markdown(f"**{data['file_name']}**")
-                            st.caption(f"{data['word_count']:,} words")
-                            preview_text = data['extracted_text'][:200]
-                            if len(data['extracted_text']) > 200:
-                                preview_text += "..."
-                            st.text(preview_text)
+                if extracted_data:
+                    st.success(f":material/check_circle: {success_count}개 파일에서 텍스트를 성공적으로 추출했습니다!")
                     
-                    if len(extracted_data) > 3:
-                        st.caption(f"... 그리고 {len(extracted_data) - 3}개 더")
+                    # 추출된 데이터 미리보기
+                    with st.expander(":material/visibility: 처음 3개 파일 미리보기"):
+                        for data in extracted_data[:3]:
+                            with st.container(border=True):
+                                st.markdown(f"**{data['file_name']}**")
+                                st.caption(f"{data['word_count']:,} words · {data['extractor']}")
+                                preview_text = data['extracted_text'][:200]
+                                if len(data['extracted_text']) > 200:
+                                    preview_text += "..."
+                                st.text(preview_text)
+                        
+                        if len(extracted_data) > 3:
+                            st.caption(f"... 그리고 {len(extracted_data) - 3}개 더")
                 
                 # Snowflake에 저장
                 with st.status("Snowflake에 저장 중...", expanded=True) as status:
@@ -265,10 +463,16 @@ if uploaded_files:
                             EXTRACTED_TEXT VARCHAR,
                             UPLOAD_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
                             WORD_COUNT NUMBER,
-                            CHAR_COUNT NUMBER
+                            CHAR_COUNT NUMBER,
+                            CONTENT_HASH VARCHAR
                         )
                         """
                         session.sql(create_table_sql).collect()
+                        # 이전 버전에서 만든 테이블에는 해시 컬럼 추가
+                        session.sql(f"ALTER TABLE {database}.{schema}.{table_name} ADD COLUMN IF NOT EXISTS CONTENT_HASH VARCHAR").collect()
+                        
+                        # 다운스트림 증분 처리를 위한 워터마크 (이 시각 이후 UPLOAD_TIMESTAMP = 이번 수집분)
+                        ingest_watermark = session.sql("SELECT CURRENT_TIMESTAMP()::TIMESTAMP_NTZ AS TS").collect()[0]['TS']
                         
                         # 교체 모드: 기존 데이터 삭제
                         if replace_mode:
@@ -279,46 +483,109 @@ if uploaded_files:
                             except Exception as e:
                                 st.write(f"   :material/warning: 지울 기존 데이터 없음")
                         
-                        # 추출된 모든 데이터 삽입
-                        st.write(f":material/looks_3: {len(extracted_data)}개의 문서 삽입 중...")
+                        rows = [
+                            {
+                                'FILE_NAME': data['file_name'],
+                                'FILE_TYPE': data['file_type'],
+                                'FILE_SIZE': data['file_size'],
+                                'EXTRACTED_TEXT': data['extracted_text'],
+                                'WORD_COUNT': data['word_count'],
+                                'CHAR_COUNT': data['char_count'],
+                                'CONTENT_HASH': data['content_hash']
+                            }
+                            for data in extracted_data
+                        ]
                         
-                        for idx, data in enumerate(extracted_data, 1):
-                            st.caption(f"저장 중 {idx}/{len(extracted_data)}: {data['file_name']}")
-                            # 텍스트 내 작은따옴표 이스케이프 처리
-                            safe_text = data['extracted_text'].replace("'", "''")
-                            
-                            # [실습] Snowflake 테이블에 데이터를 삽입하세요.
-                            # 힌트: session.sql(insert_sql).collect()
+                        load_failures = []
+                        loaded_count = 0
+                        if rows and incremental_mode:
+                            # 바뀐/새 문서를 임시 스테이징 테이블에 로드한 뒤 MERGE 한 번으로 반영
+                            st.write(f":material/looks_3: {len(extracted_data)}개의 문서 병합 중 (MERGE)...")
+                            merge_result = merge_load(
+                                session, rows, table_name, database, schema,
+                                key_columns=['FILE_NAME'],
+                                touch_columns={'UPLOAD_TIMESTAMP': 'CURRENT_TIMESTAMP()'},
+                                chunk_size=load_chunk_size, parallel=load_parallel
+                            )
+                            load_failures = merge_result['failed']
+                            loaded_count = merge_result['inserted'] + merge_result['updated']
+                            st.write(f"   :material/check_circle: 삽입 {merge_result['inserted']}개, 업데이트 {merge_result['updated']}개")
+                        elif rows:
+                            st.write(f":material/looks_3: {len(extracted_data)}개의 문서 일괄 로드 중...")
+                            insert_progress = ThrottledProgress(st.progress(0), caption=st.empty())
                             
-                            insert_sql = f"""
-                            INSERT INTO {database}.{schema}.{table_name}
-                            (FILE_NAME, FILE_TYPE, FILE_SIZE, EXTRACTED_TEXT, WORD_COUNT, CHAR_COUNT)
-                            VALUES ('{data['file_name']}', '{data['file_type']}', {data['file_size']}, 
-                                    '{safe_text}', {data['word_count']}, {data['char_count']})
-                            """
+                            # [실습] 추출된 모든 데이터를 Snowflake 테이블에 일괄 로드하세요.
+                            # 힌트: from bulk_load import bulk_load
+                            #       문서마다 INSERT 문을 만들지 않고 한 번의 stage + COPY INTO로 로드합니다 (따옴표 이스케이프 불필요).
                             
                             # 여기에 코드를 작성하세요 (아래 코드를 완성하세요)
-                            # session.sql(insert_sql).collect() # 이 줄의 주석을 해제하세요
+                            # load_results = bulk_load(
+                            #     session, rows, table_name, database=database, schema=schema,
+                            #     chunk_size=load_chunk_size, parallel=load_parallel,
+                            #     on_chunk=lambda loaded, total: insert_progress.update(
+                            #         loaded / total, caption=f"로드됨 {loaded}/{total}")
+                            # )
                             
                             # 실습을 위해 임시로 비워둡니다. 위 주석을 참고하여 채워보세요.
-                            pass
+                            load_results = []
+                            load_failures = failed_rows(load_results)
+                            loaded_count = len(load_results) - len(load_failures)
+                        
+                        if load_failures:
+                            st.write(f"   :material/warning: {len(load_failures)}개 문서 로드 실패")
+                            st.dataframe(pd.DataFrame([
+                                {"File Name": rows[r['row']]['FILE_NAME'], "Error": r['error']}
+                                for r in load_failures
+                            ]), use_container_width=True, hide_index=True)
+                        
+                        # 서버 측 파싱: 스테이지의 PDF 전체를 한 번의 INSERT ... SELECT로 추출
+                        if staged_files:
+                            st.write(f":material/cloud: Snowflake에서 PDF {len(staged_files)}개 파싱 중 (PARSE_DOCUMENT, {parse_mode})...")
+                            target_table = f"{database}.{schema}.{table_name}"
+                            if incremental_mode:
+                                parsed_table = f"{target_table}_PARSED"
+                                session.sql(f"CREATE OR REPLACE TEMPORARY TABLE {parsed_table} LIKE {target_table}").collect()
+                                parsed_count = parse_staged(session, stage, batch_id, parsed_table, mode=parse_mode)
+                                counts = merge_staged(session, parsed_table, target_table, ['FILE_NAME'], PARSED_COLUMNS,
+                                                      touch_columns={'UPLOAD_TIMESTAMP': 'CURRENT_TIMESTAMP()'})
+                                session.sql(f"DROP TABLE IF EXISTS {parsed_table}").collect()
+                                loaded_count += counts['inserted'] + counts['updated']
+                            else:
+                                parsed_count = parse_staged(session, stage, batch_id, target_table, mode=parse_mode)
+                                loaded_count += parsed_count
+                            clear_batch(session, stage, batch_id)
+                            batch_cleared = True
+                            st.write(f"   :material/check_circle: {parsed_count}개 PDF 파싱 완료")
+                            if parsed_count < len(staged_files):
+                                st.write(f"   :material/warning: {len(staged_files) - parsed_count}개 PDF에서 텍스트가 추출되지 않음")
                         
                         status.update(label=":material/check_circle: 모든 문서가 저장되었습니다!", state="complete", expanded=False)
                         
-                        mode_msg = "교체되었습니다" if replace_mode else "저장되었습니다"
-                        st.success(f":material/check_circle: `{database}.{schema}.{table_name}`에 성공적으로 {mode_msg}\n\n:material/description: 현재 테이블에 {len(extracted_data)}개의 문서가 있습니다")
+                        mode_msg = {"replace": "교체되었습니다", "incremental": "병합되었습니다"}.get(write_mode, "저장되었습니다")
+                        st.success(f":material/check_circle: `{database}.{schema}.{table_name}`에 성공적으로 {mode_msg}\n\n:material/description: {loaded_count}개의 문서가 로드되었습니다")
                         
                         # 다운스트림 앱을 위해 세션 상태에 참조 저장
                         st.session_state.rag_source_table = f"{database}.{schema}.{table_name}"
                         st.session_state.rag_source_database = database
                         st.session_state.rag_source_schema = schema
+                        st.session_state.rag_ingest_watermark = ingest_watermark
+                        table_stats.clear()  # 뷰어의 캐시된 행 수/집계 갱신
                         
                         st.balloons()
                         
                     except Exception as e:
                         st.error(f"Snowflake 저장 중 오류 발생: {str(e)}")
+            elif skipped_files and not failed_files:
+                st.info(f":material/check_circle: {len(skipped_files)}개 파일 모두 변경되지 않아 추출과 저장을 건너뛰었습니다.")
             else:
                 st.warning("어떤 파일에서도 텍스트가 성공적으로 추출되지 않았습니다.")
+        
+        # 저장 오류나 업로드 실패로 파싱되지 않은 배치의 스테이지 파일 정리
+        if server_mode and not batch_cleared:
+            try:
+                clear_batch(session, stage, batch_id)
+            except Exception as e:
+                st.warning(f":material/warning: 스테이지 파일을 지우지 못했습니다 (@{stage}/{batch_id}/): {str(e)}")
 
 st.divider()
 
@@ -326,99 +593,63 @@ st.divider()
 with st.container(border=True):
     st.subheader(":material/search: 저장된 문서 보기 (View Saved Documents)")
     
-    # 테이블이 존재하는지 확인하고 레코드 수 표시
+    # 테이블이 존재하는지 확인하고 레코드 수 표시 (행 수는 캐시됨)
+    full_table_name = f"{database}.{schema}.{table_name}"
     try:
-        count_result = session.sql(f"""
-            SELECT COUNT(*) as CNT FROM {database}.{schema}.{table_name}
-        """).collect()
-        
-        if count_result:
-            record_count = count_result[0]['CNT']
-            if record_count > 0:
-                st.warning(f":material/warning: 현재 `{database}.{schema}.{table_name}` 테이블에 **{record_count}개의 레코드**가 있습니다.")
-            else:
-                st.info(":material/inbox: **테이블이 비어 있습니다** - 아직 업로드된 문서가 없습니다.")
+        record_count = table_stats(session, full_table_name)['ROW_COUNT']
+        if record_count > 0:
+            st.warning(f":material/warning: 현재 `{full_table_name}` 테이블에 **{record_count:,}개의 레코드**가 있습니다.")
+        else:
+            st.info(":material/inbox: **테이블이 비어 있습니다** - 아직 업로드된 문서가 없습니다.")
     except:
         st.info(":material/inbox: **테이블이 아직 존재하지 않습니다** - 문서를 업로드하고 저장하여 생성하세요.")
     
     query_button = st.button("테이블 조회 (Query Table)", type="secondary", use_container_width=True)
     
     if query_button:
-        try:
-            full_table_name = f"{database}.{schema}.{table_name}"
-            
-            # 테이블 조회
-            query_sql = f"""
-            SELECT DOC_ID, FILE_NAME, FILE_TYPE, FILE_SIZE, UPLOAD_TIMESTAMP, WORD_COUNT, CHAR_COUNT
-            FROM {full_table_name}
-            ORDER BY UPLOAD_TIMESTAMP DESC
-            """
-            df = session.sql(query_sql).to_pandas()
-        
-            # 지속성을 위해 세션 상태에 저장
-            st.session_state.queried_docs = df
-            st.session_state.full_table_name = full_table_name
-            st.rerun()
-                
-        except Exception as e:
-            st.error(f"오류: {str(e)}")
-            st.info(":material/lightbulb: 테이블이 아직 존재하지 않을 수 있습니다. 문서를 먼저 업로드하고 저장하세요!")
+        # 첫 페이지부터 다시 조회하고 캐시된 행 수/집계 비우기
+        reset_grid("day16_docs_grid")
+        st.session_state.full_table_name = full_table_name
+        st.rerun()
     
     # 가능한 경우 조회 결과 표시
-    if 'queried_docs' in st.session_state and 'full_table_name' in st.session_state:
-        # 동적 테이블 이름 표시를 위해 현재 세션 상태 값 사용
-        current_full_table_name = f"{st.session_state.database}.{st.session_state.schema}.{st.session_state.table_name}"
-        
+    if 'full_table_name' in st.session_state:
         # 현재 테이블과 일치하는 경우에만 결과 표시 (다른 테이블의 오래된 데이터 표시 방지)
-        if st.session_state.full_table_name == current_full_table_name:
-            df = st.session_state.queried_docs
-            
-            if len(df) > 0:
-                st.code(f"{current_full_table_name}", language="sql")
-                
-                # 요약 메트릭
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Documents", len(df))
-                with col2:
-                    st.metric("Words", f"{df['WORD_COUNT'].sum():,}")
-                with col3:
-                    st.metric("Characters", f"{df['CHAR_COUNT'].sum():,}")
-                
-                st.divider()
-                
-                # 문서 테이블 표시
-                st.dataframe(
-                    df[['DOC_ID', 'FILE_NAME', 'FILE_TYPE', 'WORD_COUNT', 'UPLOAD_TIMESTAMP']],
-                    use_container_width=True
-                )
+        if st.session_state.full_table_name == full_table_name:
+            try:
+                stats = table_stats(session, full_table_name,
+                                    (("WORDS", "SUM(WORD_COUNT)"), ("CHARACTERS", "SUM(CHAR_COUNT)")))
                 
-                # 문서 전체 텍스트 보기 옵션
-                with st.expander(":material/menu_book: 문서 전체 텍스트 보기"):
-                    doc_id = st.selectbox(
-                        "문서 ID 선택 (Select Document ID):",
-                        options=df['DOC_ID'].tolist(),
-                        format_func=lambda x: f"Doc #{x} - {df[df['DOC_ID']==x]['FILE_NAME'].values[0]}"
-                    )
+                if stats['ROW_COUNT'] > 0:
+                    st.code(f"{full_table_name}", language="sql")
                     
-                    if st.button("텍스트 로드 (Load Text)"):
-                        text_sql = f"SELECT EXTRACTED_TEXT, FILE_NAME FROM {current_full_table_name} WHERE DOC_ID = {doc_id}"
-                        text_result = session.sql(text_sql).to_pandas()
-                        if len(text_result) > 0:
-                            doc = text_result.iloc[0]
-                            # 세션 상태에 저장
-                            st.session_state.loaded_doc_text = doc['EXTRACTED_TEXT']
-                            st.session_state.loaded_doc_name = doc['FILE_NAME']
+                    # 요약 메트릭
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Documents", f"{stats['ROW_COUNT']:,}")
+                    with col2:
+                        st.metric("Words", f"{stats['WORDS'] or 0:,}")
+                    with col3:
+                        st.metric("Characters", f"{stats['CHARACTERS'] or 0:,}")
                     
-                    # 로드된 텍스트가 있는 경우 표시
-                    if 'loaded_doc_text' in st.session_state:
-                        st.text_area(
-                            st.session_state.loaded_doc_name,
-                            value=st.session_state.loaded_doc_text,
-                            height=400
-                        )
-            else:
-                st.info(":material/inbox: 테이블이 비어 있습니다. 위에서 파일을 업로드하세요!")
+                    st.divider()
+                    
+                    # 문서 테이블: 한 페이지씩 조회, 전체 텍스트는 선택한 문서만 로드
+                    paginated_table(
+                        session, full_table_name,
+                        columns=["DOC_ID", "FILE_NAME", "FILE_TYPE", "WORD_COUNT", "UPLOAD_TIMESTAMP"],
+                        key_column="DOC_ID",
+                        state_key="day16_docs_grid",
+                        detail_column="EXTRACTED_TEXT",
+                        label_column="FILE_NAME",
+                        descending=True,
+                        total=stats['ROW_COUNT']
+                    )
+                else:
+                    st.info(":material/inbox: 테이블이 비어 있습니다. 위에서 파일을 업로드하세요!")
+            except Exception as e:
+                st.error(f"오류: {str(e)}")
+                st.info(":material/lightbulb: 테이블이 아직 존재하지 않을 수 있습니다. 문서를 먼저 업로드하고 저장하세요!")
         else:
             st.info(f":material/sync: 다른 테이블에 대한 결과를 표시하고 있습니다. '테이블 조회 (Query Table)'를 클릭하여 새로 고치세요.")
     else:
@@ -4,6 +4,17 @@
 import streamlit as st
 import pandas as pd
 import re
+import time
+from chunking import DEFAULT_TARGET_TOKENS, DEFAULT_OVERLAP_TOKENS
+from server_chunking import ensure_chunk_table, register_chunker, chunk_in_warehouse
+from chunk_sync import chunk_config, changed_doc_ids_sql, chunk_watermarks_available, sync_chunks, sync_in_warehouse
+from review_stream import (review_query, review_batches, chunk_reviews, chunk_rows, chunk_writer, stream_chunks,
+                           DEFAULT_BATCH_ROWS)
+from tokenization import (available_tokenizers, max_content_tokens, EMBED_MODEL_LIMITS,
+                          DEFAULT_TOKENIZER, DEFAULT_EMBED_MODEL)
+from data_grid import paginated_table, paginated_rows, table_stats, reset_grid
+from bulk_load import bulk_load, failed_rows, DEFAULT_CHUNK_SIZE, DEFAULT_PARALLEL
+from stream_utils import ThrottledProgress
 
 # Snowflake 연결
 try:
@@ -33,6 +44,21 @@ if 'day17_database' not in st.session_state:
 if 'day17_chunk_table' not in st.session_state:
     st.session_state.day17_chunk_table = "REVIEW_CHUNKS"
 
+
+def load_filters(source_table: str, only_new: bool, only_changed: bool) -> tuple:
+    """리뷰 로드 조건과 바인딩 파라미터 (Day 16 수집 워터마크, 청크 테이블의 문서별 워터마크)."""
+    conditions, params = [], []
+    if only_new:
+        conditions.append("UPLOAD_TIMESTAMP >= ?")
+        params.append(st.session_state.rag_ingest_watermark)
+    if only_changed:
+        chunk_table = f"{st.session_state.day17_database}.{st.session_state.day17_schema}.{st.session_state.day17_chunk_table}"
+        # 청크 테이블(워터마크)이 아직 없으면 모든 문서가 대상이므로 조건 없음 (읽기 경로에서는 DDL을 실행하지 않음)
+        if chunk_watermarks_available(session, chunk_table):
+            conditions.append(f"DOC_ID IN ({changed_doc_ids_sql(source_table, chunk_table, check_config=False)})")
+    return conditions, params
+
+
 # 데이터베이스 구성 및 로드 섹션
 with st.container(border=True):
     st.subheader(":material/analytics: 원본 데이터 구성 (Source Data Configuration)")
@@ -65,31 +91,39 @@ with st.container(border=True):
     if 'loaded_data' in st.session_state:
         st.success(f":material/check_circle: **{len(st.session_state.loaded_data)}개의 문서**가 이미 로드되었습니다.")
 
+    # Day 16 증분 수집 이후에는 이번에 추가/변경된 문서만 로드 가능
+    only_new_docs = False
+    if 'rag_ingest_watermark' in st.session_state:
+        only_new_docs = st.checkbox(
+            ":material/difference: 마지막 수집 이후 변경된 문서만 (Only Documents Since Last Ingest)",
+            value=True,
+            help=f"UPLOAD_TIMESTAMP >= {st.session_state.rag_ingest_watermark} 인 문서만 로드합니다."
+        )
+    
+    # 청크 테이블의 문서별 워터마크(DOC_ID, 청킹 당시 UPLOAD_TIMESTAMP)와 비교하여 다시 청킹할 문서만 로드
+    only_changed_docs = st.checkbox(
+        f":material/published_with_changes: 마지막 청킹 이후 새로 추가/변경된 문서만 (Only Documents Changed Since Last Chunking)",
+        value=True,
+        help=f"`{st.session_state.day17_chunk_table}`에 청크가 없거나, 청킹 이후 UPLOAD_TIMESTAMP가 바뀐 문서만 로드합니다. "
+             "청킹 설정을 바꿨다면 해제하고 전체를 로드한 뒤 증분 모드로 저장하세요."
+    )
+    
     # 문서 로드 버튼
     if st.button(":material/folder_open: 리뷰 로드 (Load Reviews)", type="primary", use_container_width=True):
         try:
             with st.status("Snowflake에서 리뷰 로딩 중...", expanded=True) as status:
                 st.write(":material/wifi: 데이터베이스 쿼리 중...")
                 
-                query = f"""
-                SELECT 
-                    DOC_ID,
-                    FILE_NAME,
-                    FILE_TYPE,
-                    EXTRACTED_TEXT,
-                    UPLOAD_TIMESTAMP,
-                    WORD_COUNT,
-                    CHAR_COUNT
-                FROM {st.session_state.day17_database}.{st.session_state.day17_schema}.{st.session_state.day17_table_name}
-                ORDER BY FILE_NAME
-                """
-                df = session.sql(query).to_pandas()
+                source_table = f"{st.session_state.day17_database}.{st.session_state.day17_schema}.{st.session_state.day17_table_name}"
+                conditions, params = load_filters(source_table, only_new_docs, only_changed_docs)
+                df = session.sql(review_query(source_table, conditions), params=params or None).to_pandas()
                 
                 st.write(f":material/check_circle: {len(df)}개의 리뷰 로드됨")
                 status.update(label="리뷰 로드 성공!", state="complete", expanded=False)
                 
-                # 세션 상태에 저장
+                # 세션 상태에 저장 (일부 문서만 로드했으면 교체 모드 저장을 막기 위해 기록)
                 st.session_state.loaded_data = df
+                st.session_state.day17_loaded_filtered = bool(only_new_docs or only_changed_docs)
                 st.session_state.source_table = f"{st.session_state.day17_database}.{st.session_state.day17_schema}.{st.session_state.day17_table_name}"
                 st.rerun()
                 
@@ -97,6 +131,199 @@ with st.container(border=True):
             st.error(f"리뷰 로드 중 오류 발생: {str(e)}")
             st.info(":material/lightbulb: Day 16에서 리뷰 파일을 먼저 업로드했는지 확인하세요!")
 
+# 스트리밍 청킹: 전체 테이블을 세션에 담지 않고 묶음 단위로 로드 -> 청킹 -> 저장
+with st.container(border=True):
+    st.subheader(":material/stream: 스트리밍 청킹 (Stream: Load → Chunk → Save)")
+    st.caption("리뷰를 to_pandas_batches()로 묶음 단위로 받아 묶음마다 청킹하고 바로 저장한 뒤 버립니다. "
+               "세션에는 집계와 미리보기만 남으므로 리뷰가 100개든 1,000,000개든 최대 메모리가 같습니다. "
+               "위의 로드 조건(변경된 문서만 등)을 그대로 사용합니다.")
+    
+    stream_source_table = f"{st.session_state.day17_database}.{st.session_state.day17_schema}.{st.session_state.day17_table_name}"
+    stream_chunk_table = f"{st.session_state.day17_database}.{st.session_state.day17_schema}.{st.session_state.day17_chunk_table}"
+    
+    stream_modes = {
+        "Keep each review as a single chunk": "keep",
+        "Chunk reviews longer than threshold (words)": "words",
+        "Chunk by tokens at sentence boundaries (Token-aware)": "tokens"
+    }
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        stream_mode = stream_modes[st.selectbox("청킹 전략 (Strategy)", list(stream_modes), key="day17_stream_mode")]
+    with col2:
+        stream_size = st.number_input("크기 (Size)", min_value=1,
+                                      value=DEFAULT_TARGET_TOKENS if stream_mode == "tokens" else 200,
+                                      help="words: 청크당 단어 수 / tokens: 청크당 목표 토큰 수",
+                                      key=f"day17_stream_size_{stream_mode}", disabled=stream_mode == "keep")
+    with col3:
+        stream_overlap = st.number_input("오버랩 (Overlap)", min_value=0,
+                                         value=DEFAULT_OVERLAP_TOKENS if stream_mode == "tokens" else 50,
+                                         key=f"day17_stream_overlap_{stream_mode}", disabled=stream_mode == "keep")
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        stream_write_mode = st.radio("저장 방식 (Write Mode)", ["incremental", "append", "replace"],
+                                     format_func={"incremental": "증분 (Incremental)", "append": "추가 (Append)",
+                                                  "replace": "교체 (Replace)"}.get,
+                                     horizontal=True, key="day17_stream_write_mode")
+    with col2:
+        stream_tokenizer = st.selectbox("토크나이저 (Tokenizer)", available_tokenizers(), key="day17_stream_tokenizer")
+    with col3:
+        stream_batch_rows = st.number_input("묶음당 리뷰 수 (Batch Rows)", min_value=100, value=DEFAULT_BATCH_ROWS,
+                                            step=1000, key="day17_stream_batch_rows",
+                                            help="한 번에 메모리에 올리는 리뷰 수 (최대 메모리를 정함)")
+    st.caption(f":material/arrow_forward: `{stream_source_table}` → `{stream_chunk_table}`")
+    if stream_write_mode == "replace":
+        st.warning("**교체 모드 활성**: 청크 테이블을 비우고 위의 로드 조건과 관계없이 모든 리뷰를 다시 청킹합니다.")
+    
+    if st.button(":material/stream: 스트리밍 청킹 실행 (Run Streamed Chunking)", use_container_width=True):
+        try:
+            with st.status("묶음 단위로 청킹 중...", expanded=True) as status:
+                ensure_chunk_table(session, stream_chunk_table)
+                if stream_write_mode == "replace":
+                    # 테이블 전체를 지우므로 일부 문서만 다시 청킹하면 나머지 청크가 사라짐 -> 항상 전체 로드
+                    session.sql(f"TRUNCATE TABLE {stream_chunk_table}").collect()
+                    conditions, params = [], []
+                else:
+                    conditions, params = load_filters(stream_source_table, only_new_docs, only_changed_docs)
+                # 대상 수는 TRUNCATE 이후에 세어야 실제로 읽을 리뷰 수와 같음
+                where = " AND ".join(conditions) if conditions else "TRUE"
+                total_docs = session.sql(f"SELECT COUNT(*) FROM {stream_source_table} WHERE {where}",
+                                         params=params or None).collect()[0][0]
+                st.write(f":material/database: 대상 리뷰 {total_docs:,}개 ({stream_batch_rows:,}개씩)")
+                
+                write = chunk_writer(session, stream_write_mode, st.session_state.day17_chunk_table,
+                                     st.session_state.day17_database, st.session_state.day17_schema,
+                                     stream_source_table)
+                
+                stream_progress = ThrottledProgress(st.progress(0), caption=st.empty())
+                summary = stream_chunks(
+                    review_batches(session, review_query(stream_source_table, conditions), params, stream_batch_rows),
+                    lambda batch: chunk_reviews(batch, stream_mode, stream_size, stream_overlap, stream_tokenizer),
+                    write,
+                    on_batch=lambda s: stream_progress.update(
+                        s['documents'] / max(total_docs, 1),
+                        caption=f"{total_docs:,}개 중 {s['documents']:,}개 리뷰 → {s['chunks']:,}개 청크 "
+                                f"(묶음 {s['batches']}, {s['documents'] / max(s['seconds'], 1e-6):,.0f} docs/sec)")
+                )
+                stream_progress.flush()
+                
+                if stream_write_mode == "incremental":
+                    st.write(f":material/merge: 새 청크 {summary['inserted']:,}, 변경 {summary['rechunked']:,}, "
+                             f"유지 {summary['unchanged']:,}, 삭제 {summary['deleted']:,}")
+                if summary['failed']:
+                    st.write(f":material/warning: {len(summary['failed'])}개 청크 로드 실패: {summary['failed'][0]['error']}")
+                st.write(f":material/speed: {summary['seconds']:.2f}초 "
+                         f"({summary['documents'] / max(summary['seconds'], 1e-6):,.0f} docs/sec, 최대 묶음 {summary['max_batch_rows']:,}행)")
+                status.update(label=":material/check_circle: 스트리밍 청킹 완료!", state="complete", expanded=False)
+            
+            # 전체 데이터 대신 집계와 미리보기만 세션에 보관
+            st.session_state.day17_stream_summary = {k: v for k, v in summary.items() if k != 'failed'}
+            st.session_state.chunks_table = stream_chunk_table
+            st.session_state.chunks_database = st.session_state.day17_database
+            st.session_state.chunks_schema = st.session_state.day17_schema
+            st.session_state.chunk_table_saved = True
+            table_stats.clear()
+        except Exception as e:
+            st.error(f"스트리밍 청킹 중 오류 발생: {str(e)}")
+    
+    if 'day17_stream_summary' in st.session_state:
+        summary = st.session_state.day17_stream_summary
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Reviews", f"{summary['documents']:,}")
+        with col2:
+            st.metric("Chunks Saved", f"{summary['loaded']:,}")
+        with col3:
+            st.metric("Split Reviews", f"{summary['split_reviews']:,}")
+        with col4:
+            st.metric("Max Tokens", f"{summary['max_tokens']:,}")
+        with st.expander(f":material/description: 청크 미리보기 (처음 {len(summary['preview'])}개)"):
+            st.dataframe(summary['preview'][['file_name', 'chunk_index', 'chunk_size', 'token_count', 'chunk_type', 'chunk_text']],
+                         use_container_width=True)
+
+# 서버 측 청킹: 문서를 앱으로 가져오지 않고 웨어하우스에서 청크 테이블을 바로 채움
+with st.container(border=True):
+    st.subheader(":material/cloud_sync: 웨어하우스에서 청킹 (Chunk in Warehouse)")
+    st.caption("리뷰 로드 없이 Python UDTF로 한 번의 INSERT ... SELECT를 실행합니다. "
+               "클라이언트 청킹과 같은 코드로 같은 청크를 만들며, 문서와 청크 텍스트가 네트워크를 오가지 않습니다.")
+    
+    source_table = f"{st.session_state.day17_database}.{st.session_state.day17_schema}.{st.session_state.day17_table_name}"
+    server_chunk_table = f"{st.session_state.day17_database}.{st.session_state.day17_schema}.{st.session_state.day17_chunk_table}"
+    
+    server_modes = {
+        "Keep each review as a single chunk": "keep",
+        "Chunk reviews longer than threshold (words)": "words",
+        "Chunk by tokens at sentence boundaries (Token-aware)": "tokens"
+    }
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        server_mode = server_modes[st.selectbox("청킹 전략 (Strategy)", list(server_modes), index=1,
+                                                key="day17_server_mode")]
+    with col2:
+        server_size = st.number_input("크기 (Size)", min_value=1,
+                                      value=DEFAULT_TARGET_TOKENS if server_mode == "tokens" else 200,
+                                      help="words: 청크당 단어 수 / tokens: 청크당 목표 토큰 수",
+                                      key=f"day17_server_size_{server_mode}", disabled=server_mode == "keep")
+    with col3:
+        server_overlap = st.number_input("오버랩 (Overlap)", min_value=0,
+                                         value=DEFAULT_OVERLAP_TOKENS if server_mode == "tokens" else 50,
+                                         key=f"day17_server_overlap_{server_mode}", disabled=server_mode == "keep")
+    server_write_modes = {
+        "증분 (Incremental) - 새 문서/바뀐 문서만 다시 청킹": "incremental",
+        "추가 (Append)": "append",
+        "교체 (Replace)": "replace"
+    }
+    server_write_mode = server_write_modes[st.radio("저장 방식 (Write Mode)", list(server_write_modes),
+                                                    key="day17_server_write_mode")]
+    st.caption(f":material/arrow_forward: `{source_table}` → `{server_chunk_table}` "
+               f"(토크나이저: estimate, 최대 {max_content_tokens(DEFAULT_EMBED_MODEL)}토큰)")
+    if server_write_mode == "replace":
+        st.warning("**교체 모드 활성**: 청크 테이블을 비우고 위의 로드 조건과 관계없이 모든 문서를 다시 청킹합니다.")
+    
+    if st.button(":material/cloud_sync: 웨어하우스에서 청킹 (Chunk in Warehouse)", use_container_width=True):
+        try:
+            with st.status("웨어하우스에서 청킹 중...", expanded=True) as status:
+                start_time = time.perf_counter()
+                st.write(":material/upload: 청킹 UDTF 등록 중...")
+                register_chunker(session, server_chunk_table)
+                ensure_chunk_table(session, server_chunk_table)
+                if server_write_mode == "replace":
+                    session.sql(f"TRUNCATE TABLE {server_chunk_table}").collect()
+                
+                server_max_tokens = max_content_tokens(DEFAULT_EMBED_MODEL)
+                server_config = chunk_config(server_mode, server_size, server_overlap, DEFAULT_TOKENIZER,
+                                             server_max_tokens)
+                if server_write_mode == "incremental":
+                    st.write(":material/difference: 바뀐 문서만 청킹 후 MERGE 실행 중...")
+                    sync = sync_in_warehouse(session, source_table, server_chunk_table, mode=server_mode,
+                                             size=server_size, overlap=server_overlap,
+                                             max_tokens=server_max_tokens, config=server_config)
+                    inserted = sync['inserted'] + sync['rechunked']
+                    st.write(f":material/info: 문서 {sync['documents']:,}개 다시 청킹 - 새 청크 {sync['inserted']:,}개, "
+                             f"변경 {sync['rechunked']:,}개, 유지 {sync['unchanged']:,}개, 삭제 {sync['deleted']:,}개")
+                else:
+                    st.write(":material/bolt: INSERT ... SELECT 실행 중...")
+                    only_new = only_new_docs and server_write_mode != "replace"  # 교체는 비운 테이블을 전체 문서로 채움
+                    inserted = chunk_in_warehouse(
+                        session, source_table, server_chunk_table, mode=server_mode,
+                        size=server_size, overlap=server_overlap, max_tokens=server_max_tokens,
+                        config=server_config,
+                        where="d.UPLOAD_TIMESTAMP >= ?" if only_new else None,
+                        params=[st.session_state.rag_ingest_watermark] if only_new else None
+                    )
+                elapsed = time.perf_counter() - start_time
+                st.write(f":material/check_circle: {inserted:,}개의 청크 생성 ({elapsed:.2f}초)")
+                status.update(label=":material/check_circle: 청킹 완료!", state="complete", expanded=False)
+            
+            # Day 18을 위해 저장
+            st.session_state.chunks_table = server_chunk_table
+            st.session_state.chunks_database = st.session_state.day17_database
+            st.session_state.chunks_schema = st.session_state.day17_schema
+            st.session_state.chunk_table_saved = True
+            table_stats.clear()
+            st.success(f":material/check_circle: `{server_chunk_table}`에 {inserted:,}개의 청크를 저장했습니다")
+        except Exception as e:
+            st.error(f"웨어하우스 청킹 중 오류 발생: {str(e)}")
+
 # 메인 콘텐츠 - 리뷰 요약
 if 'loaded_data' in st.session_state:
     with st.container(border=True):
@@ -113,9 +340,9 @@ if 'loaded_data' in st.session_state:
         with col3:
             st.metric("Avg Words/Review", f"{df['WORD_COUNT'].mean():.0f}")
             
-        # 리뷰 요약 표시
-        st.dataframe(df[['DOC_ID', 'FILE_NAME', 'FILE_TYPE', 'UPLOAD_TIMESTAMP', 'WORD_COUNT']], 
-                    use_container_width=True)
+        # 리뷰 요약 표시 (한 페이지씩)
+        paginated_rows(df, ['DOC_ID', 'FILE_NAME', 'FILE_TYPE', 'UPLOAD_TIMESTAMP', 'WORD_COUNT'],
+                       state_key="day17_loaded_grid")
                 
     # 처리 옵션
     with st.container(border=True):
@@ -124,18 +351,25 @@ if 'loaded_data' in st.session_state:
         st.info("""
         **고객 리뷰 처리 옵션:**
         
-        고객 리뷰는 일반적으로 짧으므로(각각 약 150단어), 두 가지 옵션이 있습니다:
+        고객 리뷰는 일반적으로 짧으므로(각각 약 150단어), 세 가지 옵션이 있습니다:
         - **옵션 1**: 각 리뷰를 그대로 사용 (리뷰에 권장됨)
         - **옵션 2**: 긴 리뷰를 청크로 분할 (200단어 이상의 리뷰용)
+        - **옵션 3**: 문장 경계와 토큰 수로 분할 (한국어처럼 단어 수와 토큰 수가 크게 다른 텍스트용)
         """)
         
         processing_option = st.radio(
             "처리 전략 선택:",
             ["Keep each review as a single chunk (Recommended)", 
-             "Chunk reviews longer than threshold"],
+             "Chunk reviews longer than threshold",
+             "Chunk by tokens at sentence boundaries (Token-aware)"],
             index=0
         )
         
+        # 임베딩 모델의 최대 토큰 수 (넘는 부분은 임베딩 시 경고 없이 잘림)
+        tokenizer_names = available_tokenizers()
+        tokenizer_name = DEFAULT_TOKENIZER
+        embed_model = DEFAULT_EMBED_MODEL
+        
         # 청크 크기 제어 추가 (청킹 옵션 선택 시에만 표시)
         if "Chunk reviews" in processing_option:
             col1, col2 = st.columns(2)
@@ -158,96 +392,72 @@ if 'loaded_data' in st.session_state:
                     help="청크 간 중복되는 단어 수"
                 )
             st.caption(f"{chunk_size}단어보다 긴 리뷰는 {overlap}단어의 오버랩을 두고 {chunk_size}단어 단위의 청크로 분할됩니다.")
+        elif "Token-aware" in processing_option:
+            col1, col2 = st.columns(2)
+            with col1:
+                embed_model = st.selectbox("임베딩 모델 (Embed Model)", list(EMBED_MODEL_LIMITS),
+                                           help="청크 최대 토큰 수를 정하는 모델 (Day 18에서 사용하는 모델)")
+            with col2:
+                tokenizer_name = st.selectbox("토크나이저 (Tokenizer)", tokenizer_names,
+                                              help="estimate: 의존성 없는 보수적 근사 / arctic-embed-m: tokenizers 패키지 필요")
+            max_tokens = max_content_tokens(embed_model)
+            col1, col2 = st.columns(2)
+            with col1:
+                target_tokens = st.slider(
+                    "목표 청크 크기 (tokens):",
+                    min_value=64,
+                    max_value=max_tokens,
+                    value=min(DEFAULT_TARGET_TOKENS, max_tokens),
+                    step=2,
+                    help="문장을 이 토큰 수까지 채워 하나의 청크로 만듭니다"
+                )
+            with col2:
+                overlap_tokens = st.slider(
+                    "오버랩 (tokens):",
+                    min_value=0,
+                    max_value=128,
+                    value=DEFAULT_OVERLAP_TOKENS,
+                    step=8,
+                    help="다음 청크 앞에 반복할 마지막 문장들의 최대 토큰 수"
+                )
+            st.caption(f"어떤 청크도 {max_tokens}토큰(특수 토큰 {EMBED_MODEL_LIMITS[embed_model] - max_tokens}개 제외)을 넘지 않습니다. "
+                       "너무 긴 문장은 단어 단위로 나눕니다.")
+            chunk_size = 200
+            overlap = 50
         else:
             # 청킹하지 않는 경우 기본값
             chunk_size = 200
             overlap = 50
         
         if st.button(":material/flash_on: 리뷰 처리 (Process Reviews)", type="primary", use_container_width=True):
-            chunks = []
-            
             with st.status("리뷰 처리 중...", expanded=True) as status:
+                start_time = time.perf_counter()
                 if "Keep each review" in processing_option:
-                    # 옵션 1: 리뷰 1개 = 청크 1개
+                    # 옵션 1: 리뷰 1개 = 청크 1개 (행 단위 반복 없이 컬럼을 그대로 사용)
                     st.write(":material/edit_note: 리뷰당 하나의 청크 생성 중...")
-                    
-                    for idx, row in df.iterrows():
-                        chunks.append({
-                            'doc_id': row['DOC_ID'],
-                            'file_name': row['FILE_NAME'],
-                            'chunk_id': idx + 1,
-                            'chunk_text': row['EXTRACTED_TEXT'],
-                            'chunk_size': row['WORD_COUNT'],
-                            'chunk_type': 'full_review'
-                        })
-                    
+                    chunks = chunk_reviews(df, "keep", tokenizer=tokenizer_name)
                     st.write(f":material/check_circle: {len(chunks)}개의 청크 생성 완료 (리뷰당 1개)")
                     
+                elif "Token-aware" in processing_option:
+                    # 옵션 3: 문장 경계 + 토큰 예산 (모델 최대 토큰 수를 넘는 청크 없음)
+                    st.write(f":material/edit_note: 문장을 {target_tokens}토큰 단위로 묶는 중 ({tokenizer_name})...")
+                    chunks = chunk_reviews(df, "tokens", target_tokens, overlap_tokens, tokenizer_name, embed_model)
+                    st.write(f":material/check_circle: {len(df)}개의 리뷰에서 {len(chunks)}개의 청크 생성 완료")
+                    
                 else:
-                    # 옵션 2: 긴 리뷰 분할
+                    # 옵션 2: 긴 리뷰 분할 - 단어 경계 오프셋과 배열 연산으로 윈도우를 계산하고 원본 문자열을 잘라 청크 생성
+                    # (문서가 많으면 chunk_documents가 워커 프로세스로 분산)
                     st.write(f":material/edit_note: {chunk_size}단어보다 긴 리뷰 분할 중...")
-                    chunk_id = 1
-                    
-                    for idx, row in df.iterrows():
-                        text = row['EXTRACTED_TEXT']
-                        words = text.split()
-                        
-                        if len(words) <= chunk_size:
-                            # 짧은 리뷰는 그대로 유지
-                            chunks.append({
-                                'doc_id': row['DOC_ID'],
-                                'file_name': row['FILE_NAME'],
-                                'chunk_id': chunk_id,
-                                'chunk_text': text,
-                                'chunk_size': len(words),
-                                'chunk_type': 'full_review'
-                            })
-                            chunk_id += 1
-                        else:
-                            # [실습] 긴 리뷰를 청크 사이즈와 오버랩을 고려하여 분할하세요.
-                            # 힌트: range(0, len(words), chunk_size - overlap)을 사용하세요.
-                            
-                            # 여기에 코드를 작성하세요 (아래 코드를 완성하세요)
-                            # for i in range(0, len(words), chunk_size - overlap):
-                            #     chunk_words = words[i:i + chunk_size]
-                            #     chunk_text = ' '.join(chunk_words)
-                            #     
-                            #     chunks.append({
-                            #         'doc_id': row['DOC_ID'],
-                            #         'file_name': row['FILE_NAME'],
-                            #         'chunk_id': chunk_id,
-                            #         'chunk_text': chunk_text,
-                            #         'chunk_size': len(chunk_words),
-                            #         'chunk_type': 'chunked_review'
-                            #     })
-                            #     chunk_id += 1
-                            
-                            # 실습을 위해 임시로 비워둡니다. 위 주석을 참고하여 채워보세요. 
-                            pass # 이 부분을 수정하여 루프를 구현하세요 (주석 해제)
-                            
-                            # [실습 정답용 코드 - 학생에게 제공하지 않음 / 실제 동작을 위해 아래 코드를 사용하지만, 학생 버전에서는 가려야 합니다]
-                            # 학생이 코드를 채우기 전에는 Split 기능이 동작하지 않습니다. 
-                            # 데모가 동작하게 하려면 아래 코드를 'active' 상태로 두거나, 아니면 학생이 무조건 채워야 합니다.
-                            # 여기서는 '작성용' 파일을 요청했으므로 pass만 남겨두고 주석처리합니다.
-                            # 하지만 앱의 기능이 마비되면 안되므로, 데모 시연시에는 "Keep each review" 옵션을 사용하라고 가이드하거나,
-                            # 아래 정답 코드를 주석으로 숨겨두되, 기본적으로는 동작하지 않게 합니다.
-                            
-                            # 원래 동작 코드 (현재는 주석처리됨, 학생이 작성해야 함):
-                            # for i in range(0, len(words), chunk_size - overlap):
-                            #    chunk_words = words[i:i + chunk_size]
-                            #    chunk_text = ' '.join(chunk_words)
-                            #    chunks.append({
-                            #        'doc_id': row['DOC_ID'],
-                            #        'file_name': row['FILE_NAME'],
-                            #        'chunk_id': chunk_id,
-                            #        'chunk_text': chunk_text,
-                            #        'chunk_size': len(chunk_words),
-                            #        'chunk_type': 'chunked_review'
-                            #    })
-                            #    chunk_id += 1
-                    
+                    chunks = chunk_reviews(df, "words", chunk_size, overlap, tokenizer_name)
                     st.write(f":material/check_circle: {len(df)}개의 리뷰에서 {len(chunks)}개의 청크 생성 완료")
                 
+                over_limit = int((chunks['token_count'] > max_content_tokens(embed_model)).sum())
+                if over_limit:
+                    st.write(f":material/warning: {over_limit}개의 청크가 {embed_model}의 최대 토큰 수를 넘어 임베딩 시 잘립니다 "
+                             "(토큰 기준 분할 옵션을 사용하세요)")
+                
+                elapsed = time.perf_counter() - start_time
+                st.write(f":material/speed: {elapsed:.2f}초 ({len(df) / max(elapsed, 1e-6):,.0f} docs/sec)")
                 status.update(label="처리 완료!", state="complete", expanded=False)
                     
             # 세션 상태에 청크 저장
@@ -263,21 +473,22 @@ if 'loaded_data' in st.session_state:
             
             chunks = st.session_state.review_chunks
             
-            col1, col2, col3 = st.columns(3)
+            col1, col2, col3, col4 = st.columns(4)
             with col1:
                 st.metric("Total Chunks", len(chunks))
             with col2:
-                full_reviews = len([c for c in chunks if c['chunk_type'] == 'full_review'])
+                full_reviews = int((chunks['chunk_type'] == 'full_review').sum())
                 st.metric("Full Reviews", full_reviews)
             with col3:
-                split_reviews = len([c for c in chunks if c['chunk_type'] == 'chunked_review'])
+                split_reviews = int((chunks['chunk_type'] == 'chunked_review').sum())
                 st.metric("Split Reviews", split_reviews)
+            with col4:
+                st.metric("Max Tokens", f"{chunks['token_count'].max():,}" if len(chunks) else "0")
             
             # 청크 표시
             with st.expander(":material/description: 청크 보기"):
-                chunks_df = pd.DataFrame(chunks)
-                st.dataframe(chunks_df[['chunk_id', 'file_name', 'chunk_size', 'chunk_type', 'chunk_text']], 
-                            use_container_width=True)
+                paginated_rows(chunks, ['chunk_id', 'file_name', 'chunk_size', 'token_count', 'chunk_type', 'chunk_text'],
+                               state_key="day17_chunk_preview_grid")
         
         # 4단계: Snowflake에 청크 저장
         with st.container(border=True):
@@ -317,47 +528,58 @@ if 'loaded_data' in st.session_state:
                 st.info(":material/inbox: **청크 테이블이 아직 없습니다** - 청크를 저장하면 생성됩니다.")
                 chunk_table_exists = False
             
-            # 테이블 상태에 따라 체크박스 상태 초기화 또는 업데이트
-            # 체크박스가 현재 테이블 상태를 반영하도록 함
-            if 'day17_replace_mode' not in st.session_state:
-                # 처음 - 테이블 존재 여부에 따라 초기화
-                st.session_state.day17_replace_mode = chunk_table_exists
-            else:
-                # 테이블 이름이 변경되었는지 확인 - 변경되었다면 새 테이블 상태에 따라 재설정
-                if 'day17_last_chunk_table' not in st.session_state or st.session_state.day17_last_chunk_table != full_chunk_table:
-                    st.session_state.day17_replace_mode = chunk_table_exists
-                    st.session_state.day17_last_chunk_table = full_chunk_table
+            # 테이블 이름이 바뀌면 저장 모드를 새 테이블 상태에 맞게 다시 정함
+            if st.session_state.get('day17_last_chunk_table') != full_chunk_table:
+                st.session_state.pop('day17_write_mode', None)
+                st.session_state.day17_last_chunk_table = full_chunk_table
             
-            # 교체 모드 체크박스
-            replace_mode = st.checkbox(
-                f":material/sync: `{st.session_state.day17_chunk_table}` 테이블 교체 모드 (Replace Table Mode)",
-                help=f"활성화하면 새 청크를 저장하기 전에 {full_chunk_table}의 모든 기존 데이터를 지웁니다.",
-                key="day17_replace_mode"
+            # 저장 모드: 청크가 있는 테이블이면 증분, 없으면 추가가 기본값
+            write_mode = st.radio(
+                f":material/sync: `{st.session_state.day17_chunk_table}` 저장 모드 (Write Mode)",
+                ["incremental", "append", "replace"],
+                format_func={
+                    "incremental": "증분 (Incremental)",
+                    "append": "추가 (Append)",
+                    "replace": "교체 (Replace)"
+                }.get,
+                index=0 if chunk_table_exists else 1,
+                horizontal=True,
+                help="증분: 처리한 문서의 청크만 (DOC_ID, 청크 순서)로 병합하고, 남는 청크와 사라진 문서의 청크를 삭제합니다. "
+                     "텍스트가 같은 청크는 CHUNK_ID가 유지되어 Day 18 임베딩을 다시 만들지 않습니다.",
+                key="day17_write_mode"
             )
+            replace_mode = write_mode == "replace"
+            
+            # 일괄 로드 설정
+            with st.expander(":material/tune: 일괄 로드 설정 (Bulk Load Settings)"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    load_chunk_size = st.number_input("파일당 행 수 (Chunk Size)", min_value=100, value=DEFAULT_CHUNK_SIZE, step=1000,
+                                                      help="스테이지에 업로드하는 Parquet 파일당 행 수", key="day17_load_chunk_size")
+                with col2:
+                    load_parallel = st.number_input("업로드 병렬도 (Parallel)", min_value=1, max_value=99, value=DEFAULT_PARALLEL,
+                                                    help="스테이지 업로드에 사용할 스레드 수", key="day17_load_parallel")
             
-            if replace_mode:
+            # 교체 모드는 테이블 전체를 지우므로, 일부 문서만 로드한 상태에서 저장하면 나머지 문서의 청크가 사라짐
+            partial_replace = replace_mode and st.session_state.get('day17_loaded_filtered', False)
+            if partial_replace:
+                st.error("**교체 모드를 사용할 수 없습니다**: 변경된 문서만 로드했으므로 교체하면 나머지 문서의 청크가 삭제됩니다. "
+                         "위의 로드 조건을 해제하고 전체 리뷰를 다시 로드하거나, 증분 모드로 저장하세요.")
+            elif replace_mode:
                 st.warning("**교체 모드 활성**: 새 청크를 저장하기 전에 기존 청크가 삭제됩니다.")
+            elif write_mode == "incremental":
+                st.success("**증분 모드 활성**: 처리한 문서의 청크만 병합되고, 다른 문서의 청크는 그대로 유지됩니다.")
             else:
                 st.success("**추가 모드 활성**: 새 청크가 기존 데이터에 추가됩니다.")
             
             # 테이블에 청크 저장
-            if st.button(":material/save: Snowflake에 청크 저장 (Save Chunks to Snowflake)", type="primary", use_container_width=True):
+            if st.button(":material/save: Snowflake에 청크 저장 (Save Chunks to Snowflake)", type="primary", use_container_width=True,
+                         disabled=partial_replace):
                 try:
                     with st.status("Snowflake에 청크 저장 중...", expanded=True) as status:
                         # 1단계: 테이블이 없으면 생성
                         st.write(":material/looks_one: 테이블 확인 중...")
-                        create_table_sql = f"""
-                        CREATE TABLE IF NOT EXISTS {full_chunk_table} (
-                            CHUNK_ID NUMBER,
-                            DOC_ID NUMBER,
-                            FILE_NAME VARCHAR,
-                            CHUNK_TEXT VARCHAR,
-                            CHUNK_SIZE NUMBER,
-                            CHUNK_TYPE VARCHAR,
-                            CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
-                        )
-                        """
-                        session.sql(create_table_sql).collect()
+                        ensure_chunk_table(session, full_chunk_table)
                         
                         # 2단계: 교체 모드 - 기존 청크 삭제
                         if replace_mode:
@@ -369,40 +591,55 @@ if 'loaded_data' in st.session_state:
                                 st.write(f"   :material/warning: 지울 기존 청크 없음")
                         
                         # 3단계: 청크 삽입
-                        st.write(f":material/looks_3: {len(chunks)}개의 청크 삽입 중...")
-                        chunks_df = pd.DataFrame(chunks)
+                        st.write(f":material/looks_3: {len(chunks)}개의 청크 {'병합' if write_mode == 'incremental' else '삽입'} 중...")
                         
-                        # Snowflake 테이블과 일치하도록 컬럼명을 대문자로 변경
-                        chunks_df_upper = chunks_df[['chunk_id', 'doc_id', 'file_name', 'chunk_text', 
-                                                       'chunk_size', 'chunk_type']].copy()
-                        chunks_df_upper.columns = ['CHUNK_ID', 'DOC_ID', 'FILE_NAME', 'CHUNK_TEXT', 
-                                                   'CHUNK_SIZE', 'CHUNK_TYPE']
+                        # Snowflake 테이블과 일치하도록 컬럼명을 대문자로 변경 (타임스탬프는 문자열로 올려 NTZ로 변환)
+                        chunks_df_upper = chunk_rows(chunks)
                         
-                        if replace_mode:
-                            # 교체 모드에서는 overwrite 사용 (이미 truncate했지만)
-                            session.write_pandas(chunks_df_upper,
-                                               table_name=st.session_state.day17_chunk_table,
-                                               database=st.session_state.day17_database,
-                                               schema=st.session_state.day17_schema,
-                                               overwrite=True)
+                        if write_mode == "incremental":
+                            # 스테이징에 일괄 로드한 뒤 삭제 + MERGE로 반영
+                            sync_result = sync_chunks(
+                                session, chunks_df_upper,
+                                table_name=st.session_state.day17_chunk_table,
+                                database=st.session_state.day17_database,
+                                schema=st.session_state.day17_schema,
+                                source_table=st.session_state.source_table,
+                                chunk_size=load_chunk_size,
+                                parallel=load_parallel
+                            )
+                            load_failures = sync_result['failed']
+                            loaded_count = len(chunks_df_upper) - len(load_failures)
+                            st.write(f"   :material/merge: 문서 {sync_result['documents']:,}개: 새 청크 {sync_result['inserted']:,}, "
+                                     f"변경 {sync_result['rechunked']:,}, 유지 {sync_result['unchanged']:,}, 삭제 {sync_result['deleted']:,}")
                         else:
-                            # 추가 모드
-                            session.write_pandas(chunks_df_upper,
-                                               table_name=st.session_state.day17_chunk_table,
-                                               database=st.session_state.day17_database,
-                                               schema=st.session_state.day17_schema,
-                                               overwrite=False)
+                            # 한 번의 stage + COPY INTO로 일괄 로드 (교체 모드에서는 overwrite 사용, 이미 truncate했지만)
+                            chunk_progress = ThrottledProgress(st.progress(0))
+                            load_results = bulk_load(
+                                session, chunks_df_upper,
+                                table_name=st.session_state.day17_chunk_table,
+                                database=st.session_state.day17_database,
+                                schema=st.session_state.day17_schema,
+                                chunk_size=load_chunk_size,
+                                parallel=load_parallel,
+                                overwrite=replace_mode,
+                                on_chunk=lambda loaded, total: chunk_progress.update(loaded / total)
+                            )
+                            load_failures = failed_rows(load_results)
+                            loaded_count = len(load_results) - len(load_failures)
+                        if load_failures:
+                            st.write(f"   :material/warning: {len(load_failures)}개 청크 로드 실패: {load_failures[0]['error']}")
                         
                         status.update(label=":material/check_circle: 청크 저장됨!", state="complete", expanded=False)
                     
-                    mode_msg = "교체되었습니다" if replace_mode else "저장되었습니다"
-                    st.success(f":material/check_circle: `{full_chunk_table}`에 성공적으로 {mode_msg}\n\n:material/description: 현재 테이블에 {len(chunks)}개의 청크가 있습니다")
+                    mode_msg = {"replace": "교체되었습니다", "incremental": "병합되었습니다"}.get(write_mode, "저장되었습니다")
+                    st.success(f":material/check_circle: `{full_chunk_table}`에 성공적으로 {mode_msg}\n\n:material/description: {loaded_count}개의 청크가 로드되었습니다")
                     
                     # Day 18을 위해 저장
                     st.session_state.chunks_table = full_chunk_table
                     st.session_state.chunks_database = st.session_state.day17_database
                     st.session_state.chunks_schema = st.session_state.day17_schema
                     st.session_state.chunk_table_saved = True
+                    table_stats.clear()  # 뷰어의 캐시된 행 수/집계 갱신
                     
                     st.balloons()
                     
@@ -420,81 +657,45 @@ with st.container(border=True):
     query_button = st.button(":material/analytics: 청크 테이블 조회 (Query Chunk Table)", type="secondary", use_container_width=True)
     
     if query_button:
+        # 첫 페이지부터 다시 조회하고 캐시된 행 수/집계 비우기
+        reset_grid("day17_chunks_grid")
+        st.session_state.queried_chunks_table = full_chunk_table
+        st.rerun()
+    
+    # 조회한 테이블이면 한 페이지씩 표시
+    if st.session_state.get('queried_chunks_table') == full_chunk_table:
         try:
-            query_sql = f"""
-            SELECT 
-                CHUNK_ID,
-                FILE_NAME,
-                CHUNK_SIZE,
-                CHUNK_TYPE,
-                LEFT(CHUNK_TEXT, 100) AS TEXT_PREVIEW,
-                CREATED_TIMESTAMP
-            FROM {full_chunk_table}
-            ORDER BY CHUNK_ID
-            """
-            chunks_df = session.sql(query_sql).to_pandas()
+            stats = table_stats(session, full_chunk_table, (
+                ("FULL_REVIEWS", "COUNT_IF(CHUNK_TYPE = 'full_review')"),
+                ("SPLIT_REVIEWS", "COUNT_IF(CHUNK_TYPE = 'chunked_review')")
+            ))
             
-            # 지속성을 위해 세션 상태에 저장
-            st.session_state.queried_chunks = chunks_df
-            st.session_state.queried_chunks_table = full_chunk_table
-            st.rerun()
+            if stats['ROW_COUNT'] > 0:
+                st.code(full_chunk_table, language="sql")
+                
+                # 요약 메트릭
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Total Chunks", f"{stats['ROW_COUNT']:,}")
+                with col2:
+                    st.metric("Full Reviews", f"{stats['FULL_REVIEWS']:,}")
+                with col3:
+                    st.metric("Split Reviews", f"{stats['SPLIT_REVIEWS']:,}")
                 
+                # 테이블 표시: 미리보기 100자만 조회, 전체 텍스트는 선택한 청크만 로드
+                paginated_table(
+                    session, full_chunk_table,
+                    columns=["CHUNK_ID", "FILE_NAME", "CHUNK_SIZE", "CHUNK_TYPE", "LEFT(CHUNK_TEXT, 100) AS TEXT_PREVIEW"],
+                    key_column="CHUNK_ID",
+                    state_key="day17_chunks_grid",
+                    detail_column="CHUNK_TEXT",
+                    label_column="FILE_NAME",
+                    total=stats['ROW_COUNT']
+                )
+            else:
+                st.info(":material/inbox: 테이블에 청크가 없습니다.")
         except Exception as e:
             st.error(f"청크 조회 중 오류 발생: {str(e)}")
-    
-    # 세션 상태에 결과가 있으면 표시
-    if 'queried_chunks' in st.session_state and st.session_state.get('queried_chunks_table') == full_chunk_table:
-        chunks_df = st.session_state.queried_chunks
-        
-        if len(chunks_df) > 0:
-            st.code(full_chunk_table, language="sql")
-            
-            # 요약 메트릭
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total Chunks", len(chunks_df))
-            with col2:
-                full_count = len(chunks_df[chunks_df['CHUNK_TYPE'] == 'full_review'])
-                st.metric("Full Reviews", full_count)
-            with col3:
-                split_count = len(chunks_df[chunks_df['CHUNK_TYPE'] == 'chunked_review'])
-                st.metric("Split Reviews", split_count)
-            
-            # 테이블 표시
-            st.dataframe(
-                chunks_df[['CHUNK_ID', 'FILE_NAME', 'CHUNK_SIZE', 'CHUNK_TYPE', 'TEXT_PREVIEW']],
-                use_container_width=True
-            )
-            
-            # 청크 전체 텍스트 보기 옵션
-            with st.expander(":material/menu_book: 청크 전체 텍스트 보기"):
-                chunk_id = st.selectbox(
-                    "청크 ID 선택:",
-                    options=chunks_df['CHUNK_ID'].tolist(),
-                    format_func=lambda x: f"Chunk #{x} - {chunks_df[chunks_df['CHUNK_ID']==x]['FILE_NAME'].values[0]}",
-                    key="chunk_text_selector"
-                )
-                
-                if st.button("청크 텍스트 로드 (Load Chunk Text)", key="load_chunk_text_btn"):
-                    # 선택 사항 세션 상태에 저장
-                    st.session_state.selected_chunk_id = chunk_id
-                    st.session_state.load_chunk_text = True
-                    st.rerun()
-                
-                # 로드된 경우 청크 텍스트 표시
-                if st.session_state.get('load_chunk_text') and st.session_state.get('selected_chunk_id'):
-                    text_sql = f"SELECT CHUNK_TEXT, FILE_NAME FROM {full_chunk_table} WHERE CHUNK_ID = {st.session_state.selected_chunk_id}"
-                    text_result = session.sql(text_sql).to_pandas()
-                    if len(text_result) > 0:
-                        chunk = text_result.iloc[0]
-                        st.text_area(
-                            chunk['FILE_NAME'],
-                            value=chunk['CHUNK_TEXT'],
-                            height=300,
-                            key=f"chunk_text_display_{st.session_state.selected_chunk_id}"
-                        )
-        else:
-            st.info(":material/inbox: 테이블에 청크가 없습니다.")
     else:
         st.info(":material/inbox: 아직 조회된 청크가 없습니다. 저장된 청크를 보려면 '청크 테이블 조회 (Query Chunk Table)'를 클릭하세요.")
 
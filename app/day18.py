@@ -5,6 +5,15 @@ import streamlit as st
 from snowflake.cortex import embed_text_768
 import pandas as pd
 import numpy as np
+import time
+from data_grid import paginated_table, table_stats, reset_grid
+from stream_utils import ThrottledProgress
+from dedup import dedup_chunks, dedup_report, save_duplicate_map, DEFAULT_THRESHOLD, DEFAULT_MAP_TABLE
+from server_embedding import embed_in_warehouse, prune_orphan_embeddings, DEFAULT_SLICE_ROWS
+from vector_writer import write_vectors, embedding_matrix
+from embedding_cache import (EmbeddingCache, CacheStats, LocalEmbeddingStore, SnowflakeEmbeddingStore,
+                             DEFAULT_STORE_PATH, DEFAULT_CACHE_TABLE)
+from tokenization import DEFAULT_EMBED_MODEL
 
 st.title(":material/calculate: 고객 리뷰 임베딩 생성기 (Embeddings Generator)")
 st.write("의미 기반 검색(Semantic Search)을 가능하게 하기 위해 Day 17의 리뷰 청크에 대한 임베딩을 생성합니다.")
@@ -19,6 +28,15 @@ except:
     from snowflake.snowpark import Session
     session = Session.builder.configs(st.secrets["connections"]["snowflake"]).create()
 
+@st.cache_resource
+def get_embedding_cache(store_kind: str, _session, database: str, schema: str):
+    """세션 간에 공유되는 임베딩 캐시를 만듭니다 (메모리 LRU + 선택한 영구 저장소)."""
+    if store_kind == "local":
+        return EmbeddingCache(LocalEmbeddingStore(DEFAULT_STORE_PATH))
+    if store_kind == "snowflake":
+        return EmbeddingCache(SnowflakeEmbeddingStore(_session, DEFAULT_CACHE_TABLE, database, schema))
+    return EmbeddingCache()
+
 # 데이터베이스 구성을 위한 세션 상태 초기화
 if 'day18_database' not in st.session_state:
     # Day 17의 청크가 있는지 확인
@@ -34,6 +52,9 @@ if 'day18_database' not in st.session_state:
 if 'day18_embedding_table' not in st.session_state:
     st.session_state.day18_embedding_table = "REVIEW_EMBEDDINGS"
 
+if 'day18_duplicate_table' not in st.session_state:
+    st.session_state.day18_duplicate_table = DEFAULT_MAP_TABLE
+
 # 설명
 with st.expander(":material/library_books: 임베딩(Embeddings)이란?", expanded=True):
     st.markdown("""
@@ -84,12 +105,43 @@ with st.container(border=True):
     if 'chunks_data' in st.session_state:
         st.success(f":material/check_circle: **{len(st.session_state.chunks_data)}개의 청크**가 이미 로드되었습니다.")
     
+    # 이미 임베딩이 있는 청크는 건너뛰기 (증분 수집 후 새 청크만 임베딩)
+    only_missing = st.checkbox(
+        ":material/difference: 임베딩이 없는 청크만 (Only Chunks Without Embeddings)",
+        value=False,
+        help=f"{st.session_state.day18_embedding_table} 테이블에 CHUNK_ID가 없는 청크만 로드합니다."
+    )
+    
     # 청크 로드 버튼
     if st.button(":material/folder_open: 청크 로드 (Load Chunks)", type="primary", use_container_width=True):
         try:
             with st.status("청크 로딩 중...", expanded=True) as status:
                 st.write(":material/wifi: 데이터베이스 쿼리 중...")
                 
+                where_clause = ""
+                chunk_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_chunk_table}"
+                if only_missing:
+                    embedding_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_embedding_table}"
+                    try:
+                        session.sql(f"SELECT 1 FROM {embedding_table} LIMIT 1").collect()
+                        where_clause = f"WHERE NOT EXISTS (SELECT 1 FROM {embedding_table} e WHERE e.CHUNK_ID = c.CHUNK_ID)"
+                    except Exception:
+                        st.write(":material/info: 임베딩 테이블이 아직 없어 모든 청크를 로드합니다")
+                    else:
+                        # Day 17 증분 청킹에서 지워지거나 CHUNK_ID가 바뀐 청크의 임베딩 정리
+                        pruned = prune_orphan_embeddings(session, embedding_table, chunk_table)
+                        if pruned:
+                            st.write(f":material/delete_sweep: 청크가 없는 임베딩 {pruned:,}개 삭제")
+                    # 다른 청크의 중복으로 묶인 청크는 임베딩하지 않으므로 제외
+                    duplicate_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_duplicate_table}"
+                    try:
+                        session.sql(f"SELECT 1 FROM {duplicate_table} LIMIT 1").collect()
+                        where_clause += (" AND " if where_clause else "WHERE ") + (
+                            f"NOT EXISTS (SELECT 1 FROM {duplicate_table} m "
+                            f"WHERE m.CHUNK_ID = c.CHUNK_ID AND m.CANONICAL_CHUNK_ID <> m.CHUNK_ID)")
+                    except Exception:
+                        pass
+                
                 query = f"""
                 SELECT 
                     CHUNK_ID,
@@ -98,7 +150,8 @@ with st.container(border=True):
                     CHUNK_TEXT,
                     CHUNK_SIZE,
                     CHUNK_TYPE
-                FROM {st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_chunk_table}
+                FROM {chunk_table} c
+                {where_clause}
                 ORDER BY CHUNK_ID
                 """
                 df = session.sql(query).to_pandas()
@@ -106,14 +159,84 @@ with st.container(border=True):
                 st.write(f":material/check_circle: {len(df)}개의 청크 로드됨")
                 status.update(label="청크 로드 성공!", state="complete", expanded=False)
                 
-                # 세션 상태에 저장
+                # 세션 상태에 저장 (이전 중복 제거 결과는 새 청크와 맞지 않으므로 비움)
                 st.session_state.chunks_data = df
+                st.session_state.day18_loaded_filtered = bool(where_clause)
+                st.session_state.pop('day18_dedup', None)
                 st.rerun()
                 
         except Exception as e:
             st.error(f"청크 로드 중 오류 발생: {str(e)}")
             st.info(":material/lightbulb: Day 17에서 먼저 리뷰를 처리했는지 확인하세요!")
 
+# 서버 측 임베딩: 청크를 앱으로 가져오지 않고 INSERT ... SELECT EMBED_TEXT_768로 임베딩 테이블을 바로 채움
+with st.container(border=True):
+    st.subheader(":material/cloud_sync: 웨어하우스에서 임베딩 (Embed in Warehouse)")
+    st.caption("청크 로드 없이 INSERT INTO ... SELECT CHUNK_ID, SNOWFLAKE.CORTEX.EMBED_TEXT_768(...) FROM ... 로 "
+               "임베딩을 만듭니다. 청크당 두 번의 왕복(임베딩 호출 + INSERT) 대신 구간당 SQL 한 문장입니다.")
+    
+    server_chunk_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_chunk_table}"
+    server_embedding_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_embedding_table}"
+    server_duplicate_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_duplicate_table}"
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        server_replace = st.checkbox(
+            ":material/delete_sweep: 교체: 임베딩 테이블을 비우고 모두 다시 임베딩 (Replace)",
+            value=False, key="day18_server_replace",
+            help="기본값(해제)은 임베딩이 없는 청크만 임베딩하므로 중간에 멈춘 실행을 다시 눌러 이어서 처리할 수 있습니다."
+        )
+        server_skip_duplicates = st.checkbox(
+            f":material/filter_alt: 중복 청크 제외 (`{st.session_state.day18_duplicate_table}` 매핑 사용)",
+            value=True, key="day18_server_skip_duplicates"
+        )
+    with col2:
+        server_slice_rows = st.number_input("구간당 청크 수 (Slice Rows)", min_value=100, value=DEFAULT_SLICE_ROWS,
+                                            step=1000, key="day18_server_slice_rows",
+                                            help="INSERT 한 문장(한 번의 커밋)이 임베딩하는 청크 수. 구간마다 진행률을 갱신합니다.")
+    st.caption(f":material/arrow_forward: `{server_chunk_table}` → `{server_embedding_table}` ({DEFAULT_EMBED_MODEL})")
+    if server_replace:
+        st.warning(f"**교체 모드 활성**: `{server_embedding_table}`의 기존 임베딩이 모두 삭제된 뒤 모든 청크를 다시 임베딩합니다.")
+    
+    if st.button(":material/cloud_sync: 웨어하우스에서 임베딩 (Embed in Warehouse)", use_container_width=True):
+        try:
+            with st.status("웨어하우스에서 임베딩 중...", expanded=True) as status:
+                duplicate_table = None
+                if server_skip_duplicates:
+                    try:
+                        session.sql(f"SELECT 1 FROM {server_duplicate_table} LIMIT 1").collect()
+                        duplicate_table = server_duplicate_table
+                    except Exception:
+                        st.write(":material/info: 중복 매핑 테이블이 없어 모든 청크를 대상으로 합니다")
+                
+                server_progress = ThrottledProgress(st.progress(0), caption=st.empty())
+                result = embed_in_warehouse(
+                    session, server_chunk_table, server_embedding_table, model=DEFAULT_EMBED_MODEL,
+                    replace=server_replace, duplicate_table=duplicate_table, slice_rows=server_slice_rows,
+                    on_progress=lambda done, total, rows: server_progress.update(
+                        done / max(total, 1), caption=f"{total:,}개 중 {done:,}개 임베딩 완료 (테이블 {rows:,}행)")
+                )
+                server_progress.flush()
+                rate = result['embedded'] / max(result['seconds'], 1e-6)
+                if result['pruned']:
+                    st.write(f":material/delete_sweep: 청크가 없는 임베딩 {result['pruned']:,}개 삭제")
+                st.write(f":material/check_circle: {result['embedded']:,}개의 임베딩 생성 "
+                         f"({result['slices']}개 구간, {result['seconds']:.2f}초, {rate:,.1f} chunks/sec)")
+                if st.session_state.get('day18_seconds_per_embedding') and result['embedded']:
+                    row_rate = 1 / st.session_state.day18_seconds_per_embedding
+                    st.write(f":material/speed: 행 단위 경로 {row_rate:,.1f} chunks/sec 대비 {rate / row_rate:,.1f}배")
+                status.update(label=":material/check_circle: 임베딩 완료!", state="complete", expanded=False)
+            
+            # Day 19를 위해 저장
+            st.session_state.embeddings_table = server_embedding_table
+            st.session_state.embeddings_database = st.session_state.day18_database
+            st.session_state.embeddings_schema = st.session_state.day18_schema
+            table_stats.clear()
+            st.success(f":material/check_circle: `{server_embedding_table}`에 {result['rows']:,}개의 임베딩이 있습니다")
+        except Exception as e:
+            st.error(f"웨어하우스 임베딩 중 오류 발생: {str(e)}")
+            st.info(":material/lightbulb: 다시 실행하면 이미 저장된 구간은 건너뛰고 이어서 처리합니다.")
+
 # 메인 콘텐츠 - 청크 요약
 if 'chunks_data' in st.session_state:
     with st.container(border=True):
@@ -142,6 +265,70 @@ if 'chunks_data' in st.session_state:
         with st.expander(":material/description: 청크 미리보기"):
             st.dataframe(df.head(10), use_container_width=True)
     
+    # 중복 청크 제거 (임베딩 전)
+    with st.container(border=True):
+        st.subheader(":material/content_copy: 중복 청크 제거 (Near-duplicate Dedup)")
+        st.caption("MinHash 시그니처와 LSH로 거의 같은 청크를 묶어 그룹마다 대표 청크 하나만 임베딩합니다. "
+                   "모든 청크의 원본 파일은 중복 매핑 테이블에 남습니다.")
+        
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            dedup_threshold = st.slider("유사도 임계값 (Jaccard Threshold)", 0.5, 1.0, DEFAULT_THRESHOLD, 0.05,
+                                        help="문자 5-gram 집합의 추정 Jaccard 유사도가 이 값 이상이면 중복으로 묶습니다.")
+        with col2:
+            st.session_state.day18_duplicate_table = st.text_input(
+                "Duplicate Map Table",
+                value=st.session_state.day18_duplicate_table,
+                key="day18_duplicate_table_input"
+            )
+        
+        if st.button(":material/filter_alt: 중복 찾기 (Find Near-duplicates)", use_container_width=True):
+            try:
+                with st.status("중복 청크 찾는 중...", expanded=True) as status:
+                    start_time = time.perf_counter()
+                    unique_df, mapping = dedup_chunks(df, threshold=dedup_threshold)
+                    st.write(f":material/check_circle: MinHash + LSH: {len(df):,}개 청크 → {len(unique_df):,}개 "
+                             f"({time.perf_counter() - start_time:.2f}초)")
+                    
+                    st.write(":material/upload: 중복 매핑 저장 중...")
+                    map_table = save_duplicate_map(session, mapping, st.session_state.day18_duplicate_table,
+                                                   st.session_state.day18_database, st.session_state.day18_schema)
+                    status.update(label=":material/check_circle: 중복 제거 완료!", state="complete", expanded=False)
+                
+                st.session_state.day18_dedup = {'unique': unique_df, 'mapping': mapping,
+                                                'threshold': dedup_threshold, 'table': map_table}
+            except Exception as e:
+                st.error(f"중복 제거 중 오류 발생: {str(e)}")
+        
+        if 'day18_dedup' in st.session_state:
+            dedup = st.session_state.day18_dedup
+            report = dedup_report(dedup['mapping'], st.session_state.get('day18_seconds_per_embedding'))
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Unique Chunks", f"{report['unique']:,}", delta=f"-{report['duplicates']:,}", delta_color="off")
+            with col2:
+                st.metric("Duplicate Groups", f"{report['groups']:,}")
+            with col3:
+                st.metric("Compression", f"{report['compression_ratio']:.2f}x")
+            with col4:
+                st.metric("Index Size", f"{report['index_bytes_after'] / 1e6:,.1f} MB",
+                          delta=f"-{(report['index_bytes_before'] - report['index_bytes_after']) / 1e6:,.1f} MB",
+                          delta_color="off")
+            if 'embed_seconds_before' in report:
+                st.caption(f":material/timer: 임베딩 시간 (측정된 청크당 시간 기준): {report['embed_seconds_before']:,.0f}초 → "
+                           f"{report['embed_seconds_after']:,.0f}초")
+            else:
+                st.caption(f":material/timer: 임베딩 호출 {report['chunks']:,}회 → {report['unique']:,}회 "
+                           "(임베딩을 한 번 생성하면 예상 시간도 표시됩니다)")
+            
+            with st.expander(":material/account_tree: 중복 그룹 미리보기 (원본 파일 매핑)"):
+                duplicates = dedup['mapping'][dedup['mapping']['CHUNK_ID'] != dedup['mapping']['CANONICAL_CHUNK_ID']]
+                st.dataframe(duplicates.head(100), use_container_width=True)
+            
+            st.checkbox(":material/filter_alt: 대표 청크만 임베딩 (Embed Unique Chunks Only)", value=True,
+                        key="day18_embed_unique")
+    
     # 임베딩 생성
     with st.container(border=True):
         st.subheader(":material/looks_two: 임베딩 생성 (Generate Embeddings)")
@@ -161,19 +348,48 @@ if 'chunks_data' in st.session_state:
         # 배치 크기 선택
         batch_size = st.selectbox("배치 크기 (Batch Size)", [10, 25, 50, 100], index=1,
                                   help="한 번에 처리할 청크 수")
+        
+        # 임베딩 캐시: 텍스트가 같은 청크는 다시 임베딩하지 않음
+        col1, col2 = st.columns(2)
+        with col1:
+            use_cache = st.checkbox(":material/cached: 임베딩 캐시 사용 (Use Embedding Cache)", value=True,
+                                    key="day18_use_cache",
+                                    help="(임베딩 모델, 정규화한 텍스트의 SHA-256)을 키로 이미 만든 임베딩을 재사용합니다.")
+        with col2:
+            cache_store = st.selectbox(
+                "캐시 저장소 (Cache Store)", ["local", "snowflake", "memory"],
+                format_func=lambda k: {"local": f"로컬 파일 ({DEFAULT_STORE_PATH})",
+                                       "snowflake": f"Snowflake 테이블 ({DEFAULT_CACHE_TABLE})",
+                                       "memory": "메모리만 (Memory only)"}[k],
+                key="day18_cache_store", disabled=not use_cache)
+        embedding_cache = (get_embedding_cache(cache_store, session, st.session_state.day18_database,
+                                               st.session_state.day18_schema) if use_cache else None)
 
         if st.button(":material/calculate: 임베딩 생성 (Generate Embeddings)", type="primary", use_container_width=True):
             try:
                 with st.status("임베딩 생성 중...", expanded=True) as status:
                     embeddings = []
-                    total_chunks = len(df)
-                    progress_bar = st.progress(0)
+                    # 중복 제거를 했다면 대표 청크만 임베딩
+                    embed_df = (st.session_state.day18_dedup['unique']
+                                if 'day18_dedup' in st.session_state and st.session_state.get('day18_embed_unique', True)
+                                else df)
+                    total_chunks = len(embed_df)
+                    embed_start = time.perf_counter()
+                    # 배치마다 st.write를 추가하지 않고 하나의 캡션을 50ms 단위로 갱신
+                    progress = ThrottledProgress(st.progress(0), caption=st.empty())
+                    
+                    # 캐시는 세션 간에 공유되므로 이 실행의 적중/미스만 따로 집계
+                    run_stats = CacheStats()
                     
                     for i in range(0, total_chunks, batch_size):
                         batch_end = min(i + batch_size, total_chunks)
-                        st.write(f"{total_chunks}개 중 {i+1} ~ {batch_end} 청크 처리 중...")
+                        batch_df = embed_df.iloc[i:batch_end]
+                        
+                        # 캐시에 있는 청크는 저장된 임베딩을 사용하고, 없는 청크만 아래에서 임베딩
+                        cached = embedding_cache.lookup(batch_df['CHUNK_TEXT'].tolist(), DEFAULT_EMBED_MODEL, run_stats) if embedding_cache else {}
+                        fresh_start = len(embeddings)
                         
-                        for idx, row in df.iloc[i:batch_end].iterrows():
+                        for idx, row in batch_df.iloc[[p for p in range(len(batch_df)) if p not in cached]].iterrows():
                             # [실습] embed_text_768 함수를 사용하여 임베딩을 생성하세요.
                             # 힌트: embed_text_768(model='snowflake-arctic-embed-m', text=...)
                             
@@ -197,9 +413,22 @@ if 'chunks_data' in st.session_state:
                             #     'embedding': emb
                             # })
                         
+                        fresh = embeddings[fresh_start:]
+                        if embedding_cache and fresh:
+                            chunk_texts = dict(zip(batch_df['CHUNK_ID'], batch_df['CHUNK_TEXT']))
+                            embedding_cache.store_embeddings([chunk_texts[e['chunk_id']] for e in fresh],
+                                                             [e['embedding'] for e in fresh], DEFAULT_EMBED_MODEL)
+                        embeddings.extend({'chunk_id': batch_df['CHUNK_ID'].iloc[p], 'embedding': vector}
+                                          for p, vector in cached.items())
+                        
                         # 업데이트 진행 상황
-                        progress = batch_end / total_chunks
-                        progress_bar.progress(progress)
+                        progress.update(batch_end / total_chunks,
+                                        caption=f"{total_chunks}개 중 {i+1} ~ {batch_end} 청크 처리 완료")
+                    progress.flush()
+                    cache_stats = run_stats.as_dict() if embedding_cache else None
+                    generated = len(embeddings) - (cache_stats['avoided'] if cache_stats else 0)
+                    if generated > 0:
+                        st.session_state.day18_seconds_per_embedding = (time.perf_counter() - embed_start) / generated
                     
                     # [주의] 위 루프에서 emb가 생성되지 않으면 아래 embeddings가 비어있게 됩니다.
                     # 학생이 실습하지 않으면 에러가 나거나 빈 리스트가 됩니다.
@@ -217,7 +446,18 @@ if 'chunks_data' in st.session_state:
                     # 세션 상태에 저장
                     st.session_state.embeddings_data = embeddings
             
-                    st.success(f":material/check_circle: {len(df)}개의 리뷰 청크에 대해 {len(embeddings)}개의 임베딩을 생성했습니다!")
+                    st.success(f":material/check_circle: {total_chunks}개의 리뷰 청크에 대해 {len(embeddings)}개의 임베딩을 생성했습니다!")
+                    
+                if cache_stats:
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric(":material/cached: 캐시 적중률 (Cache Hit Ratio)", f"{cache_stats['hit_ratio']:.0%}",
+                                  help=f"메모리 {cache_stats['memory_hits']:,} / 저장소 {cache_stats['store_hits']:,} / "
+                                       f"미스 {cache_stats['misses']:,}")
+                    with col2:
+                        st.metric(":material/skip_next: 생략한 임베딩 (Embeddings Avoided)", f"{cache_stats['avoided']:,}")
+                    with col3:
+                        st.metric(":material/memory: 메모리 캐시 항목", f"{embedding_cache.memory_size():,}")
                     
             except Exception as e:
                 st.error(f"임베딩 생성 오류: {str(e)}")
@@ -297,12 +537,21 @@ if 'chunks_data' in st.session_state:
                 key="day18_replace_mode"
             )
             
-            if replace_mode:
+            # 임베딩이 없는 청크만 로드했다면 교체 시 나머지 청크의 임베딩이 모두 삭제됨
+            partial_replace = replace_mode and st.session_state.get('day18_loaded_filtered', False)
+            if partial_replace:
+                st.error("**교체 모드를 사용할 수 없습니다**: 임베딩이 없는 청크만 로드했으므로 교체하면 기존 임베딩이 모두 삭제됩니다. "
+                         "위의 로드 조건을 해제하고 전체 청크를 다시 로드하거나, 추가 모드로 저장하세요.")
+            elif replace_mode:
                 st.warning("**교체 모드 활성**: 새 임베딩을 저장하기 전에 기존 임베딩이 삭제됩니다.")
             else:
                 st.success("**추가 모드 활성**: 새 임베딩이 기존 데이터에 추가됩니다.")
             
-            if st.button(":material/save: Snowflake에 임베딩 저장 (Save Embeddings to Snowflake)", type="primary", use_container_width=True):
+            if not embeddings:
+                st.info(":material/info: 저장할 임베딩이 없습니다. 위의 임베딩 생성 실습 코드를 완성하세요.")
+            
+            if st.button(":material/save: Snowflake에 임베딩 저장 (Save Embeddings to Snowflake)", type="primary", use_container_width=True,
+                         disabled=not embeddings or partial_replace):
                 try:
                     with st.status("임베딩 저장 중...", expanded=True) as status:
                         # 1단계: 임베딩 테이블 생성 또는 Truncate
@@ -331,27 +580,24 @@ if 'chunks_data' in st.session_state:
                             session.sql(create_table_sql).collect()
                             st.write(":material/check_circle: 테이블 준비 완료")
                         
-                        # 2단계: 임베딩 삽입
+                        # 2단계: 임베딩 삽입 - float32 행렬을 스테이징에 일괄 로드한 뒤 한 문장으로 VECTOR 변환
                         st.write(f":material/looks_two: {len(embeddings)}개의 임베딩 삽입 중...")
+                        save_progress = ThrottledProgress(st.progress(0), caption=st.empty())
                         
-                        for i, emb_data in enumerate(embeddings):
-                            # 임베딩 리스트 가져오기
-                            if isinstance(emb_data['embedding'], list):
-                                emb_list = emb_data['embedding']
-                            else:
-                                emb_list = list(emb_data['embedding'])
-                            
-                            # Snowflake를 위한 적절한 배열 형식으로 변환
-                            emb_array = "[" + ",".join([str(float(x)) for x in emb_list]) + "]"
-                            
-                            insert_sql = f"""
-                            INSERT INTO {full_embedding_table} (CHUNK_ID, EMBEDDING)
-                            SELECT {emb_data['chunk_id']}, {emb_array}::VECTOR(FLOAT, 768)
-                            """
-                            session.sql(insert_sql).collect()
-                            
-                            if (i + 1) % 10 == 0:
-                                st.write(f"{len(embeddings)}개 중 {i + 1}개 임베딩 저장 중...")
+                        write_result = write_vectors(
+                            session,
+                            [emb_data['chunk_id'] for emb_data in embeddings],
+                            embedding_matrix(embeddings),
+                            table_name=st.session_state.day18_embedding_table,
+                            database=st.session_state.day18_database,
+                            schema=st.session_state.day18_schema,
+                            on_batch=lambda loaded, total: save_progress.update(
+                                loaded / total, caption=f"{total}개 중 {loaded}개 임베딩 업로드 완료")
+                        )
+                        save_progress.flush()
+                        if write_result['failed']:
+                            st.write(f"   :material/warning: {len(write_result['failed'])}개 임베딩 로드 실패: "
+                                     f"{write_result['failed'][0]['error']}")
                         
                         status.update(label="임베딩 저장 완료!", state="complete", expanded=False)
                     
@@ -360,6 +606,7 @@ if 'chunks_data' in st.session_state:
                     
                     # Day 19를 위해 저장
                     st.session_state.embeddings_table = full_embedding_table
+                    table_stats.clear()  # 뷰어의 캐시된 행 수 갱신
                     st.session_state.embeddings_database = st.session_state.day18_database
                     st.session_state.embeddings_schema = st.session_state.day18_schema
                     
@@ -376,118 +623,52 @@ with st.container(border=True):
     full_embedding_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_embedding_table}"
     
     try:
-        count_result = session.sql(f"""
-            SELECT COUNT(*) as CNT FROM {full_embedding_table}
-        """).collect()
-        
-        if count_result:
-            record_count = count_result[0]['CNT']
-            if record_count > 0:
-                st.warning(f":material/warning: 현재 `{full_embedding_table}` 테이블에 **{record_count:,}개의 임베딩**이 있습니다.")
-            else:
-                st.info(":material/inbox: **임베딩 테이블이 비어 있습니다** - 위에서 임베딩을 생성하고 저장하세요.")
+        record_count = table_stats(session, full_embedding_table)['ROW_COUNT']
+        if record_count > 0:
+            st.warning(f":material/warning: 현재 `{full_embedding_table}` 테이블에 **{record_count:,}개의 임베딩**이 있습니다.")
+        else:
+            st.info(":material/inbox: **임베딩 테이블이 비어 있습니다** - 위에서 임베딩을 생성하고 저장하세요.")
     except:
         st.info(":material/inbox: **임베딩 테이블이 아직 없습니다** - 임베딩을 생성하고 저장하여 만드세요.")
     
     query_button = st.button(":material/analytics: 임베딩 테이블 조회 (Query Embedding Table)", type="secondary", use_container_width=True)
     
     if query_button:
+        # 첫 페이지부터 다시 조회하고 캐시된 행 수 비우기
+        reset_grid("day18_embeddings_grid")
+        st.session_state.queried_embeddings_table = full_embedding_table
+        st.rerun()
+    
+    # 조회한 테이블이면 한 페이지씩 표시 (768차원 벡터는 선택한 청크만 로드)
+    if st.session_state.get('queried_embeddings_table') == full_embedding_table:
         try:
-            query = f"""
-            SELECT 
-                CHUNK_ID,
-                EMBEDDING,
-                CREATED_TIMESTAMP,
-                VECTOR_L2_DISTANCE(EMBEDDING, EMBEDDING) as SELF_DISTANCE
-            FROM {full_embedding_table}
-            ORDER BY CHUNK_ID
-            """
-            result_df = session.sql(query).to_pandas()
-            
-            # 세션 상태에 저장
-            st.session_state.queried_embeddings = result_df
-            st.session_state.queried_embeddings_table = full_embedding_table
-            st.rerun()
+            total_embeddings = table_stats(session, full_embedding_table)['ROW_COUNT']
             
+            if total_embeddings > 0:
+                st.code(full_embedding_table, language="sql")
+                
+                # 요약 메트릭
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Total Embeddings", f"{total_embeddings:,}")
+                with col2:
+                    st.metric("Dimensions", "768")
+                
+                paginated_table(
+                    session, full_embedding_table,
+                    columns=["CHUNK_ID", "CREATED_TIMESTAMP", "VECTOR_L2_DISTANCE(EMBEDDING, EMBEDDING) AS SELF_DISTANCE"],
+                    key_column="CHUNK_ID",
+                    state_key="day18_embeddings_grid",
+                    detail_column="EMBEDDING",
+                    detail_format="vector",
+                    total=total_embeddings
+                )
+                
+                st.info(":material/lightbulb: 자체 거리(Self-distance)는 0이어야 하며, 이는 임베딩이 올바르게 저장되었음을 확인해줍니다.")
+            else:
+                st.info(":material/inbox: 테이블에 임베딩이 없습니다.")
         except Exception as e:
             st.error(f"임베딩 조회 중 오류 발생: {str(e)}")
-    
-    # 세션 상태에 결과가 있으면 표시
-    if 'queried_embeddings' in st.session_state and st.session_state.get('queried_embeddings_table') == full_embedding_table:
-        emb_df = st.session_state.queried_embeddings
-        
-        if len(emb_df) > 0:
-            st.code(full_embedding_table, language="sql")
-            
-            # 요약 메트릭
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("Total Embeddings", len(emb_df))
-            with col2:
-                st.metric("Dimensions", "768")
-            
-            # 가독성을 위해 EMBEDDING 컬럼 없이 테이블 표시
-            # 존재하는 컬럼 확인 (대소문자 구별 없음)
-            embedding_col = None
-            for col in emb_df.columns:
-                if col.upper() == 'EMBEDDING':
-                    embedding_col = col
-                    break
-            
-            if embedding_col:
-                display_df = emb_df.drop(columns=[embedding_col])
-            else:
-                display_df = emb_df
-            
-            st.dataframe(display_df, use_container_width=True)
-            
-            st.info(":material/lightbulb: 자체 거리(Self-distance)는 0이어야 하며, 이는 임베딩이 올바르게 저장되었음을 확인해줍니다.")
-            
-            # 개별 임베딩 벡터 보기 (EMBEDDING 컬럼이 있는 경우에만)
-            if embedding_col:
-                with st.expander(":material/search: 개별 임베딩 벡터 보기"):
-                    st.write("CHUNK_ID를 선택하여 768차원 임베딩 벡터 전체를 확인하세요:")
-                    
-                    # CHUNK_ID 컬럼 찾기 (대소문자 구별 없음)
-                    chunk_id_col = None
-                    for col in emb_df.columns:
-                        if col.upper() == 'CHUNK_ID':
-                            chunk_id_col = col
-                            break
-                    
-                    chunk_ids = emb_df[chunk_id_col].tolist()
-                    selected_chunk = st.selectbox("CHUNK_ID 선택", chunk_ids, key="view_embedding_chunk")
-                    
-                    if st.button(":material/analytics: 임베딩 벡터 로드", key="load_embedding_btn"):
-                        # 선택한 청크에 대한 임베딩 가져오기
-                        selected_emb = emb_df[emb_df[chunk_id_col] == selected_chunk][embedding_col].iloc[0]
-                        
-                        # 세션 상태에 저장
-                        st.session_state.loaded_embedding = selected_emb
-                        st.session_state.loaded_embedding_chunk = selected_chunk
-                        st.rerun()
-                    
-                    # 로드된 임베딩 표시
-                    if 'loaded_embedding' in st.session_state:
-                        st.write(f"**CHUNK_ID {st.session_state.loaded_embedding_chunk}에 대한 임베딩 벡터:**")
-                        
-                        # 필요한 경우 리스트로 변환
-                        emb_vector = st.session_state.loaded_embedding
-                        if isinstance(emb_vector, str):
-                            # 문자열 표현인 경우 파싱
-                            import json
-                            emb_vector = json.loads(emb_vector)
-                        elif hasattr(emb_vector, 'tolist'):
-                            emb_vector = emb_vector.tolist()
-                        elif not isinstance(emb_vector, list):
-                            emb_vector = list(emb_vector)
-                        
-                        st.caption(f"벡터 길이: {len(emb_vector)} 차원")
-                        
-                        # 전체 임베딩 벡터를 코드로 표시
-                        st.code(emb_vector, language="python")
-        else:
-            st.info(":material/inbox: 테이블에 임베딩이 없습니다.")
     else:
         st.info(":material/inbox: 아직 조회된 임베딩이 없습니다. 저장된 임베딩을 보려면 '임베딩 테이블 조회'를 클릭하세요.")
 
@@ -3,6 +3,7 @@
 
 import streamlit as st
 from snowflake.core import Root
+from local_search import index_settings, local_search
 
 st.title(":material/search: Cortex Search 쿼리하기 (Querying Cortex Search)")
 st.write("Cortex Search 서비스를 사용하여 관련 텍스트 청크를 검색합니다.")
@@ -21,56 +22,66 @@ except:
 with st.container(border=True):
     st.subheader(":material/search: 검색 구성 및 쿼리 (Search Configuration and Query)")
     
-    # Day 19의 기본 검색 서비스
-    default_service = 'RAG_DB.RAG_SCHEMA.CUSTOMER_REVIEW_SEARCH'
+    # 검색 방식: Cortex Search 서비스 또는 Day 18 임베딩의 로컬 벡터 인덱스
+    backend = st.radio("검색 방식 (Retrieval):", ["cortex", "local"], horizontal=True, key="day20_backend",
+                       format_func=lambda b: {"cortex": "Cortex Search 서비스",
+                                              "local": "로컬 벡터 인덱스 (Local Vector Index)"}[b])
+    local_index = None
+    search_service = None
     
-    # 사용 가능한 서비스 가져오기 시도
-    try:
-        services_result = session.sql("SHOW CORTEX SEARCH SERVICES").collect()
-        available_services = [f"{row['database_name']}.{row['schema_name']}.{row['name']}" 
-                            for row in services_result] if services_result else []
-    except:
-        available_services = []
+    if backend == "local":
+        local_index = index_settings(session, key="day20")
+    else:
+        # Day 19의 기본 검색 서비스
+        default_service = 'RAG_DB.RAG_SCHEMA.CUSTOMER_REVIEW_SEARCH'
+    
+        # 사용 가능한 서비스 가져오기 시도
+        try:
+            services_result = session.sql("SHOW CORTEX SEARCH SERVICES").collect()
+            available_services = [f"{row['database_name']}.{row['schema_name']}.{row['name']}" 
+                                for row in services_result] if services_result else []
+        except:
+            available_services = []
     
-    # 기본 서비스가 항상 첫 번째에 오도록 설정
-    if default_service in available_services:
-        available_services.remove(default_service)
-    available_services.insert(0, default_service)
+        # 기본 서비스가 항상 첫 번째에 오도록 설정
+        if default_service in available_services:
+            available_services.remove(default_service)
+        available_services.insert(0, default_service)
     
-    # 수동 입력 옵션 추가
-    if available_services:
-        available_services.append("-- 직접 입력 (Enter manually) --")
+        # 수동 입력 옵션 추가
+        if available_services:
+            available_services.append("-- 직접 입력 (Enter manually) --")
         
-        search_service_option = st.selectbox(
-            "검색 서비스 (Search Service):",
-            options=available_services,
-            index=0,
-            help="Day 19에서 생성한 Cortex Search 서비스를 선택하세요"
-        )
+            search_service_option = st.selectbox(
+                "검색 서비스 (Search Service):",
+                options=available_services,
+                index=0,
+                help="Day 19에서 생성한 Cortex Search 서비스를 선택하세요"
+            )
         
-        # 수동 입력 선택 시 텍스트 입력 표시
-        if search_service_option == "-- 직접 입력 (Enter manually) --":
+            # 수동 입력 선택 시 텍스트 입력 표시
+            if search_service_option == "-- 직접 입력 (Enter manually) --":
+                search_service = st.text_input(
+                    "서비스 경로 입력:",
+                    placeholder="database.schema.service_name"
+                )
+            else:
+                search_service = search_service_option
+            
+                # Day 19 서비스인 경우 상태 표시
+                if search_service == st.session_state.get('search_service'):
+                    st.success(":material/check_circle: Day 19의 서비스를 사용 중입니다")
+        else:
+            # 서비스가 없는 경우 텍스트 입력으로 대체
             search_service = st.text_input(
-                "서비스 경로 입력:",
-                placeholder="database.schema.service_name"
+                "검색 서비스 (Search Service):",
+                value=default_service,
+                placeholder="database.schema.service_name",
+                help="Cortex Search 서비스의 전체 경로"
             )
-        else:
-            search_service = search_service_option
-            
-            # Day 19 서비스인 경우 상태 표시
-            if search_service == st.session_state.get('search_service'):
-                st.success(":material/check_circle: Day 19의 서비스를 사용 중입니다")
-    else:
-        # 서비스가 없는 경우 텍스트 입력으로 대체
-        search_service = st.text_input(
-            "검색 서비스 (Search Service):",
-            value=default_service,
-            placeholder="database.schema.service_name",
-            help="Cortex Search 서비스의 전체 경로"
-        )
     
-    st.code(search_service, language="sql")
-    st.caption(":material/lightbulb: 이것은 Day 19의 CUSTOMER_REVIEW_SEARCH 서비스를 가리켜야 합니다")
+        st.code(search_service, language="sql")
+        st.caption(":material/lightbulb: 이것은 Day 19의 CUSTOMER_REVIEW_SEARCH 서비스를 가리켜야 합니다")
 
     st.divider()
 
@@ -85,11 +96,44 @@ with st.container(border=True):
     
     search_clicked = st.button(":material/search: 검색 (Search)", type="primary", use_container_width=True)
 
+# 결과 표시
+def show_results(items):
+    for i, item in enumerate(items, 1):
+        with st.container(border=True):
+            col1, col2, col3 = st.columns([2, 1, 1])
+            with col1:
+                st.markdown(f"**Result {i}** - {item.get('FILE_NAME', 'N/A')}")
+            with col2:
+                st.caption(f"Type: {item.get('CHUNK_TYPE', 'N/A')}")
+            with col3:
+                st.caption(f"Chunk: {item.get('CHUNK_ID', 'N/A')}")
+            
+            st.write(item.get("CHUNK_TEXT", "No text found"))
+            
+            # 관련성 점수가 있는 경우 표시
+            if hasattr(item, 'score') or 'score' in item:
+                score = item.get('score', item.score if hasattr(item, 'score') else None)
+                if score is not None:
+                    st.caption(f"Relevance Score: {score:.4f}")
+
 # 출력 컨테이너
 with st.container(border=True):
     st.subheader(":material/analytics: 검색 결과 (Search Results)")
     
-    if search_clicked:
+    if search_clicked and backend == "local":
+        if query and local_index is not None:
+            try:
+                with st.spinner("검색 중..."):
+                    results, timing = local_search(local_index, [query], k=num_results)
+                st.success(f":material/check_circle: {len(results[0])}개의 결과를 찾았습니다!")
+                st.caption(f":material/timer: 질문 임베딩 {timing['embed_ms']:.1f} ms"
+                           f"{' (캐시)' if timing['cached'] else ''} · 로컬 검색 {timing['search_ms']:.2f} ms")
+                show_results(results[0])
+            except Exception as e:
+                st.error(f"오류: {str(e)}")
+        else:
+            st.warning(":material/warning: 쿼리를 입력하고 로컬 인덱스를 새로 고치세요 (Day 18 임베딩 필요).")
+    elif search_clicked:
         if query and search_service:
             try:
                 root = Root(session)
@@ -129,23 +173,7 @@ with st.container(border=True):
                         st.success(f":material/check_circle: {len(results.results)}개의 결과를 찾았습니다!")
                         
                         # 결과 표시
-                        for i, item in enumerate(results.results, 1):
-                            with st.container(border=True):
-                                col1, col2, col3 = st.columns([2, 1, 1])
-                                with col1:
-                                    st.markdown(f"**Result {i}** - {item.get('FILE_NAME', 'N/A')}")
-                                with col2:
-                                    st.caption(f"Type: {item.get('CHUNK_TYPE', 'N/A')}")
-                                with col3:
-                                    st.caption(f"Chunk: {item.get('CHUNK_ID', 'N/A')}")
-                                
-                                st.write(item.get("CHUNK_TEXT", "No text found"))
-                                
-                                # 관련성 점수가 있는 경우 표시
-                                if hasattr(item, 'score') or 'score' in item:
-                                    score = item.get('score', item.score if hasattr(item, 'score') else None)
-                                    if score is not None:
-                                        st.caption(f"Relevance Score: {score:.4f}")
+                        show_results(results.results)
                     else:
                         st.warning("결과가 반환되지 않았습니다. 실습 코드를 확인하세요.")
             
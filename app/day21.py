@@ -2,6 +2,7 @@
 # Cortex Search를 활용한 RAG (RAG with Cortex Search)
 
 import streamlit as st
+from local_search import index_settings, local_search
 
 st.title(":material/link: Cortex Search를 활용한 RAG")
 st.write("검색 결과와 LLM 생성을 결합하여 근거 있는 답변을 제공합니다.")
@@ -57,53 +58,63 @@ st.divider()
 with st.sidebar:
     st.header(":material/settings: 설정 (Settings)")
     
-    # Day 19의 기본 검색 서비스
-    default_service = 'RAG_DB.RAG_SCHEMA.CUSTOMER_REVIEW_SEARCH'
+    # 검색 방식: Cortex Search 서비스 또는 Day 18 임베딩의 로컬 벡터 인덱스
+    backend = st.radio("검색 방식 (Retrieval):", ["cortex", "local"], key="day21_backend",
+                       format_func=lambda b: {"cortex": "Cortex Search 서비스",
+                                              "local": "로컬 벡터 인덱스 (Local Vector Index)"}[b])
+    local_index = None
+    search_service = None
     
-    # 사용 가능한 서비스 가져오기 시도
-    try:
-        services_result = session.sql("SHOW CORTEX SEARCH SERVICES").collect()
-        available_services = [f"{row['database_name']}.{row['schema_name']}.{row['name']}" 
-                            for row in services_result] if services_result else []
-    except:
-        available_services = []
+    if backend == "local":
+        local_index = index_settings(session, key="day21")
+    else:
+        # Day 19의 기본 검색 서비스
+        default_service = 'RAG_DB.RAG_SCHEMA.CUSTOMER_REVIEW_SEARCH'
+    
+        # 사용 가능한 서비스 가져오기 시도
+        try:
+            services_result = session.sql("SHOW CORTEX SEARCH SERVICES").collect()
+            available_services = [f"{row['database_name']}.{row['schema_name']}.{row['name']}" 
+                                for row in services_result] if services_result else []
+        except:
+            available_services = []
     
-    # 기본 서비스가 항상 첫 번째에 오도록 설정
-    if default_service in available_services:
-        available_services.remove(default_service)
-    available_services.insert(0, default_service)
+        # 기본 서비스가 항상 첫 번째에 오도록 설정
+        if default_service in available_services:
+            available_services.remove(default_service)
+        available_services.insert(0, default_service)
     
-    # 수동 입력 옵션 추가
-    if available_services:
-        available_services.append("-- 직접 입력 (Enter manually) --")
+        # 수동 입력 옵션 추가
+        if available_services:
+            available_services.append("-- 직접 입력 (Enter manually) --")
         
-        search_service_option = st.selectbox(
-            "검색 서비스:",
-            options=available_services,
-            index=0,
-            help="Day 19에서 생성한 Cortex Search 서비스를 선택하세요"
-        )
+            search_service_option = st.selectbox(
+                "검색 서비스:",
+                options=available_services,
+                index=0,
+                help="Day 19에서 생성한 Cortex Search 서비스를 선택하세요"
+            )
         
-        # 수동 입력 선택 시 텍스트 입력 표시
-        if search_service_option == "-- 직접 입력 (Enter manually) --":
+            # 수동 입력 선택 시 텍스트 입력 표시
+            if search_service_option == "-- 직접 입력 (Enter manually) --":
+                search_service = st.text_input(
+                    "서비스 경로 입력:",
+                    placeholder="database.schema.service_name"
+                )
+            else:
+                search_service = search_service_option
+            
+                # Day 19 서비스인 경우 상태 표시
+                if search_service == st.session_state.get('search_service'):
+                    st.caption(":material/check_circle: Day 19의 서비스를 사용 중입니다")
+        else:
+            # 서비스가 없는 경우 텍스트 입력으로 대체
             search_service = st.text_input(
-                "서비스 경로 입력:",
-                placeholder="database.schema.service_name"
+                "검색 서비스:",
+                value=default_service,
+                placeholder="database.schema.service_name",
+                help="Cortex Search 서비스의 전체 경로"
             )
-        else:
-            search_service = search_service_option
-            
-            # Day 19 서비스인 경우 상태 표시
-            if search_service == st.session_state.get('search_service'):
-                st.caption(":material/check_circle: Day 19의 서비스를 사용 중입니다")
-    else:
-        # 서비스가 없는 경우 텍스트 입력으로 대체
-        search_service = st.text_input(
-            "검색 서비스:",
-            value=default_service,
-            placeholder="database.schema.service_name",
-            help="Cortex Search 서비스의 전체 경로"
-        )
     
     num_chunks = st.slider("컨텍스트 청크 수:", 1, 10, 3,
                            help="검색할 관련 청크의 수")
@@ -126,37 +137,42 @@ question = st.text_input(
 )
 
 if st.button(":material/search: 검색 및 답변 (Search & Answer)", type="primary"):
-    if question and search_service:
+    if question and (search_service or local_index is not None):
         with st.status("처리 중...", expanded=True) as status:
             
             # 1단계: Cortex Search에서 컨텍스트 검색
             st.write(":material/search: **1단계:** 문서 검색 중...")
             
             try:
-                from snowflake.core import Root
-                
-                root = Root(session)
-                parts = search_service.split(".")
-                
-                if len(parts) != 3:
-                    st.error("서비스 경로는 다음 형식이어야 합니다: database.schema.service_name")
-                    st.stop()
-                
-                svc = (root
-                    .databases[parts[0]]
-                    .schemas[parts[1]]
-                    .cortex_search_services[parts[2]])
-                
-                search_results = svc.search(
-                    query=question,
-                    columns=["CHUNK_TEXT", "FILE_NAME"],
-                    limit=num_chunks
-                )
+                if backend == "local":
+                    results, timing = local_search(local_index, [question], k=num_chunks)
+                    search_items = results[0]
+                    st.write(f"   :material/timer: 로컬 벡터 검색 {timing['search_ms']:.2f} ms")
+                else:
+                    from snowflake.core import Root
+                
+                    root = Root(session)
+                    parts = search_service.split(".")
+                
+                    if len(parts) != 3:
+                        st.error("서비스 경로는 다음 형식이어야 합니다: database.schema.service_name")
+                        st.stop()
+                
+                    svc = (root
+                        .databases[parts[0]]
+                        .schemas[parts[1]]
+                        .cortex_search_services[parts[2]])
+                
+                    search_items = svc.search(
+                        query=question,
+                        columns=["CHUNK_TEXT", "FILE_NAME"],
+                        limit=num_chunks
+                    ).results
                 
                 # 메타데이터와 함께 컨텍스트 추출
                 context_chunks = []
                 sources = []
-                for item in search_results.results:
+                for item in search_items:
                     context_chunks.append(item.get("CHUNK_TEXT", ""))
                     sources.append(item.get("FILE_NAME", "Unknown"))
                 
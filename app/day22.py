@@ -2,6 +2,7 @@
 # 내 문서와 채팅하기 (Chat with Your Documents)
 
 import streamlit as st
+from local_search import index_settings, local_search
 
 st.title(":material/chat: 내 문서와 채팅하기 (Chat with Your Documents)")
 st.write("Cortex Search를 기반으로 하는 대화형 RAG 챗봇입니다.")
@@ -24,55 +25,65 @@ if "doc_messages" not in st.session_state:
 with st.sidebar:
     st.header(":material/settings: 설정 (Settings)")
     
-    # Day 19의 검색 서비스 확인
-    default_service = st.session_state.get('search_service', 'RAG_DB.RAG_SCHEMA.CUSTOMER_REVIEW_SEARCH')
+    # 검색 방식: Cortex Search 서비스 또는 Day 18 임베딩의 로컬 벡터 인덱스
+    backend = st.radio("검색 방식 (Retrieval):", ["cortex", "local"], key="day22_backend",
+                       format_func=lambda b: {"cortex": "Cortex Search 서비스",
+                                              "local": "로컬 벡터 인덱스 (Local Vector Index)"}[b])
+    local_index = None
+    search_service = None
     
-    # 사용 가능한 서비스 가져오기 시도
-    try:
-        services_result = session.sql("SHOW CORTEX SEARCH SERVICES").collect()
-        available_services = [f"{row['database_name']}.{row['schema_name']}.{row['name']}" 
-                            for row in services_result] if services_result else []
-    except:
-        available_services = []
+    if backend == "local":
+        local_index = index_settings(session, key="day22")
+    else:
+        # Day 19의 검색 서비스 확인
+        default_service = st.session_state.get('search_service', 'RAG_DB.RAG_SCHEMA.CUSTOMER_REVIEW_SEARCH')
+    
+        # 사용 가능한 서비스 가져오기 시도
+        try:
+            services_result = session.sql("SHOW CORTEX SEARCH SERVICES").collect()
+            available_services = [f"{row['database_name']}.{row['schema_name']}.{row['name']}" 
+                                for row in services_result] if services_result else []
+        except:
+            available_services = []
     
-    # 기본 서비스가 항상 목록의 첫 번째에 오도록 설정
-    if default_service:
-        # 목록의 다른 곳에 있다면 제
-        if default_service in available_services:
-            available_services.remove(default_service)
-        # 맨 앞에 추가
-        available_services.insert(0, default_service)
+        # 기본 서비스가 항상 목록의 첫 번째에 오도록 설정
+        if default_service:
+            # 목록의 다른 곳에 있다면 제
+            if default_service in available_services:
+                available_services.remove(default_service)
+            # 맨 앞에 추가
+            available_services.insert(0, default_service)
     
-    # 수동 입력 옵션 추가
-    if available_services:
-        available_services.append("-- 직접 입력 (Enter manually) --")
+        # 수동 입력 옵션 추가
+        if available_services:
+            available_services.append("-- 직접 입력 (Enter manually) --")
         
-        search_service_option = st.selectbox(
-            "검색 서비스:",
-            options=available_services,
-            index=0,
-            help="Day 19에서 생성한 Cortex Search 서비스를 선택하세요"
-        )
+            search_service_option = st.selectbox(
+                "검색 서비스:",
+                options=available_services,
+                index=0,
+                help="Day 19에서 생성한 Cortex Search 서비스를 선택하세요"
+            )
         
-        # 수동 입력 선택 시 텍스트 입력 표시
-        if search_service_option == "-- 직접 입력 (Enter manually) --":
+            # 수동 입력 선택 시 텍스트 입력 표시
+            if search_service_option == "-- 직접 입력 (Enter manually) --":
+                search_service = st.text_input(
+                    "서비스 경로 입력:",
+                    placeholder="database.schema.service_name"
+                )
+            else:
+                search_service = search_service_option
+            
+                # Day 19 서비스인 경우 상태 표시
+                if search_service == st.session_state.get('search_service'):
+                    st.caption(":material/check_circle: Day 19의 서비스를 사용 중입니다")
+        else:
+            # 서비스가 없는 경우 텍스트 입력으로 대체
             search_service = st.text_input(
-                "서비스 경로 입력:",
+                "Cortex Search 서비스:",
+                value=default_service,
                 placeholder="database.schema.service_name"
             )
-        else:
-            search_service = search_service_option
-            
-            # Day 19 서비스인 경우 상태 표시
-            if search_service == st.session_state.get('search_service'):
-                st.caption(":material/check_circle: Day 19의 서비스를 사용 중입니다")
-    else:
-        # 서비스가 없는 경우 텍스트 입력으로 대체
-        search_service = st.text_input(
-            "Cortex Search 서비스:",
-            value=default_service,
-            placeholder="database.schema.service_name"
-        )
     
     num_chunks = st.slider("컨텍스트 청크 수:", 1, 5, 3,
                            help="질문당 검색할 관련 청크의 수")
@@ -85,6 +96,10 @@ with st.sidebar:
 
 # 검색 함수
 def search_documents(query, service_path, limit):
+    if backend == "local":
+        results, _ = local_search(local_index, [query], k=limit)
+        return [{"text": item.get("CHUNK_TEXT") or "", "source": item.get("FILE_NAME") or "Unknown"}
+                for item in results[0]]
     from snowflake.core import Root
     root = Root(session)
     parts = service_path.split(".")
@@ -102,8 +117,8 @@ def search_documents(query, service_path, limit):
     return chunks_data
 
 # 메인 인터페이스
-if not search_service:
-    st.info(":material/arrow_back: 채팅을 시작하려면 Cortex Search 서비스를 구성하세요!")
+if not search_service and local_index is None:
+    st.info(":material/arrow_back: 채팅을 시작하려면 Cortex Search 서비스 또는 로컬 벡터 인덱스를 구성하세요!")
     st.caption(":material/lightbulb: **검색 서비스가 필요한가요?**\n- Day 19를 완료하여 `CUSTOMER_REVIEW_SEARCH`를 생성하세요\n- 서비스가 위의 드롭다운에 자동으로 나타납니다")
 else:
     # 채팅 기록 표시
@@ -4,6 +4,7 @@
 import streamlit as st
 from snowflake.core import Root
 import json
+from bulk_load import bulk_load, failed_rows
 
 # Snowflake 연결
 try:
@@ -203,7 +204,6 @@ if run_evaluation:
             test_df = pd.DataFrame(test_data)
             
             # TruLens용 Snowflake 테이블에 저장
-            test_snowpark_df = session.create_dataframe(test_df)
             dataset_table = "CUSTOMER_REVIEW_TEST_QUESTIONS"
             
             # 테이블이 존재하면 드롭하고 다시 생성
@@ -212,7 +212,14 @@ if run_evaluation:
             except:
                 pass
             
-            test_snowpark_df.write.mode("overwrite").save_as_table(dataset_table)
+            # 공용 일괄 로더로 한 번에 적재 (테이블은 데이터프레임 스키마로 자동 생성)
+            load_failures = failed_rows(bulk_load(
+                session, test_df, dataset_table,
+                database=obs_database, schema=obs_schema,
+                overwrite=True, auto_create_table=True
+            ))
+            if load_failures:
+                raise RuntimeError(f"테스트 데이터셋 로드 실패: {load_failures[0]['error']}")
             
             st.write(f":orange[:material/check:] 데이터셋 테이블 생성됨: `{obs_database}.{obs_schema}.{dataset_table}`")
             
@@ -4,6 +4,7 @@
 import streamlit as st
 from snowflake.cortex import Complete
 import time
+from stream_utils import throttled_stream
 
 st.title(":material/airwave: Write Streams")
 
@@ -39,7 +40,7 @@ if st.button("Generate Response"):
             
             # 힌트:
             # stream_generator = Complete(..., stream=True)
-            # st.write_stream(stream_generator)
+            # st.write_stream(throttled_stream(stream_generator))  # 50ms 단위로 청크를 묶어서 출력
             
             st.info("코드를 완성하고 실행 버튼을 눌러주세요.")
             
@@ -52,7 +53,8 @@ if st.button("Generate Response"):
                 time.sleep(0.01)
         
         with st.spinner(f"`{model}` 모델로 응답 생성 중..."):
-            st.write_stream(custom_stream_generator)
+            # 청크마다 델타를 보내지 않도록 50ms 단위로 묶어서 출력
+            st.write_stream(throttled_stream(custom_stream_generator))
 
 st.divider()
 st.caption("Day 3: Write streams | 30 Days of AI")
\ No newline at end of file
@@ -0,0 +1,267 @@
+# 중복 청크 제거 (Near-duplicate Chunk Detection)
+#
+# Day 17 청킹과 Day 18 임베딩 사이에서 사용합니다. 고객 리뷰에는 상투적인 문구와 거의 같은 리뷰가 많아,
+# 중복 청크마다 임베딩 호출, 인덱스 공간, 검색 결과 자리를 낭비합니다.
+#
+#   1. MinHash: 청크를 소문자/공백 정규화한 뒤 문자 shingle_size-gram 해시를 만들고, 해시를 num_perm개
+#      칸으로 나누어 칸별 최소값을 시그니처로 씁니다 (one permutation hashing + densification).
+#      문서 묶음의 코드 포인트 배열에서 numpy로 계산합니다.
+#   2. LSH: 시그니처를 bands x rows로 나누어 밴드가 같은 청크를 같은 버킷에 넣습니다.
+#      버킷마다 첫 청크와 나머지 청크만 비교하므로 상투 문구가 수만 개여도 후보 쌍이 선형으로 늘어납니다.
+#   3. 추정 Jaccard 유사도(시그니처 일치 비율)가 threshold 이상인 쌍을 연결 요소로 묶은 뒤, 요소 안에서
+#      CHUNK_ID 순서로 대표 청크를 정하고 대표와 직접 유사도가 threshold 이상인 청크만 그 그룹에 넣습니다
+#      (leader clustering). A≈B≈C처럼 이어져도 A와 C가 다르면 C는 다른 그룹의 대표가 됩니다.
+#      각 그룹의 대표 청크만 임베딩합니다.
+#
+# 모든 청크는 매핑(CHUNK_ID -> CANONICAL_CHUNK_ID, DOC_ID, FILE_NAME)에 남으므로, 대표 청크가 검색되면
+# 같은 내용을 가진 원본 파일을 모두 찾을 수 있습니다.
+
+import numpy as np
+import pandas as pd
+
+from bulk_load import stage_rows
+from chunking import _SPACE_TABLE
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 5
+DEFAULT_MAP_TABLE = "REVIEW_CHUNK_DUPLICATES"
+EMBEDDING_BYTES = 768 * 4     # VECTOR(FLOAT, 768) 한 개
+DOCS_PER_BATCH = 5000         # 코드 포인트 배열 하나에 넣는 청크 수
+MAP_COLUMNS = ["CHUNK_ID", "CANONICAL_CHUNK_ID", "DOC_ID", "FILE_NAME", "SIMILARITY"]
+
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+_BASE = np.uint64(1000003)
+_EMPTY = np.uint32(0xFFFFFFFF)
+_MAX_DENSIFY_ATTEMPTS = 1 << 12
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 마무리 단계 (shingle 해시의 비트를 고르게 섞음)."""
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def shingle_hashes(texts: list, shingle_size: int = DEFAULT_SHINGLE_SIZE) -> tuple:
+    """정규화한 텍스트의 문자 shingle_size-gram 해시.
+
+    반환값: (hashes uint64, doc_index) - doc_index 순서로 정렬됨.
+    shingle_size보다 짧은 텍스트는 텍스트 전체가 shingle 1개이고, 빈 텍스트도 shingle 1개를 가집니다.
+    """
+    k = shingle_size
+    pad = "\0" * k
+    texts = [t.lower().strip() for t in texts]
+    codes = np.frombuffer((pad.join(texts) + pad).encode("utf-32-le"), dtype=np.uint32)
+    lengths = np.fromiter((len(t) + k for t in texts), dtype=np.int64, count=len(texts))
+    doc_of = np.repeat(np.arange(len(texts)), lengths)
+
+    # 공백 종류는 ' '로 통일하고 연속 공백은 하나로
+    space = _SPACE_TABLE.take(codes, mode="clip")
+    codes = np.where(space, np.uint32(32), codes)
+    keep = ~(space & np.concatenate(([False], space[:-1])))
+    codes, doc_of = codes[keep].astype(np.uint64), doc_of[keep]
+
+    # 텍스트 안에 들어가는 창만 사용하고, shingle_size보다 짧은 텍스트(빈 텍스트 포함)는 채움 문자까지 창 1개
+    segment_starts = np.flatnonzero(np.concatenate(([True], doc_of[1:] != doc_of[:-1])))
+    text_lengths = np.diff(np.append(segment_starts, len(doc_of))) - k
+    counts = np.maximum(text_lengths - k + 1, 1)
+    first = np.cumsum(counts) - counts
+    starts = np.repeat(segment_starts, counts) + np.arange(counts.sum()) - np.repeat(first, counts)
+
+    hashes = np.zeros(len(starts), dtype=np.uint64)
+    for j in range(k):
+        hashes = hashes * _BASE + codes[starts + j]
+    return _mix(hashes), np.repeat(np.arange(len(texts)), counts)
+
+
+def _densify(signatures: np.ndarray) -> np.ndarray:
+    """빈 칸을 채운 시그니처 (optimal densification).
+
+    빈 칸 j는 시도 t마다 (j, t)에서 정해지는 다른 칸을 보고, 처음 만난 채워진 칸의 값을 빌려옵니다.
+    모든 행이 같은 순서로 보므로 같은 shingle 집합은 같은 시그니처가 되고, 짧은 청크에서도 분산이 작습니다.
+    """
+    num_perm = signatures.shape[1]
+    filled = signatures != _EMPTY
+    rows, bins = np.nonzero(~filled & filled.any(axis=1, keepdims=True))  # 모든 칸이 빈 행은 그대로
+    densified = signatures.copy()
+    for attempt in range(1, _MAX_DENSIFY_ATTEMPTS + 1):
+        if not len(rows):
+            break
+        source = (_mix(bins.astype(np.uint64) * np.uint64(_MAX_DENSIFY_ATTEMPTS) + np.uint64(attempt))
+                  % np.uint64(num_perm)).astype(np.int64)
+        hit = filled[rows, source]
+        densified[rows[hit], bins[hit]] = signatures[rows[hit], source[hit]]
+        rows, bins = rows[~hit], bins[~hit]
+    return densified
+
+
+def minhash_signatures(texts, num_perm: int = DEFAULT_NUM_PERM, shingle_size: int = DEFAULT_SHINGLE_SIZE,
+                       seed: int = 1) -> np.ndarray:
+    """텍스트별 MinHash 시그니처 (len(texts) x num_perm, uint32).
+
+    shingle마다 num_perm번 해시하는 대신 한 번만 해시하여 칸(해시 mod num_perm)별 최소값을 남기고
+    (one permutation hashing), 빈 칸은 _densify로 채웁니다. 비용이 shingle 수에만 비례합니다.
+    """
+    texts = ["" if t is None else str(t) for t in texts]
+    salt = np.uint64(np.random.default_rng(seed).integers(0, 1 << 63))
+    signatures = np.full((len(texts), num_perm), _EMPTY, dtype=np.uint32)
+    flat = signatures.reshape(-1)
+    for offset in range(0, len(texts), DOCS_PER_BATCH):
+        hashes, docs = shingle_hashes(texts[offset:offset + DOCS_PER_BATCH], shingle_size)
+        hashes = _mix(hashes ^ salt)
+        cells = (docs + offset) * num_perm + (hashes % np.uint64(num_perm)).astype(np.int64)
+        np.minimum.at(flat, cells, (hashes >> np.uint64(32)).astype(np.uint32))
+    return _densify(signatures)
+
+
+def lsh_bands(num_perm: int = DEFAULT_NUM_PERM, threshold: float = DEFAULT_THRESHOLD) -> tuple:
+    """(bands, rows): 후보가 되는 유사도 (1/bands)^(1/rows)가 threshold 이하인 것 중 rows가 가장 큰 조합.
+
+    threshold에서 후보로 잡힐 확률이 높게 유지되면서 (128/0.8 -> 16x8, 약 95%) 비교할 후보 쌍은 줄어듭니다.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows == 0 and (rows / num_perm) ** (1 / rows) <= threshold:
+            best = (num_perm // rows, rows)
+    return best
+
+
+def candidate_pairs(signatures: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """LSH 버킷별 (첫 청크, 나머지 청크) 후보 쌍 (k x 2, 중복 제거됨)."""
+    n = len(signatures)
+    mult = _mix(np.arange(1, rows + 1, dtype=np.uint64))
+    pairs = []
+    for band in range(bands):
+        keys = _mix((signatures[:, band * rows:(band + 1) * rows].astype(np.uint64) * mult).sum(axis=1)
+                    + np.uint64(band))
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        heads = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+        leader = order[np.flatnonzero(heads)[np.cumsum(heads) - 1]]
+        member = leader != order
+        pairs.append(np.stack((leader[member], order[member]), axis=1))
+    if not pairs or n == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def _components(n: int, edges: np.ndarray) -> np.ndarray:
+    """연결 요소별 가장 작은 인덱스 (최소값 전파 + 포인터 점프)."""
+    labels = np.arange(n)
+    if not len(edges):
+        return labels
+    u, v = edges[:, 0], edges[:, 1]
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, u, labels[v])
+        np.minimum.at(labels, v, labels[u])
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def similarity(signatures: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """시그니처 일치 비율로 추정한 Jaccard 유사도."""
+    return (signatures[left] == signatures[right]).mean(axis=1)
+
+
+def _leader_groups(signatures: np.ndarray, components: np.ndarray, threshold: float) -> np.ndarray:
+    """연결 요소 안에서 대표 청크와 직접 유사도가 threshold 이상인 청크만 그 대표에 묶습니다.
+
+    요소의 가장 작은 인덱스가 첫 대표이고, 어느 대표와도 유사하지 않은 청크 중 가장 작은 인덱스가
+    다음 대표가 됩니다. 라운드마다 모든 요소를 한꺼번에 처리합니다.
+    """
+    canonical = np.arange(len(components))
+    leader = components.copy()
+    pending = np.flatnonzero(components != canonical)
+    while len(pending):
+        matched = similarity(signatures, pending, leader[pending]) >= threshold
+        canonical[pending[matched]] = leader[pending[matched]]
+        pending = pending[~matched]
+        if not len(pending):
+            break
+        # 요소별로 남은 청크 중 가장 작은 인덱스가 새 대표 (pending은 오름차순)
+        groups, first = np.unique(components[pending], return_index=True)
+        leader[pending] = pending[first][np.searchsorted(groups, components[pending])]
+        pending = pending[leader[pending] != pending]
+    return canonical
+
+
+def near_duplicate_groups(signatures: np.ndarray, threshold: float = DEFAULT_THRESHOLD,
+                          bands: int = None, rows: int = None) -> np.ndarray:
+    """각 청크가 속한 그룹의 대표 인덱스 (중복이 없으면 자기 자신).
+
+    모든 청크는 대표와의 추정 유사도가 threshold 이상입니다 (_leader_groups).
+    """
+    if bands is None or rows is None:
+        bands, rows = lsh_bands(signatures.shape[1], threshold)
+    pairs = candidate_pairs(signatures, bands, rows)
+    if len(pairs):
+        pairs = pairs[similarity(signatures, pairs[:, 0], pairs[:, 1]) >= threshold]
+    return _leader_groups(signatures, _components(len(signatures), pairs), threshold)
+
+
+def dedup_chunks(chunks: pd.DataFrame, threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM,
+                 shingle_size: int = DEFAULT_SHINGLE_SIZE) -> tuple:
+    """Day 18에서 로드한 청크(CHUNK_ID, DOC_ID, FILE_NAME, CHUNK_TEXT)를 대표 청크만 남깁니다.
+
+    반환값: (대표 청크 데이터프레임, 매핑 데이터프레임 MAP_COLUMNS)
+    매핑에는 대표 청크 자신(SIMILARITY 1.0)을 포함한 모든 청크가 들어 있습니다.
+    """
+    chunks = chunks.sort_values("CHUNK_ID", kind="stable").reset_index(drop=True)
+    signatures = minhash_signatures(chunks["CHUNK_TEXT"].tolist(), num_perm, shingle_size)
+    canonical = near_duplicate_groups(signatures, threshold)
+    mapping = pd.DataFrame({
+        "CHUNK_ID": chunks["CHUNK_ID"].to_numpy(),
+        "CANONICAL_CHUNK_ID": chunks["CHUNK_ID"].to_numpy()[canonical],
+        "DOC_ID": chunks["DOC_ID"].to_numpy(),
+        "FILE_NAME": chunks["FILE_NAME"].to_numpy(),
+        "SIMILARITY": similarity(signatures, np.arange(len(chunks)), canonical)
+    }, columns=MAP_COLUMNS)
+    return chunks[canonical == np.arange(len(chunks))].reset_index(drop=True), mapping
+
+
+def dedup_report(mapping: pd.DataFrame, seconds_per_embedding: float = None) -> dict:
+    """압축률과 임베딩 호출/인덱스 크기/(측정값이 있으면) 임베딩 시간 절감량."""
+    total = len(mapping)
+    unique = int((mapping["CHUNK_ID"] == mapping["CANONICAL_CHUNK_ID"]).sum())
+    report = {
+        'chunks': total,
+        'unique': unique,
+        'duplicates': total - unique,
+        'groups': int(mapping.loc[mapping["CHUNK_ID"] != mapping["CANONICAL_CHUNK_ID"], "CANONICAL_CHUNK_ID"].nunique()),
+        'compression_ratio': total / unique if unique else 1.0,
+        'index_bytes_before': total * EMBEDDING_BYTES,
+        'index_bytes_after': unique * EMBEDDING_BYTES,
+    }
+    if seconds_per_embedding is not None:
+        report['embed_seconds_before'] = total * seconds_per_embedding
+        report['embed_seconds_after'] = unique * seconds_per_embedding
+    return report
+
+
+def save_duplicate_map(session, mapping: pd.DataFrame, table_name: str, database: str, schema: str) -> str:
+    """매핑을 중복 매핑 테이블에 반영합니다 (같은 CHUNK_ID의 이전 행은 교체). 반환값: 테이블 전체 이름."""
+    target = f"{database}.{schema}.{table_name}"
+    session.sql(f"""
+        CREATE TABLE IF NOT EXISTS {target} (
+            CHUNK_ID NUMBER,
+            CANONICAL_CHUNK_ID NUMBER,
+            DOC_ID NUMBER,
+            FILE_NAME VARCHAR,
+            SIMILARITY FLOAT,
+            CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+        )
+    """).collect()
+    staging, failed = stage_rows(session, mapping, table_name, database, schema)
+    if failed:
+        raise RuntimeError(f"중복 매핑 {len(failed)}행 로드 실패: {failed[0]['error']}")
+    session.sql(f"DELETE FROM {target} WHERE CHUNK_ID IN (SELECT CHUNK_ID FROM {staging})").collect()
+    session.sql(f"""
+        INSERT INTO {target} ({", ".join(MAP_COLUMNS)})
+        SELECT {", ".join(MAP_COLUMNS)} FROM {staging}
+    """).collect()
+    session.sql(f"DROP TABLE IF EXISTS {staging}").collect()
+    return target
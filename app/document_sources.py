@@ -0,0 +1,91 @@
+# 문서 입력 소스 (Document Sources)
+#
+# Day 16 추출기에 개별 업로드 외에 ZIP 아카이브와 서버 디렉터리를 입력으로 제공합니다.
+# 아카이브는 디스크에 풀지 않고 멤버를 하나씩 스트리밍하며, 목록 단계에서는 중앙 디렉터리
+# (메타데이터)만 읽으므로 멤버가 수만 개여도 아카이브 전체를 메모리에 올리지 않습니다.
+# 서버 경로는 설정된 루트 디렉터리 아래만 허용합니다 (앱 사용자가 서버의 임의 파일을 읽지 못하도록).
+
+import io
+import os
+import zipfile
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".pdf")
+JUNK_NAMES = (".DS_Store", "Thumbs.db")
+
+
+class DocumentSource(io.BytesIO):
+    """업로드 파일(UploadedFile)처럼 .name과 .size를 가진 메모리 버퍼입니다."""
+
+    def __init__(self, name: str, data: bytes):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+def is_supported(name: str) -> bool:
+    """추출 가능한 문서이고 macOS/Windows 메타데이터 파일이 아니면 True."""
+    parts = name.replace("\\", "/").split("/")
+    if "__MACOSX" in parts:
+        return False
+    base = parts[-1]
+    if not base or base.startswith("._") or base in JUNK_NAMES:
+        return False
+    return base.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def resolve_server_path(path: str, root: str) -> str:
+    """서버 경로를 실제 경로(심볼릭 링크, '..' 해석)로 바꾸고 root 아래에 있는지 확인합니다.
+
+    상대 경로는 root 기준입니다. root를 벗어나면 ValueError.
+    """
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, os.path.expanduser(path)))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"허용된 루트 디렉터리({root}) 밖의 경로입니다")
+    return resolved
+
+
+def zip_members(archive) -> list:
+    """아카이브에서 추출할 멤버의 ZipInfo 목록을 돌려줍니다 (압축은 풀지 않음).
+
+    archive: 경로 또는 읽기/탐색 가능한 파일 객체 (예: ZIP 업로드)
+    """
+    with zipfile.ZipFile(archive) as zf:
+        return [info for info in zf.infolist() if not info.is_dir() and is_supported(info.filename)]
+
+
+def iter_zip_sources(archive, members: list = None):
+    """멤버를 하나씩 압축 해제하여 DocumentSource로 내보내는 제너레이터입니다.
+
+    한 번에 멤버 하나만 메모리에 올라가며, 소비하는 쪽(extract_batch)이 당겨갈 때 읽습니다.
+    """
+    with zipfile.ZipFile(archive) as zf:
+        for info in members if members is not None else zf.infolist():
+            if info.is_dir() or not is_supported(info.filename):
+                continue
+            with zf.open(info) as member:
+                yield DocumentSource(info.filename, member.read())
+
+
+def directory_files(path: str, recursive: bool = True) -> list:
+    """디렉터리에서 추출할 파일의 (상대 경로, 크기) 목록을 돌려줍니다.
+
+    심볼릭 링크로 디렉터리 밖을 가리키는 파일은 건너뜁니다.
+    """
+    base = os.path.realpath(path)
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d != "__MACOSX") if recursive else []
+        for name in sorted(names):
+            full_path = os.path.join(root, name)
+            relative = os.path.relpath(full_path, path).replace(os.sep, "/")
+            if is_supported(relative) and os.path.commonpath([base, os.path.realpath(full_path)]) == base:
+                files.append((relative, os.path.getsize(full_path)))
+    return files
+
+
+def iter_directory_sources(path: str, files: list = None):
+    """디렉터리의 파일을 하나씩 읽어 DocumentSource로 내보내는 제너레이터입니다."""
+    for relative, _ in files if files is not None else directory_files(path):
+        with open(os.path.join(path, relative), "rb") as f:
+            yield DocumentSource(relative, f.read())
@@ -0,0 +1,234 @@
+# Day 18 임베딩 벤치마크 (Embedding Benchmarks)
+#
+#   throughput  행 단위 경로(청크마다 embed_text_768 호출 + INSERT)와 웨어하우스 일괄 경로
+#               (INSERT ... SELECT EMBED_TEXT_768)의 처리량(chunks/sec)
+#   write       벡터 저장: 문자열 리터럴 INSERT(행 단위) vs float32 행렬 일괄 로드 + VECTOR 변환 한 문장
+#   cache       임베딩 캐시: 재실행/편집/반복 질문에서의 적중률과 생략한 임베딩 호출 수 (로컬, 임베딩 호출은 모의)
+# write --local과 cache 외에는 Snowflake 연결이 필요합니다.
+#
+# 사용 예:
+#   python embedding_bench.py throughput --chunks 100 1000 10000 --row-max 200
+#   python embedding_bench.py write --vectors 10000 100000 --row-max 500
+#   python embedding_bench.py write --vectors 10000 100000 --local   # 클라이언트 직렬화 비용만
+#   python embedding_bench.py cache --chunks 10000 --embed-ms 40
+
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from chunking_bench import synthetic_reviews
+from extraction_bench import _snowflake_session
+from server_embedding import embed_in_warehouse, DEFAULT_SLICE_ROWS
+from embedding_cache import EmbeddingCache, CacheStats, LocalEmbeddingStore
+from tokenization import DEFAULT_EMBED_MODEL
+from vector_writer import write_vectors, embedding_matrix, _columns, EMBEDDING_DIM
+
+
+def _chunk_table(session, n_chunks: int, database: str, schema: str) -> str:
+    """리뷰 1개 = 청크 1개인 임시 청크 테이블 (CHUNK_ID, CHUNK_TEXT)."""
+    df = synthetic_reviews(n_chunks, mean_words=120, long_ratio=0, seed=n_chunks)
+    df = df.rename(columns={"DOC_ID": "CHUNK_ID", "EXTRACTED_TEXT": "CHUNK_TEXT"})[["CHUNK_ID", "CHUNK_TEXT"]]
+    session.write_pandas(df, table_name="EMBEDDING_BENCH_CHUNKS", database=database, schema=schema,
+                         auto_create_table=True, overwrite=True, table_type="temporary")
+    return f"{database}.{schema}.EMBEDDING_BENCH_CHUNKS"
+
+
+def _embedding_table(session, database: str, schema: str) -> str:
+    table = f"{database}.{schema}.EMBEDDING_BENCH_VECTORS"
+    session.sql(f"""
+        CREATE OR REPLACE TEMPORARY TABLE {table} (
+            CHUNK_ID NUMBER,
+            EMBEDDING VECTOR(FLOAT, 768),
+            CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+        )
+    """).collect()
+    return table
+
+
+def bench_rows(session, chunk_table: str, embedding_table: str, n_chunks: int, model: str) -> float:
+    """Day 18 행 단위 경로: 청크마다 embed_text_768 한 번 + INSERT 한 번. 반환값: 초."""
+    from snowflake.cortex import embed_text_768
+
+    rows = session.sql(f"SELECT CHUNK_ID, CHUNK_TEXT FROM {chunk_table} ORDER BY CHUNK_ID LIMIT {int(n_chunks)}").collect()
+    start = time.perf_counter()
+    for row in rows:
+        emb = embed_text_768(model, row['CHUNK_TEXT'], session=session)
+        emb_array = "[" + ",".join(str(float(x)) for x in emb) + "]"
+        session.sql(f"""
+            INSERT INTO {embedding_table} (CHUNK_ID, EMBEDDING)
+            SELECT {row['CHUNK_ID']}, {emb_array}::VECTOR(FLOAT, 768)
+        """).collect()
+    return time.perf_counter() - start
+
+
+def bench_throughput(args):
+    session = _snowflake_session(args.connection)
+    print(f"model={args.model} slice_rows={args.slice_rows} (행 단위는 최대 {args.row_max}개 청크로 측정)")
+    print(f"{'chunks':>8} | {'row s':>8} {'row c/s':>8} | {'set s':>8} {'set c/s':>8} {'slices':>6} | {'speedup':>7}")
+    for n_chunks in args.chunks:
+        chunk_table = _chunk_table(session, n_chunks, args.database, args.schema)
+
+        n_rows = min(n_chunks, args.row_max)
+        embedding_table = _embedding_table(session, args.database, args.schema)
+        row_seconds = bench_rows(session, chunk_table, embedding_table, n_rows, args.model)
+        row_rate = n_rows / row_seconds
+
+        embedding_table = _embedding_table(session, args.database, args.schema)
+        result = embed_in_warehouse(session, chunk_table, embedding_table, model=args.model,
+                                    slice_rows=args.slice_rows or None)
+        set_rate = result['embedded'] / result['seconds']
+
+        print(f"{n_chunks:>8,} | {row_seconds:>8.2f} {row_rate:>8.1f} | {result['seconds']:>8.2f} {set_rate:>8.1f} "
+              f"{result['slices']:>6} | {set_rate / row_rate:>6.1f}x")
+    session.sql(f"DROP TABLE IF EXISTS {args.database}.{args.schema}.EMBEDDING_BENCH_VECTORS").collect()
+
+
+def _vector_literal(emb) -> str:
+    """Day 18 이전 방식의 VECTOR 리터럴."""
+    return "[" + ",".join([str(float(x)) for x in list(emb)]) + "]"
+
+
+def _random_embeddings(n_vectors: int, seed: int = 0) -> list:
+    """embed_text_768 결과처럼 파이썬 float 리스트인 정규화된 임베딩."""
+    matrix = np.random.default_rng(seed).standard_normal((n_vectors, EMBEDDING_DIM), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return [{'chunk_id': i + 1, 'embedding': row} for i, row in enumerate(matrix.tolist())]
+
+
+def bench_write(args):
+    print(f"{'vectors':>8} {'path':>8} | {'seconds':>8} {'vec/s':>10} | {'SQL/payload MB':>14}")
+    session = None if args.local else _snowflake_session(args.connection)
+    for n_vectors in args.vectors:
+        embeddings = _random_embeddings(n_vectors, seed=n_vectors)
+
+        # 이전 방식: 벡터마다 리터럴 + INSERT (원격 측정은 row_max개까지만 실행하고 비율로 환산)
+        n_rows = n_vectors if args.local else min(n_vectors, args.row_max)
+        start = time.perf_counter()
+        sql_bytes = 0
+        if session is not None:
+            table = _embedding_table(session, args.database, args.schema)
+        for emb_data in embeddings[:n_rows]:
+            insert_sql = f"""
+            INSERT INTO EMBEDDINGS (CHUNK_ID, EMBEDDING)
+            SELECT {emb_data['chunk_id']}, {_vector_literal(emb_data['embedding'])}::VECTOR(FLOAT, 768)
+            """
+            sql_bytes += len(insert_sql)
+            if session is not None:
+                session.sql(insert_sql.replace("EMBEDDINGS", table)).collect()
+        literal = (time.perf_counter() - start) * n_vectors / n_rows
+        print(f"{n_vectors:>8,} {'literal':>8} | {literal:>8.2f} {n_vectors / literal:>10,.0f} | "
+              f"{sql_bytes * n_vectors / n_rows / 1e6:>14.1f}{'' if n_rows == n_vectors else f'  ({n_rows:,}개로 환산)'}")
+
+        # 일괄 방식: float32 행렬 -> (스테이징 Parquet 일괄 로드 -> VECTOR 변환 한 문장)
+        start = time.perf_counter()
+        matrix = embedding_matrix(embeddings)
+        chunk_ids = [e['chunk_id'] for e in embeddings]
+        if session is None:
+            frame = pd.DataFrame(matrix, columns=_columns(EMBEDDING_DIM), copy=False)
+            frame.insert(0, "CHUNK_ID", chunk_ids)
+        else:
+            table = _embedding_table(session, args.database, args.schema)
+            write_vectors(session, chunk_ids, matrix, table.split(".")[-1], args.database, args.schema)
+        bulk = time.perf_counter() - start
+        print(f"{n_vectors:>8,} {'bulk':>8} | {bulk:>8.2f} {n_vectors / bulk:>10,.0f} | "
+              f"{matrix.nbytes / 1e6:>14.1f}")
+    if session is not None:
+        session.sql(f"DROP TABLE IF EXISTS {args.database}.{args.schema}.EMBEDDING_BENCH_VECTORS").collect()
+
+
+def _mock_embed(model: str, text: str) -> np.ndarray:
+    """텍스트 해시로 정해지는 가짜 임베딩 (호출 비용은 --embed-ms로 따로 환산)."""
+    seed = int.from_bytes(hashlib.sha256(f"{model}|{text}".encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(EMBEDDING_DIM, dtype=np.float32)
+
+
+def bench_cache(args):
+    print(f"embed_ms={args.embed_ms} (모의 임베딩 호출 1회당 비용, 예상 시간 = 캐시 오버헤드 + 호출 수 × embed_ms)")
+    print(f"{'run':>22} {'texts':>8} | {'hit %':>6} {'memory':>8} {'store':>8} {'avoided':>8} {'calls':>8} | "
+          f"{'overhead s':>10} {'est. s':>8}")
+    rng = random.Random(args.seed)
+    reviews = synthetic_reviews(args.chunks, mean_words=60, long_ratio=0.0, seed=args.seed)
+    texts = [f"{text} (리뷰 {i})" for i, text in enumerate(reviews['EXTRACTED_TEXT'])]  # 합성 리뷰끼리 겹치지 않게
+    # 여러 파일에 같은 리뷰가 올라온 경우 (공백만 다른 사본 포함)
+    for i in rng.sample(range(len(texts)), int(len(texts) * args.duplicate_ratio)):
+        texts[i] = "  " + texts[rng.randrange(len(texts))].replace(" ", "  ") + "\n"
+    edited = [t + " (수정됨)" if rng.random() < args.edit_ratio else t for t in texts]
+    distinct_queries = [f"{w} 제품 품질은 어떤가요?" for w in texts[0].split()[:args.distinct_queries]]
+    queries = [distinct_queries[min(int(rng.paretovariate(1.2)) - 1, len(distinct_queries) - 1)]
+               for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store_path = os.path.join(directory, "embeddings.sqlite")
+        cache = EmbeddingCache(LocalEmbeddingStore(store_path), max_entries=args.max_entries)
+        runs = [("1 cold", cache, texts),
+                ("2 rerun (same process)", cache, texts),
+                ("3 rerun (new process)", EmbeddingCache(LocalEmbeddingStore(store_path), max_entries=args.max_entries), texts),
+                (f"4 {args.edit_ratio:.0%} edited", cache, edited),
+                ("5 repeated queries", EmbeddingCache(max_entries=args.max_entries), queries)]
+        for name, run_cache, run_texts in runs:
+            run_stats = CacheStats()
+            calls = 0
+
+            def embed(model, text):
+                nonlocal calls
+                calls += 1
+                return _mock_embed(model, text)
+
+            start = time.perf_counter()
+            for i in range(0, len(run_texts), args.batch_size):
+                run_cache.embed_texts(run_texts[i:i + args.batch_size], DEFAULT_EMBED_MODEL, embed_fn=embed, stats=run_stats)
+            overhead = time.perf_counter() - start
+            stats = run_stats.as_dict()
+            print(f"{name:>22} {len(run_texts):>8,} | {stats['hit_ratio']:>6.1%} {stats['memory_hits']:>8,} "
+                  f"{stats['store_hits']:>8,} {stats['avoided']:>8,} {calls:>8,} | "
+                  f"{overhead:>10.2f} {overhead + calls * args.embed_ms / 1000:>8.1f}")
+        print(f"no cache: {len(texts):,} calls, est. {len(texts) * args.embed_ms / 1000:,.1f} s per run")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day 18 임베딩 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("throughput", help="행 단위 embed_text_768 + INSERT vs INSERT ... SELECT EMBED_TEXT_768")
+    p.add_argument("--chunks", type=int, nargs="+", default=[100, 1_000, 10_000])
+    p.add_argument("--row-max", type=int, default=200, help="행 단위 경로로 측정할 최대 청크 수")
+    p.add_argument("--slice-rows", type=int, default=DEFAULT_SLICE_ROWS, help="0이면 한 문장으로 실행")
+    p.add_argument("--model", default=DEFAULT_EMBED_MODEL)
+    p.add_argument("--database", default="RAG_DB")
+    p.add_argument("--schema", default="RAG_SCHEMA")
+    p.add_argument("--connection", help="secrets.toml 경로")
+    p.set_defaults(func=bench_throughput)
+
+    p = sub.add_parser("write", help="벡터 저장: 문자열 리터럴 INSERT vs float32 일괄 로드 + VECTOR 변환")
+    p.add_argument("--vectors", type=int, nargs="+", default=[10_000, 100_000])
+    p.add_argument("--row-max", type=int, default=500, help="리터럴 INSERT로 실제 실행할 최대 벡터 수")
+    p.add_argument("--local", action="store_true", help="Snowflake 없이 클라이언트 직렬화 비용만 측정")
+    p.add_argument("--database", default="RAG_DB")
+    p.add_argument("--schema", default="RAG_SCHEMA")
+    p.add_argument("--connection", help="secrets.toml 경로")
+    p.set_defaults(func=bench_write)
+
+    p = sub.add_parser("cache", help="임베딩 캐시 적중률과 생략한 임베딩 호출 수 (로컬, 모의 임베딩)")
+    p.add_argument("--chunks", type=int, default=10_000)
+    p.add_argument("--duplicate-ratio", type=float, default=0.1, help="다른 청크와 텍스트가 같은 청크 비율")
+    p.add_argument("--edit-ratio", type=float, default=0.05, help="4번째 실행에서 텍스트가 바뀐 청크 비율")
+    p.add_argument("--queries", type=int, default=2_000)
+    p.add_argument("--distinct-queries", type=int, default=50)
+    p.add_argument("--batch-size", type=int, default=100)
+    p.add_argument("--max-entries", type=int, default=20_000)
+    p.add_argument("--embed-ms", type=float, default=40.0)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=bench_cache)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
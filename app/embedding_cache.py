@@ -0,0 +1,296 @@
+# 임베딩 캐시 (Content-addressed Embedding Cache)
+#
+# Day 18을 다시 실행하면 텍스트가 바뀌지 않은 청크도 모두 다시 임베딩하고, 같은 질문을 반복해서 검색하거나
+# 여러 테이블에 같은 청크가 있을 때도 같은 텍스트를 매번 임베딩합니다.
+# 여기서는 (임베딩 모델, 정규화한 텍스트의 SHA-256)을 키로 임베딩을 두 단계로 캐시합니다.
+#   1) 프로세스 메모리 LRU: float32 배열, 최대 max_entries개
+#   2) 영구 저장소: 로컬 SQLite 파일(LocalEmbeddingStore) 또는 Snowflake 테이블(SnowflakeEmbeddingStore)
+# 조회는 메모리 -> 저장소 순서로 하고, 저장소에서 찾은 임베딩은 메모리에도 올립니다.
+# 내용(텍스트)으로 키를 만들기 때문에 CHUNK_ID나 테이블이 달라도 같은 텍스트면 적중합니다.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from tokenization import DEFAULT_EMBED_MODEL
+from vector_writer import write_vectors, EMBEDDING_DIM
+
+DEFAULT_MAX_ENTRIES = 20000     # 메모리 LRU 최대 항목 수 (768차원 float32 기준 약 60 MB)
+DEFAULT_STORE_PATH = ".embedding_cache/embeddings.sqlite"
+DEFAULT_CACHE_TABLE = "EMBEDDING_CACHE"
+LOOKUP_BATCH = 1000             # 저장소 조회 한 번에 묻는 키 수
+
+
+def normalize_text(text) -> str:
+    """캐시 키용 정규화: 유니코드 NFC, 앞뒤 공백 제거, 연속 공백을 하나로."""
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+
+def cache_key(model: str, text) -> str:
+    """(모델, 정규화한 텍스트의 SHA-256) 캐시 키 '모델:해시'."""
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+def cortex_embed(model: str, text: str) -> list:
+    """Cortex embed_text_768 한 번 호출 (캐시 미스일 때 embed_fn으로 사용)."""
+    from snowflake.cortex import embed_text_768
+    return embed_text_768(model=model, text=text)
+
+
+class LocalEmbeddingStore:
+    """로컬 SQLite 파일에 (키, float32 바이트)로 임베딩을 저장합니다.
+
+    여러 Streamlit 세션이 같은 인스턴스를 공유해도 되도록 연결 하나를 잠금으로 보호합니다.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (cache_key TEXT PRIMARY KEY, vector BLOB)")
+        self._conn.commit()
+
+    def get_many(self, keys: list) -> dict:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH):
+                part = keys[start:start + LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT cache_key, vector FROM embeddings WHERE cache_key IN ({','.join('?' * len(part))})",
+                    part).fetchall()
+                found.update((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+        return found
+
+    def put_many(self, keys: list, matrix: np.ndarray):
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                                   [(key, np.asarray(vector, dtype=np.float32).tobytes())
+                                    for key, vector in zip(keys, matrix)])
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+
+
+class SnowflakeEmbeddingStore:
+    """Snowflake 테이블 (CACHE_KEY, EMBEDDING VECTOR)에 임베딩을 저장합니다.
+
+    쓰기는 vector_writer.write_vectors(스테이징 일괄 로드 + VECTOR 변환 한 문장)를 사용합니다.
+    테이블은 처음 저장할 때 만듭니다 (저장소를 고르기만 해서는 DDL을 실행하지 않음).
+    """
+
+    def __init__(self, session, table_name: str = DEFAULT_CACHE_TABLE, database: str = "RAG_DB",
+                 schema: str = "RAG_SCHEMA"):
+        self.session = session
+        self.table_name = table_name
+        self.database = database
+        self.schema = schema
+        self.table = f"{database}.{schema}.{table_name}"
+        self._exists = False
+
+    def _table_exists(self) -> bool:
+        """테이블이 있는지 읽기 쿼리로 확인합니다 (한 번 확인되면 다시 묻지 않음)."""
+        if not self._exists:
+            try:
+                self.session.sql(f"SELECT 1 FROM {self.table} LIMIT 0").collect()
+                self._exists = True
+            except Exception:
+                pass
+        return self._exists
+
+    def _ensure_table(self):
+        if not self._exists:
+            self.session.sql(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    CACHE_KEY VARCHAR,
+                    EMBEDDING VECTOR(FLOAT, {EMBEDDING_DIM}),
+                    CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+                )
+            """).collect()
+            self._exists = True
+
+    def get_many(self, keys: list) -> dict:
+        if not self._table_exists():
+            return {}
+        found = {}
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            part = keys[start:start + LOOKUP_BATCH]
+            rows = self.session.sql(
+                f"SELECT CACHE_KEY, EMBEDDING FROM {self.table} WHERE CACHE_KEY IN ({','.join('?' * len(part))})",
+                params=part).collect()
+            found.update((row['CACHE_KEY'], np.asarray(row['EMBEDDING'], dtype=np.float32)) for row in rows)
+        return found
+
+    def put_many(self, keys: list, matrix: np.ndarray):
+        self._ensure_table()
+        write_vectors(self.session, keys, matrix, self.table_name, self.database, self.schema,
+                      key_column="CACHE_KEY")
+
+    def size(self) -> int:
+        if not self._table_exists():
+            return 0
+        return self.session.sql(f"SELECT COUNT(*) FROM {self.table}").collect()[0][0]
+
+    def clear(self):
+        if self._table_exists():
+            self.session.sql(f"TRUNCATE TABLE {self.table}").collect()
+
+
+class CacheStats:
+    """캐시 적중/미스 집계입니다.
+
+    캐시는 st.cache_resource로 여러 세션이 공유하므로, 실행마다 새 CacheStats를 만들어
+    lookup/embed_texts에 넘기면 다른 사용자의 조회와 섞이지 않은 그 실행만의 통계를 얻습니다.
+    """
+
+    def __init__(self):
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def as_dict(self) -> dict:
+        """{'lookups', 'memory_hits', 'store_hits', 'misses', 'hit_ratio', 'avoided'} - avoided는 생략한 임베딩 호출 수."""
+        hits = self.memory_hits + self.store_hits
+        lookups = hits + self.misses
+        return {
+            'lookups': lookups,
+            'memory_hits': self.memory_hits,
+            'store_hits': self.store_hits,
+            'misses': self.misses,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+            'avoided': hits
+        }
+
+
+class EmbeddingCache:
+    """메모리 LRU + 영구 저장소(선택) 2단계 임베딩 캐시입니다.
+
+    stats()는 캐시를 만든 뒤(또는 reset_stats() 이후) 모든 호출의 누적 통계입니다.
+    실행별 통계는 lookup/embed_texts에 stats=CacheStats()를 넘겨 받습니다.
+    """
+
+    def __init__(self, store=None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.store = store
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.totals = CacheStats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.totals = CacheStats()
+
+    def stats(self) -> dict:
+        """누적 통계 (CacheStats.as_dict 형식)."""
+        return self.totals.as_dict()
+
+    def _count(self, stats: CacheStats = None, memory_hits: int = 0, store_hits: int = 0, misses: int = 0):
+        """누적 통계와 (주어지면) 호출자의 실행별 통계에 더합니다."""
+        with self._lock:
+            for target in (self.totals, stats):
+                if target is not None:
+                    target.memory_hits += memory_hits
+                    target.store_hits += store_hits
+                    target.misses += misses
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def lookup(self, texts, model: str = DEFAULT_EMBED_MODEL, stats: CacheStats = None) -> dict:
+        """캐시된 임베딩 {texts의 위치: float32 벡터}. 없는 위치는 빠지며 미스로 집계됩니다."""
+        keys = [cache_key(model, text) for text in texts]
+        found, missing = {}, []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is None:
+                    missing.append(i)
+                else:
+                    self._memory.move_to_end(key)
+                    found[i] = vector
+        memory_hits = len(found)
+
+        if missing and self.store is not None:
+            stored = self.store.get_many(list({keys[i] for i in missing}))
+            for i in missing:
+                vector = stored.get(keys[i])
+                if vector is not None:
+                    found[i] = vector
+                    self._remember(keys[i], vector)
+        self._count(stats, memory_hits=memory_hits, store_hits=len(found) - memory_hits,
+                    misses=len(keys) - len(found))
+        return found
+
+    def store_embeddings(self, texts, embeddings, model: str = DEFAULT_EMBED_MODEL):
+        """새로 만든 임베딩을 메모리와 저장소에 저장합니다."""
+        if not len(texts):
+            return
+        keys = [cache_key(model, text) for text in texts]
+        matrix = np.array([np.asarray(e, dtype=np.float32) for e in embeddings], dtype=np.float32)
+        for key, vector in zip(keys, matrix):
+            self._remember(key, vector)
+        if self.store is not None:
+            unique = dict(zip(keys, range(len(keys))))  # 같은 키는 마지막 것 하나만
+            self.store.put_many(list(unique), matrix[list(unique.values())])
+
+    def embed_texts(self, texts, model: str = DEFAULT_EMBED_MODEL, embed_fn=cortex_embed,
+                    stats: CacheStats = None) -> np.ndarray:
+        """texts의 임베딩 (n, 768) float32 행렬. 캐시에 없는 텍스트만 embed_fn(model, text)로 만듭니다.
+
+        같은 호출 안에서 반복되는 텍스트는 한 번만 임베딩하고 나머지는 적중으로 집계합니다.
+        질문 임베딩처럼 앱에서 직접 임베딩하는 곳은 모두 이 함수를 거칩니다.
+        """
+        texts = list(texts)
+        matrix = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        found = self.lookup(texts, model, stats)
+        for i, vector in found.items():
+            matrix[i] = vector
+
+        first = {}  # 키 -> 처음 나온 위치
+        repeats = []
+        for i in range(len(texts)):
+            if i not in found:
+                key = cache_key(model, texts[i])
+                if key in first:
+                    repeats.append((i, first[key]))
+                else:
+                    first[key] = i
+        if repeats:  # 같은 호출 안의 반복 텍스트는 임베딩하지 않음 (미스 -> 적중으로 정정)
+            self._count(stats, memory_hits=len(repeats), misses=-len(repeats))
+
+        fresh = list(first.values())
+        for i in fresh:
+            matrix[i] = np.asarray(embed_fn(model, texts[i]), dtype=np.float32)
+        self.store_embeddings([texts[i] for i in fresh], matrix[fresh], model)
+        for i, source in repeats:
+            matrix[i] = matrix[source]
+        return matrix
+
+    def memory_size(self) -> int:
+        return len(self._memory)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.store is not None:
+            self.store.clear()
+        self.reset_stats()
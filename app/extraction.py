@@ -0,0 +1,412 @@
+# 문서 텍스트 추출 엔진 (Document Text Extraction Engine)
+#
+# Day 16의 배치 추출기에서 사용합니다. 파일(또는 큰 PDF의 페이지 범위)을 워커 프로세스로
+# 분산하고, 완료되는 순서대로 결과를 돌려줍니다. 파일별 오류는 해당 파일의 결과에만 기록됩니다.
+#
+# PDF 추출기는 교체할 수 있습니다 (PDF_BACKENDS). "auto"는 문서 첫 페이지로 프로필
+# (text-heavy / layout-heavy / scanned)을 판단하고, 벤치마크가 만든 정책 파일에서
+# 해당 프로필의 가장 빠른 허용 백엔드를 고릅니다 (python extraction_bench.py backends --write-policy).
+
+import contextlib
+import hashlib
+import importlib.metadata
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from pypdf import PdfReader
+
+LARGE_PDF_BYTES = 5 * 1024 * 1024  # 이보다 큰 PDF는 페이지 수를 확인하여 분할 여부 결정
+PAGES_PER_TASK = 100               # 분할 시 작업당 페이지 수
+RELEASE_EVERY = 50                 # 페이지 스트리밍 시 pypdf 객체 캐시를 비우는 간격
+DEFAULT_BACKEND = "pypdf"
+POLICY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".extraction_policy.json")
+DEFAULT_POLICY = {"text-heavy": "pypdf", "layout-heavy": "pypdf-layout", "scanned": "pypdf"}
+LAYOUT_OPS_PER_100_CHARS = 1.0     # 이보다 절대 위치 지정(Td/TD/Tm)이 잦으면 layout-heavy (표, 다단)
+SCANNED_CHARS_PER_PAGE = 20        # 이보다 텍스트가 적으면 scanned (이미지 위주)
+
+
+def file_type(name: str) -> str:
+    """확장자로 파일 유형을 결정합니다."""
+    lower = name.lower()
+    if lower.endswith('.txt'):
+        return "TXT"
+    if lower.endswith('.md'):
+        return "Markdown"
+    if lower.endswith('.pdf'):
+        return "PDF"
+    return "Unknown"
+
+
+def content_hash(source, block_size: int = 1 << 20) -> str:
+    """업로드 버퍼의 SHA-256을 복사 없이 블록 단위로 계산합니다."""
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray)):
+        digest.update(source)
+    elif hasattr(source, "getbuffer"):
+        with source.getbuffer() as view:
+            for start in range(0, len(view), block_size):
+                digest.update(view[start:start + block_size])
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(block_size), b""):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def _pypdf_pages(stream, page_range: tuple = None, release_every: int = RELEASE_EVERY, **extract_kwargs):
+    pdf_reader = PdfReader(stream)
+    pages = pdf_reader.pages
+    start, end = page_range or (0, len(pages))
+    for page_number in range(start, end):
+        yield page_number + 1, pages[page_number].extract_text(**extract_kwargs) or ""
+        if release_every and (page_number - start + 1) % release_every == 0:
+            pdf_reader.resolved_objects.clear()
+
+
+def _pypdf_layout_pages(stream, page_range: tuple = None, release_every: int = RELEASE_EVERY):
+    """pypdf 레이아웃 모드: 글자 위치를 따라 공백을 채워 표/다단의 열 순서를 유지합니다 (더 느림)."""
+    return _pypdf_pages(stream, page_range, release_every, extraction_mode="layout")
+
+
+def _pdfminer_pages(stream, page_range: tuple = None, release_every: int = RELEASE_EVERY):
+    """pdfminer.six 레이아웃 분석 (선택 설치). 페이지를 하나씩 분석하므로 메모리는 페이지 단위입니다."""
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    page_numbers = range(*page_range) if page_range else None
+    first = page_range[0] if page_range else 0
+    for offset, layout in enumerate(extract_pages(stream, page_numbers=page_numbers)):
+        text = "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+        yield first + offset + 1, text
+
+
+# 이름 -> (페이지 제너레이터, 배포 패키지 이름)
+PDF_BACKENDS = {
+    "pypdf": (_pypdf_pages, "pypdf"),
+    "pypdf-layout": (_pypdf_layout_pages, "pypdf"),
+    "pdfminer": (_pdfminer_pages, "pdfminer.six"),
+}
+
+
+def available_backends() -> list:
+    """설치된 패키지로 사용할 수 있는 PDF 백엔드 이름 목록입니다."""
+    return [name for name, (_, package) in PDF_BACKENDS.items()
+            if importlib.util.find_spec(package.split(".")[0]) is not None]
+
+
+def backend_version(name: str) -> str:
+    try:
+        return importlib.metadata.version(PDF_BACKENDS[name][1])
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def load_policy(path: str = POLICY_FILE) -> dict:
+    """프로필 -> 백엔드 정책을 읽습니다. 파일이 없거나 백엔드가 설치되지 않았으면 기본값을 사용합니다."""
+    policy = dict(DEFAULT_POLICY)
+    try:
+        with open(path, encoding="utf-8") as f:
+            policy.update(json.load(f)["profiles"])
+    except (OSError, ValueError, KeyError):
+        pass
+    available = available_backends()
+    return {profile: backend if backend in available else DEFAULT_BACKEND
+            for profile, backend in policy.items()}
+
+
+def extractor_key(backend: str = DEFAULT_BACKEND, policy: dict = None) -> str:
+    """추출 캐시 키에 들어가는 백엔드/버전 문자열입니다 (auto는 정책 내용까지 포함)."""
+    if backend == "auto":
+        resolved = policy or load_policy()
+        versions = sorted({f"{b}-{backend_version(b)}" for b in resolved.values()})
+        digest = hashlib.sha256(json.dumps([resolved, versions], sort_keys=True).encode()).hexdigest()[:12]
+        return f"auto-{digest}"
+    return f"{backend}-{backend_version(backend)}"
+
+
+_POSITION_OPS = re.compile(rb"\b(?:Td|TD|Tm)\b")
+
+
+def pdf_profile(stream, sample_pages: int = 2, first_page: int = 0) -> str:
+    """앞 페이지 몇 장으로 문서 프로필을 판단합니다: 'text-heavy', 'layout-heavy', 'scanned'."""
+    pdf_reader = PdfReader(stream)
+    pages = pdf_reader.pages
+    sample = range(first_page, min(first_page + sample_pages, len(pages)))
+    chars = 0
+    position_ops = 0
+    for page_number in sample:
+        page = pages[page_number]
+        chars += len((page.extract_text() or "").strip())
+        contents = page.get_contents()
+        if contents is not None:
+            position_ops += len(_POSITION_OPS.findall(contents.get_data()))
+    if chars < SCANNED_CHARS_PER_PAGE * max(len(sample), 1):
+        return "scanned"
+    if position_ops * 100 / chars > LAYOUT_OPS_PER_100_CHARS:
+        return "layout-heavy"
+    return "text-heavy"
+
+
+def iter_pdf_pages(stream, page_range: tuple = None, release_every: int = RELEASE_EVERY,
+                   backend: str = DEFAULT_BACKEND):
+    """PDF의 페이지를 하나씩 읽어 (page_number, text)를 내보내는 제너레이터입니다.
+
+    stream: 업로드 버퍼 등 파일 형식 객체. 복사하지 않고 그대로 PdfReader에 넘깁니다.
+    release_every: 이 페이지 수마다 pypdf의 파싱된 객체 캐시를 비워 메모리가 페이지 수에
+                   비례해 늘어나지 않게 합니다 (비운 객체는 필요할 때 스트림에서 다시 읽힘).
+    backend: PDF_BACKENDS의 이름
+    """
+    pages_fn, _ = PDF_BACKENDS[backend]
+    return pages_fn(stream, page_range, release_every)
+
+
+def collect_pages(page_iter, separator: str = "\n\n") -> dict:
+    """페이지 레코드를 모아 오프셋과 단어/문자 수를 누적 계산하고, 마지막에 한 번만 합칩니다.
+
+    반환값의 'pages'는 (page_number, start, end) 목록으로, 합쳐진 텍스트에서 각 페이지의 위치입니다.
+    """
+    parts = []
+    pages = []
+    offset = 0
+    word_count = 0
+    for page_number, page_text in page_iter:
+        if not page_text:
+            continue
+        parts.append(page_text)
+        parts.append(separator)
+        pages.append((page_number, offset, offset + len(page_text)))
+        offset += len(page_text) + len(separator)
+        word_count += len(page_text.split())
+    return {"text": "".join(parts), "pages": pages, "word_count": word_count}
+
+
+def extract_text(name: str, data, page_range: tuple = None, backend: str = DEFAULT_BACKEND,
+                 policy: dict = None) -> dict:
+    """바이트 또는 파일 형식 객체에서 텍스트를 추출합니다.
+
+    page_range=(start, end)와 backend는 PDF에만 적용됩니다. backend="auto"이면 policy
+    (없으면 load_policy())에 따라 문서 프로필별 백엔드를 고릅니다.
+    반환값: {'text', 'pages', 'word_count', 'extractor'}
+    """
+    kind = file_type(name)
+    if kind in ("TXT", "Markdown"):
+        raw = data if isinstance(data, (bytes, bytearray)) else data.read()
+        text = raw.decode("utf-8")
+        return {"text": text, "pages": [], "word_count": len(text.split()), "extractor": "text"}
+    if kind != "PDF":
+        raise ValueError(f"지원하지 않는 파일 형식: {name}")
+
+    stream = io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data
+    if backend == "auto":
+        start = stream.tell()
+        profile = pdf_profile(stream, first_page=page_range[0] if page_range else 0)
+        stream.seek(start)
+        backend = (policy or load_policy()).get(profile, DEFAULT_BACKEND)
+    extracted = collect_pages(iter_pdf_pages(stream, page_range, backend=backend))
+    extracted["extractor"] = backend
+    return extracted
+
+
+def _extract_task(task_id: int, name: str, data, page_range: tuple, backend: str = DEFAULT_BACKEND,
+                  policy: dict = None):
+    """워커 프로세스에서 실행되는 작업입니다. 예외는 문자열로 돌려줍니다."""
+    try:
+        return task_id, extract_text(name, data, page_range, backend, policy), None
+    except Exception as e:
+        return task_id, None, f"{type(e).__name__}: {e}"
+
+
+def _extract_file_task(task_id: int, name: str, path: str, page_range: tuple, backend: str = DEFAULT_BACKEND,
+                       policy: dict = None):
+    """분할된 큰 PDF의 작업입니다. 바이트 대신 임시 파일 경로를 받아 해당 페이지 범위만 읽습니다."""
+    try:
+        with open(path, "rb") as f:
+            return task_id, extract_text(name, f, page_range, backend, policy), None
+    except Exception as e:
+        return task_id, None, f"{type(e).__name__}: {e}"
+
+
+def _spill(data: bytes) -> str:
+    """바이트를 임시 파일에 한 번 쓰고 경로를 돌려줍니다."""
+    with tempfile.NamedTemporaryFile(prefix="extract-", suffix=".pdf", delete=False) as f:
+        f.write(data)
+    return f.name
+
+
+def _remove(path: str):
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _pdf_page_count(data: bytes) -> int:
+    return len(PdfReader(io.BytesIO(data)).pages)
+
+
+def _plan_tasks(name: str, data: bytes, pages_per_task: int) -> list:
+    """파일을 하나 이상의 (page_range) 작업으로 나눕니다."""
+    if file_type(name) == "PDF" and len(data) >= LARGE_PDF_BYTES:
+        try:
+            n_pages = _pdf_page_count(data)
+        except Exception:
+            return [None]  # 오류는 워커에서 다시 보고됨
+        if n_pages > pages_per_task:
+            return [(start, min(start + pages_per_task, n_pages))
+                    for start in range(0, n_pages, pages_per_task)]
+    return [None]
+
+
+def _result(name: str, size: int, digest: str, extracted: dict = None, error: str = None,
+            cached: bool = False) -> dict:
+    text = extracted["text"] if extracted else ""
+    result = {
+        'file_name': name,
+        'file_type': file_type(name),
+        'file_size': size,
+        'content_hash': digest,
+        'cached': cached,
+        'extractor': extracted.get("extractor") if extracted else None,
+        'extracted_text': text,
+        'page_offsets': extracted["pages"] if extracted else [],
+        'word_count': 0,
+        'char_count': 0,
+        'error': error
+    }
+    if text and text.strip():
+        result['word_count'] = extracted["word_count"]
+        result['char_count'] = len(text)
+    elif error is None:
+        result['error'] = "텍스트가 추출되지 않음"
+    return result
+
+
+def _merge_parts(parts: list) -> dict:
+    """페이지 범위별 결과를 순서대로 합치고 페이지 오프셋을 전체 기준으로 옮깁니다."""
+    if len(parts) == 1:
+        return parts[0]
+    pages = []
+    offset = 0
+    for part in parts:
+        pages.extend((number, start + offset, end + offset) for number, start, end in part["pages"])
+        offset += len(part["text"])
+    return {
+        "text": "".join(part["text"] for part in parts),
+        "pages": pages,
+        "word_count": sum(part["word_count"] for part in parts),
+        "extractor": "+".join(dict.fromkeys(part.get("extractor") or "" for part in parts))
+    }
+
+
+@contextlib.contextmanager
+def _cleanup(files: dict):
+    """배치가 중단되어도 (예: 제너레이터를 끝까지 읽지 않음) 남은 임시 파일을 지웁니다."""
+    try:
+        yield
+    finally:
+        for entry in files.values():
+            _remove(entry["path"])
+
+
+def extract_batch(sources, max_workers: int = None, pages_per_task: int = PAGES_PER_TASK,
+                  known_hashes: dict = None, cache=None, backend: str = DEFAULT_BACKEND):
+    """여러 문서에서 텍스트를 추출하고, 완료되는 순서대로 결과 딕셔너리를 내보냅니다.
+
+    sources: .name, .size, .read()를 가진 객체들 (예: st.file_uploader의 UploadedFile)
+    max_workers: 워커 프로세스 수 (1이면 현재 프로세스에서 순차 처리)
+    known_hashes: {파일 이름: 해시} - 이미 계산한 content_hash가 있으면 다시 계산하지 않음
+    cache: ExtractionCache - 적중하면 파싱을 건너뛰고 결과의 'cached'가 True가 됨
+    backend: PDF 백엔드 이름 또는 "auto" (결과의 'extractor'에 실제 사용한 백엔드가 기록됨)
+
+    결과에는 'error' 키가 있으며, 실패한 파일은 다른 파일의 처리에 영향을 주지 않습니다.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    known_hashes = {} if known_hashes is None else known_hashes  # 호출자가 채워 가는 dict일 수 있음
+    policy = load_policy() if backend == "auto" else None
+    key = extractor_key(backend, policy)
+
+    if max_workers <= 1:
+        # 현재 프로세스: 업로드 버퍼를 복사하지 않고 그대로 읽음
+        for source in sources:
+            digest = known_hashes.get(source.name) or content_hash(source)
+            cached = cache.get(digest, key) if cache else None
+            if cached:
+                yield _result(source.name, source.size, digest, cached, cached=True)
+                continue
+            source.seek(0)
+            _, extracted, error = _extract_task(0, source.name, source, None, backend, policy)
+            if cache and extracted and error is None:
+                cache.put(digest, key, extracted)
+            yield _result(source.name, source.size, digest, extracted, error)
+        return
+
+    # spawn 컨텍스트: Streamlit 서버 프로세스(다중 스레드)를 fork하지 않기 위함
+    context = multiprocessing.get_context("spawn")
+    max_in_flight = max_workers * 2  # 한 번에 메모리에 올리는 작업 수 제한
+
+    files = {}    # file_id -> {name, size, parts, remaining, path}
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool, _cleanup(files):
+        pending = {}  # future -> (file_id, part_index)
+        source_iter = iter(enumerate(sources))
+        exhausted = False
+
+        while pending or not exhausted:
+            # 작업 큐 채우기
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    file_id, source = next(source_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                # 캐시 적중: 바이트를 복사하거나 워커에 보내지 않고 바로 결과 반환
+                digest = known_hashes.get(source.name) or content_hash(source)
+                cached = cache.get(digest, key) if cache else None
+                if cached:
+                    yield _result(source.name, source.size, digest, cached, cached=True)
+                    continue
+                # 프로세스 간 전달에는 바이트가 필요 (버퍼가 있으면 getvalue()로 한 번만 복사)
+                source.seek(0)
+                data = source.getvalue() if hasattr(source, "getvalue") else source.read()
+                ranges = _plan_tasks(source.name, data, pages_per_task)
+                # 여러 범위로 나눈 PDF는 임시 파일에 한 번만 쓰고 작업마다 경로만 보냄 (바이트를 N번 피클링하지 않음)
+                path = _spill(data) if len(ranges) > 1 else None
+                files[file_id] = {"name": source.name, "size": len(data), "hash": digest, "path": path,
+                                  "parts": [None] * len(ranges), "remaining": len(ranges), "error": None}
+                for part_index, page_range in enumerate(ranges):
+                    if path:
+                        future = pool.submit(_extract_file_task, file_id, source.name, path, page_range,
+                                             backend, policy)
+                    else:
+                        future = pool.submit(_extract_task, file_id, source.name, data, page_range, backend, policy)
+                    pending[future] = (file_id, part_index)
+                del data
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_id, part_index = pending.pop(future)
+                entry = files[file_id]
+                try:
+                    _, extracted, error = future.result()
+                except Exception as e:  # 워커 프로세스 자체가 실패한 경우
+                    extracted, error = None, f"{type(e).__name__}: {e}"
+                entry["parts"][part_index] = extracted
+                entry["error"] = entry["error"] or error
+                entry["remaining"] -= 1
+
+                if entry["remaining"] == 0:
+                    del files[file_id]
+                    _remove(entry["path"])
+                    merged = _merge_parts(entry["parts"]) if entry["error"] is None else None
+                    if cache and merged:
+                        cache.put(entry["hash"], key, merged)
+                    yield _result(entry["name"], entry["size"], entry["hash"], merged, entry["error"])
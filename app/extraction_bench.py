@@ -0,0 +1,414 @@
+# Day 16 추출 벤치마크 (Extraction Benchmarks)
+#
+# 합성 PDF 코퍼스를 만들어 추출 엔진의 성능을 측정합니다.
+#
+# 사용 예:
+#   python extraction_bench.py workers --files 48 --pages 40
+#   python extraction_bench.py server --files 10 50 --pages 10 100   # Snowflake 연결 필요
+#   python extraction_bench.py backends --corpus ../assets --write-policy
+
+import argparse
+import io
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tomllib
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+from extraction import (extract_batch, extract_text, available_backends, backend_version,
+                        pdf_profile, POLICY_FILE, DEFAULT_POLICY)
+
+WORDS = ("powder snow thermal gloves waterproof jacket warm durable binding "
+         "helmet goggles lightweight comfortable zipper seam insulated boots").split()
+
+
+def _synthetic_line(page: int, line: int, lines_per_page: int, seed: int) -> str:
+    k = (seed + page * lines_per_page + line) * 7
+    words = " ".join(WORDS[(k + i) % len(WORDS)] for i in range(10))
+    return f"{page + 1}-{line + 1} {words}"
+
+
+def _layout_cells(page: int, rows: int, cols: int, seed: int) -> list:
+    """표 한 페이지의 셀 텍스트 (행 우선 순서)."""
+    return [[f"{WORDS[(seed + page * rows * cols + r * cols + c) % len(WORDS)]} {(r + 1) * (c + 3) % 97}"
+             for c in range(cols)] for r in range(rows)]
+
+
+def _build_pdf(page_contents: list) -> bytes:
+    """페이지별 콘텐츠 스트림으로 Helvetica 폰트만 쓰는 간단한 PDF를 만듭니다."""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(b"")  # 나중에 채움
+    page_ids = []
+    for content in page_contents:
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+              % (len(objects) + 1, catalog_id, xref))
+    return out.getvalue()
+
+
+def make_synthetic_pdf(n_pages: int, lines_per_page: int = 40, seed: int = 0) -> bytes:
+    """외부 라이브러리 없이 텍스트 페이지로 구성된 간단한 PDF를 만듭니다 (text-heavy)."""
+    contents = []
+    for page in range(n_pages):
+        lines = [f"({_synthetic_line(page, line, lines_per_page, seed)}) Tj T*".encode()
+                 for line in range(lines_per_page)]
+        contents.append(b"BT /F1 10 Tf 12 TL 40 800 Td " + b" ".join(lines) + b" ET")
+    return _build_pdf(contents)
+
+
+def synthetic_text(n_pages: int, lines_per_page: int = 40, seed: int = 0) -> str:
+    """make_synthetic_pdf 문서의 정답 텍스트."""
+    return "\n".join(_synthetic_line(page, line, lines_per_page, seed)
+                     for page in range(n_pages) for line in range(lines_per_page))
+
+
+def make_layout_pdf(n_pages: int, rows: int = 30, cols: int = 6, seed: int = 0) -> bytes:
+    """셀마다 절대 위치(Tm)로 배치한 표 페이지로 구성된 PDF를 만듭니다 (layout-heavy)."""
+    contents = []
+    for page in range(n_pages):
+        cells = []
+        for r, row in enumerate(_layout_cells(page, rows, cols, seed)):
+            for c, text in enumerate(row):
+                cells.append(f"1 0 0 1 {40 + c * 90} {800 - r * 25} Tm ({text}) Tj".encode())
+        contents.append(b"BT /F1 9 Tf " + b" ".join(cells) + b" ET")
+    return _build_pdf(contents)
+
+
+def layout_text(n_pages: int, rows: int = 30, cols: int = 6, seed: int = 0) -> str:
+    """make_layout_pdf 문서의 정답 텍스트."""
+    return "\n".join(" ".join(row) for page in range(n_pages) for row in _layout_cells(page, rows, cols, seed))
+
+
+class MemorySource(io.BytesIO):
+    """업로드 파일(UploadedFile)처럼 .name과 .size를 가진 메모리 버퍼입니다."""
+
+    def __init__(self, name: str, data: bytes):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+def bench_workers(args):
+    corpus = [make_synthetic_pdf(args.pages, seed=i) for i in range(args.files)]
+    total_mb = sum(len(d) for d in corpus) / 1e6
+    print(f"코퍼스: PDF {args.files}개 × {args.pages}페이지 ({total_mb:.1f} MB)")
+
+    for workers in args.workers:
+        sources = [MemorySource(f"doc-{i:04d}.pdf", d) for i, d in enumerate(corpus)]
+        start = time.perf_counter()
+        results = list(extract_batch(sources, max_workers=workers))
+        elapsed = time.perf_counter() - start
+        errors = sum(1 for r in results if r["error"])
+        print(f"workers={workers}: {elapsed:6.2f}s  {len(results) / elapsed:6.1f} files/s  오류 {errors}")
+
+
+def _legacy_extract(buffer) -> tuple:
+    """이전 Day 16 방식: 업로드 전체를 읽어 들인 뒤 페이지마다 문자열을 이어 붙이고 마지막에 단어 수 계산."""
+    from pypdf import PdfReader
+    pdf_reader = PdfReader(io.BytesIO(buffer.read()))
+    extracted_text = ""
+    for page in pdf_reader.pages:
+        page_text = page.extract_text()
+        if page_text:
+            extracted_text += page_text + "\n\n"
+    word_count = len(extracted_text.split())
+    return extracted_text, word_count
+
+
+def _run_pages_variant(args):
+    """자식 프로세스에서 한 가지 방식만 실행하여 최대 RSS를 따로 측정합니다."""
+    with open(args.path, "rb") as f:
+        buffer = MemorySource(os.path.basename(args.path), f.read())  # 업로드 버퍼 역할
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if args.variant == "legacy":
+        text, _ = _legacy_extract(buffer)
+    else:
+        text = extract_text(buffer.name, buffer)["text"]
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed:.3f} {peak} {baseline} {len(text)}")
+
+
+def bench_pages(args):
+    data = make_synthetic_pdf(args.pages, lines_per_page=args.lines)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+        path = f.name
+    print(f"PDF: {args.pages}페이지, {len(data) / 1e6:.1f} MB")
+    try:
+        for variant in ("legacy", "streaming"):
+            out = subprocess.run([sys.executable, __file__, "_pages-variant", variant, path],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            elapsed, peak, baseline, chars = float(out[0]), int(out[1]), int(out[2]), int(out[3])
+            print(f"{variant:>9}: {elapsed:6.2f}s  peak RSS {peak / 1024:7.1f} MB "
+                  f"(+{(peak - baseline) / 1024:.1f} MB over loaded upload)  {chars:,} chars")
+    finally:
+        os.unlink(path)
+
+
+_TOKEN = re.compile(r"\S+")
+_CLEAN_TOKEN = re.compile(r"^[\w.,;:!?'\"()%/-]+$")
+
+
+def quality_proxies(text: str, truth: str = None) -> dict:
+    """추출 품질 대리 지표.
+
+    alpha_ratio: 깨지지 않은 토큰(문자/숫자/일반 구두점)의 비율 - 정답 없이 계산 가능
+    bloat: 토큰당 문자 수 (레이아웃 모드의 공백 채움 등)
+    recall: 정답 토큰 중 추출된 토큰 비율 (정답이 있을 때)
+    order: 정답의 인접 토큰 쌍이 추출 결과에서도 인접한 비율 - 읽기 순서 보존 (정답이 있을 때)
+    """
+    tokens = _TOKEN.findall(text)
+    result = {
+        "alpha_ratio": sum(1 for t in tokens if _CLEAN_TOKEN.match(t)) / len(tokens) if tokens else 0.0,
+        "bloat": len(text) / len(tokens) if tokens else 0.0,
+        "recall": None,
+        "order": None
+    }
+    if truth is not None:
+        truth_tokens = _TOKEN.findall(truth)
+        overlap = sum((Counter(tokens) & Counter(truth_tokens)).values())
+        result["recall"] = overlap / len(truth_tokens) if truth_tokens else 1.0
+        truth_pairs = Counter(zip(truth_tokens, truth_tokens[1:]))
+        pairs = Counter(zip(tokens, tokens[1:]))
+        result["order"] = sum((pairs & truth_pairs).values()) / max(sum(truth_pairs.values()), 1)
+    return result
+
+
+def _backend_corpus(args) -> list:
+    """(이름, 바이트, 프로필, 정답 텍스트) 목록. 합성 문서는 정답이 있고, --corpus 문서는 없음."""
+    corpus = []
+    for i in range(args.text_docs):
+        corpus.append((f"text-{i}.pdf", make_synthetic_pdf(args.pages, seed=i), "text-heavy",
+                       synthetic_text(args.pages, seed=i)))
+    for i in range(args.layout_docs):
+        corpus.append((f"layout-{i}.pdf", make_layout_pdf(args.pages, seed=i), "layout-heavy",
+                       layout_text(args.pages, seed=i)))
+    if args.corpus:
+        for path in sorted(Path(args.corpus).rglob("*.pdf")):
+            if "__MACOSX" in path.parts:
+                continue
+            data = path.read_bytes()
+            try:
+                profile = pdf_profile(io.BytesIO(data))
+            except Exception as e:
+                print(f"건너뜀 {path}: {e}", file=sys.stderr)
+                continue
+            corpus.append((str(path), data, profile, None))
+    return corpus
+
+
+def _acceptable(row, min_recall: float, min_order: float, min_alpha: float, max_bloat: float) -> bool:
+    if pd.notna(row["recall"]) and (row["recall"] < min_recall or row["order"] < min_order):
+        return False
+    # 공백 채움이 심하면 이후 청킹/임베딩에서 토큰이 낭비되므로 제외
+    return row["alpha_ratio"] >= min_alpha and row["bloat"] <= max_bloat
+
+
+def bench_backends(args):
+    """PDF 백엔드별 pages/sec, 최대 메모리, 품질 지표를 측정하고 프로필별 선택 정책을 만듭니다."""
+    backends = args.backends or available_backends()
+    corpus = _backend_corpus(args)
+    print(f"백엔드: {', '.join(f'{b} ({backend_version(b)})' for b in backends)} / 문서 {len(corpus)}개")
+
+    records = []
+    for name, data, profile, truth in corpus:
+        for backend in backends:
+            try:
+                # 시간 측정 (tracemalloc 오버헤드 없이)
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    extracted = extract_text(name, io.BytesIO(data), backend=backend)
+                elapsed = (time.perf_counter() - start) / args.repeat
+                # 메모리 측정 (파이썬 할당 최대치)
+                tracemalloc.start()
+                extract_text(name, io.BytesIO(data), backend=backend)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            except Exception as e:
+                print(f"{backend} 실패 ({name}): {e}", file=sys.stderr)
+                continue
+            n_pages = max(len(extracted["pages"]), 1)
+            records.append({
+                "document": name, "profile": profile, "backend": backend,
+                "pages": n_pages, "seconds": elapsed, "peak_mb": peak / 1e6,
+                **quality_proxies(extracted["text"], truth)
+            })
+
+    df = pd.DataFrame(records)
+    if df.empty:
+        print("측정 결과 없음")
+        return
+    summary = df.groupby(["profile", "backend"]).agg(
+        docs=("document", "count"), pages=("pages", "sum"), seconds=("seconds", "sum"),
+        peak_mb=("peak_mb", "max"), alpha_ratio=("alpha_ratio", "mean"), bloat=("bloat", "mean"),
+        recall=("recall", "mean"), order=("order", "mean")
+    ).reset_index()
+    summary["pages_per_sec"] = summary["pages"] / summary["seconds"]
+    summary["acceptable"] = summary.apply(
+        _acceptable, axis=1, min_recall=args.min_recall, min_order=args.min_order, min_alpha=args.min_alpha,
+        max_bloat=args.max_bloat)
+
+    # 프로필마다 허용 기준을 통과한 백엔드 중 가장 빠른 것 선택
+    policy = dict(DEFAULT_POLICY)
+    for profile, group in summary.groupby("profile"):
+        candidates = group[group["acceptable"]].sort_values("pages_per_sec", ascending=False)
+        if not candidates.empty:
+            policy[profile] = candidates.iloc[0]["backend"]
+
+    columns = ["profile", "backend", "docs", "pages", "pages_per_sec", "peak_mb",
+               "alpha_ratio", "bloat", "recall", "order", "acceptable"]
+    with pd.option_context("display.width", 200, "display.max_columns", None,
+                           "display.float_format", "{:.3f}".format):
+        print(summary[columns].to_string(index=False))
+    print("\n선택 정책: " + ", ".join(f"{k} -> {v}" for k, v in policy.items()))
+
+    if args.write_policy:
+        with open(args.write_policy, "w", encoding="utf-8") as f:
+            json.dump({
+                "profiles": policy,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "versions": {b: backend_version(b) for b in backends},
+                "summary": summary[columns].to_dict(orient="records")
+            }, f, ensure_ascii=False, indent=2, default=str)
+        print(f"정책 저장: {args.write_policy}")
+
+
+def _snowflake_session(secrets_path: str = None):
+    from snowflake.snowpark import Session
+    path = Path(secrets_path or Path(__file__).parent / ".streamlit" / "secrets.toml")
+    with open(path, "rb") as f:
+        configs = tomllib.load(f)["connections"]["snowflake"]
+    return Session.builder.configs(configs).create()
+
+
+def bench_server(args):
+    """클라이언트 추출(pypdf) vs 서버 추출(put_stream + PARSE_DOCUMENT)을 파일 수와 크기별로 비교합니다.
+
+    클라이언트 시간은 추출만, 서버 시간은 스테이지 업로드 + 파싱 + 테이블 삽입까지 포함합니다.
+    """
+    from server_extraction import DEFAULT_STAGE, ensure_stage, new_batch_id, stage_source, parse_staged, clear_batch
+
+    session = _snowflake_session(args.connection)
+    stage = f"{args.database}.{args.schema}.{DEFAULT_STAGE}"
+    table = f"{args.database}.{args.schema}.EXTRACTION_BENCH_DOCS"
+    ensure_stage(session, stage)
+    session.sql(f"""
+        CREATE OR REPLACE TEMPORARY TABLE {table} (
+            DOC_ID NUMBER AUTOINCREMENT, FILE_NAME VARCHAR, FILE_TYPE VARCHAR, FILE_SIZE NUMBER,
+            EXTRACTED_TEXT VARCHAR, UPLOAD_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
+            WORD_COUNT NUMBER, CHAR_COUNT NUMBER, CONTENT_HASH VARCHAR
+        )
+    """).collect()
+
+    print(f"{'files':>6} {'pages':>6} {'MB':>7} | {'client s':>9} {'files/s':>8} | "
+          f"{'upload s':>9} {'parse s':>8} {'server s':>9} {'files/s':>8}")
+    for n_files in args.files:
+        for n_pages in args.pages:
+            corpus = [make_synthetic_pdf(n_pages, seed=i) for i in range(n_files)]
+            total_mb = sum(len(d) for d in corpus) / 1e6
+
+            sources = [MemorySource(f"doc-{i:04d}.pdf", d) for i, d in enumerate(corpus)]
+            start = time.perf_counter()
+            list(extract_batch(sources, max_workers=args.workers))
+            client = time.perf_counter() - start
+
+            sources = [MemorySource(f"doc-{i:04d}.pdf", d) for i, d in enumerate(corpus)]
+            batch_id = new_batch_id()
+            start = time.perf_counter()
+            for source in sources:
+                stage_source(session, source, stage, batch_id)
+            upload = time.perf_counter() - start
+            parse_staged(session, stage, batch_id, table, mode=args.mode)
+            server = time.perf_counter() - start
+            clear_batch(session, stage, batch_id)
+
+            print(f"{n_files:>6} {n_pages:>6} {total_mb:>7.1f} | {client:>9.2f} {n_files / client:>8.1f} | "
+                  f"{upload:>9.2f} {server - upload:>8.2f} {server:>9.2f} {n_files / server:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day 16 추출 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("workers", help="워커 수에 따른 files/sec")
+    p.add_argument("--files", type=int, default=48)
+    p.add_argument("--pages", type=int, default=40)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.set_defaults(func=bench_workers)
+
+    p = sub.add_parser("pages", help="1,000페이지 PDF의 최대 RSS 및 시간 (이전 방식 vs 스트리밍)")
+    p.add_argument("--pages", type=int, default=1000)
+    p.add_argument("--lines", type=int, default=40)
+    p.set_defaults(func=bench_pages)
+
+    p = sub.add_parser("server", help="클라이언트(pypdf) vs 서버(PARSE_DOCUMENT) 추출 비교")
+    p.add_argument("--files", type=int, nargs="+", default=[10, 50])
+    p.add_argument("--pages", type=int, nargs="+", default=[10, 100])
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="클라이언트 추출 워커 수")
+    p.add_argument("--mode", choices=["LAYOUT", "OCR"], default="LAYOUT")
+    p.add_argument("--database", default="RAG_DB")
+    p.add_argument("--schema", default="RAG_SCHEMA")
+    p.add_argument("--connection", help="secrets.toml 경로")
+    p.set_defaults(func=bench_server)
+
+    p = sub.add_parser("backends", help="PDF 백엔드 비교 및 프로필별 선택 정책 생성")
+    p.add_argument("--backends", nargs="+", help="비교할 백엔드 (기본: 설치된 전체)")
+    p.add_argument("--text-docs", type=int, default=4, help="합성 text-heavy 문서 수")
+    p.add_argument("--layout-docs", type=int, default=4, help="합성 layout-heavy 문서 수")
+    p.add_argument("--pages", type=int, default=20, help="합성 문서당 페이지 수")
+    p.add_argument("--corpus", help="추가로 측정할 PDF 디렉터리 (하위 폴더 포함)")
+    p.add_argument("--repeat", type=int, default=2, help="시간 측정 반복 횟수")
+    p.add_argument("--min-recall", type=float, default=0.98)
+    p.add_argument("--min-order", type=float, default=0.95)
+    p.add_argument("--min-alpha", type=float, default=0.80)
+    p.add_argument("--max-bloat", type=float, default=10.0, help="허용할 최대 토큰당 문자 수")
+    p.add_argument("--write-policy", nargs="?", const=POLICY_FILE,
+                   help=f"선택 정책을 JSON으로 저장 (기본 경로: {POLICY_FILE})")
+    p.set_defaults(func=bench_backends)
+
+    p = sub.add_parser("_pages-variant")
+    p.add_argument("variant", choices=["legacy", "streaming"])
+    p.add_argument("path")
+    p.set_defaults(func=_run_pages_variant)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# 추출 결과 디스크 캐시 (Extraction Cache)
+#
+# 같은 파일을 반복해서 업로드할 때 PdfReader를 다시 실행하지 않도록, 추출 결과를
+# (파일 SHA-256, 추출기 백엔드/버전) 키로 zlib 압축하여 디스크에 저장합니다.
+# 전체 크기가 max_bytes를 넘으면 가장 오래 사용되지 않은 항목부터 삭제합니다.
+# 전체 크기는 메모리에서 추적하고(처음 한 번만 디렉터리를 훑음), 한도를 넘을 때만 디렉터리를 다시 훑어
+# 90%까지 줄입니다.
+
+import json
+import os
+import tempfile
+import threading
+import zlib
+
+DEFAULT_CACHE_DIR = ".extraction_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+EVICT_TO = 0.9  # 한도를 넘으면 max_bytes의 90%까지 줄임 (한도 근처에서 put마다 다시 훑지 않도록)
+
+
+class ExtractionCache:
+    """파일 해시 + 추출기 키로 추출 결과를 저장하는 크기 제한 디스크 캐시입니다.
+
+    값은 extract_text()의 반환값 {'text', 'pages', 'word_count', 'extractor'} 입니다.
+    여러 Streamlit 세션이 같은 디렉터리를 공유해도 되도록 쓰기는 임시 파일 + os.replace로 합니다.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 level: int = 6):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = self.bytes_stored()  # 저장된 전체 크기 (put마다 디렉터리를 훑지 않기 위함)
+
+    def _path(self, digest: str, extractor: str) -> str:
+        safe_extractor = "".join(c if c.isalnum() or c in "-_." else "_" for c in extractor)
+        return os.path.join(self.directory, f"{digest}-{safe_extractor}.z")
+
+    def get(self, digest: str, extractor: str):
+        """캐시된 추출 결과를 돌려줍니다. 없거나 손상되었으면 None."""
+        path = self._path(digest, extractor)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+            value = json.loads(zlib.decompress(payload))
+        except (OSError, ValueError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # 최근 사용 시각 갱신 (LRU 삭제 기준)
+        except OSError:
+            pass
+        value["pages"] = [tuple(p) for p in value["pages"]]
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, digest: str, extractor: str, extracted: dict):
+        """추출 결과를 압축하여 저장하고, 필요하면 오래된 항목을 삭제합니다."""
+        payload = zlib.compress(json.dumps({
+            "text": extracted["text"],
+            "pages": extracted["pages"],
+            "word_count": extracted["word_count"],
+            "extractor": extracted.get("extractor")
+        }, ensure_ascii=False).encode("utf-8"), self.level)
+        if len(payload) > self.max_bytes:
+            return
+        path = self._path(digest, extractor)
+        try:
+            replaced = os.path.getsize(path)  # 같은 키를 덮어쓰면 이전 크기를 뺌
+        except OSError:
+            replaced = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._bytes += len(payload) - replaced
+            over = self._bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _entries(self) -> list:
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".z"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def bytes_stored(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """전체 크기가 max_bytes × EVICT_TO 이하가 될 때까지 가장 오래 사용되지 않은 항목을 삭제합니다.
+
+        디렉터리를 실제로 훑은 크기로 메모리의 전체 크기도 다시 맞춥니다 (다른 프로세스가 쓴 항목 포함).
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._bytes = total
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
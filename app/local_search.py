@@ -0,0 +1,108 @@
+# 로컬 벡터 검색 (Local Vector Search)
+#
+# Day 20–22에서 Cortex Search 서비스 대신 쓸 수 있는 검색 경로입니다.
+# Day 18의 임베딩 테이블을 로컬 메모리 맵 인덱스(vector_index)로 내보내고, 질문은 임베딩 캐시를 거쳐
+# 임베딩한 뒤(같은 질문은 Cortex 호출 없이) 로컬 행렬 곱 + argpartition으로 상위 k개 청크를 찾습니다.
+# 인덱스는 st.cache_resource로 세션 간에 공유되며, 새로 고침은 새로 추가/교체된 임베딩만 가져옵니다.
+# 벡터가 많으면 근사 검색(ann_index, IVF-PQ)을 켜서 nprobe개 목록만 검색하고 후보를 원래 벡터로 다시 채점합니다.
+
+import time
+
+import streamlit as st
+
+from ann_index import AnnIndex, AnnSearcher, build_ann_index, DEFAULT_NPROBE
+from embedding_cache import EmbeddingCache, CacheStats, LocalEmbeddingStore, DEFAULT_STORE_PATH
+from tokenization import DEFAULT_EMBED_MODEL
+from vector_index import VectorIndex, index_directory, refresh_index, search_chunks, DTYPES
+
+DTYPE_LABELS = {"float32": "float32 (원본)", "float16": "float16 (1/2 크기)", "int8": "int8 (1/4 크기)"}
+
+
+@st.cache_resource
+def get_vector_index(directory: str, dtype: str):
+    """세션 간에 공유되는 로컬 벡터 인덱스를 엽니다."""
+    return VectorIndex(directory, dtype)
+
+
+@st.cache_resource
+def get_ann_index(directory: str):
+    """저장된 IVF-PQ 인덱스를 엽니다 (없으면 None)."""
+    return AnnIndex.load(directory)
+
+
+@st.cache_resource
+def get_query_cache():
+    """질문 임베딩 캐시 (Day 18 임베딩 캐시와 같은 로컬 저장소 사용)."""
+    return EmbeddingCache(LocalEmbeddingStore(DEFAULT_STORE_PATH))
+
+
+def index_settings(session, key: str):
+    """임베딩 테이블/저장 형식을 고르고 인덱스를 새로 고치는 설정 패널.
+
+    반환값: VectorIndex 또는 근사 검색을 켰으면 AnnSearcher (인덱스가 비었으면 None)
+    """
+    default_table = st.session_state.get('embeddings_table', 'RAG_DB.RAG_SCHEMA.REVIEW_EMBEDDINGS')
+    embedding_table = st.text_input("임베딩 테이블 (Embeddings Table):", value=default_table, key=f"{key}_embedding_table",
+                                    help="Day 18에서 저장한 임베딩 테이블")
+    parts = embedding_table.split(".")
+    default_chunks = f"{parts[0]}.{parts[1]}.REVIEW_CHUNKS" if len(parts) == 3 else "RAG_DB.RAG_SCHEMA.REVIEW_CHUNKS"
+    chunk_table = st.text_input("청크 테이블 (Chunks Table):", value=default_chunks, key=f"{key}_chunk_table",
+                                help="검색 결과에 표시할 청크 텍스트/파일 이름")
+    dtype = st.selectbox("저장 형식 (Quantization):", DTYPES, format_func=DTYPE_LABELS.get, key=f"{key}_dtype",
+                         help="float16/int8은 인덱스 크기와 메모리 대역폭을 줄이는 대신 점수가 약간 달라집니다")
+
+    directory = index_directory(embedding_table, dtype)
+    index = get_vector_index(directory, dtype)
+    ann_directory = f"{directory}-ivfpq"
+    ann = get_ann_index(ann_directory)
+    if st.button(":material/sync: 인덱스 새로 고침 (Refresh Index)", key=f"{key}_refresh", use_container_width=True):
+        try:
+            with st.spinner("임베딩 가져오는 중..."):
+                result = refresh_index(session, index, embedding_table, chunk_table)
+                if ann is not None:
+                    ann.sync(index)  # 근사 인덱스에도 삽입/삭제 반영
+                    ann.save(ann_directory)
+            st.success(f":material/check_circle: {'다시 만듦' if result['rebuilt'] else '새로 고침'}: "
+                       f"{result['added']:,}개 추가 ({result['replaced']:,}개 교체), {result['deleted']:,}개 삭제, "
+                       f"{result['seconds']:.1f}초")
+        except Exception as e:
+            st.error(f"인덱스 새로 고침 오류: {str(e)}")
+
+    if len(index):
+        st.caption(f":material/database: {len(index):,}개 벡터 · {index.nbytes() / 1e6:,.1f} MB · "
+                   f"기준 시각 {index.meta['watermark']}")
+        with st.expander(":material/speed: 근사 검색 (ANN, IVF-PQ)"):
+            use_ann = st.checkbox("근사 검색 사용", value=False, key=f"{key}_use_ann",
+                                  help="수백만 개 이상의 벡터에서 전수 검색 대신 IVF-PQ 인덱스로 후보만 검색합니다")
+            nprobe = st.slider("nprobe (재현율 ↔ 속도)", 1, 128, DEFAULT_NPROBE, key=f"{key}_nprobe",
+                               help="검색할 목록 수. 클수록 정확하지만 느립니다")
+            if st.button(":material/build: 근사 인덱스 학습 (Build ANN Index)", key=f"{key}_build_ann",
+                         use_container_width=True):
+                with st.spinner("k-평균/PQ 학습 중..."):
+                    ann = build_ann_index(index)
+                    ann.save(ann_directory)
+                    get_ann_index.clear()
+            if ann is not None:
+                st.caption(f"{len(ann):,}개 벡터 · 목록 {ann.meta['nlist']:,}개 · {ann.nbytes() / 1e6:,.1f} MB")
+            elif use_ann:
+                st.caption(":material/info: 근사 인덱스를 먼저 학습하세요. 그 전까지는 전수 검색을 사용합니다.")
+        if use_ann and ann is not None:
+            return AnnSearcher(ann, index, nprobe=nprobe)
+        return index
+    st.caption(":material/info: 인덱스가 비어 있습니다. 새로 고침을 눌러 임베딩을 가져오세요.")
+    return None
+
+
+def local_search(index: VectorIndex, queries: list, k: int = 5, model: str = DEFAULT_EMBED_MODEL):
+    """질문마다 상위 k개 청크를 찾습니다. 반환값: (질문별 결과 목록, {'embed_ms', 'search_ms', 'cached'})"""
+    cache = get_query_cache()
+    stats = CacheStats()  # 공유 캐시의 누적 통계 대신 이 호출의 통계
+    start = time.perf_counter()
+    query_vectors = cache.embed_texts(queries, model, stats=stats)
+    embedded = time.perf_counter()
+    results = search_chunks(index, query_vectors, k)
+    return results, {
+        'embed_ms': (embedded - start) * 1000,
+        'search_ms': (time.perf_counter() - embedded) * 1000,
+        'cached': stats.as_dict()['avoided']
+    }
@@ -0,0 +1,153 @@
+# 리뷰 스트리밍 청킹 (Streamed Review Chunking)
+#
+# Day 17의 "리뷰 로드"는 원본 테이블 전체를 to_pandas()로 하나의 데이터프레임에 담아 세션 상태에 보관하므로,
+# 사용자마다 코퍼스 전체 사본을 갖고 메모리가 코퍼스 크기에 비례합니다.
+# 여기서는 to_pandas_batches()로 결과를 묶음 단위로 받아 묶음마다 청킹 -> 저장까지 끝내고 버리므로,
+# 한 번에 메모리에 있는 것은 묶음 하나(batch_rows 행)와 그 청크뿐입니다. 코퍼스 크기와 관계없이 최대 메모리가 일정합니다.
+
+import time
+
+import pandas as pd
+
+from bulk_load import bulk_load, failed_rows, DEFAULT_CHUNK_SIZE, DEFAULT_PARALLEL
+from chunk_sync import chunk_config, sync_chunks
+from chunking import chunk_documents, chunk_documents_by_tokens, count_tokens, CHUNK_COLUMNS
+from server_chunking import CHUNK_TABLE_COLUMNS
+from tokenization import max_content_tokens, DEFAULT_TOKENIZER, DEFAULT_EMBED_MODEL
+
+DEFAULT_BATCH_ROWS = 20000   # 청킹/저장 한 번에 처리하는 리뷰 수
+PREVIEW_CHUNKS = 200         # 화면 미리보기용으로 남기는 청크 수
+REVIEW_COLUMNS = ["DOC_ID", "FILE_NAME", "FILE_TYPE", "EXTRACTED_TEXT", "UPLOAD_TIMESTAMP", "WORD_COUNT", "CHAR_COUNT"]
+REVIEW_CHUNK_COLUMNS = CHUNK_COLUMNS + ["source_timestamp", "token_count", "chunk_config"]  # chunk_reviews 결과 컬럼
+
+
+def review_query(source_table: str, conditions: list = None) -> str:
+    """Day 17 리뷰 로드 쿼리 (conditions는 AND로 연결)."""
+    return f"""
+        SELECT {", ".join(REVIEW_COLUMNS)}
+        FROM {source_table}
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY FILE_NAME
+    """
+
+
+def review_batches(session, query: str, params: list = None, batch_rows: int = DEFAULT_BATCH_ROWS):
+    """쿼리 결과를 batch_rows 행 이하의 데이터프레임으로 하나씩 돌려줍니다.
+
+    to_pandas_batches()의 묶음 크기는 서버 결과 청크에 따라 정해지므로, 작은 묶음은 모으고 큰 묶음은 나눕니다.
+    """
+    pending, pending_rows = [], 0
+    for batch in session.sql(query, params=params or None).to_pandas_batches():
+        start = 0
+        while start < len(batch):
+            part = batch.iloc[start:start + batch_rows - pending_rows]
+            start += len(part)
+            pending.append(part)
+            pending_rows += len(part)
+            if pending_rows == batch_rows:
+                yield pd.concat(pending, ignore_index=True)
+                pending, pending_rows = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def chunk_reviews(df: pd.DataFrame, mode: str = "keep", size: int = 200, overlap: int = 50,
+                  tokenizer: str = DEFAULT_TOKENIZER, model: str = DEFAULT_EMBED_MODEL) -> pd.DataFrame:
+    """리뷰 데이터프레임을 Day 17 청크 데이터프레임으로 만듭니다.
+
+    mode: 'keep'(리뷰 1개 = 청크 1개), 'words'(size/overlap 단어), 'tokens'(size 목표 토큰, overlap 토큰)
+    반환값: REVIEW_CHUNK_COLUMNS 컬럼의 데이터프레임 (chunk_id는 1부터)
+    """
+    if mode == "keep":
+        chunks = pd.DataFrame({
+            'chunk_id': range(1, len(df) + 1),
+            'doc_id': df['DOC_ID'].to_numpy(),
+            'file_name': df['FILE_NAME'].to_numpy(),
+            'chunk_text': df['EXTRACTED_TEXT'].to_numpy(),
+            'chunk_size': df['WORD_COUNT'].to_numpy(),
+            'chunk_type': 'full_review',
+            'chunk_index': 1
+        }, columns=CHUNK_COLUMNS)
+        chunks['source_timestamp'] = df['UPLOAD_TIMESTAMP'].to_numpy()
+        config = chunk_config("keep")
+    elif mode == "tokens":
+        chunks = chunk_documents_by_tokens(df, target_tokens=size, overlap_tokens=overlap, model=model, tokenizer=tokenizer)
+        config = chunk_config("tokens", size, overlap, tokenizer, max_content_tokens(model))
+    else:
+        chunks = chunk_documents(df, chunk_size=size, overlap=overlap)
+        config = chunk_config("words", size, overlap)
+
+    if 'token_count' not in chunks:
+        chunks['token_count'] = count_tokens(chunks['chunk_text'], tokenizer)
+    chunks['chunk_config'] = config  # 설정이 바뀌면 증분 동기화에서 다시 청킹 대상
+    return chunks
+
+
+def chunk_rows(chunks: pd.DataFrame) -> pd.DataFrame:
+    """청크 테이블에 올릴 행 (컬럼 이름 대문자, 타임스탬프는 문자열로 올려 NTZ로 변환)."""
+    rows = chunks.rename(columns=str.upper)
+    rows = rows[[c for c in CHUNK_TABLE_COLUMNS if c in rows]].copy()
+    if 'SOURCE_TIMESTAMP' in rows:
+        rows['SOURCE_TIMESTAMP'] = rows['SOURCE_TIMESTAMP'].astype(str)
+    return rows
+
+
+def chunk_writer(session, write_mode: str, table_name: str, database: str, schema: str, source_table: str,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, parallel: int = DEFAULT_PARALLEL):
+    """묶음마다 호출할 저장 함수 rows -> {'loaded', 'failed', ...증분 집계}.
+
+    write_mode: 'incremental'(sync_chunks), 'append'/'replace'(bulk_load, 교체는 호출 전에 TRUNCATE).
+    추가 모드의 CHUNK_ID는 테이블의 기존 최대값 다음부터 묶음을 넘어 이어서 매깁니다.
+    """
+    target = f"{database}.{schema}.{table_name}"
+    next_id = session.sql(f"SELECT COALESCE(MAX(CHUNK_ID), 0) FROM {target}").collect()[0][0]
+
+    def write(rows: pd.DataFrame) -> dict:
+        nonlocal next_id
+        if write_mode == "incremental":
+            result = sync_chunks(session, rows, table_name, database, schema, source_table, chunk_size, parallel)
+            return {**result, 'loaded': len(rows) - len(result['failed'])}
+        rows = rows.assign(CHUNK_ID=rows['CHUNK_ID'] + next_id)
+        next_id += len(rows)
+        failed = failed_rows(bulk_load(session, rows, table_name=table_name, database=database, schema=schema,
+                                       chunk_size=chunk_size, parallel=parallel))
+        return {'loaded': len(rows) - len(failed), 'failed': failed}
+
+    return write
+
+
+def stream_chunks(batches, chunker, write=None, on_batch=None) -> dict:
+    """리뷰 묶음마다 청킹하고 저장한 뒤 버리며, 집계와 첫 PREVIEW_CHUNKS개 청크만 남깁니다.
+
+    chunker: 리뷰 데이터프레임 -> 청크 데이터프레임 (chunk_reviews)
+    write: chunk_rows 결과 -> chunk_writer 결과 (None이면 저장하지 않음)
+    on_batch: 묶음마다 on_batch(summary)를 호출 (진행 표시)
+    """
+    summary = {'documents': 0, 'chunks': 0, 'full_reviews': 0, 'split_reviews': 0, 'max_tokens': 0,
+               'loaded': 0, 'failed': [], 'batches': 0, 'max_batch_rows': 0,
+               'inserted': 0, 'rechunked': 0, 'unchanged': 0, 'deleted': 0}
+    preview = []
+    start_time = time.perf_counter()
+    for df in batches:
+        chunks = chunker(df)
+        summary['documents'] += len(df)
+        summary['chunks'] += len(chunks)
+        summary['full_reviews'] += int((chunks['chunk_type'] == 'full_review').sum())
+        summary['split_reviews'] += int((chunks['chunk_type'] == 'chunked_review').sum())
+        summary['max_tokens'] = max(summary['max_tokens'], int(chunks['token_count'].max()) if len(chunks) else 0)
+        summary['batches'] += 1
+        summary['max_batch_rows'] = max(summary['max_batch_rows'], len(df))
+        if sum(len(p) for p in preview) < PREVIEW_CHUNKS:
+            preview.append(chunks.head(PREVIEW_CHUNKS).copy())  # 묶음 전체를 붙잡지 않도록 복사
+        if write is not None:
+            result = write(chunk_rows(chunks))
+            for key in ('loaded', 'inserted', 'rechunked', 'unchanged', 'deleted'):
+                summary[key] += result.get(key, 0)
+            summary['failed'] += result['failed']
+        del df, chunks
+        summary['seconds'] = time.perf_counter() - start_time
+        if on_batch:
+            on_batch(summary)
+    summary['seconds'] = time.perf_counter() - start_time
+    summary['preview'] = pd.concat(preview, ignore_index=True).head(PREVIEW_CHUNKS) if preview else pd.DataFrame(columns=REVIEW_CHUNK_COLUMNS)
+    return summary
@@ -0,0 +1,141 @@
+# 서버 측 청킹 (In-warehouse Chunking)
+#
+# Day 17에서 문서 전체 텍스트를 to_pandas()로 앱에 가져와 청킹한 뒤 청크를 다시 업로드하는 대신,
+# Python UDTF로 웨어하우스 안에서 한 번의 INSERT ... SELECT로 청크 테이블을 채웁니다.
+#
+# UDTF는 chunking.py와 tokenization.py를 스테이지에 올려 IMPORTS로 사용하므로, 클라이언트 청킹과
+# 같은 코드(같은 윈도우/오버랩 의미와 토큰 수)로 실행됩니다. 서버에서는 외부 네트워크가 없으므로
+# 토크나이저는 항상 "estimate"입니다.
+
+import os
+
+from server_extraction import ensure_stage, DEFAULT_STAGE
+from tokenization import DEFAULT_TOKENIZER
+
+UDTF_NAME = "REVIEW_CHUNKER"
+UDTF_STAGE_DIR = "chunking_udtf"
+UDTF_MODULES = ("chunking.py", "tokenization.py")
+SERVER_MODES = ("keep", "words", "tokens")
+CHUNK_TABLE_COLUMNS = ["CHUNK_ID", "DOC_ID", "FILE_NAME", "CHUNK_TEXT", "CHUNK_SIZE", "CHUNK_TYPE", "TOKEN_COUNT",
+                       "CHUNK_INDEX", "SOURCE_TIMESTAMP", "CHUNK_CONFIG"]
+# 이전 버전 테이블에 추가하는 컬럼 (문서별 워터마크: 문서 안 청크 순서, 청킹 당시 문서의 UPLOAD_TIMESTAMP, 청킹 설정)
+_ADDED_COLUMNS = {"TOKEN_COUNT": "NUMBER", "CHUNK_INDEX": "NUMBER", "SOURCE_TIMESTAMP": "TIMESTAMP_NTZ",
+                  "CHUNK_CONFIG": "VARCHAR"}
+
+_HANDLER = f"""
+from chunking import window_offsets, document_token_chunks
+from tokenization import get_tokenizer
+
+
+class ReviewChunker:
+    def __init__(self):
+        self.tokenizer = get_tokenizer("{DEFAULT_TOKENIZER}")
+
+    def process(self, text, mode, size, overlap, max_tokens):
+        text = text or ""
+        if mode == "keep":
+            chunks = [(0, len(text), False)]
+        elif mode == "words":
+            _, starts, ends, _, split = window_offsets([text], size, overlap)
+            chunks = zip(starts.tolist(), ends.tolist(), split.tolist())
+        else:
+            chunks = [(s, e, split) for s, e, _, split in
+                      document_token_chunks(text, self.tokenizer, min(size, max_tokens), max_tokens, overlap)]
+        for index, (start, end, split) in enumerate(chunks, 1):
+            chunk = text[start:end]
+            yield (index, chunk, len(chunk.split()), "chunked_review" if split else "full_review",
+                   self.tokenizer.count(chunk))
+"""
+
+
+def ensure_chunk_table(session, table: str):
+    """Day 17 청크 테이블을 만들고, 이전 버전 테이블에는 새 컬럼을 추가합니다."""
+    session.sql(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            CHUNK_ID NUMBER,
+            DOC_ID NUMBER,
+            FILE_NAME VARCHAR,
+            CHUNK_TEXT VARCHAR,
+            CHUNK_SIZE NUMBER,
+            CHUNK_TYPE VARCHAR,
+            TOKEN_COUNT NUMBER,
+            CHUNK_INDEX NUMBER,
+            SOURCE_TIMESTAMP TIMESTAMP_NTZ,
+            CHUNK_CONFIG VARCHAR,
+            CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+        )
+    """).collect()
+    for column, column_type in _ADDED_COLUMNS.items():
+        session.sql(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}").collect()
+
+
+def _schema_prefix(table: str) -> str:
+    """'database.schema.table'의 'database.schema.' (이름만 있으면 빈 문자열)."""
+    return table.rsplit(".", 1)[0] + "." if "." in table else ""
+
+
+def chunker_name(table: str) -> str:
+    """청크 테이블과 같은 database.schema의 UDTF 이름 (세션의 현재 스키마에 의존하지 않음)."""
+    return _schema_prefix(table) + UDTF_NAME
+
+
+def register_chunker(session, chunk_table: str, stage: str = None) -> str:
+    """청킹 모듈을 스테이지에 올리고 청크 테이블의 스키마에 UDTF를 (다시) 만듭니다. 반환값: UDTF 이름.
+
+    stage: 모듈을 올릴 스테이지 (None이면 청크 테이블 스키마의 DEFAULT_STAGE)
+    """
+    stage = stage or _schema_prefix(chunk_table) + DEFAULT_STAGE
+    name = chunker_name(chunk_table)
+    ensure_stage(session, stage)
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in UDTF_MODULES:
+        session.file.put(os.path.join(module_dir, module), f"@{stage}/{UDTF_STAGE_DIR}/",
+                         auto_compress=False, overwrite=True)
+    imports = ", ".join(f"'@{stage}/{UDTF_STAGE_DIR}/{module}'" for module in UDTF_MODULES)
+    session.sql(f"""
+        CREATE OR REPLACE FUNCTION {name}(
+            TEXT VARCHAR, MODE VARCHAR, SIZE NUMBER, OVERLAP NUMBER, MAX_TOKENS NUMBER
+        )
+        RETURNS TABLE (CHUNK_INDEX NUMBER, CHUNK_TEXT VARCHAR, CHUNK_SIZE NUMBER, CHUNK_TYPE VARCHAR, TOKEN_COUNT NUMBER)
+        LANGUAGE PYTHON
+        RUNTIME_VERSION = '3.11'
+        PACKAGES = ('numpy', 'pandas')
+        IMPORTS = ({imports})
+        HANDLER = 'ReviewChunker'
+        AS $${_HANDLER}$$
+    """).collect()
+    return name
+
+
+def chunk_in_warehouse(session, source_table: str, target_table: str, mode: str = "words",
+                       size: int = 200, overlap: int = 50, max_tokens: int = 510, config: str = None,
+                       where: str = None, params: list = None) -> int:
+    """소스 문서 테이블을 UDTF로 청킹하여 target_table에 한 번의 INSERT ... SELECT로 추가합니다.
+
+    mode: 'keep'(리뷰 1개 = 청크 1개), 'words'(size/overlap 단어), 'tokens'(size 목표 토큰, overlap 토큰)
+    config: CHUNK_CONFIG 컬럼에 기록할 청킹 설정 (chunk_sync.chunk_config)
+    CHUNK_ID는 target_table의 기존 최대값 다음부터 FILE_NAME, DOC_ID, 청크 순서로 매깁니다.
+    UDTF는 target_table과 같은 스키마에 register_chunker로 만들어 두어야 합니다.
+    반환값: 삽입된 청크 수
+    """
+    if mode not in SERVER_MODES:
+        raise ValueError(f"지원하지 않는 청킹 모드: {mode}")
+    result = session.sql(f"""
+        INSERT INTO {target_table} ({", ".join(CHUNK_TABLE_COLUMNS)})
+        SELECT
+            (SELECT COALESCE(MAX(CHUNK_ID), 0) FROM {target_table})
+                + ROW_NUMBER() OVER (ORDER BY d.FILE_NAME, d.DOC_ID, c.CHUNK_INDEX) AS CHUNK_ID,
+            d.DOC_ID,
+            d.FILE_NAME,
+            c.CHUNK_TEXT,
+            c.CHUNK_SIZE,
+            c.CHUNK_TYPE,
+            c.TOKEN_COUNT,
+            c.CHUNK_INDEX,
+            d.UPLOAD_TIMESTAMP AS SOURCE_TIMESTAMP,
+            ? AS CHUNK_CONFIG
+        FROM {source_table} d,
+             TABLE({chunker_name(target_table)}(d.EXTRACTED_TEXT, '{mode}', {int(size)}, {int(overlap)}, {int(max_tokens)})) c
+        {f"WHERE {where}" if where else ""}
+    """, params=[config] + (params or [])).collect()
+    return result[0][0] if result else 0
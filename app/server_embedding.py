@@ -0,0 +1,112 @@
+# 서버 측 임베딩 생성 (Set-based In-warehouse Embedding)
+#
+# Day 18의 기본 경로는 청크마다 Python에서 embed_text_768을 호출하고, 벡터를 다시 INSERT 한 번으로 저장합니다.
+# batch_size와 관계없이 청크당 왕복이 두 번입니다.
+# 여기서는 INSERT INTO 임베딩 테이블 SELECT CHUNK_ID, SNOWFLAKE.CORTEX.EMBED_TEXT_768(...) FROM 청크 테이블
+# 한 문장으로 웨어하우스 안에서 임베딩을 만들고 저장합니다 (텍스트와 벡터가 앱을 거치지 않음).
+#
+# 큰 테이블은 CHUNK_ID 구간(slice_rows개씩)으로 나누어 구간마다 한 문장씩 실행합니다.
+# 구간마다 커밋되므로 중간에 실패해도 다시 실행하면 임베딩이 없는 청크만 이어서 처리하고(재시작 가능),
+# 구간이 끝날 때마다 임베딩 테이블의 행 수를 읽어 진행률을 표시합니다.
+
+import time
+
+from tokenization import DEFAULT_EMBED_MODEL
+
+DEFAULT_SLICE_ROWS = 5000   # INSERT ... SELECT 한 문장(한 번의 커밋)이 임베딩하는 최대 청크 수
+
+
+def ensure_embedding_table(session, table: str):
+    """Day 18 임베딩 테이블을 만듭니다 (있으면 그대로)."""
+    session.sql(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            CHUNK_ID NUMBER,
+            EMBEDDING VECTOR(FLOAT, 768),
+            CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+        )
+    """).collect()
+
+
+def prune_orphan_embeddings(session, embedding_table: str, chunk_table: str) -> int:
+    """청크 테이블에 없는 CHUNK_ID의 임베딩을 지웁니다 (Day 17 증분 청킹에서 삭제/다시 청킹된 청크).
+
+    반환값: 지운 행 수
+    """
+    result = session.sql(f"""
+        DELETE FROM {embedding_table} e
+        WHERE NOT EXISTS (SELECT 1 FROM {chunk_table} c WHERE c.CHUNK_ID = e.CHUNK_ID)
+    """).collect()
+    return result[0][0] if result else 0
+
+
+def _missing_filter(embedding_table: str, duplicate_table: str = None) -> str:
+    """임베딩이 없는 청크 (중복 매핑에서 다른 청크로 묶인 청크 제외) 조건."""
+    condition = f"NOT EXISTS (SELECT 1 FROM {embedding_table} e WHERE e.CHUNK_ID = c.CHUNK_ID)"
+    if duplicate_table:
+        condition += (f" AND NOT EXISTS (SELECT 1 FROM {duplicate_table} m "
+                      f"WHERE m.CHUNK_ID = c.CHUNK_ID AND m.CANONICAL_CHUNK_ID <> m.CHUNK_ID)")
+    return condition
+
+
+def row_count(session, table: str) -> int:
+    """테이블 행 수 (진행률 폴링용)."""
+    return session.sql(f"SELECT COUNT(*) FROM {table}").collect()[0][0]
+
+
+def embed_in_warehouse(session, chunk_table: str, embedding_table: str, model: str = DEFAULT_EMBED_MODEL,
+                       replace: bool = False, duplicate_table: str = None, slice_rows: int = DEFAULT_SLICE_ROWS,
+                       on_progress=None) -> dict:
+    """임베딩이 없는 청크를 INSERT ... SELECT EMBED_TEXT_768로 임베딩합니다.
+
+    replace: True면 임베딩 테이블을 비우고 모든 청크를 다시 임베딩합니다.
+    duplicate_table: 중복 매핑 테이블 (dedup.save_duplicate_map) - 대표 청크만 임베딩
+    slice_rows: 한 문장이 처리하는 최대 청크 수 (None이면 전체를 한 문장으로)
+    on_progress: 구간마다 on_progress(완료 청크 수, 전체 청크 수, 임베딩 테이블 행 수)
+    반환값: {'embedded', 'slices', 'seconds', 'rows', 'pruned'} - pruned는 청크가 사라져 지운 임베딩 수
+    """
+    ensure_embedding_table(session, embedding_table)
+    pruned = 0
+    if replace:
+        session.sql(f"TRUNCATE TABLE {embedding_table}").collect()
+    else:
+        pruned = prune_orphan_embeddings(session, embedding_table, chunk_table)
+    missing = _missing_filter(embedding_table, duplicate_table)
+
+    # 구간 경계: 임베딩이 없는 청크를 CHUNK_ID 순서로 slice_rows개씩 나눈 각 구간의 첫 CHUNK_ID
+    if slice_rows:
+        bounds = session.sql(f"""
+            SELECT CHUNK_ID, COUNT(*) OVER () AS TOTAL
+            FROM {chunk_table} c
+            WHERE {missing}
+            QUALIFY MOD(ROW_NUMBER() OVER (ORDER BY CHUNK_ID) - 1, {int(slice_rows)}) = 0
+            ORDER BY CHUNK_ID
+        """).collect()
+        total = bounds[0]['TOTAL'] if bounds else 0
+        slices = [(b['CHUNK_ID'], bounds[i + 1]['CHUNK_ID'] if i + 1 < len(bounds) else None)
+                  for i, b in enumerate(bounds)]
+    else:
+        total = session.sql(f"SELECT COUNT(*) FROM {chunk_table} c WHERE {missing}").collect()[0][0]
+        slices = [(None, None)] if total else []
+
+    start_rows = row_count(session, embedding_table)
+    rows = start_rows
+    start_time = time.perf_counter()
+    for low, high in slices:
+        bounds_filter = "".join([f" AND c.CHUNK_ID >= {int(low)}" if low is not None else "",
+                                 f" AND c.CHUNK_ID < {int(high)}" if high is not None else ""])
+        session.sql(f"""
+            INSERT INTO {embedding_table} (CHUNK_ID, EMBEDDING)
+            SELECT c.CHUNK_ID, SNOWFLAKE.CORTEX.EMBED_TEXT_768(?, c.CHUNK_TEXT)
+            FROM {chunk_table} c
+            WHERE {missing}{bounds_filter}
+        """, params=[model]).collect()
+        rows = row_count(session, embedding_table)
+        if on_progress:
+            on_progress(rows - start_rows, total, rows)
+    return {
+        'embedded': rows - start_rows,
+        'slices': len(slices),
+        'seconds': time.perf_counter() - start_time,
+        'rows': rows,
+        'pruned': pruned
+    }
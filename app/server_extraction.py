@@ -0,0 +1,88 @@
+# 서버 측 문서 파싱 (Server-side Document Parsing)
+#
+# 업로드 바이트를 앱 서버에서 pypdf로 파싱하지 않고, session.file.put_stream으로 내부 스테이지에
+# 그대로 올린 뒤 SNOWFLAKE.CORTEX.PARSE_DOCUMENT로 웨어하우스에서 한 번의 INSERT ... SELECT로 추출합니다.
+#
+# 스테이지 경로: @stage/<batch_id>/<content_hash>/<file_name>
+# 경로에 해시를 넣어 두면 별도 매핑 테이블 없이 INSERT ... SELECT에서 CONTENT_HASH를 채울 수 있습니다.
+
+import uuid
+
+from extraction import content_hash
+
+DEFAULT_STAGE = "DOC_STAGE"
+SERVER_FILE_TYPES = ("PDF",)  # TXT/MD는 디코딩만 하면 되므로 클라이언트에서 처리
+PARSE_MODES = ("LAYOUT", "OCR")
+PARSED_COLUMNS = ["FILE_NAME", "FILE_TYPE", "FILE_SIZE", "EXTRACTED_TEXT", "WORD_COUNT", "CHAR_COUNT", "CONTENT_HASH"]
+
+_HASH_LENGTH = 64
+
+
+def ensure_stage(session, stage: str):
+    """디렉터리 테이블이 있고 서버 측 암호화를 쓰는 내부 스테이지를 만듭니다 (PARSE_DOCUMENT 요구사항)."""
+    session.sql(f"""
+        CREATE STAGE IF NOT EXISTS {stage}
+        DIRECTORY = (ENABLE = TRUE)
+        ENCRYPTION = (TYPE = 'SNOWFLAKE_SSE')
+    """).collect()
+
+
+def new_batch_id() -> str:
+    return uuid.uuid4().hex
+
+
+def stage_source(session, source, stage: str, batch_id: str, digest: str = None) -> dict:
+    """업로드 파일 객체를 버퍼링 없이 스테이지로 스트리밍합니다.
+
+    반환값: {'file_name', 'file_size', 'content_hash', 'stage_path'}
+    """
+    digest = digest or content_hash(source)
+    source.seek(0)
+    stage_path = f"@{stage}/{batch_id}/{digest}/{source.name}"
+    session.file.put_stream(source, stage_path, auto_compress=False, overwrite=True)
+    return {
+        'file_name': source.name,
+        'file_size': source.size,
+        'content_hash': digest,
+        'stage_path': stage_path
+    }
+
+
+def parse_staged(session, stage: str, batch_id: str, table: str, mode: str = "LAYOUT") -> int:
+    """배치의 모든 스테이지 파일을 PARSE_DOCUMENT로 파싱하여 한 번의 INSERT ... SELECT로 저장합니다.
+
+    table: Day 16 문서 테이블과 같은 컬럼을 가진 테이블 (DOC_ID, UPLOAD_TIMESTAMP는 기본값 사용)
+    반환값: 삽입된 행 수 (텍스트가 추출되지 않은 파일은 제외)
+    """
+    if mode not in PARSE_MODES:
+        raise ValueError(f"지원하지 않는 파싱 모드: {mode}")
+    session.sql(f"ALTER STAGE {stage} REFRESH").collect()
+
+    # RELATIVE_PATH = <batch_id>/<hash>/<file_name>
+    name_start = len(batch_id) + 1 + _HASH_LENGTH + 2
+    result = session.sql(f"""
+        INSERT INTO {table} ({", ".join(PARSED_COLUMNS)})
+        SELECT
+            SUBSTR(RELATIVE_PATH, {name_start}) AS FILE_NAME,
+            'PDF' AS FILE_TYPE,
+            SIZE AS FILE_SIZE,
+            TEXT AS EXTRACTED_TEXT,
+            REGEXP_COUNT(TEXT, '\\\\S+') AS WORD_COUNT,
+            LENGTH(TEXT) AS CHAR_COUNT,
+            SPLIT_PART(RELATIVE_PATH, '/', 2) AS CONTENT_HASH
+        FROM (
+            SELECT
+                RELATIVE_PATH,
+                SIZE,
+                SNOWFLAKE.CORTEX.PARSE_DOCUMENT(@{stage}, RELATIVE_PATH, {{'mode': '{mode}'}}):content::VARCHAR AS TEXT
+            FROM DIRECTORY(@{stage})
+            WHERE STARTSWITH(RELATIVE_PATH, '{batch_id}/')
+        )
+        WHERE TEXT IS NOT NULL AND TRIM(TEXT) <> ''
+    """).collect()
+    return result[0][0] if result else 0
+
+
+def clear_batch(session, stage: str, batch_id: str):
+    """파싱이 끝난 배치의 스테이지 파일을 삭제합니다."""
+    session.sql(f"REMOVE @{stage}/{batch_id}/").collect()
@@ -0,0 +1,144 @@
+# 스트리밍 및 진행 상황 업데이트를 위한 스로틀링 헬퍼 (Throttled UI Updates)
+#
+# 토큰 스트림이나 행 단위 루프에서 매번 화면을 갱신하면 브라우저로 보내는 델타(delta)가
+# 너무 많아집니다. 여기의 헬퍼들은 짧은 시간 창(기본 50ms) 동안의 업데이트를 모아서
+# 한 번에 내보냅니다.
+
+import time
+
+DEFAULT_INTERVAL = 0.05  # 50ms
+
+
+class Throttle:
+    """마지막 출력 이후 interval 초가 지났는지 확인하는 간단한 타이머입니다."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.emitted = 0    # 실제로 화면에 보낸 업데이트 수
+        self.coalesced = 0  # 묶여서 생략된 업데이트 수
+        self._last = float("-inf")
+
+    def ready(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if force or now - self._last >= self.interval:
+            self._last = now
+            self.emitted += 1
+            return True
+        self.coalesced += 1
+        return False
+
+
+def throttled_stream(chunks, interval: float = DEFAULT_INTERVAL, throttle: Throttle = None):
+    """청크를 interval 동안 모아서 하나의 문자열로 내보내는 제너레이터입니다.
+
+    `st.write_stream(throttled_stream(generator))` 형태로 사용합니다.
+    첫 번째 청크는 바로 내보내므로 첫 토큰까지의 체감 시간은 그대로입니다.
+    """
+    if callable(chunks):
+        chunks = chunks()
+    throttle = throttle or Throttle(interval)
+
+    buffer = []
+    for chunk in chunks:
+        if not isinstance(chunk, str):
+            # 문자열이 아닌 청크(예: 데이터프레임)는 버퍼를 비운 뒤 그대로 전달
+            if buffer:
+                throttle.ready(force=True)
+                yield "".join(buffer)
+                buffer = []
+            throttle.ready(force=True)
+            yield chunk
+            continue
+        if not chunk:
+            continue
+
+        buffer.append(chunk)
+        if throttle.ready():
+            yield "".join(buffer)
+            buffer = []
+
+    if buffer:
+        throttle.ready(force=True)
+        yield "".join(buffer)
+
+
+class ThrottledProgress:
+    """st.progress 및 상태 텍스트 업데이트를 interval 단위로 묶습니다.
+
+    progress_bar: st.progress(...) 로 만든 요소
+    caption: 선택 사항, 상태 텍스트를 표시할 st.empty() 플레이스홀더
+    """
+
+    def __init__(self, progress_bar, caption=None, interval: float = DEFAULT_INTERVAL):
+        self.progress_bar = progress_bar
+        self.caption = caption
+        self.throttle = Throttle(interval)
+        self._pending = None
+
+    def update(self, value: float, text: str = None, caption: str = None, force: bool = False):
+        self._pending = (min(max(value, 0.0), 1.0), text, caption)
+        # 마지막 업데이트(100%)는 항상 내보냄
+        if self.throttle.ready(force=force or value >= 1.0):
+            self._render()
+
+    def flush(self):
+        """대기 중인 마지막 업데이트를 내보냅니다."""
+        if self._pending is not None:
+            self.throttle.ready(force=True)
+            self._render()
+
+    def _render(self):
+        value, text, caption = self._pending
+        self._pending = None
+        self.progress_bar.progress(value, text=text)
+        if self.caption is not None and caption is not None:
+            self.caption.caption(caption)
+
+
+if __name__ == "__main__":
+    # 델타 수 및 CPU 시간 측정: python stream_utils.py
+    class _CountingSink:
+        def __init__(self):
+            self.deltas = 0
+
+        def progress(self, value, text=None):
+            self.deltas += 1
+
+        def caption(self, text):
+            self.deltas += 1
+
+    def _token_stream(n_tokens, delay):
+        for i in range(n_tokens):
+            if delay:
+                time.sleep(delay)
+            yield f"tok{i} "
+
+    print("== 스트리밍 (write_stream 델타 수) ==")
+    for n_tokens, delay in [(2000, 0.0005), (20000, 0.0)]:
+        cpu, wall = time.process_time(), time.perf_counter()
+        raw = sum(1 for _ in _token_stream(n_tokens, delay))
+        raw_cpu, raw_wall = time.process_time() - cpu, time.perf_counter() - wall
+
+        cpu, wall = time.process_time(), time.perf_counter()
+        throttled = sum(1 for _ in throttled_stream(_token_stream(n_tokens, delay)))
+        thr_cpu, thr_wall = time.process_time() - cpu, time.perf_counter() - wall
+        print(f"{n_tokens:>6} tokens: 델타 {raw:>6} -> {throttled:>4} | "
+              f"CPU {raw_cpu * 1000:.1f}ms -> {thr_cpu * 1000:.1f}ms | "
+              f"wall {raw_wall:.2f}s -> {thr_wall:.2f}s")
+
+    print("== 진행 상황 (progress + caption 델타 수) ==")
+    for n_rows in [1000, 100000]:
+        sink = _CountingSink()
+        for i in range(n_rows):
+            sink.progress((i + 1) / n_rows, text=f"{i + 1}/{n_rows}")
+            sink.caption(f"row {i + 1}")
+        raw = sink.deltas
+
+        sink = _CountingSink()
+        tracker = ThrottledProgress(sink, caption=sink)
+        cpu = time.process_time()
+        for i in range(n_rows):
+            tracker.update((i + 1) / n_rows, text=f"{i + 1}/{n_rows}", caption=f"row {i + 1}")
+        tracker.flush()
+        print(f"{n_rows:>6} rows: 델타 {raw:>6} -> {sink.deltas:>4} | "
+              f"throttle CPU {(time.process_time() - cpu) * 1000:.1f}ms")
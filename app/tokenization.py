@@ -0,0 +1,99 @@
+# 임베딩 모델 토크나이저 (Embedding Model Tokenizers)
+#
+# Day 17의 토큰 기준 청킹에서 사용합니다. 임베딩 모델은 최대 토큰 수를 넘는 입력을 경고 없이
+# 잘라내므로(snowflake-arctic-embed-m: 512), 청크 크기를 단어 수가 아니라 토큰 수로 제한합니다.
+#
+# 토크나이저는 교체할 수 있습니다 (TOKENIZERS):
+#   "estimate"      의존성 없는 BERT WordPiece(uncased) 근사. 한글 음절은 NFD 분해 후 자모 수(2~3),
+#                   영숫자 연속 구간은 5자당 1토큰으로 세어 실제보다 크게(보수적으로) 셉니다.
+#   "arctic-embed-m" Hugging Face tokenizers 패키지가 있으면 모델의 실제 토크나이저를 사용합니다.
+
+import importlib.util
+import math
+import re
+from functools import lru_cache
+
+DEFAULT_EMBED_MODEL = "snowflake-arctic-embed-m"
+EMBED_MODEL_LIMITS = {
+    "snowflake-arctic-embed-m": 512,
+    "snowflake-arctic-embed-m-v1.5": 512,
+    "e5-base-v2": 512,
+}
+SPECIAL_TOKENS = 2  # [CLS], [SEP]
+DEFAULT_TOKENIZER = "estimate"
+
+_PIECE = re.compile(r"[A-Za-z0-9]+|[가-힣]|\S")
+_ALNUM_CHARS_PER_TOKEN = 5
+
+
+def max_content_tokens(model: str = DEFAULT_EMBED_MODEL) -> int:
+    """특수 토큰을 뺀, 청크 텍스트에 쓸 수 있는 최대 토큰 수입니다."""
+    return EMBED_MODEL_LIMITS[model] - SPECIAL_TOKENS
+
+
+class EstimateTokenizer:
+    """외부 패키지 없이 WordPiece 토큰 수를 보수적으로 근사합니다."""
+
+    name = "estimate"
+
+    @staticmethod
+    def _piece_tokens(piece: str) -> int:
+        if len(piece) == 1 and "가" <= piece <= "힣":
+            return 3 if (ord(piece) - 0xAC00) % 28 else 2  # 받침이 있으면 자모 3개
+        if piece[0].isascii() and piece[0].isalnum():
+            return math.ceil(len(piece) / _ALNUM_CHARS_PER_TOKEN)
+        return 1
+
+    def count(self, text: str) -> int:
+        return sum(self._piece_tokens(p) for p in _PIECE.findall(text))
+
+    def count_batch(self, texts) -> list:
+        return [self.count(t) for t in texts]
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """앞에서부터 max_tokens 토큰까지의 접두사 (모델이 실제로 보는 부분)."""
+        total = 0
+        for m in _PIECE.finditer(text):
+            total += self._piece_tokens(m.group())
+            if total > max_tokens:
+                return text[:m.start()]
+        return text
+
+
+class HuggingFaceTokenizer:
+    """tokenizers 패키지로 모델의 실제 토크나이저를 사용합니다 (특수 토큰 제외)."""
+
+    def __init__(self, name: str, repo: str):
+        from tokenizers import Tokenizer
+        self.name = name
+        self._tokenizer = Tokenizer.from_pretrained(repo)
+        self._tokenizer.no_truncation()
+
+    def count(self, text: str) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def count_batch(self, texts) -> list:
+        return [len(e.ids) for e in self._tokenizer.encode_batch(list(texts), add_special_tokens=False)]
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        offsets = self._tokenizer.encode(text, add_special_tokens=False).offsets
+        return text if len(offsets) <= max_tokens else text[:offsets[max_tokens - 1][1]]
+
+
+TOKENIZERS = {
+    "estimate": (lambda: EstimateTokenizer(), None),
+    "arctic-embed-m": (lambda: HuggingFaceTokenizer("arctic-embed-m", "Snowflake/snowflake-arctic-embed-m"), "tokenizers"),
+}
+
+
+def available_tokenizers() -> list:
+    """설치된 패키지로 사용할 수 있는 토크나이저 이름 목록입니다."""
+    return [name for name, (_, package) in TOKENIZERS.items()
+            if package is None or importlib.util.find_spec(package) is not None]
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(name: str = DEFAULT_TOKENIZER):
+    """토크나이저를 만들어 프로세스 안에서 재사용합니다 (워커 프로세스는 이름으로 다시 만듦)."""
+    factory, _ = TOKENIZERS[name]
+    return factory()
@@ -0,0 +1,184 @@
+# 로컬 벡터 검색 벤치마크 (Vector Search Benchmarks)
+#
+#   quantization  저장 형식(float32/float16/int8)별 recall@k(정확한 float32 검색 대비), 질문 1개 지연(p50/p99),
+#                 질문 묶음 처리량(QPS), 인덱스 크기
+#   ann           IVF-PQ 근사 검색(ann_index)의 nprobe/refine별 recall@k와 QPS를 정확한 전수 검색과 비교
+# 합성 임베딩(클러스터 중심 + 잡음, 정규화)으로 로컬에서만 실행합니다. Snowflake 연결이 필요 없습니다.
+#
+# 사용 예:
+#   python vector_bench.py quantization --vectors 10000 100000 --queries 200 --k 10
+#   python vector_bench.py ann --vectors 100000 500000 --nprobe 4 16 64 --refine 0 4 16 64
+#   python vector_bench.py ann --vectors 100000 --latent-dim 64   # 실제 임베딩처럼 낮은 내재 차원
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from ann_index import build_ann_index, AnnIndex, DEFAULT_NPROBE, DEFAULT_REFINE
+from vector_index import VectorIndex, normalize_rows, DTYPES
+from vector_writer import EMBEDDING_DIM
+
+
+def synthetic_embeddings(n_vectors: int, n_queries: int, dim: int = EMBEDDING_DIM, clusters: int = 200,
+                         noise: float = 0.6, latent_dim: int = 0, seed: int = 0):
+    """리뷰 임베딩처럼 주제별로 뭉친 정규화 벡터 n_vectors개와, 그 근처의 질문 n_queries개.
+
+    latent_dim: 0이면 dim차원 전체에 고르게 퍼진 잡음 (근사 검색에 가장 불리),
+                아니면 latent_dim차원에서 만든 벡터를 dim차원으로 투영하고 작은 잡음을 더함
+    """
+    rng = np.random.default_rng(seed)
+    space = latent_dim or dim
+    centers = rng.standard_normal((clusters, space), dtype=np.float32)
+    projection = rng.standard_normal((space, dim), dtype=np.float32) if latent_dim else None
+    vectors = np.empty((n_vectors, dim), dtype=np.float32)
+    for start in range(0, n_vectors, 50000):  # 메모리 제한을 위해 나누어 생성
+        end = min(start + 50000, n_vectors)
+        part = centers[rng.integers(clusters, size=end - start)]
+        part += noise * rng.standard_normal((end - start, space), dtype=np.float32)
+        if latent_dim:
+            part = part @ projection
+            part += 0.3 * np.sqrt(latent_dim / dim) * rng.standard_normal((end - start, dim), dtype=np.float32)
+        vectors[start:end] = normalize_rows(part)
+    queries = vectors[rng.integers(n_vectors, size=n_queries)] + 0.05 * rng.standard_normal((n_queries, dim), dtype=np.float32)
+    return vectors, normalize_rows(queries)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int, block_rows: int = 65536) -> np.ndarray:
+    """정확한 float32 상위 k개 행 번호 (정답)."""
+    best = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(vectors), block_rows):
+        scores = queries @ vectors[start:start + block_rows].T
+        best = np.concatenate([best, np.broadcast_to(np.arange(scores.shape[1]) + start, scores.shape)], axis=1)
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        keep = np.argpartition(best_scores, -k, axis=1)[:, -k:]
+        best = np.take_along_axis(best, keep, axis=1)
+        best_scores = np.take_along_axis(best_scores, keep, axis=1)
+    return best
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """질문별 |찾은 k개 ∩ 정답 k개| / k 의 평균."""
+    return float(np.mean([len(np.intersect1d(f, t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def latency_ms(search, queries: np.ndarray, repeat: int = 1) -> np.ndarray:
+    times = []
+    for _ in range(repeat):
+        for q in queries:
+            start = time.perf_counter()
+            search(q)
+            times.append((time.perf_counter() - start) * 1000)
+    return np.array(times)
+
+
+def bench_quantization(args):
+    print(f"k={args.k} queries={args.queries} batch={args.batch} CPU={os.cpu_count()} (메모리 맵 파일은 페이지 캐시에 올라간 상태)")
+    print(f"{'vectors':>9} {'dtype':>8} | {'MB':>8} {'build s':>8} | {f'recall@{args.k}':>9} | "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'batch QPS':>10}")
+    for n_vectors in args.vectors:
+        vectors, queries = synthetic_embeddings(n_vectors, args.queries, seed=args.seed)
+        truth = exact_top_k(vectors, queries, args.k)
+        with tempfile.TemporaryDirectory() as directory:
+            for dtype in args.dtypes:
+                start = time.perf_counter()
+                index = VectorIndex(os.path.join(directory, dtype), dtype)
+                for part in range(0, n_vectors, 50000):
+                    index.add(np.arange(part, min(part + 50000, n_vectors)), vectors[part:part + 50000])
+                build = time.perf_counter() - start
+
+                found, _ = index.search(queries, args.k)
+                recall = recall_at_k(found, truth)
+                index.search(queries[:1], args.k)  # 페이지 캐시 예열
+                single = latency_ms(lambda q: index.search(q, args.k), queries[:args.latency_queries])
+                start = time.perf_counter()
+                for b in range(0, len(queries), args.batch):
+                    index.search(queries[b:b + args.batch], args.k)
+                qps = len(queries) / (time.perf_counter() - start)
+                print(f"{n_vectors:>9,} {dtype:>8} | {index.nbytes() / 1e6:>8.1f} {build:>8.2f} | {recall:>9.3f} | "
+                      f"{np.percentile(single, 50):>8.2f} {np.percentile(single, 99):>8.2f} {qps:>10,.0f}")
+                del index
+        del vectors
+
+
+def bench_ann(args):
+    print(f"k={args.k} queries={args.queries} latent_dim={args.latent_dim or '-'} CPU={os.cpu_count()} "
+          f"(refine는 int8 로컬 인덱스로 다시 채점)")
+    print(f"{'vectors':>9} {'method':>22} | {'MB':>8} {'build s':>8} | {f'recall@{args.k}':>9} | "
+          f"{'p50 ms':>8} {'QPS':>8} {'speedup':>8}")
+    for n_vectors in args.vectors:
+        vectors, queries = synthetic_embeddings(n_vectors, args.queries, latent_dim=args.latent_dim, seed=args.seed)
+        truth = exact_top_k(vectors, queries, args.k)
+        with tempfile.TemporaryDirectory() as directory:
+            exact = {}
+            for dtype in ("float32", "int8"):
+                index = VectorIndex(os.path.join(directory, dtype), dtype)
+                for part in range(0, n_vectors, 50000):
+                    index.add(np.arange(part, min(part + 50000, n_vectors)), vectors[part:part + 50000])
+                exact[dtype] = index
+            del vectors
+
+            def report(name, search, size, build, baseline=None):
+                found = search(queries)
+                single = latency_ms(lambda q: search(q), queries[:args.latency_queries])
+                start = time.perf_counter()
+                for q in queries:  # 대화형 검색처럼 질문 하나씩
+                    search(q)
+                qps = len(queries) / (time.perf_counter() - start)
+                print(f"{n_vectors:>9,} {name:>22} | {size / 1e6:>8.1f} {build:>8.1f} | "
+                      f"{recall_at_k(found, truth):>9.3f} | {np.percentile(single, 50):>8.2f} {qps:>8,.0f} "
+                      f"{f'{qps / baseline:.1f}x' if baseline else '':>8}")
+                return qps
+
+            base_qps = report("exact float32", lambda q: exact["float32"].search(q, args.k)[0],
+                              exact["float32"].nbytes(), 0.0)
+            report("exact int8", lambda q: exact["int8"].search(q, args.k)[0], exact["int8"].nbytes(), 0.0, base_qps)
+
+            start = time.perf_counter()
+            ann = build_ann_index(exact["int8"], nlist=args.nlist, seed=args.seed)
+            build = time.perf_counter() - start
+            ann.save(os.path.join(directory, "ann"))
+            ann = AnnIndex.load(os.path.join(directory, "ann"))  # 저장/로드 확인
+            for nprobe in args.nprobe:
+                for refine in args.refine:
+                    report(f"ivfpq nprobe={nprobe} r={refine}",
+                           lambda q: ann.search(q, args.k, nprobe, refine, exact["int8"])[0],
+                           ann.nbytes(), build, base_qps)
+            del exact, ann
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 벡터 검색 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("quantization", help="float32/float16/int8 인덱스의 recall@k와 지연 시간")
+    p.add_argument("--vectors", type=int, nargs="+", default=[10_000, 100_000])
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--latency-queries", type=int, default=50, help="질문 1개 지연 시간을 잴 질문 수")
+    p.add_argument("--batch", type=int, default=64, help="처리량 측정 시 한 번에 검색하는 질문 수")
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--dtypes", nargs="+", default=DTYPES, choices=DTYPES)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=bench_quantization)
+
+    p = sub.add_parser("ann", help="IVF-PQ 근사 검색 vs 정확한 전수 검색: recall@k와 QPS")
+    p.add_argument("--vectors", type=int, nargs="+", default=[100_000, 500_000])
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--latency-queries", type=int, default=50)
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--nlist", type=int, default=None, help="IVF 목록 수 (기본: 4 × sqrt(n))")
+    p.add_argument("--nprobe", type=int, nargs="+", default=[4, DEFAULT_NPROBE, 64])
+    p.add_argument("--refine", type=int, nargs="+", default=[0, 4, 16, DEFAULT_REFINE])
+    p.add_argument("--latent-dim", type=int, default=0)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=bench_ann)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+# 로컬 벡터 인덱스 (Local Memory-mapped Vector Index)
+#
+# Day 18이 만든 REVIEW_EMBEDDINGS는 검색에 쓰이지 않고, Day 20–22의 모든 질문은 원격 Cortex Search 서비스로 갑니다.
+# 여기서는 임베딩 테이블을 로컬 디렉터리로 내보내, 행마다 정규화한 (n, 768) 행렬을 메모리 맵 파일로 엽니다.
+# 정규화된 행끼리의 내적이 코사인 유사도이므로, 질문 묶음 (b, 768)과 행렬을 블록 단위로 곱하고
+# argpartition으로 블록마다 상위 k개만 남겨 합칩니다 (전체 정렬 없음).
+#
+# 저장 형식(dtype): float32(원본), float16(절반 크기), int8(행마다 스케일 하나, 1/4 크기).
+# 새로 고침은 CREATED_TIMESTAMP 워터마크 이후의 행만 가져와 파일 끝에 덧붙이고, 같은 CHUNK_ID의 예전 행은
+# 삭제 표시(live=0)만 합니다. 테이블에서 지워진 CHUNK_ID는 CHUNK_ID 목록만 읽어 맞춰 삭제 표시하고,
+# 삭제 표시된 행이 많아지면 로컬에서 압축(compact)합니다.
+
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+import numpy as np
+
+from review_stream import review_batches
+from vector_writer import EMBEDDING_DIM
+
+DEFAULT_INDEX_DIR = ".vector_index"
+DTYPES = ["float32", "float16", "int8"]
+DEFAULT_BLOCK_ROWS = 16384      # 상위 k개를 고르는 블록 행 수
+DECODE_ROWS = 256               # float16/int8을 float32로 바꿔 곱하는 단위 (버퍼가 CPU 캐시에 머무는 크기)
+DEFAULT_EXPORT_ROWS = 20000     # 내보내기 묶음 크기
+COMPACT_RATIO = 0.25            # 삭제 표시된 행 비율이 이보다 크면 압축
+METADATA_COLUMNS = ["CHUNK_ID", "FILE_NAME", "CHUNK_TYPE", "CHUNK_TEXT"]
+
+
+def normalize_rows(matrix) -> np.ndarray:
+    """행마다 L2 정규화한 float32 행렬 (영벡터는 그대로)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def quantize(matrix: np.ndarray, dtype: str):
+    """정규화된 행렬을 저장 형식으로 바꿉니다. 반환값: (코드 행렬, int8의 행별 스케일 또는 None)"""
+    if dtype == "float32":
+        return np.ascontiguousarray(matrix, dtype=np.float32), None
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"지원하지 않는 dtype: {dtype} ({', '.join(DTYPES)})")
+
+
+class VectorIndex:
+    """디렉터리 하나에 저장되는 메모리 맵 벡터 인덱스입니다.
+
+    vectors.bin (n, dim) 코드 행렬, scales.bin (int8만), ids.bin CHUNK_ID, live.bin 삭제 표시,
+    chunks.sqlite 청크 텍스트/파일 이름, meta.json 행 수/dtype/워터마크
+    """
+
+    def __init__(self, directory: str, dtype: str = "float32", dim: int = EMBEDDING_DIM):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            if dtype not in DTYPES:
+                raise ValueError(f"지원하지 않는 dtype: {dtype} ({', '.join(DTYPES)})")
+            self.meta = {'dtype': dtype, 'dim': dim, 'rows': 0, 'watermark': None, 'source': None, 'generation': 0}
+            self._save_meta()
+        self._db = sqlite3.connect(os.path.join(directory, "chunks.sqlite"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS chunks "
+                         "(row INTEGER PRIMARY KEY, chunk_id INTEGER, file_name TEXT, chunk_type TEXT, chunk_text TEXT)")
+        self._open()
+
+    @property
+    def dtype(self) -> str:
+        return self.meta['dtype']
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _save_meta(self):
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def _open(self):
+        """파일을 메모리 맵으로 엽니다 (덧붙인 뒤에는 다시 열어야 새 행이 보임)."""
+        rows, dim = self.meta['rows'], self.meta['dim']
+        if rows == 0:
+            self.vectors = np.empty((0, dim), dtype=self.dtype)
+            self.scales = None
+            self.ids = np.empty(0, dtype=np.int64)
+            self.live = np.empty(0, dtype=bool)
+            self._row_lookup = None
+            return
+        self.vectors = np.memmap(self._path("vectors.bin"), dtype=self.dtype, mode="r", shape=(rows, dim))
+        self.scales = (np.memmap(self._path("scales.bin"), dtype=np.float32, mode="r", shape=(rows,))
+                       if self.dtype == "int8" else None)
+        self.ids = np.memmap(self._path("ids.bin"), dtype=np.int64, mode="r", shape=(rows,))
+        self.live = np.memmap(self._path("live.bin"), dtype=bool, mode="r+", shape=(rows,))
+        self._row_lookup = None
+
+    def __len__(self) -> int:
+        return int(self.live.sum())
+
+    def nbytes(self) -> int:
+        """벡터(와 스케일) 파일 크기."""
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def delete(self, chunk_ids) -> int:
+        """CHUNK_ID의 행을 삭제 표시합니다. 반환값: 삭제 표시한 행 수."""
+        if not len(self.ids):
+            return 0
+        rows = np.flatnonzero(np.isin(self.ids, np.asarray(chunk_ids, dtype=np.int64)) & self.live)
+        self.live[rows] = False
+        self.live.flush()
+        self._row_lookup = None
+        return len(rows)
+
+    def add(self, chunk_ids, matrix, metadata: list = None) -> int:
+        """임베딩을 덧붙입니다. 이미 있는 CHUNK_ID의 예전 행은 삭제 표시합니다. 반환값: 교체된 행 수.
+
+        metadata: 행마다 {'FILE_NAME', 'CHUNK_TYPE', 'CHUNK_TEXT'} (선택)
+        """
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        if not len(chunk_ids):
+            return 0
+        matrix = np.atleast_2d(matrix)
+        # 같은 묶음 안의 중복 CHUNK_ID는 마지막 행만 (테이블의 중복 행이 인덱스에서 두 번 살아 있지 않도록)
+        _, last = np.unique(chunk_ids[::-1], return_index=True)
+        if len(last) < len(chunk_ids):
+            keep = np.sort(len(chunk_ids) - 1 - last)
+            chunk_ids, matrix = chunk_ids[keep], matrix[keep]
+            metadata = [metadata[i] for i in keep] if metadata is not None else None
+        replaced = self.delete(chunk_ids)
+        codes, scales = quantize(normalize_rows(matrix), self.dtype)
+        start = self.meta['rows']
+        for name, array in (("vectors.bin", codes), ("scales.bin", scales), ("ids.bin", chunk_ids),
+                            ("live.bin", np.ones(len(chunk_ids), dtype=bool))):
+            if array is not None:
+                with open(self._path(name), "ab") as f:
+                    f.write(np.ascontiguousarray(array).tobytes())
+        if metadata is not None:
+            self._db.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)",
+                                 [(start + i, int(chunk_id), m.get('FILE_NAME'), m.get('CHUNK_TYPE'), m.get('CHUNK_TEXT'))
+                                  for i, (chunk_id, m) in enumerate(zip(chunk_ids, metadata))])
+            self._db.commit()
+        self.meta['rows'] = start + len(chunk_ids)
+        self._save_meta()
+        self._open()
+        return replaced
+
+    def rows_for(self, chunk_ids) -> np.ndarray:
+        """CHUNK_ID의 살아 있는 행 번호 (없으면 -1)."""
+        if self._row_lookup is None:
+            live_rows = np.flatnonzero(self.live)
+            order = np.argsort(self.ids[live_rows], kind="stable")
+            self._row_lookup = (np.asarray(self.ids[live_rows][order]), live_rows[order])
+        sorted_ids, sorted_rows = self._row_lookup
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        if not len(sorted_ids):
+            return np.full(chunk_ids.shape, -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(sorted_ids, chunk_ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[positions] == chunk_ids, sorted_rows[positions], -1)
+
+    def vectors_for(self, rows) -> np.ndarray:
+        """행 번호의 벡터를 float32로 복원합니다 (int8은 스케일 적용)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows][:, None]
+        return vectors
+
+    def _scores(self, queries: np.ndarray, start: int, end: int) -> np.ndarray:
+        """queries (b, dim)와 행 start:end의 내적 (b, m). float16/int8은 작은 버퍼에 나누어 float32로 변환합니다."""
+        block = self.vectors[start:end]
+        if self.dtype == "float32":
+            return queries @ block.T
+        scores = np.empty((len(queries), len(block)), dtype=np.float32)
+        buffer = np.empty((DECODE_ROWS, block.shape[1]), dtype=np.float32)
+        for offset in range(0, len(block), DECODE_ROWS):
+            part = block[offset:offset + DECODE_ROWS]
+            np.copyto(buffer[:len(part)], part)
+            np.matmul(queries, buffer[:len(part)].T, out=scores[:, offset:offset + len(part)])
+        if self.scales is not None:
+            scores *= self.scales[start:end]
+        return scores
+
+    def search(self, queries, k: int = 5, block_rows: int = DEFAULT_BLOCK_ROWS):
+        """코사인 유사도 상위 k개. queries: (dim,) 또는 (b, dim).
+
+        반환값: (행 번호 (b, k), 점수 (b, k)) - 점수 내림차순, 살아 있는 행이 k개보다 적으면 행 번호 -1
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        n_queries = len(queries)
+        best_rows = np.full((n_queries, k), -1, dtype=np.int64)          # 빈 자리 (행 번호 -1, 점수 -inf)
+        best_scores = np.full((n_queries, k), -np.inf, dtype=np.float32)
+        for start in range(0, self.meta['rows'], block_rows):
+            scores = self._scores(queries, start, min(start + block_rows, self.meta['rows']))
+            scores[:, ~self.live[start:start + block_rows]] = -np.inf
+            if scores.shape[1] > k:
+                top = np.argpartition(scores, -k, axis=1)[:, -k:]
+                scores = np.take_along_axis(scores, top, axis=1)
+            else:
+                top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            best_rows = np.concatenate([best_rows, top + start], axis=1)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            if best_rows.shape[1] > k:
+                keep = np.argpartition(best_scores, -k, axis=1)[:, -k:]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows[~np.isfinite(best_scores)] = -1
+        return best_rows, best_scores
+
+    def metadata(self, rows) -> list:
+        """행 번호의 청크 정보 {'CHUNK_ID', 'FILE_NAME', 'CHUNK_TYPE', 'CHUNK_TEXT'} 목록 (행 순서대로)."""
+        rows = [int(r) for r in rows if r >= 0]
+        if not rows:
+            return []
+        found = {r[0]: dict(zip(METADATA_COLUMNS, r[1:])) for r in self._db.execute(
+            f"SELECT row, chunk_id, file_name, chunk_type, chunk_text FROM chunks "
+            f"WHERE row IN ({','.join('?' * len(rows))})", rows)}
+        return [found.get(r, {'CHUNK_ID': int(self.ids[r])}) for r in rows]
+
+    def compact(self):
+        """삭제 표시된 행을 빼고 파일을 다시 씁니다 (원격 조회 없음)."""
+        keep = np.flatnonzero(self.live)
+        vectors, ids = np.array(self.vectors[keep]), np.array(self.ids[keep])
+        scales = np.array(self.scales[keep]) if self.scales is not None else None
+        old_rows = {int(r): i for i, r in enumerate(keep)}
+        metadata = self._db.execute("SELECT row, chunk_id, file_name, chunk_type, chunk_text FROM chunks").fetchall()
+        self._db.execute("DELETE FROM chunks")
+        self._db.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?)",
+                             [(old_rows[r[0]],) + tuple(r[1:]) for r in metadata if r[0] in old_rows])
+        self._db.commit()
+        for name, array in (("vectors.bin", vectors), ("scales.bin", scales), ("ids.bin", ids),
+                            ("live.bin", np.ones(len(keep), dtype=bool))):
+            if array is not None:
+                tmp_path = self._path(name + ".tmp")
+                with open(tmp_path, "wb") as f:
+                    f.write(array.tobytes())
+                os.replace(tmp_path, self._path(name))
+        self.meta['rows'] = len(keep)
+        self.meta['generation'] = self.meta.get('generation', 0) + 1  # 행 번호가 바뀜 (ann_index 동기화용)
+        self._save_meta()
+        self._open()
+
+    def clear(self):
+        """모든 행을 지웁니다 (dtype은 유지)."""
+        for name in ("vectors.bin", "scales.bin", "ids.bin", "live.bin"):
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+        self._db.execute("DELETE FROM chunks")
+        self._db.commit()
+        self.meta.update({'rows': 0, 'watermark': None, 'generation': self.meta.get('generation', 0) + 1})
+        self._save_meta()
+        self._open()
+
+
+def index_directory(embedding_table: str, dtype: str, root: str = DEFAULT_INDEX_DIR) -> str:
+    """임베딩 테이블/저장 형식별 인덱스 디렉터리."""
+    return os.path.join(root, f"{embedding_table.replace('.', '_')}-{dtype}")
+
+
+def remove_index(directory: str):
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def _parse_vectors(values) -> np.ndarray:
+    """EMBEDDING::ARRAY 결과(JSON 문자열 또는 리스트)를 (n, dim) float32 행렬로."""
+    values = list(values)
+    if values and isinstance(values[0], str):
+        return np.array(json.loads("[" + ",".join(values) + "]"), dtype=np.float32)
+    return np.array(values, dtype=np.float32)
+
+
+def refresh_index(session, index: VectorIndex, embedding_table: str, chunk_table: str = None,
+                  batch_rows: int = DEFAULT_EXPORT_ROWS, on_batch=None) -> dict:
+    """임베딩 테이블에서 워터마크(CREATED_TIMESTAMP) 이후의 행만 가져와 인덱스에 반영합니다.
+
+    교체된 임베딩(DELETE + INSERT로 새 타임스탬프)은 새 행으로 들어오고 예전 행은 삭제 표시됩니다.
+    그 뒤 테이블의 COUNT(DISTINCT CHUNK_ID)가 인덱스 행 수와 다르면 CHUNK_ID 목록을 읽어
+    테이블에 없는 CHUNK_ID를 삭제 표시합니다. 인덱스가 비었거나 다른 테이블에서 만들었으면,
+    또는 맞춘 뒤에도 인덱스에 없는 CHUNK_ID가 남으면 처음부터 다시 만듭니다.
+    chunk_table: 청크 텍스트/파일 이름을 가져올 청크 테이블 (None이면 벡터만)
+    on_batch: 묶음마다 on_batch(가져온 행 수)
+    반환값: {'added', 'replaced', 'deleted', 'rebuilt', 'compacted', 'rows', 'seconds'}
+    """
+    start_time = time.perf_counter()
+    rebuilt = index.meta['source'] != embedding_table or index.meta['watermark'] is None
+    if rebuilt:
+        index.clear()
+    added, replaced = _append_new_rows(session, index, embedding_table, chunk_table, batch_rows, on_batch)
+    index.meta['source'] = embedding_table
+    index._save_meta()
+
+    # 지워진 CHUNK_ID 맞추기 (행 수가 같으면 CHUNK_ID 목록을 읽지 않음)
+    deleted = 0
+    distinct = session.sql(f"SELECT COUNT(DISTINCT CHUNK_ID) FROM {embedding_table}").collect()[0][0]
+    if distinct != len(index):
+        live_ids = np.unique(np.asarray(index.ids)[np.asarray(index.live)])
+        table_ids = np.unique(np.concatenate(
+            [df['CHUNK_ID'].to_numpy(dtype=np.int64) for df in
+             review_batches(session, f"SELECT DISTINCT CHUNK_ID FROM {embedding_table}", None, batch_rows)]
+            or [np.empty(0, dtype=np.int64)]))
+        deleted = index.delete(np.setdiff1d(live_ids, table_ids, assume_unique=True))
+        if len(np.setdiff1d(table_ids, live_ids, assume_unique=True)):
+            # 워터마크 이전인데 인덱스에 없는 행 (예: 같은 타임스탬프로 늦게 들어온 행) - 다시 만듦
+            index.clear()
+            added, replaced = _append_new_rows(session, index, embedding_table, chunk_table, batch_rows, on_batch)
+            index.meta['source'] = embedding_table
+            index._save_meta()
+            rebuilt, deleted = True, 0
+
+    compacted = index.meta['rows'] > 0 and 1 - len(index) / index.meta['rows'] > COMPACT_RATIO
+    if compacted:
+        index.compact()
+    return {
+        'added': added,
+        'replaced': replaced,
+        'deleted': deleted,
+        'rebuilt': rebuilt,
+        'compacted': compacted,
+        'rows': len(index),
+        'seconds': time.perf_counter() - start_time
+    }
+
+
+def _append_new_rows(session, index: VectorIndex, embedding_table: str, chunk_table: str, batch_rows: int,
+                     on_batch) -> tuple:
+    """워터마크 이후의 행을 인덱스에 덧붙이고 워터마크를 올립니다. 반환값: (가져온 행 수, 교체된 행 수)"""
+    watermark = index.meta['watermark']
+
+    join = f"LEFT JOIN {chunk_table} c ON c.CHUNK_ID = e.CHUNK_ID" if chunk_table else ""
+    text_columns = "c.FILE_NAME, c.CHUNK_TYPE, c.CHUNK_TEXT" if chunk_table else \
+        "NULL AS FILE_NAME, NULL AS CHUNK_TYPE, NULL AS CHUNK_TEXT"
+    query = f"""
+        SELECT e.CHUNK_ID, e.EMBEDDING::ARRAY AS EMBEDDING,
+               TO_VARCHAR(e.CREATED_TIMESTAMP, 'YYYY-MM-DD HH24:MI:SS.FF9') AS CREATED, {text_columns}
+        FROM {embedding_table} e {join}
+        {"WHERE e.CREATED_TIMESTAMP > ?::TIMESTAMP_NTZ" if watermark else ""}
+        ORDER BY e.CREATED_TIMESTAMP, e.CHUNK_ID
+    """
+    added = replaced = 0
+    for df in review_batches(session, query, [watermark] if watermark else None, batch_rows):
+        replaced += index.add(df['CHUNK_ID'].to_numpy(), _parse_vectors(df['EMBEDDING']),
+                              df[["FILE_NAME", "CHUNK_TYPE", "CHUNK_TEXT"]].to_dict("records"))
+        added += len(df)
+        index.meta['watermark'] = max(watermark or "", df['CREATED'].max())
+        watermark = index.meta['watermark']
+        if on_batch:
+            on_batch(added)
+    return added, replaced
+
+
+def search_chunks(index: VectorIndex, query_vectors, k: int = 5) -> list:
+    """질문마다 상위 k개 청크 [{'CHUNK_ID', 'FILE_NAME', 'CHUNK_TYPE', 'CHUNK_TEXT', 'score'}, ...] 목록."""
+    rows, scores = index.search(query_vectors, k)
+    results = []
+    for query_rows, query_scores in zip(rows, scores):
+        items = index.metadata(query_rows)
+        results.append([{**item, 'score': float(score)} for item, score in zip(items, query_scores[query_rows >= 0])])
+    return results
@@ -0,0 +1,86 @@
+# 벡터 일괄 저장 (Bulk Vector Writer)
+#
+# Day 18은 임베딩마다 768개의 float를 문자열로 바꿔 "[...]" 리터럴을 만들고
+# INSERT ... SELECT {id}, {리터럴}::VECTOR(FLOAT, 768)을 한 행씩 실행합니다 (벡터마다 수 KB의 SQL 컴파일).
+# 여기서는 임베딩을 float32 NumPy 행렬로 유지하고, 차원마다 FLOAT 컬럼(E0 ... E767)을 가진 Parquet 파일로
+# 임시 스테이징 테이블에 일괄 로드(bulk_load = write_pandas)한 뒤, 한 문장으로 VECTOR로 변환해 저장합니다.
+#
+# 리스트 컬럼(ARRAY) 대신 차원별 컬럼을 쓰는 이유: Parquet LIST가 드라이버/리더 버전에 따라
+# 중첩 객체로 읽힐 수 있지만, FLOAT 컬럼은 그대로 읽히고 float32 -> FLOAT 변환도 손실이 없습니다.
+
+import numpy as np
+import pandas as pd
+
+from bulk_load import bulk_load, failed_rows, DEFAULT_PARALLEL
+
+EMBEDDING_DIM = 768
+DEFAULT_BATCH_ROWS = 50000   # bulk_load 한 번에 올리는 벡터 수 (Parquet 변환 메모리 제한)
+DEFAULT_FILE_ROWS = 10000    # 스테이지에 올리는 Parquet 파일당 행 수
+
+
+def embedding_matrix(embeddings, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """임베딩 목록(리스트/배열 또는 {'embedding': ...} 딕셔너리)을 (n, dim) float32 행렬로 만듭니다."""
+    if isinstance(embeddings, np.ndarray):
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+    else:
+        vectors = [e['embedding'] if isinstance(e, dict) else e for e in embeddings]
+        matrix = np.array(vectors, dtype=np.float32)
+    if not len(matrix):  # 빈 입력 (예: 임베딩을 하나도 만들지 않은 실행)
+        return np.empty((0, dim), dtype=np.float32)
+    matrix = matrix.reshape(len(matrix), -1)
+    if matrix.ndim != 2 or (len(matrix) and matrix.shape[1] != dim):
+        raise ValueError(f"임베딩 차원이 {dim}이 아닙니다: {matrix.shape}")
+    return matrix
+
+
+def _columns(dim: int) -> list:
+    return [f"E{i}" for i in range(dim)]
+
+
+def write_vectors(session, chunk_ids, matrix: np.ndarray, table_name: str, database: str, schema: str,
+                  batch_rows: int = DEFAULT_BATCH_ROWS, file_rows: int = DEFAULT_FILE_ROWS,
+                  parallel: int = DEFAULT_PARALLEL, on_batch=None, key_column: str = "CHUNK_ID") -> dict:
+    """(CHUNK_ID, 임베딩)을 임베딩 테이블에 저장합니다. 같은 CHUNK_ID의 기존 임베딩은 교체합니다.
+
+    matrix: (n, 768) float32 행렬 (embedding_matrix)
+    key_column: 키 컬럼 이름 (CHUNK_ID 외의 키는 문자열, 예: 임베딩 캐시의 CACHE_KEY)
+    on_batch: 스테이징 로드 묶음마다 on_batch(로드한 벡터 수, 전체 벡터 수)
+    반환값: {'written': 저장한 벡터 수, 'failed': 스테이징 로드 실패 행 목록}
+    """
+    numeric_key = key_column == "CHUNK_ID"
+    chunk_ids = np.asarray(chunk_ids, dtype=np.int64 if numeric_key else object)
+    matrix = embedding_matrix(matrix)
+    if len(chunk_ids) != len(matrix):
+        raise ValueError(f"CHUNK_ID {len(chunk_ids)}개와 임베딩 {len(matrix)}개의 수가 다릅니다")
+    if not len(matrix):  # 저장할 벡터가 없으면 스테이징 왕복 없이 끝냄
+        return {'written': 0, 'failed': []}
+    dim = matrix.shape[1]
+    target = f"{database}.{schema}.{table_name}"
+    staging_name = f"{table_name}_VECTOR_STAGING"
+    staging = f"{database}.{schema}.{staging_name}"
+    columns = _columns(dim)
+
+    session.sql(f"""
+        CREATE OR REPLACE TEMPORARY TABLE {staging} (
+            {key_column} {"NUMBER" if numeric_key else "VARCHAR"}, {", ".join(f"{c} FLOAT" for c in columns)}
+        )
+    """).collect()
+    failed = []
+    for start in range(0, len(matrix), batch_rows):
+        part = pd.DataFrame(matrix[start:start + batch_rows], columns=columns, copy=False)
+        part.insert(0, key_column, chunk_ids[start:start + batch_rows])
+        failed += [{**f, 'row': f['row'] + start}
+                   for f in failed_rows(bulk_load(session, part, staging_name, database=database, schema=schema,
+                                                  chunk_size=file_rows, parallel=parallel))]
+        if on_batch:
+            on_batch(min(start + batch_rows, len(matrix)), len(matrix))
+
+    # 한 문장으로 VECTOR 변환 후 저장 (기존 임베딩은 교체)
+    session.sql(f"DELETE FROM {target} WHERE {key_column} IN (SELECT {key_column} FROM {staging})").collect()
+    result = session.sql(f"""
+        INSERT INTO {target} ({key_column}, EMBEDDING)
+        SELECT {key_column}, ARRAY_CONSTRUCT({", ".join(columns)})::VECTOR(FLOAT, {dim})
+        FROM {staging}
+    """).collect()
+    session.sql(f"DROP TABLE IF EXISTS {staging}").collect()
+    return {'written': result[0][0] if result else 0, 'failed': failed}